@@ -1,5 +1,4 @@
 """Tools: search_ads, get_ad_intelligence."""
-import json
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta
 
@@ -8,6 +7,7 @@ from competitive_mcp.db import (
     Competitor, Ad,
 )
 from competitive_mcp.formatting import format_number, format_euros, format_date, truncate
+from services.ad_analytics import aggregate_ads, parse_platforms
 
 
 def search_ads(
@@ -87,60 +87,51 @@ def get_ad_intelligence(days: int = 30) -> str:
         if not comp_ids:
             return "Aucun concurrent configuré."
 
-        all_ads = db.query(Ad).filter(Ad.competitor_id.in_(comp_ids)).all()
-        if not all_ads:
+        # Counts and estimated spend grouped in SQL (one row per group)
+        groups = aggregate_ads(db, comp_ids, ("competitor_id", "display_format", "publisher_platforms", "platform"))
+        total_ads = sum(g.ads for g in groups)
+        if not total_ads:
             return "Aucune publicité en base."
 
         # Global stats
-        active = [a for a in all_ads if a.is_active]
         format_counts = {}
         platform_counts = {}
         comp_ad_counts = {}
 
-        total_spend_min = 0
-        total_spend_max = 0
+        for g in groups:
+            fmt = g.display_format or "AUTRE"
+            format_counts[fmt] = format_counts.get(fmt, 0) + g.ads
 
-        for ad in all_ads:
-            fmt = ad.display_format or "AUTRE"
-            format_counts[fmt] = format_counts.get(fmt, 0) + 1
+            for pp in parse_platforms(g.publisher_platforms, g.platform):
+                platform_counts[pp] = platform_counts.get(pp, 0) + g.ads
 
-            try:
-                pps = json.loads(ad.publisher_platforms) if ad.publisher_platforms else []
-            except (json.JSONDecodeError, TypeError):
-                pps = []
-            if not pps and ad.platform:
-                pps = [ad.platform.upper()]
-            for pp in pps:
-                platform_counts[pp] = platform_counts.get(pp, 0) + 1
-
-            cid = ad.competitor_id
+            cid = g.competitor_id
             if cid not in comp_ad_counts:
                 comp_ad_counts[cid] = {"total": 0, "active": 0, "spend_min": 0, "spend_max": 0}
-            comp_ad_counts[cid]["total"] += 1
-            if ad.is_active:
-                comp_ad_counts[cid]["active"] += 1
+            comp_ad_counts[cid]["total"] += g.ads
+            comp_ad_counts[cid]["active"] += int(g.active)
+            comp_ad_counts[cid]["spend_min"] += g.spend_min
+            comp_ad_counts[cid]["spend_max"] += g.spend_max
 
-            spend = _estimate_spend(ad)
-            comp_ad_counts[cid]["spend_min"] += spend[0]
-            comp_ad_counts[cid]["spend_max"] += spend[1]
-            total_spend_min += spend[0]
-            total_spend_max += spend[1]
+        total_active = sum(d["active"] for d in comp_ad_counts.values())
+        total_spend_min = sum(d["spend_min"] for d in comp_ad_counts.values())
+        total_spend_max = sum(d["spend_max"] for d in comp_ad_counts.values())
 
         lines = ["# Intelligence Publicitaire", ""]
-        lines.append(f"**Total** : {len(all_ads)} pubs ({len(active)} actives)")
+        lines.append(f"**Total** : {total_ads} pubs ({total_active} actives)")
         lines.append(f"**Budget estimé total** : {format_euros(total_spend_min)} – {format_euros(total_spend_max)}")
         lines.append("")
 
         # Format breakdown
         lines.append("## Répartition par format")
         for fmt, count in sorted(format_counts.items(), key=lambda x: -x[1]):
-            pct = round(count / len(all_ads) * 100, 1)
+            pct = round(count / total_ads * 100, 1)
             lines.append(f"- {fmt} : {count} ({pct}%)")
 
         lines.append("")
         lines.append("## Répartition par plateforme")
         for plat, count in sorted(platform_counts.items(), key=lambda x: -x[1]):
-            pct = round(count / len(all_ads) * 100, 1)
+            pct = round(count / total_ads * 100, 1)
             lines.append(f"- {plat} : {count} ({pct}%)")
 
         lines.append("")
@@ -157,20 +148,3 @@ def get_ad_intelligence(days: int = 30) -> str:
     finally:
         db.close()
 
-
-def _estimate_spend(ad):
-    """Estime le budget d'une pub."""
-    if ad.estimated_spend_min and ad.estimated_spend_min > 0:
-        return (ad.estimated_spend_min, ad.estimated_spend_max or ad.estimated_spend_min)
-    cpm = 3.0
-    if ad.impressions_min and ad.impressions_min > 0:
-        return (
-            (ad.impressions_min / 1000) * cpm,
-            ((ad.impressions_max or ad.impressions_min) / 1000) * cpm,
-        )
-    if ad.eu_total_reach and ad.eu_total_reach > 100:
-        return (
-            (ad.eu_total_reach / 1000) * cpm * 0.7,
-            (ad.eu_total_reach / 1000) * cpm * 1.3,
-        )
-    return (0, 0)
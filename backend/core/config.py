@@ -24,6 +24,11 @@ class Settings:
     # ScrapeCreators API
     SCRAPECREATORS_API_KEY: str = os.getenv("SCRAPECREATORS_API_KEY", "")
     SCRAPECREATORS_CACHE_TTL_MINUTES: int = int(os.getenv("SCRAPECREATORS_CACHE_TTL_MINUTES", "60"))
+    SCRAPECREATORS_CACHE_MAX_ENTRIES: int = int(os.getenv("SCRAPECREATORS_CACHE_MAX_ENTRIES", "2000"))
+    SCRAPECREATORS_CACHE_MAX_MB: int = int(os.getenv("SCRAPECREATORS_CACHE_MAX_MB", "64"))
+    # Disk cache shared between API, scheduler and MCP processes ("" disables it)
+    SCRAPECREATORS_CACHE_PATH: str = os.getenv("SCRAPECREATORS_CACHE_PATH", "./cache/scrapecreators.sqlite")
+    SCRAPECREATORS_DISK_CACHE_MAX_MB: int = int(os.getenv("SCRAPECREATORS_DISK_CACHE_MAX_MB", "256"))
 
     # Anthropic Claude API (for AI creative analysis)
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
@@ -55,6 +60,50 @@ class Settings:
     SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
     SCHEDULER_HOUR: int = int(os.getenv("SCHEDULER_HOUR", "2"))
     SCHEDULER_MINUTE: int = int(os.getenv("SCHEDULER_MINUTE", "0"))
+    # "inline": the API process also runs the worker loop (single-process deploys).
+    # "worker": jobs run in `python -m services.worker`, the API only enqueues them;
+    # only set it where a worker service is deployed (render.yaml, docker-compose.yml).
+    SCHEDULER_MODE: str = os.getenv("SCHEDULER_MODE", "inline").lower()
+    JOB_LOCK_TTL_MINUTES: int = int(os.getenv("JOB_LOCK_TTL_MINUTES", "15"))
+    WORKER_POLL_SECONDS: float = float(os.getenv("WORKER_POLL_SECONDS", "5"))
+    # How long API shutdown waits for the inline worker's running jobs before cancelling them
+    WORKER_SHUTDOWN_SECONDS: float = float(os.getenv("WORKER_SHUTDOWN_SECONDS", "25"))
+
+    # Daily collection concurrency (competitors in flight + per-provider caps)
+    COLLECTION_CONCURRENCY: int = int(os.getenv("COLLECTION_CONCURRENCY", "8"))
+    SCRAPECREATORS_MAX_CONCURRENCY: int = int(os.getenv("SCRAPECREATORS_MAX_CONCURRENCY", "5"))
+    META_AD_LIBRARY_MAX_CONCURRENCY: int = int(os.getenv("META_AD_LIBRARY_MAX_CONCURRENCY", "3"))
+    SEARCHAPI_MAX_CONCURRENCY: int = int(os.getenv("SEARCHAPI_MAX_CONCURRENCY", "3"))
+
+    # Creative analysis pipeline (services/creative_analyzer.py)
+    GEMINI_RPM: int = int(os.getenv("GEMINI_RPM", "120"))
+    MISTRAL_RPM: int = int(os.getenv("MISTRAL_RPM", "60"))
+    CREATIVE_DOWNLOAD_CONCURRENCY: int = int(os.getenv("CREATIVE_DOWNLOAD_CONCURRENCY", "8"))
+    CREATIVE_ANALYZE_CONCURRENCY: int = int(os.getenv("CREATIVE_ANALYZE_CONCURRENCY", "8"))
+    CREATIVE_WRITE_BATCH: int = int(os.getenv("CREATIVE_WRITE_BATCH", "25"))
+    LLM_TEXT_BATCH_SIZE: int = int(os.getenv("LLM_TEXT_BATCH_SIZE", "10"))  # text-only ads / posts per prompt
+
+    # Daily ad snapshots rolled up per competitor into ad_daily_stats (services/signals.py)
+    AD_DAILY_ROLLUP: bool = os.getenv("AD_DAILY_ROLLUP", "true").lower() == "true"
+
+    # Monthly range partitions for the metric history tables, PostgreSQL only (services/partitioning.py)
+    HISTORY_PARTITIONING: bool = os.getenv("HISTORY_PARTITIONING", "false").lower() == "true"
+    HISTORY_PARTITION_MONTHS_AHEAD: int = int(os.getenv("HISTORY_PARTITION_MONTHS_AHEAD", "3"))
+
+    # Raw metric history retention (services/retention.py): one row per day for
+    # RETENTION_DAILY_DAYS, then per week until RETENTION_WEEKLY_DAYS, then per month
+    RETENTION_ENABLED: bool = os.getenv("RETENTION_ENABLED", "true").lower() == "true"
+    RETENTION_DRY_RUN: bool = os.getenv("RETENTION_DRY_RUN", "true").lower() == "true"
+    RETENTION_DAILY_DAYS: int = int(os.getenv("RETENTION_DAILY_DAYS", "90"))
+    RETENTION_WEEKLY_DAYS: int = int(os.getenv("RETENTION_WEEKLY_DAYS", "365"))
+
+    # Content-addressed analysis cache (services/analysis_cache.py)
+    ANALYSIS_CACHE_ENABLED: bool = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+
+    # Shared outbound HTTP pool (services/http_client.py)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "40"))
+    HTTP_PER_HOST_LIMIT: int = int(os.getenv("HTTP_PER_HOST_LIMIT", "10"))
 
     # Data.gouv.fr cache
     DATAGOUV_CACHE_DIR: Path = Path(os.getenv("DATAGOUV_CACHE_DIR", "./cache/datagouv"))
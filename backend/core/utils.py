@@ -1,4 +1,5 @@
 """Shared utility functions."""
+from sqlalchemy import DateTime, cast, func
 
 
 def get_logo_url(website: str | None) -> str | None:
@@ -9,3 +10,15 @@ def get_logo_url(website: str | None) -> str | None:
     if not domain or "." not in domain:
         return None
     return f"https://www.google.com/s2/favicons?domain={domain}&sz=128"
+
+
+def date_bucket(dialect: str, column, interval: str):
+    """SQL expression giving the 'YYYY-MM-DD' start of the day/week/month of a column."""
+    if dialect == "postgresql":
+        unit = {"raw": "day", "day": "day", "week": "week", "month": "month"}[interval]
+        return func.to_char(func.date_trunc(unit, cast(column, DateTime)), "YYYY-MM-DD")
+    if interval == "week":
+        return func.date(column, "weekday 0", "-6 days")  # Monday of the week
+    if interval == "month":
+        return func.strftime("%Y-%m-01", column)
+    return func.date(column)
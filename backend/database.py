@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, Text, ForeignKey, Boolean, BigInteger, JSON
+from sqlalchemy import create_engine, event, Column, Integer, String, DateTime, Float, Text, ForeignKey, Boolean, BigInteger, JSON, Date, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from datetime import datetime
+from sqlalchemy.orm import sessionmaker, relationship, Session as OrmSession
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dt_time, timedelta
+from functools import partial
+import asyncio
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "") or "sqlite:///./competitive.db"
@@ -162,6 +165,19 @@ class Ad(Base):
     competitor = relationship("Competitor", back_populates="ads")
 
 
+class AdAttribute(Base):
+    """One value of an ad's JSON list columns (services/ad_attributes.py).
+
+    kind: platform, country, location, tag, product or color.
+    """
+    __tablename__ = "ad_attributes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    ad_id = Column(Integer, nullable=False, index=True)  # References ads.id
+    kind = Column(String(20), nullable=False)
+    value = Column(String(500), nullable=False)
+
+
 class InstagramData(Base):
     __tablename__ = "instagram_data"
 
@@ -291,6 +307,25 @@ class StoreLocation(Base):
     competitor = relationship("Competitor", backref="store_locations")
 
 
+class CatchmentZone(Base):
+    """Materialised catchment of a competitor's BANCO stores for a given radius."""
+    __tablename__ = "catchment_zones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    competitor_id = Column(Integer, ForeignKey("competitors.id"), nullable=False, index=True)
+    radius_km = Column(Float, nullable=False)
+    stores_signature = Column(String(100))  # count + id/coordinate sums of the BANCO rows used
+    communes_version = Column(String(50))   # communes dataset cache version used
+    total_stores = Column(Integer, default=0)
+    population_covered = Column(BigInteger, default=0)
+    nb_communes_covered = Column(Integer, default=0)
+    total_population = Column(BigInteger, default=0)  # population of all communes in the dataset
+    communes = Column(Text)  # JSON {commune_code: population}
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+    competitor = relationship("Competitor", backref="catchment_zones")
+
+
 class MarketIndicator(Base):
     """Market activity indicators from INSEE/data.gouv.fr."""
     __tablename__ = "market_indicators"
@@ -548,6 +583,72 @@ class AdSnapshot(Base):
     competitor = relationship("Competitor", backref="ad_snapshots")
 
 
+class AdDailyStat(Base):
+    """Per-competitor daily rollup of ad_snapshots (one row per competitor and day)."""
+    __tablename__ = "ad_daily_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    competitor_id = Column(Integer, ForeignKey("competitors.id"), index=True)
+    day = Column(Date, nullable=False, index=True)
+    active_count = Column(Integer, default=0)
+    spend_min = Column(Float, default=0)
+    spend_max = Column(Float, default=0)
+    total_reach = Column(BigInteger, default=0)
+
+
+class CompetitorDailyMetric(Base):
+    """Channel metrics of a competitor as of the end of a day (services/metrics_rollup.py).
+
+    One row per competitor and day with collected data; each row carries
+    forward the latest known value of every channel, so "latest" and
+    "N days ago" are single-row lookups.
+    """
+    __tablename__ = "competitor_daily_metrics"
+
+    id = Column(Integer, primary_key=True, index=True)
+    competitor_id = Column(Integer, ForeignKey("competitors.id"), index=True)
+    day = Column(Date, nullable=False, index=True)
+    # Instagram
+    ig_followers = Column(Integer)
+    ig_posts_count = Column(Integer)
+    ig_engagement_rate = Column(Float)
+    ig_avg_likes = Column(Float)
+    ig_avg_comments = Column(Float)
+    ig_recorded_at = Column(DateTime)
+    # TikTok
+    tt_followers = Column(BigInteger)
+    tt_likes = Column(BigInteger)
+    tt_videos_count = Column(Integer)
+    tt_recorded_at = Column(DateTime)
+    # YouTube
+    yt_subscribers = Column(BigInteger)
+    yt_total_views = Column(BigInteger)
+    yt_videos_count = Column(Integer)
+    yt_engagement_rate = Column(Float)
+    yt_recorded_at = Column(DateTime)
+    # Play Store / App Store
+    ps_app_name = Column(String(255))
+    ps_rating = Column(Float)
+    ps_reviews_count = Column(Integer)
+    ps_downloads = Column(String(50))
+    ps_downloads_numeric = Column(BigInteger)
+    ps_version = Column(String(50))
+    ps_recorded_at = Column(DateTime)
+    as_app_name = Column(String(255))
+    as_rating = Column(Float)
+    as_reviews_count = Column(Integer)
+    as_downloads = Column(String(50))
+    as_downloads_numeric = Column(BigInteger)
+    as_version = Column(String(50))
+    as_recorded_at = Column(DateTime)
+    # Snapchat profile
+    snap_subscribers = Column(BigInteger)
+    snap_engagement_rate = Column(Float)
+    snap_spotlight_count = Column(Integer)
+    snap_recorded_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
 class GoogleTrendsData(Base):
     """Google Trends interest score (0-100) per competitor per day."""
     __tablename__ = "google_trends_data"
@@ -561,6 +662,11 @@ class GoogleTrendsData(Base):
 
     competitor = relationship("Competitor", backref="google_trends_data")
 
+    # Upsert key of services/google_ingestion.py (added to existing databases by init_db)
+    __table_args__ = (
+        Index("uq_google_trends_competitor_keyword_date", "competitor_id", "keyword", "date", unique=True),
+    )
+
 
 class GoogleNewsArticle(Base):
     """News article collected via Google News."""
@@ -710,6 +816,67 @@ class EReputationComment(Base):
     audit = relationship("EReputationAudit", back_populates="comments")
 
 
+class JobRun(Base):
+    """A scheduled job execution requested from the API, drained by the worker."""
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(100), nullable=False, index=True)  # scheduler job id (daily_collection, ...)
+    status = Column(String(20), default="queued", index=True)  # queued/running/done/failed
+    source = Column(String(20), default="manual")  # manual/cron
+    requested_by = Column(String(255))
+    worker = Column(String(255))  # hostname:pid of the worker that ran it
+    error = Column(Text)
+    enqueued_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
+class JobLock(Base):
+    """Leased lock so a job runs in at most one worker at a time."""
+    __tablename__ = "job_locks"
+
+    job_id = Column(String(100), primary_key=True)
+    holder = Column(String(255), nullable=False)
+    acquired_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class TaskItem(Base):
+    """One item of a long pipeline (ad to analyze, store to enrich, ...), leased by workers."""
+    __tablename__ = "task_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_type = Column(String(50), nullable=False, index=True)  # creative_analysis/social_analysis/gmb_enrichment/ereputation_audit
+    item_key = Column(String(100), nullable=False)  # id of the ad/post/store/competitor
+    run_id = Column(Integer, index=True)  # JobRun that last enqueued it
+    status = Column(String(20), default="pending", index=True)  # pending/leased/done/dead
+    attempts = Column(Integer, default=0)
+    lease_owner = Column(String(255))
+    lease_expires_at = Column(DateTime)
+    available_at = Column(DateTime, default=datetime.utcnow, index=True)  # retry backoff
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, index=True)
+
+
+class AnalysisCache(Base):
+    """AI analysis keyed by content (image bytes + normalised text + prompt version + model)."""
+    __tablename__ = "analysis_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(20), nullable=False, index=True)  # creative/creative_text/social
+    content_hash = Column(String(64), nullable=False)  # exact key (sha256)
+    similar_key = Column(String(64), index=True)  # same key with the perceptual hash instead of the bytes
+    model = Column(String(100))
+    prompt_version = Column(String(20))
+    result = Column(Text, nullable=False)  # JSON
+    hits = Column(Integer, default=0)
+    similar_hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_hit_at = Column(DateTime)
+
+
 def _run_migrations(engine):
     """Add missing columns and indexes to existing tables."""
     try:
@@ -815,6 +982,7 @@ def _run_migrations(engine):
             ("tiktok_data", "recorded_at"),
             ("youtube_data", "competitor_id"),
             ("youtube_data", "recorded_at"),
+            ("ad_snapshots", "recorded_at"),
             ("ads", "creative_concept"),
             ("ads", "creative_tone"),
             ("ads", "creative_score"),
@@ -1009,6 +1177,14 @@ def _merge_competitor_group(conn, ids: list[int], merged_ids: set[int]):
         return
 
     for other_id in others:
+        # Trends points already stored for the canonical competitor would collide
+        # on the (competitor_id, keyword, date) unique index
+        conn.execute(text(
+            'DELETE FROM google_trends_data WHERE competitor_id = :old AND EXISTS ('
+            'SELECT 1 FROM google_trends_data g WHERE g.competitor_id = :canonical '
+            'AND g.keyword = google_trends_data.keyword AND g.date = google_trends_data.date)'
+        ), {"canonical": best_id, "old": other_id})
+
         # Re-point all FK references to canonical
         for fk_table in ("ads", "instagram_data", "app_data", "tiktok_data", "youtube_data",
                          "store_locations", "social_posts", "serp_results", "geo_results",
@@ -1020,6 +1196,12 @@ def _merge_competitor_group(conn, ids: list[int], merged_ids: set[int]):
             except Exception:
                 pass  # Table might not exist
 
+        # Daily ad rollup: rebuilt from the re-pointed snapshots (a plain UPDATE
+        # would collide on the (competitor_id, day) unique index)
+        rollup_ad_snapshots(conn, competitor_ids=[best_id, other_id])
+        from services.metrics_rollup import rebuild_daily_metrics
+        rebuild_daily_metrics(conn, [best_id, other_id])
+
         # Move advertiser_competitors links to canonical (avoid duplicates)
         # First delete links that would cause duplicates
         conn.execute(text(
@@ -1060,8 +1242,131 @@ def _merge_competitor_group(conn, ids: list[int], merged_ids: set[int]):
         merged_ids.add(other_id)
 
 
+def rollup_ad_snapshots(conn, day_from=None, day_to=None, competitor_ids=None) -> int:
+    """Rebuild ad_daily_stats from ad_snapshots for days in [day_from, day_to] (all days if None).
+
+    Works on a Session or a Connection; the caller commits. Returns the number of rows written.
+    """
+    from sqlalchemy import delete, insert, select, func
+
+    snap = AdSnapshot.__table__
+    stats = AdDailyStat.__table__
+    day = func.date(snap.c.recorded_at)
+
+    snap_filters, stats_filters = [], []
+    if day_from is not None:
+        snap_filters.append(snap.c.recorded_at >= datetime.combine(day_from, dt_time.min))
+        stats_filters.append(stats.c.day >= day_from)
+    if day_to is not None:
+        snap_filters.append(snap.c.recorded_at < datetime.combine(day_to + timedelta(days=1), dt_time.min))
+        stats_filters.append(stats.c.day <= day_to)
+    if competitor_ids is not None:
+        snap_filters.append(snap.c.competitor_id.in_(competitor_ids))
+        stats_filters.append(stats.c.competitor_id.in_(competitor_ids))
+
+    conn.execute(delete(stats).where(*stats_filters))
+    grouped = select(
+        snap.c.competitor_id,
+        day,
+        func.count(snap.c.id),
+        func.coalesce(func.sum(snap.c.estimated_spend_min), 0),
+        func.coalesce(func.sum(snap.c.estimated_spend_max), 0),
+        func.coalesce(func.sum(snap.c.eu_total_reach), 0),
+    ).where(*snap_filters).group_by(snap.c.competitor_id, day)
+    result = conn.execute(insert(stats).from_select(
+        ["competitor_id", "day", "active_count", "spend_min", "spend_max", "total_reach"], grouped,
+    ))
+    return result.rowcount or 0
+
+
+def _backfill_ad_daily_stats(engine):
+    """Build the daily ad rollup from existing snapshots the first time it is empty."""
+    try:
+        from sqlalchemy import text
+        with engine.begin() as conn:
+            has_stats = conn.execute(text("SELECT 1 FROM ad_daily_stats LIMIT 1")).first()
+            has_snapshots = conn.execute(text("SELECT 1 FROM ad_snapshots LIMIT 1")).first()
+            if has_snapshots and not has_stats:
+                rollup_ad_snapshots(conn)
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).warning(f"Ad daily stats backfill warning: {e}")
+
+
+def _backfill_ad_attributes(engine):
+    """Explode the JSON list columns of existing ads the first time ad_attributes is empty."""
+    try:
+        from sqlalchemy import text
+        from services.ad_attributes import CHUNK_SIZE, sync_ad_attributes
+        with engine.begin() as conn:
+            if conn.execute(text("SELECT 1 FROM ad_attributes LIMIT 1")).first():
+                # Bulk ad deletes (admin cleanup) leave rows behind; drop them here
+                conn.execute(text("DELETE FROM ad_attributes WHERE ad_id NOT IN (SELECT id FROM ads)"))
+                return
+            last_id = 0
+            while True:
+                ids = [r[0] for r in conn.execute(text(
+                    "SELECT id FROM ads WHERE id > :last ORDER BY id LIMIT :n"
+                ), {"last": last_id, "n": CHUNK_SIZE})]
+                if not ids:
+                    break
+                sync_ad_attributes(conn, ids)
+                last_id = ids[-1]
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).warning(f"Ad attributes backfill warning: {e}")
+
+
+def _backfill_competitor_daily_metrics(engine):
+    """Build competitor_daily_metrics from the raw channel history the first time it is empty."""
+    try:
+        from sqlalchemy import text
+        from services.metrics_rollup import rebuild_daily_metrics, METRIC_TABLES
+        with engine.begin() as conn:
+            if conn.execute(text("SELECT 1 FROM competitor_daily_metrics LIMIT 1")).first():
+                return
+            comp_ids = set()
+            for table in METRIC_TABLES:
+                comp_ids.update(
+                    r[0] for r in conn.execute(text(f'SELECT DISTINCT competitor_id FROM "{table}"'))
+                    if r[0] is not None
+                )
+            if comp_ids:
+                rebuild_daily_metrics(conn, sorted(comp_ids))
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).warning(f"Competitor daily metrics backfill warning: {e}")
+
+
+def _compact_google_trends(engine):
+    """Drop the duplicate trends points stored before the unique (competitor_id, keyword, date) index.
+
+    Keeps the latest fetch of each point; runs until the unique index exists.
+    """
+    try:
+        from sqlalchemy import text, inspect
+        inspector = inspect(engine)
+        if "google_trends_data" not in inspector.get_table_names():
+            return
+        if "uq_google_trends_competitor_keyword_date" in {
+            idx["name"] for idx in inspector.get_indexes("google_trends_data")
+        }:
+            return
+        with engine.begin() as conn:
+            result = conn.execute(text(
+                "DELETE FROM google_trends_data WHERE id NOT IN ("
+                "SELECT MAX(id) FROM google_trends_data GROUP BY competitor_id, keyword, date)"
+            ))
+        if result.rowcount:
+            import logging
+            logging.getLogger(__name__).info(f"Google Trends compaction: {result.rowcount} duplicate points removed")
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).warning(f"Google Trends compaction warning: {e}")
+
+
 def _add_unique_constraints(engine):
-    """Add unique constraints on join tables (idempotent)."""
+    """Add unique constraints on join/cache tables (idempotent)."""
     try:
         from sqlalchemy import text, inspect
         inspector = inspect(engine)
@@ -1069,6 +1374,14 @@ def _add_unique_constraints(engine):
         for table, cols, idx_name in [
             ("user_advertisers", ["user_id", "advertiser_id"], "uq_user_advertiser"),
             ("advertiser_competitors", ["advertiser_id", "competitor_id"], "uq_advertiser_competitor"),
+            ("catchment_zones", ["competitor_id", "radius_km"], "uq_catchment_competitor_radius"),
+            ("task_items", ["task_type", "item_key"], "uq_task_type_item"),
+            ("analysis_cache", ["content_hash"], "uq_analysis_cache_hash"),
+            ("ad_daily_stats", ["competitor_id", "day"], "uq_ad_daily_stats_competitor_day"),
+            ("competitor_daily_metrics", ["competitor_id", "day"], "uq_competitor_daily_metrics_day"),
+            # Leading (kind, value) serves the attribute filters
+            ("ad_attributes", ["kind", "value", "ad_id"], "uq_ad_attributes_kind_value_ad"),
+            ("google_trends_data", ["competitor_id", "keyword", "date"], "uq_google_trends_competitor_keyword_date"),
         ]:
             if table not in existing_tables:
                 continue
@@ -1084,14 +1397,107 @@ def _add_unique_constraints(engine):
         logging.getLogger(__name__).warning(f"Unique constraint warning: {e}")
 
 
+# (table, columns, index name, partial-index predicate) for the hot history and
+# ads queries: filter on competitor_id, then order or window on time.
+# "{true}" in a predicate is the dialect's boolean literal.
+COMPOSITE_INDEXES = [
+    ("instagram_data", ["competitor_id", "recorded_at DESC"], "ix_instagram_data_competitor_recorded", None),
+    ("tiktok_data", ["competitor_id", "recorded_at DESC"], "ix_tiktok_data_competitor_recorded", None),
+    ("youtube_data", ["competitor_id", "recorded_at DESC"], "ix_youtube_data_competitor_recorded", None),
+    ("snapchat_data", ["competitor_id", "recorded_at DESC"], "ix_snapchat_data_competitor_recorded", None),
+    ("app_data", ["competitor_id", "store", "recorded_at DESC"], "ix_app_data_competitor_store_recorded", None),
+    ("ad_snapshots", ["competitor_id", "recorded_at DESC"], "ix_ad_snapshots_competitor_recorded", None),
+    ("ad_snapshots", ["ad_id", "recorded_at DESC"], "ix_ad_snapshots_ad_recorded", None),
+    ("google_trends_data", ["competitor_id", "keyword", "date DESC"], "ix_google_trends_competitor_keyword_date", None),
+    ("ads", ["competitor_id", "start_date DESC"], "ix_ads_competitor_start", None),
+    ("ads", ["competitor_id"], "ix_ads_competitor_active", "is_active = {true}"),
+]
+
+
+def _composite_index_ddl(table: str, columns: list[str], idx_name: str, where: str | None, is_pg: bool) -> str:
+    col_list = ", ".join(
+        f'"{name}" {order}'.rstrip() for name, _, order in (c.partition(" ") for c in columns)
+    )
+    ddl = f'CREATE INDEX IF NOT EXISTS "{idx_name}" ON "{table}" ({col_list})'
+    if where:
+        ddl += " WHERE " + where.format(true="true" if is_pg else "1")
+    return ddl
+
+
+def _add_composite_indexes(engine):
+    """Add the COMPOSITE_INDEXES (composite and partial) that are missing (idempotent)."""
+    try:
+        from sqlalchemy import text, inspect
+        inspector = inspect(engine)
+        existing_tables = inspector.get_table_names()
+        is_pg = engine.dialect.name == "postgresql"
+        for table, columns, idx_name, where in COMPOSITE_INDEXES:
+            if table not in existing_tables:
+                continue
+            if idx_name in {idx["name"] for idx in inspector.get_indexes(table)}:
+                continue
+            with engine.begin() as conn:
+                conn.execute(text(_composite_index_ddl(table, columns, idx_name, where, is_pg)))
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).warning(f"Composite index warning: {e}")
+
+
+def _partition_history(engine):
+    """Range-partition the history tables by month on PostgreSQL (opt-in, services/partitioning.py)."""
+    try:
+        from core.config import settings
+        if engine.dialect.name != "postgresql" or not settings.HISTORY_PARTITIONING:
+            return
+        from services.partitioning import partition_history_tables
+        partition_history_tables(engine)
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).warning(f"History partitioning warning: {e}")
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _partition_history(engine)
     _run_migrations(engine)
+    _compact_google_trends(engine)
     _add_unique_constraints(engine)
+    _add_composite_indexes(engine)
     _backfill_logos(engine)
     _backfill_competitor_advertiser(engine)
     _backfill_is_brand(engine)
     _migrate_join_tables(engine)
+    _backfill_ad_daily_stats(engine)
+    _backfill_ad_attributes(engine)
+    _backfill_competitor_daily_metrics(engine)
+
+
+# Keep competitor_daily_metrics in step with every InstagramData/TikTokData/...
+# row added through the ORM (services/metrics_rollup.py)
+@event.listens_for(OrmSession, "after_flush")
+def _collect_metric_rows(session, flush_context):
+    from services.metrics_rollup import collect_flushed
+    collect_flushed(session)
+
+
+@event.listens_for(OrmSession, "after_flush_postexec")
+def _rollup_metric_rows(session, flush_context):
+    from services.metrics_rollup import apply_pending
+    apply_pending(session)
+
+
+# Keep ad_attributes in step with the JSON list columns of ads written through
+# the ORM (services/ad_attributes.py)
+@event.listens_for(OrmSession, "after_flush")
+def _collect_ad_attributes(session, flush_context):
+    from services.ad_attributes import collect_flushed
+    collect_flushed(session)
+
+
+@event.listens_for(OrmSession, "after_flush_postexec")
+def _sync_ad_attributes(session, flush_context):
+    from services.ad_attributes import apply_pending
+    apply_pending(session)
 
 
 def get_db():
@@ -1100,3 +1506,52 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# =============================================================================
+# Async access for `async def` handlers
+# =============================================================================
+
+# Bounded pool for blocking DB work, sized below the engine pool (5 + 10 overflow)
+DB_THREAD_POOL_SIZE = int(os.getenv("DB_THREAD_POOL_SIZE", "8"))
+db_executor = ThreadPoolExecutor(max_workers=DB_THREAD_POOL_SIZE, thread_name_prefix="db")
+
+
+async def run_in_db_thread(fn, *args, **kwargs):
+    """Run blocking DB/CPU work on the bounded DB pool instead of the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, partial(fn, *args, **kwargs))
+
+
+class AsyncDBSession:
+    """Session handle for async handlers.
+
+    Mirrors AsyncSession.run_sync(fn, *args): fn receives the sync Session and
+    runs on the DB thread pool, so slow queries never block the event loop.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self._factory = session_factory
+        self._session = None
+
+    @property
+    def sync_session(self):
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_db_thread(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self):
+        if self._session is not None:
+            await run_in_db_thread(self._session.close)
+            self._session = None
+
+
+async def get_async_db():
+    db = AsyncDBSession()
+    try:
+        yield db
+    finally:
+        await db.close()
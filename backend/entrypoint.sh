@@ -7,4 +7,9 @@ if [ -n "$S3_CACHE_BUCKET" ]; then
   aws s3 sync "s3://${S3_CACHE_BUCKET}/datagouv" /app/cache/datagouv --quiet || echo "Warning: S3 sync failed, continuing without cache"
 fi
 
+# Any arguments replace the API server (e.g. "python -m services.worker")
+if [ "$#" -gt 0 ]; then
+  exec "$@"
+fi
+
 exec uvicorn main:app --host 0.0.0.0 --port "${PORT:-8000}"
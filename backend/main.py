@@ -13,6 +13,7 @@ from database import init_db, engine, User, Advertiser, Competitor, PromptTempla
 from database import SessionLocal
 from fastapi import Depends, HTTPException
 from core.auth import get_current_user
+from core.config import settings
 
 import os
 # Load .env from parent dir (local dev) or current dir (deployed)
@@ -30,6 +31,7 @@ from routers import smart_filter
 from routers import vgeo
 from routers import ereputation
 from services.scheduler import scheduler
+from services.http_client import http_pool
 
 # Logging
 logging.basicConfig(
@@ -373,8 +375,31 @@ def _backfill_ad_types():
         db.close()
 
 
+_inline_worker = None  # services.worker.Worker when SCHEDULER_MODE=inline
+_inline_worker_task = None  # its run() task, awaited on shutdown
+
+
+async def _stop_inline_worker():
+    """Stop the inline worker and wait for its running jobs (cancelled after WORKER_SHUTDOWN_SECONDS)."""
+    import asyncio
+
+    if _inline_worker is None:
+        return
+    _inline_worker.stop()
+    if _inline_worker_task is None:
+        return
+    try:
+        await asyncio.wait_for(_inline_worker_task, timeout=settings.WORKER_SHUTDOWN_SECONDS)
+        logger.info("Inline worker stopped")
+    except asyncio.TimeoutError:
+        logger.warning(f"Inline worker jobs cancelled after {settings.WORKER_SHUTDOWN_SECONDS}s shutdown wait")
+    except Exception as e:
+        logger.error(f"Inline worker stop failed: {e}")
+
+
 async def _deferred_startup():
     """Run slow startup tasks in background so healthcheck passes fast."""
+    global _inline_worker, _inline_worker_task
     import asyncio
     await asyncio.sleep(2)  # Let the server start first
 
@@ -396,11 +421,15 @@ async def _deferred_startup():
     # Auto-enrich moved to daily scheduler to avoid burning API credits on every deploy
     # The scheduler runs at 02:00 and handles enrichment there
 
-    try:
-        await scheduler.start()
-        logger.info("Scheduler started")
-    except Exception as e:
-        logger.error(f"Scheduler start failed (non-fatal): {e}")
+    # Default SCHEDULER_MODE=inline: jobs run in this process; "worker" leaves them to `python -m services.worker`
+    if settings.SCHEDULER_MODE == "inline":
+        try:
+            from services.worker import Worker
+            _inline_worker = Worker()
+            _inline_worker_task = asyncio.create_task(_inline_worker.run())
+            logger.info("Inline worker started")
+        except Exception as e:
+            logger.error(f"Inline worker start failed (non-fatal): {e}")
 
     # Store enrichment moved to daily scheduler to avoid API calls on every deploy
 
@@ -410,6 +439,11 @@ async def lifespan(app: FastAPI):
     """Application lifecycle management."""
     import asyncio
 
+    try:
+        await http_pool.start()
+    except Exception as e:
+        logger.error(f"HTTP pool start failed (non-fatal): {e}")
+
     try:
         init_db()
         logger.info("Database initialized")
@@ -447,9 +481,12 @@ async def lifespan(app: FastAPI):
     except Exception:
         pass
 
+    # Running jobs still use the HTTP pool: close it only once they are done
+    await _stop_inline_worker()
+
     try:
-        await scheduler.stop()
-        logger.info("Scheduler stopped")
+        await http_pool.close()
+        logger.info("HTTP pool closed")
     except Exception:
         pass
 
@@ -606,6 +643,12 @@ async def health_check():
     return result
 
 
+@app.get("/api/health/http")
+async def http_pool_metrics():
+    """Outbound HTTP pool: saturation and per-host latency."""
+    return http_pool.metrics()
+
+
 @app.get("/api/health/data-depth")
 async def data_depth():
     """Data depth diagnostic — no auth required."""
@@ -759,125 +802,96 @@ def _require_admin(user: User):
         raise HTTPException(status_code=403, detail="Admin uniquement")
 
 
+def _enqueue_job(job_id: str, user: User, message: str) -> dict:
+    """Queue a scheduler job for the worker process."""
+    from services.jobs import enqueue_job
+    db = SessionLocal()
+    try:
+        run = enqueue_job(db, job_id, requested_by=user.email)
+        return {"message": message, "job_id": job_id, "run_id": run.id, "status": run.status, "timestamp": datetime.utcnow().isoformat()}
+    finally:
+        db.close()
+
+
 @app.post("/api/scheduler/run-now")
 async def trigger_manual_collection(user: User = Depends(get_current_user)):
-    """Déclenche une collecte manuelle de toutes les données. Admin only."""
+    """Met en file une collecte manuelle de toutes les données. Admin only."""
     _require_admin(user)
-    try:
-        await scheduler.daily_data_collection()
-        return {"message": "Collecte terminée", "timestamp": datetime.utcnow().isoformat()}
-    except Exception as e:
-        return {"message": f"Erreur: {str(e)}", "error": True}
+    return _enqueue_job("daily_collection", user, "Collecte mise en file")
 
 
 @app.post("/api/scheduler/run-creative-analysis")
 async def trigger_creative_analysis(user: User = Depends(get_current_user)):
-    """Déclenche l'analyse créative Gemini sur les pubs non analysées. Admin only."""
+    """Met en file l'analyse créative Gemini sur les pubs non analysées. Admin only."""
     _require_admin(user)
-    import asyncio
-    asyncio.create_task(scheduler.daily_creative_analysis())
-    return {"message": "Analyse créative lancée en background", "timestamp": datetime.utcnow().isoformat()}
+    return _enqueue_job("daily_creative_analysis", user, "Analyse créative mise en file")
 
 
 @app.post("/api/scheduler/run-social-analysis")
 async def trigger_social_analysis(user: User = Depends(get_current_user)):
-    """Déclenche la collecte + analyse IA des posts sociaux. Admin only."""
+    """Met en file la collecte + analyse IA des posts sociaux. Admin only."""
     _require_admin(user)
-    import asyncio
-    asyncio.create_task(scheduler.daily_social_analysis())
-    return {"message": "Collecte + analyse sociale lancée en background", "timestamp": datetime.utcnow().isoformat()}
+    return _enqueue_job("daily_social_analysis", user, "Collecte + analyse sociale mise en file")
 
 
 @app.post("/api/scheduler/run-seo")
 async def trigger_seo_tracking(user: User = Depends(get_current_user)):
-    """Déclenche le tracking SEO SERP pour toutes les enseignes. Admin only."""
+    """Met en file le tracking SEO SERP pour toutes les enseignes. Admin only."""
     _require_admin(user)
-    import asyncio
-    asyncio.create_task(scheduler.daily_seo_tracking())
-    return {"message": "SEO tracking lancé en background", "timestamp": datetime.utcnow().isoformat()}
+    return _enqueue_job("daily_seo_tracking", user, "SEO tracking mis en file")
 
 
 @app.post("/api/scheduler/run-geo")
 async def trigger_geo_tracking(user: User = Depends(get_current_user)):
-    """Déclenche le tracking GEO (visibilité IA) pour toutes les enseignes. Admin only."""
+    """Met en file le tracking GEO (visibilité IA) pour toutes les enseignes. Admin only."""
     _require_admin(user)
-    import asyncio
-    asyncio.create_task(scheduler.daily_geo_tracking())
-    return {"message": "GEO tracking lancé en background", "timestamp": datetime.utcnow().isoformat()}
+    return _enqueue_job("daily_geo_tracking", user, "GEO tracking mis en file")
 
 
 @app.post("/api/scheduler/run-vgeo")
 async def trigger_vgeo_analysis(user: User = Depends(get_current_user)):
-    """Déclenche l'analyse VGEO (Video GEO) pour toutes les enseignes. Admin only."""
+    """Met en file l'analyse VGEO (Video GEO) pour toutes les enseignes. Admin only."""
     _require_admin(user)
-    import asyncio
-    asyncio.create_task(scheduler.daily_vgeo_analysis())
-    return {"message": "VGEO analysis lancée en background", "timestamp": datetime.utcnow().isoformat()}
+    return _enqueue_job("daily_vgeo_analysis", user, "VGEO analysis mise en file")
 
 
 @app.post("/api/scheduler/run-trends")
 async def trigger_google_trends(user: User = Depends(get_current_user)):
-    """Déclenche la collecte Google Trends pour toutes les enseignes. Admin only."""
+    """Met en file la collecte Google Trends pour toutes les enseignes. Admin only."""
     _require_admin(user)
-    import asyncio
-    asyncio.create_task(scheduler.daily_google_trends())
-    return {"message": "Google Trends lancé en background", "timestamp": datetime.utcnow().isoformat()}
+    return _enqueue_job("daily_google_trends", user, "Google Trends mis en file")
 
 
 @app.post("/api/scheduler/run-news")
 async def trigger_google_news(user: User = Depends(get_current_user)):
-    """Déclenche la collecte Google News pour toutes les enseignes. Admin only."""
+    """Met en file la collecte Google News pour toutes les enseignes. Admin only."""
     _require_admin(user)
-    import asyncio
-    asyncio.create_task(scheduler.daily_google_news())
-    return {"message": "Google News lancé en background", "timestamp": datetime.utcnow().isoformat()}
+    return _enqueue_job("daily_google_news", user, "Google News mis en file")
 
 
 @app.post("/api/scheduler/run-aso")
 async def trigger_aso_analysis(user: User = Depends(get_current_user)):
-    """Déclenche l'analyse ASO (App Store Optimization) pour toutes les enseignes. Admin only."""
+    """Met en file l'analyse ASO (App Store Optimization) pour toutes les enseignes. Admin only."""
     _require_admin(user)
-    import asyncio
-    asyncio.create_task(scheduler.daily_aso_analysis())
-    return {"message": "ASO analysis lancée en background", "timestamp": datetime.utcnow().isoformat()}
+    return _enqueue_job("daily_aso_analysis", user, "ASO analysis mise en file")
 
 
 @app.post("/api/scheduler/run-gmb")
 async def trigger_gmb_enrichment(user: User = Depends(get_current_user)):
-    """Déclenche l'enrichissement GMB (Google My Business) pour tous les magasins. Admin only."""
+    """Met en file l'enrichissement GMB (Google My Business) pour tous les magasins. Admin only."""
     _require_admin(user)
-    import asyncio
-    asyncio.create_task(scheduler.weekly_gmb_enrichment())
-    return {"message": "GMB enrichment lancé en background", "timestamp": datetime.utcnow().isoformat()}
+    return _enqueue_job("weekly_gmb_enrichment", user, "GMB enrichment mis en file")
 
 
 @app.post("/api/scheduler/run-ereputation")
 async def trigger_ereputation_audit(user: User = Depends(get_current_user)):
-    """Déclenche l'audit e-réputation pour tous les concurrents. Admin only."""
+    """Met en file l'audit e-réputation pour tous les concurrents. Admin only."""
     _require_admin(user)
-    import asyncio
-    asyncio.create_task(scheduler.weekly_ereputation_audit())
-    return {"message": "Audit e-réputation lancé en background", "timestamp": datetime.utcnow().isoformat()}
+    return _enqueue_job("weekly_ereputation_audit", user, "Audit e-réputation mis en file")
 
 
 @app.post("/api/scheduler/run-all")
 async def trigger_all_enrichment(user: User = Depends(get_current_user)):
-    """Déclenche TOUT : collecte + signaux + creative + social + SEO + GEO + VGEO + trends + news + ASO. Admin only."""
+    """Met en file TOUT : collecte + signaux + creative + social + SEO + GEO + VGEO + trends + news + ASO. Admin only."""
     _require_admin(user)
-    import asyncio
-
-    async def _run_all():
-        await scheduler.daily_data_collection()
-        await scheduler.daily_snapshots_and_signals()
-        await scheduler.daily_creative_analysis()
-        await scheduler.daily_social_analysis()
-        await scheduler.daily_seo_tracking()
-        await scheduler.daily_geo_tracking()
-        await scheduler.daily_vgeo_analysis()
-        await scheduler.daily_google_trends()
-        await scheduler.daily_google_news()
-        await scheduler.daily_aso_analysis()
-        await scheduler.weekly_ereputation_audit()
-
-    asyncio.create_task(_run_all())
-    return {"message": "Enrichissement complet lancé en background (collecte + signaux + creative + social + SEO + GEO + VGEO + trends + news + ASO + e-réputation)", "timestamp": datetime.utcnow().isoformat()}
+    return _enqueue_job("all", user, "Enrichissement complet mis en file (collecte + signaux + creative + social + SEO + GEO + VGEO + trends + news + ASO + e-réputation)")
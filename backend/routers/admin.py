@@ -931,18 +931,18 @@ async def admin_data_health(
     competitors = db.query(Competitor).filter(Competitor.is_active == True).all()
     comp_ids = [c.id for c in competitors]
 
-    # Latest timestamps per competitor per source
-    def _latest_map(model, extra_filter=None):
-        q = db.query(model.competitor_id, func.max(model.recorded_at).label("latest"))
-        if extra_filter is not None:
-            q = q.filter(extra_filter)
-        return dict(q.filter(model.competitor_id.in_(comp_ids)).group_by(model.competitor_id).all())
-
-    ig_map = _latest_map(InstagramData)
-    tt_map = _latest_map(TikTokData)
-    yt_map = _latest_map(YouTubeData)
-    ps_map = _latest_map(AppData, AppData.store == "playstore")
-    as_map = _latest_map(AppData, AppData.store == "appstore")
+    # Latest timestamps per competitor per source, from the daily rollup
+    from services.metrics_rollup import load_channel_metrics
+    latest_metrics = load_channel_metrics(db, comp_ids)
+
+    def _latest_map(channel):
+        return {cid: r.recorded_at for cid, r in latest_metrics[channel].items()}
+
+    ig_map = _latest_map("instagram")
+    tt_map = _latest_map("tiktok")
+    yt_map = _latest_map("youtube")
+    ps_map = _latest_map("playstore")
+    as_map = _latest_map("appstore")
 
     # Ad latest per competitor
     ad_map = dict(
@@ -1087,3 +1087,99 @@ async def update_user_features(
         "user_id": user_id,
         "features": resolve_features(target.features),
     }
+
+
+# ── Job queue ─────────────────────────────────────────────────────────────────
+
+@router.get("/task-queue")
+async def get_task_queue(
+    user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db),
+):
+    """Backlog and throughput per task type, with progress of the latest runs."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin uniquement")
+    from services import jobs, task_queue
+
+    from database import SystemSetting
+
+    runs = jobs.recent_runs(db)
+    progress = task_queue.run_progress(db, [r["id"] for r in runs])
+    for run in runs:
+        run["progress"] = progress.get(run["id"])
+    pipeline = db.query(SystemSetting).filter(SystemSetting.key == "creative_pipeline_stats").first()
+    return {
+        "task_types": task_queue.queue_stats(db),
+        "runs": runs,
+        "creative_pipeline": json.loads(pipeline.value) if pipeline else None,
+    }
+
+
+@router.get("/task-queue/{task_type}/failures")
+async def get_task_failures(
+    task_type: str,
+    user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db),
+):
+    """Items of a task type that failed at least once (retrying or dead)."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin uniquement")
+    from services import task_queue
+    if task_type not in task_queue.TASK_TYPES:
+        raise HTTPException(status_code=404, detail="Type de tâche inconnu")
+    return task_queue.failed_items(db, task_type)
+
+
+@router.post("/task-queue/{task_type}/retry-dead")
+async def retry_dead_tasks(
+    task_type: str,
+    user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db),
+):
+    """Re-arm dead items of a task type; the worker picks them up on its next poll."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin uniquement")
+    from services import task_queue
+    if task_type not in task_queue.TASK_TYPES:
+        raise HTTPException(status_code=404, detail="Type de tâche inconnu")
+    return {"task_type": task_type, "requeued": task_queue.retry_dead(db, task_type)}
+
+
+@router.get("/analysis-cache")
+async def get_analysis_cache_stats(
+    user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db),
+):
+    """Hit rate of the content-addressed AI analysis cache, per kind (creative, creative_text, social)."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin uniquement")
+    from services import analysis_cache
+    return analysis_cache.stats(db)
+
+
+# ── History retention ─────────────────────────────────────────────────────────
+
+@router.get("/retention")
+async def get_retention_report(
+    user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db),
+):
+    """Report of the last history retention run (rows / bytes reclaimed or reclaimable)."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin uniquement")
+    from services.retention import get_last_report
+    return get_last_report(db) or {}
+
+
+@router.post("/retention/run")
+async def run_retention(
+    dry_run: bool = Query(True),
+    user: User = Depends(get_admin_user),
+):
+    """Run the history retention now; dry_run=true (default) only reports what would be reclaimed."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin uniquement")
+    from services import jobs
+    from services.retention import apply_retention
+    from database import run_in_db_thread
+    return await run_in_db_thread(jobs.with_session, apply_retention, dry_run)
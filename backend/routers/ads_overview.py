@@ -2,7 +2,6 @@
 Part de Voix Publicitaire — agrégation par concurrent tel que configuré.
 Toutes les pages/bénéficiaires d'un concurrent sont regroupées sous son nom.
 """
-import json
 import logging
 from datetime import datetime, timedelta
 from collections import defaultdict
@@ -10,9 +9,10 @@ from collections import defaultdict
 from fastapi import APIRouter, Depends, Header, Query
 from sqlalchemy.orm import Session
 
-from database import SessionLocal, Ad, User, Competitor
+from database import SessionLocal, User
 from core.auth import get_current_user
 from core.permissions import get_user_competitors, parse_advertiser_header
+from services.ad_analytics import aggregate_ads, parse_platforms
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -26,39 +26,6 @@ def _get_db():
         db.close()
 
 
-def _estimate_spend(ad: Ad) -> tuple[float, float]:
-    """Estimated spend (priority: declared > impressions×CPM > reach×CPM)."""
-    if ad.estimated_spend_min and ad.estimated_spend_min > 0:
-        return ad.estimated_spend_min, ad.estimated_spend_max or ad.estimated_spend_min
-    if ad.impressions_min and ad.impressions_min > 0:
-        cpm = 3.0
-        return (ad.impressions_min / 1000) * cpm, ((ad.impressions_max or ad.impressions_min) / 1000) * cpm
-    if ad.eu_total_reach and ad.eu_total_reach > 100:
-        cpm = 3.0
-        return (ad.eu_total_reach / 1000) * cpm * 0.7, (ad.eu_total_reach / 1000) * cpm * 1.3
-    return 0.0, 0.0
-
-
-def _parse_platforms(ad: Ad) -> list[str]:
-    """Parse publisher_platforms JSON, normalise AUDIENCE_NETWORK/MESSENGER → facebook."""
-    pps: list[str] = []
-    if ad.publisher_platforms:
-        try:
-            pps = json.loads(ad.publisher_platforms)
-        except (json.JSONDecodeError, TypeError):
-            pps = []
-    if not pps and ad.platform:
-        pps = [ad.platform.upper()]
-
-    normalised = []
-    for p in pps:
-        p_lower = p.lower()
-        if p_lower in ("audience_network", "messenger"):
-            p_lower = "facebook"
-        normalised.append(p_lower)
-    return list(set(normalised))
-
-
 @router.get("/overview")
 async def ads_overview(
     start_date: str | None = Query(None, description="YYYY-MM-DD"),
@@ -90,29 +57,24 @@ async def ads_overview(
     comp_map = {c.id: c for c in competitors}
     comp_ids = list(comp_map.keys())
 
-    # Load all ads in period
-    ads = (
-        db.query(Ad)
-        .filter(Ad.competitor_id.in_(comp_ids))
-        .filter((Ad.start_date >= period_start) | (Ad.is_active == True))
-        .all()
+    # Ads overlapping the period, grouped and summed in SQL (no Ad rows loaded)
+    groups = aggregate_ads(
+        db, comp_ids, ("competitor_id", "publisher_platforms", "platform", "display_format", "ad_type"),
+        period_start, period_end,
     )
-
-    # Filter: only ads that overlap with the period
-    filtered_ads = []
-    for a in ads:
-        if a.start_date and a.start_date > period_end:
-            continue
-        if a.end_date and a.end_date < period_start:
-            continue
-        filtered_ads.append(a)
+    page_rows = aggregate_ads(db, comp_ids, ("competitor_id", "page"), period_start, period_end)
+    day_rows = aggregate_ads(db, comp_ids, ("competitor_id", "start_day"), period_start, period_end)
 
     # Group by competitor (all pages/beneficiaries roll up to competitor)
-    ads_by_comp: dict[int, list[Ad]] = defaultdict(list)
-    for a in filtered_ads:
-        ads_by_comp[a.competitor_id].append(a)
-
-    grand_total_ads = len(filtered_ads)
+    groups_by_comp: dict[int, list] = defaultdict(list)
+    for g in groups:
+        groups_by_comp[g.competitor_id].append(g)
+    pages_by_comp: dict[int, set[str]] = defaultdict(set)
+    for r in page_rows:
+        if r.page:
+            pages_by_comp[r.competitor_id].add(r.page.strip())
+
+    grand_total_ads = sum(g.ads for g in groups)
     grand_active = 0
     grand_spend_min = 0.0
     grand_spend_max = 0.0
@@ -122,47 +84,37 @@ async def ads_overview(
 
     for cid in comp_ids:
         comp = comp_map[cid]
-        c_ads = ads_by_comp.get(cid, [])
-        if not c_ads:
+        c_groups = groups_by_comp.get(cid, [])
+        if not c_groups:
             continue
 
-        active_count = sum(1 for a in c_ads if a.is_active)
+        total_ads = sum(g.ads for g in c_groups)
+        active_count = sum(int(g.active) for g in c_groups)
         grand_active += active_count
 
         by_platform: dict[str, dict] = defaultdict(lambda: {"ads": 0, "spend_min": 0.0, "spend_max": 0.0, "reach": 0})
         by_type: dict[str, int] = defaultdict(int)
         by_format: dict[str, int] = defaultdict(int)
-        # Track distinct pages/beneficiaries under this competitor
-        pages: set[str] = set()
 
         comp_spend_min = 0.0
         comp_spend_max = 0.0
         comp_reach = 0
 
-        for a in c_ads:
-            s_min, s_max = _estimate_spend(a)
+        for g in c_groups:
+            s_min, s_max, reach = float(g.spend_min), float(g.spend_max), int(g.reach)
             comp_spend_min += s_min
             comp_spend_max += s_max
-            reach = a.eu_total_reach or 0
             comp_reach += reach
 
-            platforms = _parse_platforms(a)
+            platforms = parse_platforms(g.publisher_platforms, g.platform, normalise=True)
             for plat in platforms:
-                by_platform[plat]["ads"] += 1
+                by_platform[plat]["ads"] += g.ads
                 by_platform[plat]["spend_min"] += s_min / max(len(platforms), 1)
                 by_platform[plat]["spend_max"] += s_max / max(len(platforms), 1)
                 by_platform[plat]["reach"] += reach // max(len(platforms), 1)
 
-            ad_type = a.ad_type or "unknown"
-            by_type[ad_type] += 1
-
-            fmt = (a.display_format or "unknown").upper()
-            by_format[fmt] += 1
-
-            # Track pages
-            page = a.beneficiary or a.page_name
-            if page:
-                pages.add(page.strip())
+            by_type[g.ad_type or "unknown"] += g.ads
+            by_format[(g.display_format or "unknown").upper()] += g.ads
 
         grand_spend_min += comp_spend_min
         grand_spend_max += comp_spend_max
@@ -172,13 +124,13 @@ async def ads_overview(
             "id": cid,
             "name": comp.name,
             "logo_url": comp.logo_url,
-            "total_ads": len(c_ads),
+            "total_ads": total_ads,
             "active_ads": active_count,
             "sov_pct": 0,
             "spend_min": round(comp_spend_min),
             "spend_max": round(comp_spend_max),
             "reach": comp_reach,
-            "pages": sorted(pages),
+            "pages": sorted(pages_by_comp.get(cid, set())),
             "by_platform": {k: {"ads": v["ads"], "spend_min": round(v["spend_min"]), "spend_max": round(v["spend_max"]), "reach": v["reach"]} for k, v in by_platform.items()},
             "by_type": dict(by_type),
             "by_format": dict(by_format),
@@ -191,18 +143,17 @@ async def ads_overview(
     # Sort by total_ads desc
     comp_results.sort(key=lambda x: x["total_ads"], reverse=True)
 
-    # Timeline: weekly aggregation by competitor
+    # Timeline: weekly aggregation by competitor (daily groups from SQL folded into ISO weeks)
     timeline: dict[str, dict[str, dict]] = defaultdict(lambda: defaultdict(lambda: {"ads_started": 0, "spend_min": 0.0}))
-    for a in filtered_ads:
-        if not a.start_date:
+    for r in day_rows:
+        if not r.start_day:
             continue
-        week = a.start_date.strftime("%G-W%V")
-        comp = comp_map.get(a.competitor_id)
+        week = datetime.strptime(str(r.start_day)[:10], "%Y-%m-%d").strftime("%G-W%V")
+        comp = comp_map.get(r.competitor_id)
         if not comp:
             continue
-        s_min, _ = _estimate_spend(a)
-        timeline[week][comp.name]["ads_started"] += 1
-        timeline[week][comp.name]["spend_min"] += s_min
+        timeline[week][comp.name]["ads_started"] += r.ads
+        timeline[week][comp.name]["spend_min"] += float(r.spend_min)
 
     timeline_list = []
     for week in sorted(timeline.keys()):
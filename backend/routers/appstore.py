@@ -7,13 +7,13 @@ from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from typing import List
 from datetime import datetime, timedelta
-import httpx
 
 from database import get_db, Competitor, AppData, User
 from models.schemas import AppDataResponse, TrendResponse
 from core.trends import calculate_trend
 from core.auth import get_current_user
 from core.permissions import verify_competitor_ownership, get_user_competitors, parse_advertiser_header
+from services.http_client import http_client
 
 router = APIRouter()
 
@@ -47,7 +47,7 @@ ITUNES_REVIEWS_API = "https://itunes.apple.com/fr/rss/customerreviews/id={app_id
 async def fetch_appstore_app(app_id: str) -> dict:
     """Fetch app data from App Store using iTunes API."""
     try:
-        async with httpx.AsyncClient() as client:
+        async with http_client() as client:
             # Fetch app details
             response = await client.get(ITUNES_LOOKUP_API, params={"id": app_id, "country": "fr"})
             data = response.json()
@@ -281,7 +281,7 @@ async def search_appstore(
 ):
     """Search for apps on the App Store."""
     try:
-        async with httpx.AsyncClient() as client:
+        async with http_client() as client:
             response = await client.get(
                 "https://itunes.apple.com/search",
                 params={"term": query, "country": "fr", "media": "software", "limit": limit}
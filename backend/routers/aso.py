@@ -66,8 +66,8 @@ def _enrich_playstore(app_id: str) -> dict:
 async def _enrich_appstore(app_id: str) -> dict:
     """Fetch extra App Store fields for ASO analysis."""
     try:
-        import httpx
-        async with httpx.AsyncClient(timeout=15) as client:
+        from services.http_client import http_client
+        async with http_client(timeout=15) as client:
             resp = await client.get(
                 "https://itunes.apple.com/lookup",
                 params={"id": app_id, "country": "fr"},
@@ -916,7 +916,7 @@ async def _generate_ai_diagnostic(
     competitor_scores: list, brand_name: str | None, sector: str
 ) -> dict | None:
     """Generate an AI-powered ASO diagnostic using the editable prompt template."""
-    import httpx
+    from services.http_client import http_client
     import os
     from core.config import settings
 
@@ -967,7 +967,7 @@ async def _generate_ai_diagnostic(
 
     try:
         url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent?key={gemini_key}"
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_client(timeout=30.0) as client:
             response = await client.post(
                 url,
                 json={
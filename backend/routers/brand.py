@@ -584,7 +584,7 @@ def _is_safe_url(url: str) -> bool:
 
 async def _detect_socials_from_website(website: str) -> dict:
     """Scrape a website's HTML and extract social media links."""
-    import httpx
+    from services.http_client import http_client
 
     suggestions = {}
     url = website if website.startswith("http") else f"https://{website}"
@@ -593,7 +593,7 @@ async def _detect_socials_from_website(website: str) -> dict:
         return suggestions
 
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=15.0) as client:
+        async with http_client(follow_redirects=True, timeout=15.0) as client:
             resp = await client.get(url, headers={
                 "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
             })
@@ -214,12 +214,13 @@ async def list_competitors(
     comp_ids = [c.id for c in competitors]
     cards = []
 
-    # Batch-load latest data for all competitors (4 queries instead of 4*N)
-    from routers.watch import _batch_load_latest
-    ps_map = _batch_load_latest(db, AppData, comp_ids, AppData.store == "playstore")
-    ig_map = _batch_load_latest(db, InstagramData, comp_ids)
-    tt_map = _batch_load_latest(db, TikTokData, comp_ids)
-    yt_map = _batch_load_latest(db, YouTubeData, comp_ids)
+    # Latest data for all competitors from the daily rollup (one query)
+    from services.metrics_rollup import load_channel_metrics
+    latest = load_channel_metrics(db, comp_ids)
+    ps_map = latest["playstore"]
+    ig_map = latest["instagram"]
+    tt_map = latest["tiktok"]
+    yt_map = latest["youtube"]
 
     for comp in competitors:
         playstore = ps_map.get(comp.id)
@@ -371,9 +372,10 @@ async def get_competitor(
     # Calcul du score et du rang (scoped to advertiser)
     all_competitors = _scoped_competitor_query(db, user, x_advertiser_id, include_brand=True).all()
     all_ids = [c.id for c in all_competitors]
-    from routers.watch import _batch_load_latest
-    all_ps = _batch_load_latest(db, AppData, all_ids, AppData.store == "playstore")
-    all_ig = _batch_load_latest(db, InstagramData, all_ids)
+    from services.metrics_rollup import load_channel_metrics
+    latest = load_channel_metrics(db, all_ids)
+    all_ps = latest["playstore"]
+    all_ig = latest["instagram"]
 
     scores = []
     for c in all_competitors:
@@ -12,9 +12,10 @@ from fastapi import APIRouter, Depends, Header, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
-from database import get_db, Ad, Competitor, User, SystemSetting, AdvertiserCompetitor, UserAdvertiser
+from database import get_db, Ad, AdAttribute, Competitor, User, SystemSetting, AdvertiserCompetitor, UserAdvertiser
 from pydantic import BaseModel
 
+from services.ad_attributes import attribute_filter
 from services.creative_analyzer import creative_analyzer
 from services.smart_filter import smart_filter_service
 from core.auth import get_current_user, get_admin_user
@@ -119,24 +120,45 @@ async def analyze_all_creatives(
     start_time = asyncio.get_event_loop().time()
     timed_out = False
 
+    def _has_image(ad: Ad) -> bool:
+        return bool(ad.creative_url) and not any(p in ad.creative_url for p in SKIP_URL_PATTERNS)
+
+    # Text-only ads (Google Ads, etc.) go first, LLM_TEXT_BATCH_SIZE ads per prompt
+    text_only = [ad for ad in ads_to_analyze if not _has_image(ad) and ad.ad_text and len(ad.ad_text.strip()) >= 10]
+    batched = {}
+    if len(text_only) > 1:
+        try:
+            answers = await asyncio.wait_for(
+                creative_analyzer.analyze_text_batch(
+                    [{"ad_text": ad.ad_text, "platform": _normalize_platform(ad.platform), "ad_id": ad.ad_id or ""}
+                     for ad in text_only],
+                    use_cache=not force,
+                ),
+                timeout=MAX_TIME,
+            )
+            batched = {ad.id: result for ad, result in zip(text_only, answers)}
+        except asyncio.TimeoutError:
+            logger.warning(f"Batched text analysis timed out for {len(text_only)} ads")
+
     for ad in ads_to_analyze:
         elapsed = asyncio.get_event_loop().time() - start_time
         if elapsed >= MAX_TIME:
             timed_out = True
             break
 
+        model_called = ad.id not in batched
         try:
             # Text-only analysis for ads without images (Google Ads, etc.)
-            fmt = (ad.display_format or "").upper()
-            has_image = ad.creative_url and not any(
-                p in (ad.creative_url or "") for p in ["googlesyndication.com", "2mdn.net", "doubleclick.net"]
-            )
-            if not has_image and ad.ad_text and len(ad.ad_text.strip()) >= 10:
+            has_image = _has_image(ad)
+            if ad.id in batched:
+                result = batched[ad.id]
+            elif not has_image and ad.ad_text and len(ad.ad_text.strip()) >= 10:
                 result = await asyncio.wait_for(
                     creative_analyzer.analyze_text_only(
                         ad_text=ad.ad_text,
                         platform=_normalize_platform(ad.platform),
                         ad_id=ad.ad_id or "",
+                        use_cache=not force,
                     ),
                     timeout=45,
                 )
@@ -147,6 +169,7 @@ async def analyze_all_creatives(
                         ad_text=ad.ad_text or "",
                         platform=_normalize_platform(ad.platform),
                         ad_id=ad.ad_id or "",
+                        use_cache=not force,
                     ),
                     timeout=60,
                 )
@@ -159,6 +182,7 @@ async def analyze_all_creatives(
                             ad_text=ad.ad_text,
                             platform=_normalize_platform(ad.platform),
                             ad_id=ad.ad_id or "",
+                            use_cache=not force,
                         ),
                         timeout=45,
                     )
@@ -168,6 +192,9 @@ async def analyze_all_creatives(
                 fresh_url = result.pop("_fresh_url", None)
                 if fresh_url:
                     ad.creative_url = fresh_url
+                # Same content already analyzed (analysis_cache): no model call was made
+                if result.pop("_cache", None):
+                    model_called = False
                 ad.creative_analysis = json.dumps(result, ensure_ascii=False)
                 ad.creative_concept = result.get("concept", "")[:100]
                 ad.creative_hook = result.get("hook", "")[:500]
@@ -223,7 +250,8 @@ async def analyze_all_creatives(
             errors += 1
             error_details.append(f"{ad.ad_id}: {str(e)[:120]}")
 
-        await asyncio.sleep(1.0)
+        if model_called:
+            await asyncio.sleep(1.0)
 
     db.commit()
 
@@ -349,26 +377,11 @@ def _compute_insights(
         query = query.filter(Competitor.id == competitor_id)
     if category:
         query = query.filter(Ad.product_category == category)
+    if location:
+        query = query.filter(attribute_filter("location", location))
 
     rows = query.all()
 
-    # Post-filter by location (needs JSON parsing)
-    if location:
-        filtered_rows = []
-        for ad, comp_name in rows:
-            if ad.location_audience:
-                try:
-                    locs = json.loads(ad.location_audience) if isinstance(ad.location_audience, str) else ad.location_audience
-                    if isinstance(locs, list):
-                        for loc in locs:
-                            name = loc.get("name", "") if isinstance(loc, dict) else str(loc)
-                            if location.lower() in name.lower():
-                                filtered_rows.append((ad, comp_name))
-                                break
-                except (json.JSONDecodeError, TypeError):
-                    pass
-        rows = filtered_rows
-
     # Count remaining (not yet analyzed)
     remaining_q = db.query(func.count(Ad.id)).join(
         Competitor, Ad.competitor_id == Competitor.id
@@ -393,11 +406,27 @@ def _compute_insights(
             "geo_analysis": [],
         }
 
+    # Colours and locations are counted in SQL from ad_attributes
+    ad_ids = query.with_entities(Ad.id)
+    color_counter = Counter(dict(
+        db.query(AdAttribute.value, func.count(AdAttribute.ad_id))
+        .filter(AdAttribute.kind == "color", AdAttribute.ad_id.in_(ad_ids))
+        .group_by(AdAttribute.value)
+        .all()
+    ))
+    location_rows = (
+        db.query(AdAttribute.value, Competitor.name, Ad.product_category, func.count(AdAttribute.ad_id))
+        .join(Ad, Ad.id == AdAttribute.ad_id)
+        .join(Competitor, Ad.competitor_id == Competitor.id)
+        .filter(AdAttribute.kind == "location", AdAttribute.ad_id.in_(ad_ids))
+        .group_by(AdAttribute.value, Competitor.name, Ad.product_category)
+        .all()
+    )
+
     # Aggregate data
     scores = []
     concept_counter = Counter()
     tone_counter = Counter()
-    color_counter = Counter()
     layout_counter = Counter()
     cta_counter = Counter()
     category_counter = Counter()
@@ -435,14 +464,6 @@ def _compute_insights(
         if ad.seasonal_event and ad.seasonal_event != "aucun":
             seasonal_event_counter[ad.seasonal_event] += 1
 
-        # Parse colors
-        try:
-            colors = json.loads(ad.creative_dominant_colors) if ad.creative_dominant_colors else []
-            for c in colors:
-                color_counter[c] += 1
-        except (json.JSONDecodeError, TypeError):
-            pass
-
         # Hooks with scores
         if ad.creative_hook and score > 0:
             hooks.append({
@@ -577,10 +598,11 @@ def _compute_insights(
         tone_counter=tone_counter,
         total=total,
         rows=rows,
+        location_rows=location_rows,
     )
 
     # Build geo analysis
-    geo_analysis = _build_geo_analysis(rows)
+    geo_analysis = _build_geo_analysis(location_rows)
 
     return {
         "total_analyzed": total,
@@ -678,8 +700,13 @@ def _generate_signals(
     tone_counter: Counter,
     total: int,
     rows: list,
+    location_rows: list = (),
 ) -> list[dict]:
-    """Generate JARVIS intelligence signals from competitive analysis data."""
+    """Generate JARVIS intelligence signals from competitive analysis data.
+
+    location_rows: (location, competitor name, product category, ad count)
+    groups from ad_attributes.
+    """
     signals = []
     if not total or not competitor_stats:
         return signals
@@ -725,17 +752,9 @@ def _generate_signals(
             except (ValueError, TypeError):
                 pass
 
-        # Geo (location_audience)
-        if ad.location_audience:
-            try:
-                locations = json.loads(ad.location_audience) if isinstance(ad.location_audience, str) else ad.location_audience
-                if isinstance(locations, list):
-                    for loc in locations:
-                        name = loc.get("name", "") if isinstance(loc, dict) else str(loc)
-                        if name:
-                            comp_locations[comp_name][name] += 1
-            except (json.JSONDecodeError, TypeError):
-                pass
+    # Geo (location_audience)
+    for name, comp_name, _category, count in location_rows:
+        comp_locations[comp_name][name] += count
 
     # Signal: category_push (≥30% in one category)
     for comp_name, cats in comp_categories.items():
@@ -859,29 +878,17 @@ def _generate_signals(
     return signals[:7]
 
 
-def _build_geo_analysis(rows: list) -> list[dict]:
-    """Build geographic analysis from location_audience data."""
+def _build_geo_analysis(location_rows: list) -> list[dict]:
+    """Build geographic analysis from (location, competitor, category, ad count) groups."""
     location_stats: dict[str, dict] = {}
 
-    for ad, comp_name in rows:
-        if not ad.location_audience:
-            continue
-        try:
-            locations = json.loads(ad.location_audience) if isinstance(ad.location_audience, str) else ad.location_audience
-            if not isinstance(locations, list):
-                continue
-            for loc in locations:
-                name = loc.get("name", "") if isinstance(loc, dict) else str(loc)
-                if not name:
-                    continue
-                if name not in location_stats:
-                    location_stats[name] = {"ad_count": 0, "competitors": set(), "categories": Counter()}
-                location_stats[name]["ad_count"] += 1
-                location_stats[name]["competitors"].add(comp_name)
-                if ad.product_category:
-                    location_stats[name]["categories"][ad.product_category] += 1
-        except (json.JSONDecodeError, TypeError):
-            pass
+    for name, comp_name, category, count in location_rows:
+        if name not in location_stats:
+            location_stats[name] = {"ad_count": 0, "competitors": set(), "categories": Counter()}
+        location_stats[name]["ad_count"] += count
+        location_stats[name]["competitors"].add(comp_name)
+        if category:
+            location_stats[name]["categories"][category] += count
 
     # Convert to list, sort by ad_count
     geo = []
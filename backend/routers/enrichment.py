@@ -169,8 +169,8 @@ async def _fetch_appstore(competitor: Competitor, db: Session) -> dict:
     if not competitor.appstore_app_id:
         return {"platform": "appstore", "competitor": competitor.name, "status": "skipped", "reason": "no app_id"}
     try:
-        import httpx
-        async with httpx.AsyncClient(timeout=15) as client:
+        from services.http_client import http_client
+        async with http_client(timeout=15) as client:
             resp = await client.get(f"https://itunes.apple.com/lookup?id={competitor.appstore_app_id}&country=fr")
             results = resp.json().get("results", [])
         if not results:
@@ -16,6 +16,7 @@ from database import get_db, SessionLocal, Competitor, Ad, User, StoreLocation
 from core.auth import get_current_user
 from core.permissions import verify_competitor_ownership, get_user_competitors, get_user_competitor_ids, parse_advertiser_header
 from services.scrapecreators import scrapecreators
+from services.ad_ingestion import load_existing_ads, upsert_ads
 
 logger = logging.getLogger(__name__)
 
@@ -690,6 +691,9 @@ async def _fetch_ads_background(competitor_id: int, competitor_name: str, facebo
         can_analyze = True  # Let analyze_creative() handle API key check (may be in DB)
         SKIP_URL_PATTERNS = ["googlesyndication.com", "2mdn.net", "doubleclick.net"]
 
+        # One query for every ad_id already stored instead of one per ad
+        existing_ads = load_existing_ads(db, (str(ad.get("ad_archive_id", "")) for ad in ads_data))
+
         for ad in ads_data:
             ad_id = str(ad.get("ad_archive_id", ""))
             if not ad_id:
@@ -701,7 +705,7 @@ async def _fetch_ads_background(competitor_id: int, competitor_name: str, facebo
             if not use_page_id and not _name_matches(competitor.name, page_name_val):
                 continue
 
-            existing = db.query(Ad).filter(Ad.ad_id == ad_id).first()
+            existing = existing_ads.get(ad_id)
 
             cards = snapshot.get("cards", [])
             first_card = cards[0] if cards else {}
@@ -796,6 +800,7 @@ async def _fetch_ads_background(competitor_id: int, competitor_name: str, facebo
                 ad_obj = Ad(competitor_id=competitor_id, ad_id=ad_id, **enriched)
                 db.add(ad_obj)
                 db.flush()  # Get the ID
+                existing_ads[ad_id] = ad_obj
                 new_count += 1
 
             # Inline creative analysis while URL is fresh
@@ -886,6 +891,7 @@ async def _fetch_ads_background(competitor_id: int, competitor_name: str, facebo
                     if not cursor or not batch:
                         break
 
+                child_rows = []
                 for ad in child_ads:
                     ad_id = str(ad.get("ad_archive_id", ""))
                     if not ad_id:
@@ -898,9 +904,6 @@ async def _fetch_ads_background(competitor_id: int, competitor_name: str, facebo
                         if not _is_valid_child(competitor.name, ad_page_name):
                             continue
 
-                    if db.query(Ad).filter(Ad.ad_id == ad_id).first():
-                        continue
-
                     snapshot = ad.get("snapshot", {})
                     cards = snapshot.get("cards", [])
                     first_card = cards[0] if cards else {}
@@ -920,7 +923,7 @@ async def _fetch_ads_background(competitor_id: int, competitor_name: str, facebo
                         if "INSTAGRAM" in str(p).upper():
                             platform = "instagram"
                             break
-                    new_ad = Ad(
+                    child_rows.append(dict(
                         competitor_id=competitor_id,
                         ad_id=ad_id,
                         platform=platform,
@@ -936,10 +939,8 @@ async def _fetch_ads_background(competitor_id: int, competitor_name: str, facebo
                         link_url=link_url_val or None,
                         display_format=display_fmt or None,
                         ad_library_url=ad.get("url", "") or None,
-                    )
-                    db.add(new_ad)
-                    child_new += 1
-                db.commit()
+                    ))
+                child_new = upsert_ads(db, child_rows, update_fields=None).new if child_rows else 0
             except Exception as e:
                 logger.warning(f"Child pages keyword search failed for {competitor.name}: {e}")
 
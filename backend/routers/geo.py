@@ -16,7 +16,7 @@ import logging
 import random
 
 logger = logging.getLogger(__name__)
-from database import get_db, Advertiser, Store, CommuneData, ZoneAnalysis, StoreLocation, Competitor, User, UserAdvertiser, AdvertiserCompetitor
+from database import get_db, get_async_db, AsyncDBSession, Advertiser, Store, CommuneData, ZoneAnalysis, StoreLocation, Competitor, User, UserAdvertiser, AdvertiserCompetitor
 from core.auth import get_current_user, get_optional_user, get_admin_user
 from core.permissions import parse_advertiser_header
 from services.gmb_service import gmb_service, compute_gmb_score
@@ -27,6 +27,8 @@ from services.geodata import (
     COMMUNES_REFERENCE,
     find_nearest_commune,
 )
+from services.spatial_index import get_reference_index
+from services.catchment import load_catchment_zones, compute_overlaps
 from core.retailers_db import get_all_retailers_flat, search_retailers
 
 router = APIRouter()
@@ -314,21 +316,15 @@ async def analyze_zone(
     # Utilise les communes de référence avec estimation
     communes_with_data = []
 
-    for commune in COMMUNES_REFERENCE:
-        distance = haversine_distance(
-            data.latitude, data.longitude,
-            commune["lat"], commune["lon"]
-        )
-
-        if distance <= data.radius_km:
-            communes_with_data.append({
-                "code_commune": commune["code"],
-                "nom_commune": commune["nom"],
-                "population": commune["pop"],
-                "latitude": commune["lat"],
-                "longitude": commune["lon"],
-                "distance_km": round(distance, 2),
-            })
+    for commune, distance in get_reference_index().query_radius(data.latitude, data.longitude, data.radius_km):
+        communes_with_data.append({
+            "code_commune": commune["code"],
+            "nom_commune": commune["nom"],
+            "population": commune["pop"],
+            "latitude": commune["lat"],
+            "longitude": commune["lon"],
+            "distance_km": round(distance, 2),
+        })
 
     # Agrégations
     total_pop = sum(c["population"] for c in communes_with_data)
@@ -344,10 +340,12 @@ async def analyze_zone(
     concurrents = []
 
     if brand:
+        # Pré-filtre bbox côté SQL, distance exacte ensuite
+        bbox = get_bounding_box(data.latitude, data.longitude, data.radius_km)
         all_stores = db.query(Store).filter(
             Store.advertiser_id != brand.id,
-            Store.latitude.isnot(None),
-            Store.longitude.isnot(None)
+            Store.latitude.between(bbox["min_lat"], bbox["max_lat"]),
+            Store.longitude.between(bbox["min_lon"], bbox["max_lon"]),
         ).all()
 
         for store in all_stores:
@@ -699,7 +697,7 @@ async def get_competitor_stores_geo(
 @router.get("/catchment-zones")
 async def get_catchment_zones(
     radius_km: float = 10,
-    db: Session = Depends(get_db),
+    db: AsyncDBSession = Depends(get_async_db),
     user: User = Depends(get_current_user),
     x_advertiser_id: str | None = Header(None),
 ):
@@ -708,6 +706,9 @@ async def get_catchment_zones(
 
     Pour chaque magasin concurrent, détermine les communes couvertes dans un rayon donné,
     agrège la population couverte, et calcule les chevauchements entre concurrents.
+    Les zones sont lues depuis catchment_zones et recalculées seulement si les
+    magasins BANCO du concurrent ont changé. Tout le travail SQL/CPU tourne dans
+    le pool DB.
     """
     import time
     start = time.time()
@@ -715,14 +716,28 @@ async def get_catchment_zones(
     if radius_km < 1 or radius_km > 50:
         raise HTTPException(status_code=400, detail="radius_km doit être entre 1 et 50")
 
-    # 1. Load communes with coordinates + population
-    all_communes = await datagouv_service.get_communes_with_data()
-    communes_with_coords = [
-        c for c in all_communes
-        if c.get("latitude") and c.get("longitude") and c.get("population")
-    ]
+    # 1. Competitors in scope
+    comp_map = await db.run_sync(_catchment_competitors, user, x_advertiser_id)
+    if not comp_map:
+        return {"radius_km": radius_km, "total_population_france": 67000000,
+                "competitors": [], "overlaps": [], "computation_time_ms": 0}
 
-    # 2. Load competitor stores (BANCO source)
+    # 2. Materialised catchments (recomputed only for competitors whose BANCO stores changed)
+    zones, zone_stats = await load_catchment_zones(db.sync_session, list(comp_map), radius_km)
+
+    # 3-4. Aggregates + overlaps
+    result = await db.run_sync(_catchment_result, comp_map, zones)
+
+    return {
+        "radius_km": radius_km,
+        **result,
+        "computation_time_ms": round((time.time() - start) * 1000),
+        "index_build_ms": zone_stats["index_build_ms"],
+        "zones_rebuilt": zone_stats["rebuilt"],
+    }
+
+
+def _catchment_competitors(db: Session, user: User, x_advertiser_id: str | None) -> Dict[int, str]:
     user_adv_ids = [r[0] for r in db.query(UserAdvertiser.advertiser_id).filter(UserAdvertiser.user_id == user.id).all()]
     comp_ids_from_adv = [r[0] for r in db.query(AdvertiserCompetitor.competitor_id).filter(AdvertiserCompetitor.advertiser_id.in_(user_adv_ids)).all()]
     user_comp_query = db.query(Competitor.id, Competitor.name).filter((Competitor.is_active == True) | (Competitor.is_active == None))
@@ -730,117 +745,48 @@ async def get_catchment_zones(
         user_comp_query = user_comp_query.filter(Competitor.id.in_(comp_ids_from_adv))
     if x_advertiser_id:
         user_comp_query = user_comp_query.filter(Competitor.advertiser_id == int(x_advertiser_id))
-    competitors_list = user_comp_query.all()
+    return {c.id: c.name for c in user_comp_query.all()}
 
-    if not competitors_list:
-        return {"radius_km": radius_km, "total_population_france": 67000000,
-                "competitors": [], "overlaps": [], "computation_time_ms": 0}
-
-    comp_map = {c.id: c.name for c in competitors_list}
-    comp_ids = list(comp_map.keys())
-
-    stores = db.query(StoreLocation).filter(
-        StoreLocation.source == "BANCO",
-        StoreLocation.competitor_id.in_(comp_ids),
-        StoreLocation.latitude.isnot(None),
-        StoreLocation.longitude.isnot(None),
-    ).all()
 
-    # Group stores by competitor
-    stores_by_comp: Dict[int, list] = {}
-    for s in stores:
-        stores_by_comp.setdefault(s.competitor_id, []).append(s)
-
-    # 3. For each store, find communes in radius using bbox pre-filter + haversine
-    # Result: dict[competitor_id] -> dict[commune_code] -> {population, min_distance}
-    comp_communes: Dict[int, Dict[str, Dict]] = {}
-
-    for comp_id, comp_stores in stores_by_comp.items():
-        covered: Dict[str, Dict] = {}
-        for store in comp_stores:
-            bbox = get_bounding_box(store.latitude, store.longitude, radius_km)
-            for commune in communes_with_coords:
-                clat = commune["latitude"]
-                clon = commune["longitude"]
-                # Quick bbox filter
-                if clat < bbox["min_lat"] or clat > bbox["max_lat"]:
-                    continue
-                if clon < bbox["min_lon"] or clon > bbox["max_lon"]:
-                    continue
-                # Precise haversine
-                dist = haversine_distance(store.latitude, store.longitude, clat, clon)
-                if dist <= radius_km:
-                    code = commune.get("code", "")
-                    if not code:
-                        continue
-                    if code not in covered or dist < covered[code]["distance"]:
-                        covered[code] = {
-                            "population": commune.get("population", 0),
-                            "distance": dist,
-                        }
-        comp_communes[comp_id] = covered
-
-    # 4. Aggregate per competitor
-    total_pop_france = sum(c.get("population", 0) for c in communes_with_coords)
-    if total_pop_france == 0:
-        total_pop_france = 67000000
+def _catchment_result(db: Session, comp_map: Dict[int, str], zones: Dict) -> Dict:
+    total_pop_france = max((z.total_population or 0 for z in zones.values()), default=0) or 67000000
 
     competitors_result = []
-    for comp_id in comp_ids:
-        covered = comp_communes.get(comp_id, {})
-        pop_covered = sum(v["population"] for v in covered.values())
-        nb_communes = len(covered)
-        name = comp_map[comp_id]
+    for comp_id, name in comp_map.items():
+        zone = zones.get(comp_id)
+        pop_covered = (zone.population_covered or 0) if zone else 0
         color = COMPETITOR_COLORS.get(name.lower(), "#6b7280")
-        total_stores = len(stores_by_comp.get(comp_id, []))
         pct = round(pop_covered / total_pop_france * 100, 1) if total_pop_france > 0 else 0
 
         competitors_result.append({
             "competitor_id": comp_id,
             "competitor_name": name,
             "color": color,
-            "total_stores": total_stores,
+            "total_stores": (zone.total_stores or 0) if zone else 0,
             "population_covered": pop_covered,
-            "nb_communes_covered": nb_communes,
+            "nb_communes_covered": (zone.nb_communes_covered or 0) if zone else 0,
             "pct_population": pct,
         })
 
     # Sort by population covered descending
     competitors_result.sort(key=lambda x: x["population_covered"], reverse=True)
 
-    # 5. Compute pairwise overlaps
-    overlaps = []
+    # Pairwise overlaps on commune bitsets
     comp_id_list = [c["competitor_id"] for c in competitors_result]
-    for i in range(len(comp_id_list)):
-        for j in range(i + 1, len(comp_id_list)):
-            a_id = comp_id_list[i]
-            b_id = comp_id_list[j]
-            a_codes = set(comp_communes.get(a_id, {}).keys())
-            b_codes = set(comp_communes.get(b_id, {}).keys())
-            shared = a_codes & b_codes
-            if not shared:
-                continue
-            shared_pop = sum(
-                comp_communes[a_id][code]["population"]
-                for code in shared
-            )
-            overlaps.append({
-                "competitor_a_name": comp_map[a_id],
-                "competitor_b_name": comp_map[b_id],
-                "shared_population": shared_pop,
-                "shared_communes": len(shared),
-            })
-
-    overlaps.sort(key=lambda x: x["shared_population"], reverse=True)
-
-    elapsed_ms = round((time.time() - start) * 1000)
+    overlaps = [
+        {
+            "competitor_a_name": comp_map[o["competitor_a"]],
+            "competitor_b_name": comp_map[o["competitor_b"]],
+            "shared_population": o["shared_population"],
+            "shared_communes": o["shared_communes"],
+        }
+        for o in compute_overlaps(zones, comp_id_list)
+    ]
 
     return {
-        "radius_km": radius_km,
         "total_population_france": total_pop_france,
         "competitors": competitors_result,
         "overlaps": overlaps,
-        "computation_time_ms": elapsed_ms,
     }
 
 
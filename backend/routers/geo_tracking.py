@@ -624,7 +624,7 @@ async def _generate_ai_analysis(
     seo_vs_geo: list,
 ) -> dict | None:
     """Generate AI-powered GEO analysis using the editable prompt template."""
-    import httpx
+    from services.http_client import http_client
     import os
 
     from core.config import settings
@@ -659,7 +659,7 @@ async def _generate_ai_analysis(
 
     try:
         url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent?key={gemini_key}"
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_client(timeout=30.0) as client:
             response = await client.post(
                 url,
                 json={
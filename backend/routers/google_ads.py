@@ -13,6 +13,7 @@ from sqlalchemy import desc
 
 from database import get_db, Competitor, Ad, User
 from services.scrapecreators import scrapecreators
+from services.ad_ingestion import upsert_ads
 from core.auth import get_current_user
 from core.permissions import verify_competitor_ownership, get_user_competitors, parse_advertiser_header
 
@@ -218,14 +219,12 @@ async def _fetch_and_store_google_ads(
 
         total_fetched += len(ads)
 
+        rows = []
         for ad in ads:
             creative_id = ad.get("creativeId", "")
             if not creative_id:
                 continue
 
-            # Check if already exists
-            existing = db.query(Ad).filter(Ad.ad_id == creative_id).first()
-
             first_shown = _parse_date(ad.get("firstShown"))
             last_shown = _parse_date(ad.get("lastShown"))
 
@@ -239,36 +238,34 @@ async def _fetch_and_store_google_ads(
             imp_min = impressions.get("min") if isinstance(impressions, dict) else None
             imp_max = impressions.get("max") if isinstance(impressions, dict) else None
 
-            if existing:
-                # Update last_shown and active status
-                existing.end_date = last_shown
-                existing.is_active = is_active
-                if imp_min is not None:
-                    existing.impressions_min = imp_min
-                if imp_max is not None:
-                    existing.impressions_max = imp_max
-                updated_count += 1
-            else:
-                new_ad = Ad(
-                    competitor_id=competitor_id,
-                    ad_id=creative_id,
-                    platform="google",
-                    creative_url=ad.get("imageUrl") or "",
-                    ad_text="",
-                    cta="",
-                    start_date=first_shown,
-                    end_date=last_shown,
-                    is_active=is_active,
-                    impressions_min=imp_min,
-                    impressions_max=imp_max,
-                    page_name=ad.get("advertiserName") or "",
-                    display_format=(ad.get("format") or "").upper(),
-                    ad_library_url=ad.get("adUrl") or "",
-                    link_url=f"https://{domain}",
-                    targeted_countries=json.dumps([country]) if country else None,
-                )
-                db.add(new_ad)
-                new_count += 1
+            rows.append(dict(
+                competitor_id=competitor_id,
+                ad_id=creative_id,
+                platform="google",
+                creative_url=ad.get("imageUrl") or "",
+                ad_text="",
+                cta="",
+                start_date=first_shown,
+                end_date=last_shown,
+                is_active=is_active,
+                impressions_min=imp_min,
+                impressions_max=imp_max,
+                page_name=ad.get("advertiserName") or "",
+                display_format=(ad.get("format") or "").upper(),
+                ad_library_url=ad.get("adUrl") or "",
+                link_url=f"https://{domain}",
+                targeted_countries=json.dumps([country]) if country else None,
+            ))
+
+        if rows:
+            # Existing ads: refresh last_shown and active status
+            ingest = upsert_ads(
+                db, rows,
+                update_fields=("end_date", "is_active", "impressions_min", "impressions_max"),
+                commit=False,
+            )
+            new_count += ingest.new
+            updated_count += ingest.updated
 
         cursor = result.get("cursor")
         if not cursor:
@@ -8,12 +8,12 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 
 from database import (
     get_db, Competitor, User,
     GoogleTrendsData, GoogleNewsArticle,
 )
+from services.google_ingestion import insert_news, news_rows, trends_rows, upsert_trends
 from services.searchapi import searchapi
 from core.auth import get_current_user
 from core.permissions import (
@@ -66,19 +66,8 @@ async def get_trends_interest(
             for c in competitors:
                 kw_to_comp[c.name] = c.id
 
-            for point in result["timeline_data"]:
-                date_str = point.get("date", "")
-                for kw, val in point.get("values", {}).items():
-                    comp_id = kw_to_comp.get(kw)
-                    if comp_id is not None:
-                        db.add(GoogleTrendsData(
-                            competitor_id=comp_id,
-                            keyword=kw,
-                            date=date_str,
-                            value=val,
-                        ))
             try:
-                db.commit()
+                upsert_trends(db, trends_rows(result["timeline_data"], kw_to_comp))
             except Exception as e:
                 db.rollback()
                 logger.warning(f"Failed to store trends data: {e}")
@@ -194,7 +183,7 @@ async def refresh_news(
 ):
     """
     Force-collect fresh news for all competitors.
-    Deduplicates by link (unique constraint).
+    Deduplicates by link (articles already stored are skipped).
     """
     adv_id = parse_advertiser_header(x_advertiser_id)
     competitors = get_user_competitors(db, user, advertiser_id=adv_id)
@@ -208,24 +197,7 @@ async def refresh_news(
             logger.warning(f"News fetch failed for {comp.name}: {result.get('error')}")
             continue
 
-        for article in result.get("articles", []):
-            if not article.get("link"):
-                continue
-            news = GoogleNewsArticle(
-                competitor_id=comp.id,
-                title=article.get("title", ""),
-                link=article["link"],
-                source=article.get("source", ""),
-                date=article.get("date", ""),
-                snippet=article.get("snippet", ""),
-                thumbnail=article.get("thumbnail", ""),
-            )
-            db.add(news)
-            try:
-                db.flush()
-                total_added += 1
-            except IntegrityError:
-                db.rollback()
+        total_added += insert_news(db, news_rows(comp.id, result.get("articles", [])), commit=False)
 
     try:
         db.commit()
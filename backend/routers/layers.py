@@ -3,9 +3,10 @@ Router pour les layers cartographiques et POI.
 Endpoints pour bornes IRVE, POI, limites administratives, etc.
 """
 from typing import Optional, List
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request, Response
 
 from services.datagouv import datagouv_service
+from services.boundaries import tile_bbox, zoom_level
 
 router = APIRouter(prefix="/api/layers", tags=["Map Layers"])
 
@@ -174,28 +175,77 @@ async def get_idf_bike_parkings():
 # Contours géographiques
 # =============================================================================
 
+BOUNDARY_TYPES = ["communes", "departements", "regions", "epci", "academies"]
+
+
+def _parse_bbox(bbox: Optional[str]):
+    if not bbox:
+        return None
+    try:
+        parts = tuple(float(v) for v in bbox.split(","))
+    except ValueError:
+        parts = ()
+    if len(parts) != 4:
+        raise HTTPException(status_code=400, detail="bbox invalide (attendu: minLon,minLat,maxLon,maxLat)")
+    return parts
+
+
+async def _boundary_response(request: Request, boundary_type: str, code, bbox, zoom) -> Response:
+    """FeatureCollection pré-sérialisé avec ETag (304 si inchangé)."""
+    if boundary_type not in BOUNDARY_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Type invalide. Types valides: {', '.join(BOUNDARY_TYPES)}"
+        )
+
+    store = await datagouv_service.get_boundary_store(boundary_type)
+    if store is None:
+        return Response(content=b'{"type":"FeatureCollection","features":[]}', media_type="application/json")
+
+    level = zoom_level(zoom)
+    etag = store.etag(level, code, bbox)
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(
+        content=store.feature_collection(level, code, bbox),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
 @router.get("/boundaries/{boundary_type}")
 async def get_boundaries(
+    request: Request,
     boundary_type: str,
     code: Optional[str] = Query(None, description="Filtre par code (ex: 75 pour Paris)"),
+    bbox: Optional[str] = Query(None, description="minLon,minLat,maxLon,maxLat"),
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="Zoom carte (niveau de simplification)"),
 ):
     """
     Récupère les contours géographiques au format GeoJSON.
     Types: communes, departements, epci, academies
+    Sans zoom: géométries complètes ; avec zoom: géométries simplifiées.
     """
-    valid_types = ["communes", "departements", "regions", "epci", "academies"]
-    if boundary_type not in valid_types:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Type invalide. Types valides: {', '.join(valid_types)}"
-        )
+    return await _boundary_response(request, boundary_type, code, _parse_bbox(bbox), zoom)
 
-    geojson = await datagouv_service.get_geojson_boundaries(
-        boundary_type=boundary_type,
-        code_filter=code,
-    )
 
-    return geojson
+@router.get("/boundaries/{boundary_type}/tiles/{z}/{x}/{y}")
+async def get_boundary_tile(
+    request: Request,
+    boundary_type: str,
+    z: int,
+    x: int,
+    y: int,
+    code: Optional[str] = Query(None),
+):
+    """
+    Tuile XYZ GeoJSON : features intersectant la tuile, simplifiées pour ce zoom.
+    """
+    if not 0 <= z <= 22 or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Tuile invalide")
+    return await _boundary_response(request, boundary_type, code, tile_bbox(z, x, y), z)
 
 
 # =============================================================================
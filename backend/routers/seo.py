@@ -798,7 +798,7 @@ async def _generate_ai_analysis(
     best_keywords: list, missing_keywords: list,
 ) -> dict | None:
     """Generate AI-powered SEO analysis using the editable prompt template."""
-    import httpx
+    from services.http_client import http_client
     import os
     import json
 
@@ -836,7 +836,7 @@ async def _generate_ai_analysis(
 
     try:
         url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent?key={gemini_key}"
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_client(timeout=30.0) as client:
             response = await client.post(
                 url,
                 json={
@@ -133,7 +133,7 @@ async def run_detection(
     x_advertiser_id: str | None = Header(None),
 ):
     """Manually trigger signal detection."""
-    from services.signals import detect_all_signals, snapshot_active_ads
+    from services.signals import detect_all_signals, snapshot_active_ads, last_detection_stats
 
     adv_id = parse_advertiser_header(x_advertiser_id)
 
@@ -144,9 +144,21 @@ async def run_detection(
         "message": f"Detection complete: {len(signals)} new signals, {snap_count} ad snapshots",
         "signals": signals,
         "snapshots": snap_count,
+        "timings_ms": last_detection_stats.get("timings_ms", {}),
     }
 
 
+@router.get("/detection-stats")
+async def detection_stats(
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Last detection run: competitors, signals per detector and timings per step."""
+    from services.signals import get_detection_stats
+
+    return get_detection_stats(db)
+
+
 @router.get("/ad-trends/{competitor_id}")
 async def get_ad_trends(
     competitor_id: int,
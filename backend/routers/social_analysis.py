@@ -266,6 +266,29 @@ async def analyze_all_content(
     start_time = asyncio.get_event_loop().time()
     timed_out = False
 
+    # Posts without thumbnail go first, LLM_TEXT_BATCH_SIZE posts per prompt
+    text_posts = [
+        p for p in posts_to_analyze
+        if not p.thumbnail_url and f"{p.title or ''} {p.description or ''}".strip()
+    ]
+    batched = {}
+    if len(text_posts) > 1:
+        try:
+            answers = await asyncio.wait_for(
+                social_content_analyzer.analyze_content_batch([
+                    {
+                        "title": p.title, "description": p.description, "platform": p.platform,
+                        "competitor_name": comp_names.get(p.competitor_id, ""),
+                        "views": p.views, "likes": p.likes, "comments": p.comments, "shares": p.shares,
+                    }
+                    for p in text_posts
+                ]),
+                timeout=MAX_TIME,
+            )
+            batched = {p.id: result for p, result in zip(text_posts, answers)}
+        except asyncio.TimeoutError:
+            logger.warning(f"Batched analysis timed out for {len(text_posts)} posts")
+
     for post in posts_to_analyze:
         # Check time budget before each post
         elapsed = asyncio.get_event_loop().time() - start_time
@@ -273,8 +296,9 @@ async def analyze_all_content(
             timed_out = True
             break
 
+        model_called = post.id not in batched
         try:
-            result = await asyncio.wait_for(
+            result = batched[post.id] if post.id in batched else await asyncio.wait_for(
                 social_content_analyzer.analyze_content(
                     title=post.title or "",
                     description=post.description or "",
@@ -290,6 +314,9 @@ async def analyze_all_content(
             )
 
             if result:
+                # Same content already analyzed (analysis_cache): no model call was made
+                if result.pop("_cache", None):
+                    model_called = False
                 post.content_analysis = json.dumps(result, ensure_ascii=False)
                 post.content_theme = result.get("theme", "")[:100]
                 post.content_hook = result.get("hook", "")[:500]
@@ -325,7 +352,8 @@ async def analyze_all_content(
             post.content_engagement_score = 0
             errors += 1
 
-        await asyncio.sleep(0.5)
+        if model_called:
+            await asyncio.sleep(0.5)
 
     db.commit()
 
@@ -4,18 +4,20 @@ Powers the Tendances dashboard with historical evolution data.
 """
 from fastapi import APIRouter, Depends, Header, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, case, cast, Float
+from sqlalchemy import func, and_, case, select, Float
 from typing import Optional
 from datetime import datetime, timedelta
 import json
 import logging
 
 from database import (
-    get_db, Competitor, Ad, InstagramData, TikTokData,
-    YouTubeData, AppData, AdSnapshot, User, SnapchatData,
+    get_db, get_async_db, AsyncDBSession, Competitor, Ad, InstagramData, TikTokData,
+    YouTubeData, AppData, AdSnapshot, AdDailyStat, User, SnapchatData,
     GoogleTrendsData,
 )
 from core.auth import get_current_user
+from core.config import settings
+from core.utils import date_bucket
 from core.permissions import get_user_competitors, get_user_competitor_ids, parse_advertiser_header
 
 logger = logging.getLogger(__name__)
@@ -35,43 +37,57 @@ def _parse_date(d: str | None) -> datetime | None:
 async def get_timeseries(
     date_from: Optional[str] = Query(None, description="ISO date start"),
     date_to: Optional[str] = Query(None, description="ISO date end"),
-    db: Session = Depends(get_db),
+    interval: str = Query("raw", pattern="^(raw|day|week|month)$", description="Downsampling bucket"),
+    db: AsyncDBSession = Depends(get_async_db),
     user: User = Depends(get_current_user),
     x_advertiser_id: str | None = Header(None),
 ):
     """
     Return all time-series metrics for every competitor.
     Each competitor gets arrays of {date, value} for every tracked metric.
+    With interval=day/week/month, each series keeps the last point of every
+    bucket (sums for flows such as new Snapchat ads), dated by the bucket start.
+    Each metric family is one query for all competitors, run on the DB thread
+    pool so they never block the event loop.
     """
     adv_id = parse_advertiser_header(x_advertiser_id)
+    start = _parse_date(date_from) or (datetime.utcnow() - timedelta(days=30))
+    end = _parse_date(date_to) or datetime.utcnow()
+    return await db.run_sync(_build_timeseries, user, adv_id, start, end, interval)
+
+
+def _build_timeseries(
+    db: Session, user: User, adv_id: int | None, start: datetime, end: datetime, interval: str = "raw",
+) -> dict:
     competitors = get_user_competitors(db, user, advertiser_id=adv_id)
     comp_ids = [c.id for c in competitors]
-    comp_map = {c.id: {"name": c.name, "is_brand": c.is_brand, "logo_url": c.logo_url} for c in competitors}
 
-    start = _parse_date(date_from) or (datetime.utcnow() - timedelta(days=30))
-    end = _parse_date(date_to) or datetime.utcnow()
+    families = {
+        "instagram": _get_instagram_series(db, comp_ids, start, end, interval),
+        "tiktok": _get_tiktok_series(db, comp_ids, start, end, interval),
+        "youtube": _get_youtube_series(db, comp_ids, start, end, interval),
+        "playstore": _get_app_series(db, comp_ids, "playstore", start, end, interval),
+        "appstore": _get_app_series(db, comp_ids, "appstore", start, end, interval),
+        "ads": _get_ads_series(db, comp_ids, start, end, interval),
+        "snapchat": _get_snapchat_series(db, comp_ids, start, end, interval),
+        "google_trends": _get_google_trends_series(db, comp_ids, start, end, interval),
+    }
 
     result = {}
-
-    for comp_id, info in comp_map.items():
+    for comp in competitors:
         comp_data = {
-            "name": info["name"],
-            "is_brand": info["is_brand"],
-            "logo_url": info["logo_url"],
-            "instagram": _get_instagram_series(db, comp_id, start, end),
-            "tiktok": _get_tiktok_series(db, comp_id, start, end),
-            "youtube": _get_youtube_series(db, comp_id, start, end),
-            "playstore": _get_app_series(db, comp_id, "playstore", start, end),
-            "appstore": _get_app_series(db, comp_id, "appstore", start, end),
-            "ads": _get_ads_series(db, comp_id, start, end),
-            "snapchat": _get_snapchat_series(db, comp_id, start, end),
-            "google_trends": _get_google_trends_series(db, comp_id, start, end),
+            "name": comp.name,
+            "is_brand": comp.is_brand,
+            "logo_url": comp.logo_url,
         }
-        result[str(comp_id)] = comp_data
+        for family, series in families.items():
+            comp_data[family] = series[comp.id]
+        result[str(comp.id)] = comp_data
 
     return {
         "date_from": start.isoformat(),
         "date_to": end.isoformat(),
+        "interval": interval,
         "competitors": result,
     }
 
@@ -95,15 +111,15 @@ async def get_trends_summary(
     end = _parse_date(date_to) or datetime.utcnow()
     start = _parse_date(date_from) or (end - timedelta(days=7))
 
+    deltas = _compute_deltas(db, comp_ids, start, end)
     summaries = []
     for comp in competitors:
-        metrics = _compute_deltas(db, comp.id, start, end)
         summaries.append({
             "competitor_id": comp.id,
             "name": comp.name,
             "is_brand": comp.is_brand,
             "logo_url": comp.logo_url,
-            "metrics": metrics,
+            "metrics": deltas[comp.id],
         })
 
     return {
@@ -113,321 +129,362 @@ async def get_trends_summary(
     }
 
 
-# ─── Time-series builders ───────────────────────────────────────────
+# ─── Bucketing ──────────────────────────────────────────────────────
 
-def _get_instagram_series(db: Session, comp_id: int, start: datetime, end: datetime) -> dict:
-    rows = (
-        db.query(InstagramData)
-        .filter(
-            InstagramData.competitor_id == comp_id,
-            InstagramData.recorded_at >= start,
-            InstagramData.recorded_at <= end,
+def _bucket_expr(db: Session, column, interval: str):
+    """SQL expression giving the 'YYYY-MM-DD' start of the day/week/month of a column."""
+    return date_bucket(db.get_bind().dialect.name, column, interval)
+
+
+def _bucketed_rows(db: Session, source, interval: str, partition: tuple = ()) -> dict[int, list]:
+    """Rows of `source` (a select with competitor_id and ts columns) grouped by competitor, oldest first.
+
+    With interval=day/week/month only the latest row of each competitor (and
+    partition columns) per bucket is kept, with the bucket start in `bucket`.
+    """
+    src = source.subquery()
+    if interval == "raw":
+        stmt = select(src).order_by(src.c.competitor_id, src.c.ts)
+    else:
+        bucket = _bucket_expr(db, src.c.ts, interval)
+        rn = func.row_number().over(
+            partition_by=[src.c.competitor_id, *[src.c[p] for p in partition], bucket],
+            order_by=src.c.ts.desc(),
         )
-        .order_by(InstagramData.recorded_at)
-        .all()
+        inner = select(src, bucket.label("bucket"), rn.label("rn")).subquery()
+        stmt = (
+            select(*[c for c in inner.c if c.name != "rn"])
+            .where(inner.c.rn == 1)
+            .order_by(inner.c.competitor_id, inner.c.ts)
+        )
+
+    grouped: dict[int, list] = {}
+    for row in db.execute(stmt):
+        grouped.setdefault(row.competitor_id, []).append(row)
+    return grouped
+
+
+def _point_date(row) -> str:
+    bucket = getattr(row, "bucket", None)
+    if bucket is not None:
+        return str(bucket)
+    return row.ts.isoformat() if hasattr(row.ts, "isoformat") else str(row.ts)
+
+
+def _points(rows: list, field: str, cast_to=None, skip_empty: bool = False) -> list[dict]:
+    points = []
+    for r in rows:
+        value = getattr(r, field)
+        if skip_empty and not value:
+            continue
+        if cast_to is not None:
+            value = cast_to(value or 0)
+        points.append({"date": _point_date(r), "value": value})
+    return points
+
+
+def _series_source(model, fields: tuple, comp_ids: list[int], start: datetime, end: datetime, *filters):
+    return select(
+        model.competitor_id, model.recorded_at.label("ts"), *[getattr(model, f) for f in fields],
+    ).where(
+        model.competitor_id.in_(comp_ids),
+        model.recorded_at >= start,
+        model.recorded_at <= end,
+        *filters,
     )
+
+
+# ─── Time-series builders (one query per metric family, all competitors) ──
+
+def _get_instagram_series(db: Session, comp_ids: list[int], start: datetime, end: datetime, interval: str = "raw") -> dict:
+    fields = ("followers", "engagement_rate", "posts_count", "avg_likes", "avg_comments")
+    grouped = _bucketed_rows(db, _series_source(InstagramData, fields, comp_ids, start, end), interval)
     return {
-        "followers": [{"date": r.recorded_at.isoformat(), "value": r.followers} for r in rows],
-        "engagement_rate": [{"date": r.recorded_at.isoformat(), "value": r.engagement_rate} for r in rows],
-        "posts_count": [{"date": r.recorded_at.isoformat(), "value": r.posts_count} for r in rows],
-        "avg_likes": [{"date": r.recorded_at.isoformat(), "value": r.avg_likes} for r in rows],
-        "avg_comments": [{"date": r.recorded_at.isoformat(), "value": r.avg_comments} for r in rows],
+        comp_id: {f: _points(grouped.get(comp_id, []), f) for f in fields}
+        for comp_id in comp_ids
     }
 
 
-def _get_tiktok_series(db: Session, comp_id: int, start: datetime, end: datetime) -> dict:
-    rows = (
-        db.query(TikTokData)
-        .filter(
-            TikTokData.competitor_id == comp_id,
-            TikTokData.recorded_at >= start,
-            TikTokData.recorded_at <= end,
-        )
-        .order_by(TikTokData.recorded_at)
-        .all()
-    )
+def _get_tiktok_series(db: Session, comp_ids: list[int], start: datetime, end: datetime, interval: str = "raw") -> dict:
+    fields = ("followers", "likes", "videos_count")
+    grouped = _bucketed_rows(db, _series_source(TikTokData, fields, comp_ids, start, end), interval)
     return {
-        "followers": [{"date": r.recorded_at.isoformat(), "value": r.followers} for r in rows],
-        "likes": [{"date": r.recorded_at.isoformat(), "value": r.likes} for r in rows],
-        "videos_count": [{"date": r.recorded_at.isoformat(), "value": r.videos_count} for r in rows],
+        comp_id: {f: _points(grouped.get(comp_id, []), f) for f in fields}
+        for comp_id in comp_ids
     }
 
 
-def _get_youtube_series(db: Session, comp_id: int, start: datetime, end: datetime) -> dict:
-    rows = (
-        db.query(YouTubeData)
-        .filter(
-            YouTubeData.competitor_id == comp_id,
-            YouTubeData.recorded_at >= start,
-            YouTubeData.recorded_at <= end,
-        )
-        .order_by(YouTubeData.recorded_at)
-        .all()
-    )
+def _get_youtube_series(db: Session, comp_ids: list[int], start: datetime, end: datetime, interval: str = "raw") -> dict:
+    fields = ("subscribers", "total_views", "videos_count", "engagement_rate")
+    grouped = _bucketed_rows(db, _series_source(YouTubeData, fields, comp_ids, start, end), interval)
     return {
-        "subscribers": [{"date": r.recorded_at.isoformat(), "value": r.subscribers} for r in rows],
-        "total_views": [{"date": r.recorded_at.isoformat(), "value": r.total_views} for r in rows],
-        "videos_count": [{"date": r.recorded_at.isoformat(), "value": r.videos_count} for r in rows],
-        "engagement_rate": [{"date": r.recorded_at.isoformat(), "value": r.engagement_rate} for r in rows],
+        comp_id: {f: _points(grouped.get(comp_id, []), f) for f in fields}
+        for comp_id in comp_ids
     }
 
 
-def _get_app_series(db: Session, comp_id: int, store: str, start: datetime, end: datetime) -> dict:
-    rows = (
-        db.query(AppData)
-        .filter(
-            AppData.competitor_id == comp_id,
-            AppData.store == store,
-            AppData.recorded_at >= start,
-            AppData.recorded_at <= end,
-        )
-        .order_by(AppData.recorded_at)
-        .all()
+def _get_app_series(db: Session, comp_ids: list[int], store: str, start: datetime, end: datetime, interval: str = "raw") -> dict:
+    source = _series_source(
+        AppData, ("rating", "reviews_count", "downloads_numeric"), comp_ids, start, end, AppData.store == store,
     )
-    return {
-        "rating": [{"date": r.recorded_at.isoformat(), "value": r.rating} for r in rows],
-        "reviews_count": [{"date": r.recorded_at.isoformat(), "value": r.reviews_count} for r in rows],
-        "downloads": [{"date": r.recorded_at.isoformat(), "value": r.downloads_numeric} for r in rows if r.downloads_numeric],
-    }
+    grouped = _bucketed_rows(db, source, interval)
+    result = {}
+    for comp_id in comp_ids:
+        rows = grouped.get(comp_id, [])
+        result[comp_id] = {
+            "rating": _points(rows, "rating"),
+            "reviews_count": _points(rows, "reviews_count"),
+            "downloads": _points(rows, "downloads_numeric", skip_empty=True),
+        }
+    return result
 
 
-def _get_snapchat_series(db: Session, comp_id: int, start: datetime, end: datetime) -> dict:
+def _get_snapchat_series(db: Session, comp_ids: list[int], start: datetime, end: datetime, interval: str = "raw") -> dict:
     """Snapchat ads count timeseries + profile data from SnapchatData."""
-    # Ads timeseries
+    # Ads timeseries: new ads per bucket (a flow, so summed rather than sampled)
+    day = _bucket_expr(db, Ad.start_date, interval)
     ad_rows = (
         db.query(
-            func.date(Ad.start_date).label("day"),
+            Ad.competitor_id,
+            day.label("day"),
             func.count(Ad.id).label("ads_count"),
             func.coalesce(func.sum(Ad.impressions_min), 0).label("impressions"),
         )
         .filter(
-            Ad.competitor_id == comp_id,
+            Ad.competitor_id.in_(comp_ids),
             Ad.platform == "snapchat",
             Ad.start_date >= start,
             Ad.start_date <= end,
         )
-        .group_by(func.date(Ad.start_date))
-        .order_by(func.date(Ad.start_date))
+        .group_by(Ad.competitor_id, day)
+        .order_by(Ad.competitor_id, day)
         .all()
     )
+    ads_by_comp: dict[int, list] = {}
+    for r in ad_rows:
+        ads_by_comp.setdefault(r.competitor_id, []).append(r)
 
     # Profile timeseries
-    profile_rows = (
-        db.query(SnapchatData)
-        .filter(
-            SnapchatData.competitor_id == comp_id,
-            SnapchatData.recorded_at >= start,
-            SnapchatData.recorded_at <= end,
-        )
-        .order_by(SnapchatData.recorded_at)
-        .all()
-    )
+    fields = ("subscribers", "engagement_rate", "spotlight_count")
+    profiles = _bucketed_rows(db, _series_source(SnapchatData, fields, comp_ids, start, end), interval)
 
-    return {
-        "ads_count": [{"date": str(r.day), "value": r.ads_count} for r in ad_rows],
-        "impressions": [{"date": str(r.day), "value": int(r.impressions)} for r in ad_rows],
-        "subscribers": [{"date": r.recorded_at.isoformat(), "value": r.subscribers} for r in profile_rows],
-        "engagement_rate": [{"date": r.recorded_at.isoformat(), "value": r.engagement_rate} for r in profile_rows],
-        "spotlight_count": [{"date": r.recorded_at.isoformat(), "value": r.spotlight_count} for r in profile_rows],
-    }
+    result = {}
+    for comp_id in comp_ids:
+        ads = ads_by_comp.get(comp_id, [])
+        rows = profiles.get(comp_id, [])
+        result[comp_id] = {
+            "ads_count": [{"date": str(r.day), "value": r.ads_count} for r in ads],
+            "impressions": [{"date": str(r.day), "value": int(r.impressions)} for r in ads],
+            **{f: _points(rows, f) for f in fields},
+        }
+    return result
 
 
-def _get_google_trends_series(db: Session, comp_id: int, start: datetime, end: datetime) -> dict:
+def _get_google_trends_series(db: Session, comp_ids: list[int], start: datetime, end: datetime, interval: str = "raw") -> dict:
     """Google Trends interest score timeseries."""
     start_str = start.strftime("%Y-%m-%d")
     end_str = end.strftime("%Y-%m-%d")
-    rows = (
-        db.query(GoogleTrendsData)
-        .filter(
-            GoogleTrendsData.competitor_id == comp_id,
-            GoogleTrendsData.date >= start_str,
-            GoogleTrendsData.date <= end_str,
-        )
-        .order_by(GoogleTrendsData.date)
-        .all()
+    source = select(
+        GoogleTrendsData.competitor_id,
+        GoogleTrendsData.keyword,
+        GoogleTrendsData.date.label("ts"),
+        GoogleTrendsData.value,
+    ).where(
+        GoogleTrendsData.competitor_id.in_(comp_ids),
+        GoogleTrendsData.date >= start_str,
+        GoogleTrendsData.date <= end_str,
     )
+    grouped = _bucketed_rows(db, source, interval, partition=("keyword",))
     return {
-        "interest": [{"date": r.date, "value": r.value} for r in rows],
+        comp_id: {"interest": _points(grouped.get(comp_id, []), "value")}
+        for comp_id in comp_ids
     }
 
 
-def _get_ads_series(db: Session, comp_id: int, start: datetime, end: datetime) -> dict:
-    """Ad metrics from daily snapshots."""
-    rows = (
-        db.query(
-            func.date(AdSnapshot.recorded_at).label("day"),
+def _get_ads_series(db: Session, comp_ids: list[int], start: datetime, end: datetime, interval: str = "raw") -> dict:
+    """Ad metrics from the daily rollup (raw snapshots when AD_DAILY_ROLLUP is off)."""
+    if settings.AD_DAILY_ROLLUP:
+        source = select(
+            AdDailyStat.competitor_id,
+            AdDailyStat.day.label("ts"),
+            AdDailyStat.active_count,
+            AdDailyStat.spend_min,
+            AdDailyStat.spend_max,
+            AdDailyStat.total_reach,
+        ).where(
+            AdDailyStat.competitor_id.in_(comp_ids),
+            AdDailyStat.day >= start.date(),
+            AdDailyStat.day <= end.date(),
+        )
+    else:
+        day = func.date(AdSnapshot.recorded_at)
+        source = select(
+            AdSnapshot.competitor_id,
+            day.label("ts"),
             func.count(AdSnapshot.id).label("active_count"),
             func.sum(AdSnapshot.estimated_spend_min).label("spend_min"),
             func.sum(AdSnapshot.estimated_spend_max).label("spend_max"),
             func.sum(AdSnapshot.eu_total_reach).label("total_reach"),
-        )
-        .filter(
-            AdSnapshot.competitor_id == comp_id,
+        ).where(
+            AdSnapshot.competitor_id.in_(comp_ids),
             AdSnapshot.recorded_at >= start,
             AdSnapshot.recorded_at <= end,
-        )
-        .group_by(func.date(AdSnapshot.recorded_at))
-        .order_by(func.date(AdSnapshot.recorded_at))
-        .all()
-    )
-    return {
-        "active_count": [{"date": str(r.day), "value": r.active_count} for r in rows],
-        "spend_min": [{"date": str(r.day), "value": float(r.spend_min or 0)} for r in rows],
-        "spend_max": [{"date": str(r.day), "value": float(r.spend_max or 0)} for r in rows],
-        "total_reach": [{"date": str(r.day), "value": int(r.total_reach or 0)} for r in rows],
-    }
+        ).group_by(AdSnapshot.competitor_id, day)
+    grouped = _bucketed_rows(db, source, interval)
 
+    result = {}
+    for comp_id in comp_ids:
+        rows = grouped.get(comp_id, [])
+        result[comp_id] = {
+            "active_count": _points(rows, "active_count"),
+            "spend_min": _points(rows, "spend_min", cast_to=float),
+            "spend_max": _points(rows, "spend_max", cast_to=float),
+            "total_reach": _points(rows, "total_reach", cast_to=int),
+        }
+    return result
 
-# ─── Delta computation ──────────────────────────────────────────────
 
-def _compute_deltas(db: Session, comp_id: int, start: datetime, end: datetime) -> dict:
-    """Compute latest value + delta for each metric."""
-    metrics = {}
-
-    # Instagram
-    ig_latest = db.query(InstagramData).filter(
-        InstagramData.competitor_id == comp_id,
-        InstagramData.recorded_at <= end,
-    ).order_by(InstagramData.recorded_at.desc()).first()
-
-    ig_prev = db.query(InstagramData).filter(
-        InstagramData.competitor_id == comp_id,
-        InstagramData.recorded_at <= start,
-    ).order_by(InstagramData.recorded_at.desc()).first()
-
-    if ig_latest:
-        metrics["ig_followers"] = _delta(ig_latest.followers, ig_prev.followers if ig_prev else None)
-        metrics["ig_engagement"] = _delta(ig_latest.engagement_rate, ig_prev.engagement_rate if ig_prev else None)
-        metrics["ig_posts"] = _delta(ig_latest.posts_count, ig_prev.posts_count if ig_prev else None)
-
-    # TikTok
-    tt_latest = db.query(TikTokData).filter(
-        TikTokData.competitor_id == comp_id,
-        TikTokData.recorded_at <= end,
-    ).order_by(TikTokData.recorded_at.desc()).first()
-
-    tt_prev = db.query(TikTokData).filter(
-        TikTokData.competitor_id == comp_id,
-        TikTokData.recorded_at <= start,
-    ).order_by(TikTokData.recorded_at.desc()).first()
-
-    if tt_latest:
-        metrics["tt_followers"] = _delta(tt_latest.followers, tt_prev.followers if tt_prev else None)
-        metrics["tt_likes"] = _delta(tt_latest.likes, tt_prev.likes if tt_prev else None)
-
-    # YouTube
-    yt_latest = db.query(YouTubeData).filter(
-        YouTubeData.competitor_id == comp_id,
-        YouTubeData.recorded_at <= end,
-    ).order_by(YouTubeData.recorded_at.desc()).first()
-
-    yt_prev = db.query(YouTubeData).filter(
-        YouTubeData.competitor_id == comp_id,
-        YouTubeData.recorded_at <= start,
-    ).order_by(YouTubeData.recorded_at.desc()).first()
-
-    if yt_latest:
-        metrics["yt_subscribers"] = _delta(yt_latest.subscribers, yt_prev.subscribers if yt_prev else None)
-        metrics["yt_views"] = _delta(yt_latest.total_views, yt_prev.total_views if yt_prev else None)
-        metrics["yt_engagement"] = _delta(yt_latest.engagement_rate, yt_prev.engagement_rate if yt_prev else None)
-
-    # App Store
-    for store in ["playstore", "appstore"]:
-        prefix = "ps" if store == "playstore" else "as"
-        app_latest = db.query(AppData).filter(
-            AppData.competitor_id == comp_id,
-            AppData.store == store,
-            AppData.recorded_at <= end,
-        ).order_by(AppData.recorded_at.desc()).first()
-
-        app_prev = db.query(AppData).filter(
-            AppData.competitor_id == comp_id,
-            AppData.store == store,
-            AppData.recorded_at <= start,
-        ).order_by(AppData.recorded_at.desc()).first()
-
-        if app_latest:
-            metrics[f"{prefix}_rating"] = _delta(app_latest.rating, app_prev.rating if app_prev else None)
-            metrics[f"{prefix}_reviews"] = _delta(app_latest.reviews_count, app_prev.reviews_count if app_prev else None)
-            if app_latest.downloads_numeric:
-                metrics[f"{prefix}_downloads"] = _delta(
-                    app_latest.downloads_numeric,
-                    app_prev.downloads_numeric if app_prev else None
-                )
+# ─── Delta computation ──────────────────────────────────────────────
 
-    # Ads (from snapshots — latest day vs first day in range)
-    ad_latest = (
+def _latest_rows(db: Session, model, comp_ids: list[int], before: datetime, *filters) -> dict[int, object]:
+    """Most recent row at or before `before` for every competitor, in one windowed query."""
+    rn = func.row_number().over(
+        partition_by=model.competitor_id,
+        order_by=model.recorded_at.desc(),
+    ).label("rn")
+    inner = select(*model.__table__.c, rn).where(
+        model.competitor_id.in_(comp_ids),
+        model.recorded_at <= before,
+        *filters,
+    ).subquery()
+    stmt = select(*[c for c in inner.c if c.name != "rn"]).where(inner.c.rn == 1)
+    return {row.competitor_id: row for row in db.execute(stmt)}
+
+
+def _ad_snapshot_totals(db: Session, comp_ids: list[int], since: datetime, until: datetime) -> dict[int, object]:
+    rows = (
         db.query(
+            AdSnapshot.competitor_id,
             func.count(AdSnapshot.id).label("cnt"),
             func.sum(AdSnapshot.estimated_spend_min).label("spend_min"),
             func.sum(AdSnapshot.estimated_spend_max).label("spend_max"),
             func.sum(AdSnapshot.eu_total_reach).label("reach"),
         )
         .filter(
-            AdSnapshot.competitor_id == comp_id,
-            AdSnapshot.recorded_at >= end - timedelta(days=1),
-            AdSnapshot.recorded_at <= end,
+            AdSnapshot.competitor_id.in_(comp_ids),
+            AdSnapshot.recorded_at >= since,
+            AdSnapshot.recorded_at <= until,
         )
-        .first()
+        .group_by(AdSnapshot.competitor_id)
+        .all()
     )
+    return {r.competitor_id: r for r in rows}
 
-    ad_prev = (
-        db.query(
-            func.count(AdSnapshot.id).label("cnt"),
-            func.sum(AdSnapshot.estimated_spend_min).label("spend_min"),
-            func.sum(AdSnapshot.estimated_spend_max).label("spend_max"),
-            func.sum(AdSnapshot.eu_total_reach).label("reach"),
-        )
-        .filter(
-            AdSnapshot.competitor_id == comp_id,
-            AdSnapshot.recorded_at >= start,
-            AdSnapshot.recorded_at <= start + timedelta(days=1),
-        )
-        .first()
-    )
 
-    if ad_latest and ad_latest.cnt:
-        metrics["ads_active"] = _delta(ad_latest.cnt, ad_prev.cnt if ad_prev else None)
-        metrics["ads_spend_max"] = _delta(
-            float(ad_latest.spend_max or 0),
-            float(ad_prev.spend_max or 0) if ad_prev else None
-        )
-        metrics["ads_reach"] = _delta(
-            int(ad_latest.reach or 0),
-            int(ad_prev.reach or 0) if ad_prev else None
+def _compute_deltas(db: Session, comp_ids: list[int], start: datetime, end: datetime) -> dict:
+    """Compute latest value + delta for each metric, for every competitor.
+
+    Two windowed queries per source (latest row up to `end` and up to `start`),
+    whatever the number of competitors.
+    """
+    ig_latest = _latest_rows(db, InstagramData, comp_ids, end)
+    ig_prev = _latest_rows(db, InstagramData, comp_ids, start)
+    tt_latest = _latest_rows(db, TikTokData, comp_ids, end)
+    tt_prev = _latest_rows(db, TikTokData, comp_ids, start)
+    yt_latest = _latest_rows(db, YouTubeData, comp_ids, end)
+    yt_prev = _latest_rows(db, YouTubeData, comp_ids, start)
+    apps = {
+        store: (
+            _latest_rows(db, AppData, comp_ids, end, AppData.store == store),
+            _latest_rows(db, AppData, comp_ids, start, AppData.store == store),
         )
+        for store in ["playstore", "appstore"]
+    }
+    sc_latest = _latest_rows(db, SnapchatData, comp_ids, end)
+    sc_prev = _latest_rows(db, SnapchatData, comp_ids, start)
+
+    # Ads (from snapshots — latest day vs first day in range)
+    ads_latest = _ad_snapshot_totals(db, comp_ids, end - timedelta(days=1), end)
+    ads_prev = _ad_snapshot_totals(db, comp_ids, start, start + timedelta(days=1))
 
     # Snapchat Ads
-    snap_latest_count = db.query(func.count(Ad.id)).filter(
-        Ad.competitor_id == comp_id,
-        Ad.platform == "snapchat",
-    ).scalar() or 0
-
-    snap_impressions = db.query(func.coalesce(func.sum(Ad.impressions_min), 0)).filter(
-        Ad.competitor_id == comp_id,
-        Ad.platform == "snapchat",
-    ).scalar() or 0
-
-    if snap_latest_count > 0:
-        metrics["snap_ads"] = {"value": snap_latest_count, "previous": None, "delta": None, "delta_pct": None}
-        metrics["snap_impressions"] = {"value": int(snap_impressions), "previous": None, "delta": None, "delta_pct": None}
-
-    # Snapchat Profile
-    sc_latest = db.query(SnapchatData).filter(
-        SnapchatData.competitor_id == comp_id,
-        SnapchatData.recorded_at <= end,
-    ).order_by(SnapchatData.recorded_at.desc()).first()
-
-    sc_prev = db.query(SnapchatData).filter(
-        SnapchatData.competitor_id == comp_id,
-        SnapchatData.recorded_at <= start,
-    ).order_by(SnapchatData.recorded_at.desc()).first()
-
-    if sc_latest:
-        metrics["snap_subscribers"] = _delta(sc_latest.subscribers, sc_prev.subscribers if sc_prev else None)
-        metrics["snap_engagement"] = _delta(sc_latest.engagement_rate, sc_prev.engagement_rate if sc_prev else None)
-
-    return metrics
+    snap_ads = {
+        r.competitor_id: r
+        for r in db.query(
+            Ad.competitor_id,
+            func.count(Ad.id).label("cnt"),
+            func.coalesce(func.sum(Ad.impressions_min), 0).label("impressions"),
+        ).filter(
+            Ad.competitor_id.in_(comp_ids),
+            Ad.platform == "snapchat",
+        ).group_by(Ad.competitor_id).all()
+    }
+
+    result = {}
+    for comp_id in comp_ids:
+        metrics = {}
+
+        # Instagram
+        latest, prev = ig_latest.get(comp_id), ig_prev.get(comp_id)
+        if latest:
+            metrics["ig_followers"] = _delta(latest.followers, prev.followers if prev else None)
+            metrics["ig_engagement"] = _delta(latest.engagement_rate, prev.engagement_rate if prev else None)
+            metrics["ig_posts"] = _delta(latest.posts_count, prev.posts_count if prev else None)
+
+        # TikTok
+        latest, prev = tt_latest.get(comp_id), tt_prev.get(comp_id)
+        if latest:
+            metrics["tt_followers"] = _delta(latest.followers, prev.followers if prev else None)
+            metrics["tt_likes"] = _delta(latest.likes, prev.likes if prev else None)
+
+        # YouTube
+        latest, prev = yt_latest.get(comp_id), yt_prev.get(comp_id)
+        if latest:
+            metrics["yt_subscribers"] = _delta(latest.subscribers, prev.subscribers if prev else None)
+            metrics["yt_views"] = _delta(latest.total_views, prev.total_views if prev else None)
+            metrics["yt_engagement"] = _delta(latest.engagement_rate, prev.engagement_rate if prev else None)
+
+        # App Store
+        for store, (store_latest, store_prev) in apps.items():
+            prefix = "ps" if store == "playstore" else "as"
+            latest, prev = store_latest.get(comp_id), store_prev.get(comp_id)
+            if latest:
+                metrics[f"{prefix}_rating"] = _delta(latest.rating, prev.rating if prev else None)
+                metrics[f"{prefix}_reviews"] = _delta(latest.reviews_count, prev.reviews_count if prev else None)
+                if latest.downloads_numeric:
+                    metrics[f"{prefix}_downloads"] = _delta(
+                        latest.downloads_numeric,
+                        prev.downloads_numeric if prev else None
+                    )
+
+        # Ads
+        latest, prev = ads_latest.get(comp_id), ads_prev.get(comp_id)
+        if latest and latest.cnt:
+            metrics["ads_active"] = _delta(latest.cnt, prev.cnt if prev else None)
+            metrics["ads_spend_max"] = _delta(
+                float(latest.spend_max or 0),
+                float(prev.spend_max or 0) if prev else None
+            )
+            metrics["ads_reach"] = _delta(
+                int(latest.reach or 0),
+                int(prev.reach or 0) if prev else None
+            )
+
+        # Snapchat Ads
+        snap = snap_ads.get(comp_id)
+        if snap and snap.cnt > 0:
+            metrics["snap_ads"] = {"value": snap.cnt, "previous": None, "delta": None, "delta_pct": None}
+            metrics["snap_impressions"] = {"value": int(snap.impressions), "previous": None, "delta": None, "delta_pct": None}
+
+        # Snapchat Profile
+        latest, prev = sc_latest.get(comp_id), sc_prev.get(comp_id)
+        if latest:
+            metrics["snap_subscribers"] = _delta(latest.subscribers, prev.subscribers if prev else None)
+            metrics["snap_engagement"] = _delta(latest.engagement_rate, prev.engagement_rate if prev else None)
+
+        result[comp_id] = metrics
+
+    return result
 
 
 def _delta(current, previous) -> dict:
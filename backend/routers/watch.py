@@ -5,12 +5,11 @@ Dashboard et alertes pour surveiller la concurrence.
 from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, func
-from typing import List, Optional, Dict
+from typing import List, Optional
 from datetime import datetime, timedelta
 import uuid
-import json
 
-from database import get_db, Advertiser, Competitor, AppData, InstagramData, TikTokData, YouTubeData, SnapchatData, Ad, User, AdvertiserCompetitor, UserAdvertiser
+from database import get_db, get_async_db, AsyncDBSession, Advertiser, Competitor, AppData, InstagramData, Ad, User, AdvertiserCompetitor, UserAdvertiser
 from models.schemas import (
     WatchOverview, MarketPosition, KeyMetric, Trend, TrendDirection,
     Alert, AlertsList, AlertType, AlertSeverity, Channel,
@@ -21,72 +20,11 @@ from core.sectors import get_sector_label
 from core.auth import get_current_user, get_current_advertiser
 from core.utils import get_logo_url
 from core.permissions import get_advertiser_competitors, parse_advertiser_header
+from services.metrics_rollup import load_channel_metrics
 
 router = APIRouter()
 
 
-def _batch_load_latest(db: Session, model, competitor_ids: list, extra_filter=None) -> Dict:
-    """Batch-load the latest record per competitor for a given model.
-
-    Returns dict {competitor_id: row}.
-    Uses a subquery to find max(recorded_at) per competitor, then fetches those rows.
-    """
-    if not competitor_ids:
-        return {}
-
-    # Subquery: max recorded_at per competitor
-    sub = db.query(
-        model.competitor_id,
-        func.max(model.recorded_at).label("max_at"),
-    ).filter(model.competitor_id.in_(competitor_ids))
-    if extra_filter is not None:
-        sub = sub.filter(extra_filter)
-    sub = sub.group_by(model.competitor_id).subquery()
-
-    rows = db.query(model).join(
-        sub,
-        (model.competitor_id == sub.c.competitor_id) & (model.recorded_at == sub.c.max_at),
-    )
-    if extra_filter is not None:
-        rows = rows.filter(extra_filter)
-    rows = rows.all()
-
-    result = {}
-    for r in rows:
-        result[r.competitor_id] = r
-    return result
-
-
-def _batch_load_week_ago(db: Session, model, competitor_ids: list, week_ago, extra_filter=None) -> Dict:
-    """Batch-load the latest record before week_ago per competitor."""
-    if not competitor_ids:
-        return {}
-
-    sub = db.query(
-        model.competitor_id,
-        func.max(model.recorded_at).label("max_at"),
-    ).filter(
-        model.competitor_id.in_(competitor_ids),
-        model.recorded_at <= week_ago,
-    )
-    if extra_filter is not None:
-        sub = sub.filter(extra_filter)
-    sub = sub.group_by(model.competitor_id).subquery()
-
-    rows = db.query(model).join(
-        sub,
-        (model.competitor_id == sub.c.competitor_id) & (model.recorded_at == sub.c.max_at),
-    )
-    if extra_filter is not None:
-        rows = rows.filter(extra_filter)
-    rows = rows.all()
-
-    result = {}
-    for r in rows:
-        result[r.competitor_id] = r
-    return result
-
-
 def format_number(value: Optional[float], suffix: str = "") -> str:
     """Formate un nombre pour affichage (1.2M, 45K, etc.)."""
     if value is None:
@@ -174,12 +112,13 @@ async def get_watch_overview(
     competitors = _get_advertiser_competitors_query(db, adv_id).all()
     comp_ids = [c.id for c in competitors]
 
-    # Batch-load all latest data (6 queries instead of 5*N)
-    ps_map = _batch_load_latest(db, AppData, comp_ids, AppData.store == "playstore")
-    as_map = _batch_load_latest(db, AppData, comp_ids, AppData.store == "appstore")
-    ig_map = _batch_load_latest(db, InstagramData, comp_ids)
-    tt_map = _batch_load_latest(db, TikTokData, comp_ids)
-    yt_map = _batch_load_latest(db, YouTubeData, comp_ids)
+    # Latest values from the daily rollup (one query whatever the history)
+    latest = load_channel_metrics(db, comp_ids)
+    ps_map = latest["playstore"]
+    as_map = latest["appstore"]
+    ig_map = latest["instagram"]
+    tt_map = latest["tiktok"]
+    yt_map = latest["youtube"]
 
     # Collecte des données pour tous les acteurs
     actors_data = []
@@ -358,15 +297,20 @@ async def get_watch_overview(
 @router.get("/dashboard")
 async def get_dashboard_data(
     days: int = 7,
-    db: Session = Depends(get_db),
+    db: AsyncDBSession = Depends(get_async_db),
     user: User = Depends(get_current_user),
     x_advertiser_id: str | None = Header(None),
 ):
     """
     Endpoint agrégé pour le dashboard frontend.
     Retourne toutes les données competitors + insights en un seul appel.
+    Les requêtes tournent dans le pool DB pour ne pas bloquer la boucle asyncio.
     """
     adv_id = parse_advertiser_header(x_advertiser_id)
+    return await db.run_sync(_build_dashboard_data, days, user, adv_id)
+
+
+def _build_dashboard_data(db: Session, days: int, user: User, adv_id: int | None) -> dict:
     brand = get_brand(db, user, adv_id)
     if not adv_id:
         adv_id = brand.id
@@ -375,15 +319,14 @@ async def get_dashboard_data(
 
     week_ago = datetime.utcnow() - timedelta(days=days)
 
-    # Batch-load all data (12 queries instead of 10*N)
-    ig_latest_map = _batch_load_latest(db, InstagramData, comp_ids)
-    ig_old_map = _batch_load_week_ago(db, InstagramData, comp_ids, week_ago)
-    tt_latest_map = _batch_load_latest(db, TikTokData, comp_ids)
-    tt_old_map = _batch_load_week_ago(db, TikTokData, comp_ids, week_ago)
-    yt_latest_map = _batch_load_latest(db, YouTubeData, comp_ids)
-    yt_old_map = _batch_load_week_ago(db, YouTubeData, comp_ids, week_ago)
-    ps_latest_map = _batch_load_latest(db, AppData, comp_ids, AppData.store == "playstore")
-    as_latest_map = _batch_load_latest(db, AppData, comp_ids, AppData.store == "appstore")
+    # Latest and N-days-ago values from the daily rollup (2 queries whatever the history)
+    latest = load_channel_metrics(db, comp_ids)
+    old = load_channel_metrics(db, comp_ids, as_of=week_ago)
+    ig_latest_map, ig_old_map = latest["instagram"], old["instagram"]
+    tt_latest_map, tt_old_map = latest["tiktok"], old["tiktok"]
+    yt_latest_map, yt_old_map = latest["youtube"], old["youtube"]
+    ps_latest_map = latest["playstore"]
+    as_latest_map = latest["appstore"]
 
     # Snapchat ads: batch-load counts + impressions per competitor
     snap_data_map = {}
@@ -402,8 +345,8 @@ async def get_dashboard_data(
                 "total_impressions": row.imp,
             }
 
-    # Snapchat profile data: batch-load latest SnapchatData
-    snap_profile_map = _batch_load_latest(db, SnapchatData, comp_ids) if comp_ids else {}
+    # Snapchat profile data: latest SnapchatData values
+    snap_profile_map = latest["snapchat"]
 
     # Build entity_name lookup for snap
     snap_entity_map = {c.id: c.snapchat_entity_name for c in competitors if c.snapchat_entity_name}
@@ -780,107 +723,72 @@ def _get_platform_leaders(competitors: list) -> dict:
 
 def _build_ad_intelligence(db: Session, competitor_data: list, brand_name: str) -> dict:
     """Build ad intelligence: format breakdown, platform mix, payer/advertiser analysis."""
-    # Only load ads for tracked competitors to limit memory usage
-    tracked_ids = [c["id"] for c in competitor_data]
-    all_ads = db.query(Ad).filter(Ad.competitor_id.in_(tracked_ids)).all() if tracked_ids else []
+    from services.ad_analytics import aggregate_ads, parse_platforms
 
-    # Per competitor ad data
-    comp_ads = {}
-    for ad in all_ads:
-        cid = ad.competitor_id
-        if cid not in comp_ads:
-            comp_ads[cid] = []
-        comp_ads[cid].append(ad)
+    # Counts and spend are grouped in SQL; only one row per group comes back
+    tracked_ids = [c["id"] for c in competitor_data]
+    groups = aggregate_ads(db, tracked_ids, ("competitor_id", "display_format", "publisher_platforms", "platform"))
+    page_rows = aggregate_ads(db, tracked_ids, ("page_name", "display_format"))
+    # Payer tracking: only REAL payer data (byline/disclaimer_label), never page_name
+    payer_rows = aggregate_ads(db, tracked_ids, ("payer", "page_name"))
 
-    # Global format breakdown
+    # Global and per competitor format / platform breakdown
     format_counts = {}
     platform_counts = {}
-    advertisers = {}  # page_name -> {ads, competitors, active, formats}
-    payers = {}  # byline/disclaimer -> {total, active, pages} (only explicit payer data)
-
-    for ad in all_ads:
-        fmt = ad.display_format or "AUTRE"
-        format_counts[fmt] = format_counts.get(fmt, 0) + 1
-
-        try:
-            pps = json.loads(ad.publisher_platforms) if ad.publisher_platforms else []
-        except (json.JSONDecodeError, TypeError):
-            pps = []
-        # Fallback: use ad.platform for ads without publisher_platforms (e.g. Google Ads)
-        if not pps and ad.platform:
-            pps = [ad.platform.upper()]
+    comp_stats = {}  # competitor_id -> {total, active, formats, platforms, spend_min, spend_max}
+    for g in groups:
+        fmt = g.display_format or "AUTRE"
+        format_counts[fmt] = format_counts.get(fmt, 0) + g.ads
+        # Fallback: ad.platform for ads without publisher_platforms (e.g. Google Ads)
+        pps = parse_platforms(g.publisher_platforms, g.platform)
         for pp in pps:
-            platform_counts[pp] = platform_counts.get(pp, 0) + 1
-
-        pname = ad.page_name or "Inconnu"
-        if pname not in advertisers:
-            advertisers[pname] = {"total": 0, "active": 0, "competitor_id": ad.competitor_id, "formats": {}}
-        advertisers[pname]["total"] += 1
-        if ad.is_active:
-            advertisers[pname]["active"] += 1
-        fmt_key = ad.display_format or "AUTRE"
-        advertisers[pname]["formats"][fmt_key] = advertisers[pname]["formats"].get(fmt_key, 0) + 1
-
-        # Payer tracking: only use REAL payer data (byline/disclaimer_label)
-        # Don't fallback to page_name — that's the advertiser, not the payer
-        explicit_payer = ad.byline or ad.disclaimer_label
-        if explicit_payer:
-            if explicit_payer not in payers:
-                payers[explicit_payer] = {"total": 0, "active": 0, "pages": set()}
-            payers[explicit_payer]["total"] += 1
-            if ad.is_active:
-                payers[explicit_payer]["active"] += 1
-            payers[explicit_payer]["pages"].add(pname)
+            platform_counts[pp] = platform_counts.get(pp, 0) + g.ads
+
+        stats = comp_stats.setdefault(g.competitor_id, {
+            "total": 0, "active": 0, "formats": {}, "platforms": set(), "spend_min": 0, "spend_max": 0,
+        })
+        stats["total"] += g.ads
+        stats["active"] += int(g.active)
+        stats["formats"][fmt] = stats["formats"].get(fmt, 0) + g.ads
+        stats["platforms"].update(pps)
+        stats["spend_min"] += g.spend_min
+        stats["spend_max"] += g.spend_max
+
+    advertisers = {}  # page_name -> {total, active, formats}
+    for r in page_rows:
+        pname = r.page_name or "Inconnu"
+        adv = advertisers.setdefault(pname, {"total": 0, "active": 0, "formats": {}})
+        adv["total"] += r.ads
+        adv["active"] += int(r.active)
+        fmt_key = r.display_format or "AUTRE"
+        adv["formats"][fmt_key] = adv["formats"].get(fmt_key, 0) + r.ads
+
+    payers = {}  # byline/disclaimer -> {total, active, pages}
+    for r in payer_rows:
+        if not r.payer:
+            continue
+        payer = payers.setdefault(r.payer, {"total": 0, "active": 0, "pages": set()})
+        payer["total"] += r.ads
+        payer["active"] += int(r.active)
+        payer["pages"].add(r.page_name or "Inconnu")
 
     # Per competitor summary
     competitor_ad_summary = []
     for cd in competitor_data:
         cid = cd["id"]
-        ads = comp_ads.get(cid, [])
-        active = [a for a in ads if a.is_active]
-
-        # Format breakdown for this competitor
-        comp_formats = {}
-        comp_platforms = set()
-        for a in ads:
-            f = a.display_format or "AUTRE"
-            comp_formats[f] = comp_formats.get(f, 0) + 1
-            try:
-                pps = json.loads(a.publisher_platforms) if a.publisher_platforms else []
-            except (json.JSONDecodeError, TypeError):
-                pps = []
-            if not pps and a.platform:
-                pps = [a.platform.upper()]
-            for pp in pps:
-                comp_platforms.add(pp)
-
-        # Estimated spend (priority: declared > impressions x CPM > reach x CPM)
-        spend_min = 0
-        spend_max = 0
-        for a in ads:
-            if a.estimated_spend_min and a.estimated_spend_min > 0:
-                spend_min += a.estimated_spend_min
-                spend_max += a.estimated_spend_max or a.estimated_spend_min
-            elif a.impressions_min and a.impressions_min > 0:
-                cpm = 3.0  # Default CPM for Meta FR
-                spend_min += (a.impressions_min / 1000) * cpm
-                spend_max += ((a.impressions_max or a.impressions_min) / 1000) * cpm
-            elif a.eu_total_reach and a.eu_total_reach > 100:
-                cpm = 3.0
-                spend_min += (a.eu_total_reach / 1000) * cpm * 0.7
-                spend_max += (a.eu_total_reach / 1000) * cpm * 1.3
-
+        stats = comp_stats.get(cid, {"total": 0, "active": 0, "formats": {}, "platforms": set(),
+                                     "spend_min": 0, "spend_max": 0})
         competitor_ad_summary.append({
             "id": cid,
             "name": cd["name"],
             "logo_url": cd.get("logo_url"),
             "is_brand": cd["name"].lower() == brand_name.lower(),
-            "total_ads": len(ads),
-            "active_ads": len(active),
-            "formats": comp_formats,
-            "platforms": sorted(comp_platforms),
-            "estimated_spend_min": spend_min,
-            "estimated_spend_max": spend_max,
+            "total_ads": stats["total"],
+            "active_ads": stats["active"],
+            "formats": stats["formats"],
+            "platforms": sorted(stats["platforms"]),
+            "estimated_spend_min": stats["spend_min"],
+            "estimated_spend_max": stats["spend_max"],
         })
 
     competitor_ad_summary.sort(key=lambda x: x["total_ads"], reverse=True)
@@ -900,33 +808,22 @@ def _build_ad_intelligence(db: Session, competitor_data: list, brand_name: str)
         competitor_ad_summary, format_counts, platform_counts, brand_name
     )
 
-    total_spend_min = 0
-    total_spend_max = 0
-    for a in all_ads:
-        if a.estimated_spend_min and a.estimated_spend_min > 0:
-            total_spend_min += a.estimated_spend_min
-            total_spend_max += a.estimated_spend_max or a.estimated_spend_min
-        elif a.impressions_min and a.impressions_min > 0:
-            cpm = 3.0
-            total_spend_min += (a.impressions_min / 1000) * cpm
-            total_spend_max += ((a.impressions_max or a.impressions_min) / 1000) * cpm
-        elif a.eu_total_reach and a.eu_total_reach > 100:
-            cpm = 3.0
-            total_spend_min += (a.eu_total_reach / 1000) * cpm * 0.7
-            total_spend_max += (a.eu_total_reach / 1000) * cpm * 1.3
+    total_ads = sum(g.ads for g in groups)
+    total_spend_min = sum(g.spend_min for g in groups)
+    total_spend_max = sum(g.spend_max for g in groups)
 
     return {
-        "total_ads": len(all_ads),
-        "total_active": len([a for a in all_ads if a.is_active]),
+        "total_ads": total_ads,
+        "total_active": sum(int(g.active) for g in groups),
         "total_estimated_spend": {"min": total_spend_min, "max": total_spend_max},
         "format_breakdown": [
             {"format": k, "label": FORMAT_LABELS.get(k, k), "count": v,
-             "pct": round(v / len(all_ads) * 100, 1) if all_ads else 0}
+             "pct": round(v / total_ads * 100, 1) if total_ads else 0}
             for k, v in sorted(format_counts.items(), key=lambda x: -x[1])
         ],
         "platform_breakdown": [
             {"platform": k, "count": v,
-             "pct": round(v / len(all_ads) * 100, 1) if all_ads else 0}
+             "pct": round(v / total_ads * 100, 1) if total_ads else 0}
             for k, v in sorted(platform_counts.items(), key=lambda x: -x[1])
         ],
         "advertisers": [
@@ -1332,10 +1229,11 @@ async def get_rankings(
     comp_ids = [c.id for c in competitors]
     rankings = []
 
-    # Batch-load all latest data (3 queries instead of 3*N)
-    ps_map = _batch_load_latest(db, AppData, comp_ids, AppData.store == "playstore")
-    ig_map = _batch_load_latest(db, InstagramData, comp_ids)
-    tt_map = _batch_load_latest(db, TikTokData, comp_ids)
+    # Latest values from the daily rollup (one query whatever the history)
+    latest = load_channel_metrics(db, comp_ids)
+    ps_map = latest["playstore"]
+    ig_map = latest["instagram"]
+    tt_map = latest["tiktok"]
 
     # Ranking Play Store (note)
     playstore_data = []
@@ -0,0 +1,139 @@
+"""
+Query plans and timings of the hot history / ads queries, before and after
+the composite and partial indexes of database.COMPOSITE_INDEXES.
+
+    # Scratch SQLite database seeded with synthetic rows (default)
+    python scripts/benchmark_indexes.py --competitors 50 --days 365
+
+    # Existing database: plans only, no DDL unless --apply
+    DATABASE_URL=postgresql://... python scripts/benchmark_indexes.py --live [--apply]
+
+On the scratch database the composite indexes are dropped for the "before"
+pass and created for the "after" pass. PostgreSQL plans use EXPLAIN ANALYZE,
+SQLite plans EXPLAIN QUERY PLAN.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+QUERIES = [
+    ("latest instagram row",
+     "SELECT * FROM instagram_data WHERE competitor_id = :cid ORDER BY recorded_at DESC LIMIT 1"),
+    ("instagram range",
+     "SELECT recorded_at, followers FROM instagram_data "
+     "WHERE competitor_id = :cid AND recorded_at >= :since ORDER BY recorded_at"),
+    ("latest playstore row",
+     "SELECT * FROM app_data WHERE competitor_id = :cid AND store = 'playstore' "
+     "ORDER BY recorded_at DESC LIMIT 1"),
+    ("ad snapshots range",
+     "SELECT COUNT(*) FROM ad_snapshots WHERE competitor_id = :cid AND recorded_at >= :since"),
+    ("active ads of a competitor",
+     "SELECT COUNT(*) FROM ads WHERE competitor_id = :cid AND is_active = {true}"),
+    ("latest ads of a competitor",
+     "SELECT id FROM ads WHERE competitor_id = :cid ORDER BY start_date DESC LIMIT 50"),
+]
+RUNS = 20
+
+
+def _seed(engine, competitors: int, days: int, ads_per_competitor: int):
+    from sqlalchemy import insert
+    from database import Ad, AdSnapshot, AppData, Competitor, InstagramData
+
+    now = datetime.utcnow()
+    rnd = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(insert(Competitor), [{"id": c, "name": f"Comp {c}", "is_active": True}
+                                          for c in range(1, competitors + 1)])
+        for c in range(1, competitors + 1):
+            stamps = [now - timedelta(days=d, hours=rnd.randint(0, 23)) for d in range(days)]
+            conn.execute(insert(InstagramData), [
+                {"competitor_id": c, "followers": 1000 + i, "recorded_at": t} for i, t in enumerate(stamps)
+            ])
+            conn.execute(insert(AppData), [
+                {"competitor_id": c, "store": store, "rating": 4.0, "recorded_at": t}
+                for t in stamps for store in ("playstore", "appstore")
+            ])
+            conn.execute(insert(Ad), [
+                {"competitor_id": c, "ad_id": f"{c}-{a}", "is_active": rnd.random() < 0.2,
+                 "start_date": now - timedelta(days=rnd.randint(0, days))}
+                for a in range(ads_per_competitor)
+            ])
+            conn.execute(insert(AdSnapshot), [
+                {"ad_id": f"{c}-{a}", "competitor_id": c, "recorded_at": t}
+                for a in range(0, ads_per_competitor, 10) for t in stamps[:30]
+            ])
+
+
+def _drop_composite_indexes(engine):
+    from sqlalchemy import text
+    from database import COMPOSITE_INDEXES
+
+    with engine.begin() as conn:
+        for _, _, idx_name, _ in COMPOSITE_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS "{idx_name}"'))
+
+
+def _report(engine, label: str, params: dict):
+    from sqlalchemy import text
+
+    is_pg = engine.dialect.name == "postgresql"
+    explain = "EXPLAIN ANALYZE " if is_pg else "EXPLAIN QUERY PLAN "
+    print(f"\n===== {label} =====")
+    with engine.connect() as conn:
+        for name, sql in QUERIES:
+            sql = sql.format(true="true" if is_pg else "1")
+            plan = conn.execute(text(explain + sql), params).fetchall()
+            start = time.perf_counter()
+            for _ in range(RUNS):
+                conn.execute(text(sql), params).fetchall()
+            elapsed = (time.perf_counter() - start) / RUNS * 1000
+            print(f"\n-- {name}: {elapsed:.2f} ms/query")
+            for row in plan:
+                print("   " + (row[0] if is_pg else str(row[-1])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="use DATABASE_URL instead of a scratch SQLite file")
+    parser.add_argument("--apply", action="store_true", help="with --live: create the missing indexes, then re-run")
+    parser.add_argument("--competitors", type=int, default=30)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--ads", type=int, default=500, help="ads per competitor")
+    parser.add_argument("--competitor-id", type=int, default=1)
+    args = parser.parse_args()
+
+    if not args.live:
+        path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from database import Base, engine, _add_composite_indexes
+
+    params = {"cid": args.competitor_id, "since": datetime.utcnow() - timedelta(days=30)}
+    if args.live:
+        _report(engine, "current", params)
+        if args.apply:
+            _add_composite_indexes(engine)
+            _report(engine, "after _add_composite_indexes", params)
+        return
+
+    Base.metadata.create_all(bind=engine)
+    print(f"Seeding {args.competitors} competitors x {args.days} days into {engine.url.database}")
+    _seed(engine, args.competitors, args.days, args.ads)
+    _drop_composite_indexes(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    _report(engine, "before (single-column indexes)", params)
+    _add_composite_indexes(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    _report(engine, "after (composite + partial indexes)", params)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Ad analytics query layer.
+
+Ads overview, the dashboard ad intelligence and the MCP ad tools all need
+counts, estimated spend and reach per competitor / platform / format / page.
+Loading every Ad row (with its wide Text columns) grows with the ads table, so
+the period filter, the grouping and the sums run in SQL on a narrow
+projection; Python only sees one row per group.
+
+publisher_platforms is a JSON list stored as text: rows are grouped on the raw
+string (a handful of distinct values) and each distinct value is parsed once.
+"""
+import json
+from datetime import datetime
+from functools import lru_cache
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from database import Ad
+
+CPM = 3.0  # Default CPM for Meta FR (€ per 1000 impressions)
+
+# Estimated spend (priority: declared > impressions x CPM > reach x CPM)
+SPEND_MIN = case(
+    (Ad.estimated_spend_min > 0, Ad.estimated_spend_min),
+    (Ad.impressions_min > 0, Ad.impressions_min / 1000.0 * CPM),
+    (Ad.eu_total_reach > 100, Ad.eu_total_reach / 1000.0 * CPM * 0.7),
+    else_=0.0,
+)
+SPEND_MAX = case(
+    (Ad.estimated_spend_min > 0, func.coalesce(func.nullif(Ad.estimated_spend_max, 0), Ad.estimated_spend_min)),
+    (Ad.impressions_min > 0, func.coalesce(func.nullif(Ad.impressions_max, 0), Ad.impressions_min) / 1000.0 * CPM),
+    (Ad.eu_total_reach > 100, Ad.eu_total_reach / 1000.0 * CPM * 1.3),
+    else_=0.0,
+)
+
+# Group-by dimensions available to aggregate_ads()
+DIMENSIONS = {
+    "competitor_id": Ad.competitor_id,
+    "publisher_platforms": Ad.publisher_platforms,
+    "platform": Ad.platform,
+    "display_format": Ad.display_format,
+    "ad_type": Ad.ad_type,
+    "page_name": Ad.page_name,
+    # Overview "pages": beneficiary when known, else the page
+    "page": func.coalesce(func.nullif(Ad.beneficiary, ""), func.nullif(Ad.page_name, "")),
+    # Only explicit payer data (byline / disclaimer), never the page name
+    "payer": func.coalesce(func.nullif(Ad.byline, ""), func.nullif(Ad.disclaimer_label, "")),
+    "start_day": func.date(Ad.start_date),
+}
+
+
+def aggregate_ads(
+    db: Session,
+    competitor_ids: list[int],
+    group_by: tuple[str, ...],
+    period_start: datetime = None,
+    period_end: datetime = None,
+) -> list:
+    """Ad counts and sums grouped by the given DIMENSIONS, computed in SQL.
+
+    Each row has the dimension values plus ads, active, spend_min, spend_max
+    and reach. With a period, only ads overlapping it are counted (started in
+    the period or still active, not started after it, not ended before it).
+    """
+    if not competitor_ids:
+        return []
+    dims = [DIMENSIONS[name].label(name) for name in group_by]
+    stmt = select(
+        *dims,
+        func.count(Ad.id).label("ads"),
+        func.coalesce(func.sum(case((Ad.is_active == True, 1), else_=0)), 0).label("active"),
+        func.coalesce(func.sum(SPEND_MIN), 0).label("spend_min"),
+        func.coalesce(func.sum(SPEND_MAX), 0).label("spend_max"),
+        func.coalesce(func.sum(Ad.eu_total_reach), 0).label("reach"),
+    ).where(Ad.competitor_id.in_(competitor_ids))
+    if period_start is not None:
+        stmt = stmt.where(
+            (Ad.start_date >= period_start) | (Ad.is_active == True),
+            Ad.end_date.is_(None) | (Ad.end_date >= period_start),
+        )
+    if period_end is not None:
+        stmt = stmt.where(Ad.start_date.is_(None) | (Ad.start_date <= period_end))
+    if dims:
+        stmt = stmt.group_by(*dims)
+    return db.execute(stmt).all()
+
+
+@lru_cache(maxsize=1024)
+def parse_platforms(publisher_platforms: str | None, platform: str | None, normalise: bool = False) -> tuple:
+    """Platforms of an ad from its publisher_platforms JSON (ad.platform as fallback).
+
+    normalise=True lowercases, folds AUDIENCE_NETWORK/MESSENGER into facebook
+    and dedupes, as the ads overview does.
+    """
+    pps: list = []
+    if publisher_platforms:
+        try:
+            pps = json.loads(publisher_platforms)
+        except (json.JSONDecodeError, TypeError):
+            pps = []
+    if not pps and platform:
+        pps = [platform.upper()]
+    if not normalise:
+        return tuple(pps)
+
+    normalised = []
+    for p in pps:
+        p_lower = p.lower()
+        if p_lower in ("audience_network", "messenger"):
+            p_lower = "facebook"
+        normalised.append(p_lower)
+    return tuple(set(normalised))
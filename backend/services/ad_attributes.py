@@ -0,0 +1,133 @@
+"""
+Exploded JSON list fields of ads (ad_attributes table).
+
+publisher_platforms, targeted_countries, location_audience, creative_tags,
+products_detected and creative_dominant_colors are JSON lists stored as text
+on ads. Filtering or counting on them meant json.loads on every row, so each
+value is also stored as one (ad_id, kind, value) row, indexed on
+(kind, value), and platform / country / location / tag / product / colour
+filters and counts run in SQL.
+
+The JSON columns stay the source of truth (API payloads are unchanged). The
+table is maintained on write: a session hook re-explodes the ads whose list
+columns changed in a flush, and upsert_ads() does the same for its Core
+INSERT ... ON CONFLICT batches.
+"""
+import json
+import logging
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from database import Ad, AdAttribute
+
+logger = logging.getLogger(__name__)
+
+# Ad column -> attribute kind
+ATTRIBUTE_COLUMNS = {
+    "publisher_platforms": "platform",
+    "targeted_countries": "country",
+    "location_audience": "location",
+    "creative_tags": "tag",
+    "products_detected": "product",
+    "creative_dominant_colors": "color",
+}
+CHUNK_SIZE = 500
+MAX_VALUE_LENGTH = 500
+
+
+def _values(raw) -> list:
+    if not raw:
+        return []
+    try:
+        items = json.loads(raw) if isinstance(raw, str) else raw
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return items if isinstance(items, list) else []
+
+
+def explode(row) -> list[tuple[str, str]]:
+    """(kind, value) pairs of an ad (ORM object or row with the list columns + platform)."""
+    pairs = []
+    for column, kind in ATTRIBUTE_COLUMNS.items():
+        items = _values(getattr(row, column))
+        # Same fallback as the dashboards: ad.platform when publisher_platforms is empty
+        if kind == "platform" and not items and row.platform:
+            items = [row.platform.upper()]
+        seen = set()
+        for item in items:
+            # location_audience items are {"name": ..., "type": ..., "excluded": ...}
+            if isinstance(item, dict):
+                item = item.get("name")
+            # Malformed payloads (null, nested lists/objects) must not abort the ad write
+            if isinstance(item, bool) or not isinstance(item, (str, int, float)):
+                continue
+            value = str(item).strip()[:MAX_VALUE_LENGTH]
+            if value and value not in seen:
+                seen.add(value)
+                pairs.append((kind, value))
+    return pairs
+
+
+def sync_ad_attributes(conn, ad_ids, by_ad_key: bool = False) -> int:
+    """Rebuild the attribute rows of these ads from their stored JSON columns.
+
+    ad_ids are ads.id values (ads.ad_id keys with by_ad_key=True). Ads that no
+    longer exist just lose their rows. Works on a Session or a Connection; the
+    caller commits. Returns the number of rows written.
+    """
+    key = Ad.ad_id if by_ad_key else Ad.id
+    ids = list({i for i in ad_ids if i is not None})
+    written = 0
+    for i in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[i:i + CHUNK_SIZE]
+        rows = conn.execute(
+            select(Ad.id, Ad.platform, *[getattr(Ad, c) for c in ATTRIBUTE_COLUMNS]).where(key.in_(chunk))
+        ).all()
+        stale = [r.id for r in rows] if by_ad_key else chunk
+        if stale:
+            conn.execute(delete(AdAttribute).where(AdAttribute.ad_id.in_(stale)))
+        values = [{"ad_id": r.id, "kind": kind, "value": value} for r in rows for kind, value in explode(r)]
+        if values:
+            conn.execute(insert(AdAttribute), values)
+        written += len(values)
+    return written
+
+
+def attribute_filter(kind: str, value: str, exact: bool = False):
+    """Ad.id IN (ads having an attribute of this kind matching value).
+
+    Case-insensitive substring match by default, as the former JSON post-filters.
+    """
+    match = AdAttribute.value == value if exact else AdAttribute.value.ilike(f"%{value}%")
+    return Ad.id.in_(select(AdAttribute.ad_id).where(AdAttribute.kind == kind, match))
+
+
+# ─── Session hook (registered on Session in database.py) ────────────
+
+def collect_flushed(session: Session):
+    """after_flush: remember the ads whose list columns were written by this flush."""
+    from sqlalchemy import inspect as sa_inspect
+
+    touched = set()
+    for obj in session.new:
+        if isinstance(obj, Ad):
+            touched.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Ad):
+            state = sa_inspect(obj)
+            if any(state.attrs[c].history.has_changes() for c in (*ATTRIBUTE_COLUMNS, "platform")):
+                touched.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Ad):
+            touched.add(obj.id)
+    touched.discard(None)
+    if touched:
+        session.info.setdefault("pending_ad_attributes", set()).update(touched)
+
+
+def apply_pending(session: Session):
+    """after_flush_postexec: re-explode the ads touched by the flush."""
+    touched = session.info.pop("pending_ad_attributes", None)
+    if touched:
+        sync_ad_attributes(session.connection(), touched)
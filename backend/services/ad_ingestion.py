@@ -0,0 +1,171 @@
+"""
+Bulk ad ingestion.
+Loads the existing ad_ids of a batch in one query, then inserts/updates rows
+with a dialect-aware INSERT ... ON CONFLICT (PostgreSQL, SQLite).
+"""
+import logging
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import Ad
+from services.ad_attributes import ATTRIBUTE_COLUMNS, sync_ad_attributes
+
+logger = logging.getLogger(__name__)
+
+# Keep IN (...) lists and executemany batches well under driver limits
+CHUNK_SIZE = 500
+
+# Fields refreshed on re-ingestion by default (delivery status + metrics)
+STATUS_FIELDS = (
+    "is_active",
+    "end_date",
+    "impressions_min",
+    "impressions_max",
+    "estimated_spend_min",
+    "estimated_spend_max",
+    "eu_total_reach",
+)
+
+
+@dataclass
+class IngestResult:
+    new: int = 0
+    updated: int = 0
+    deactivated: int = 0
+    skipped: int = 0
+
+    def to_dict(self) -> dict:
+        return {"new": self.new, "updated": self.updated, "deactivated": self.deactivated, "skipped": self.skipped}
+
+
+def _chunks(items: list, size: int = CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def existing_ad_status(db: Session, ad_ids: Iterable[str]) -> dict[str, bool]:
+    """Map ad_id -> is_active for the ad_ids already stored (one query per chunk)."""
+    ids = list({str(a) for a in ad_ids if a})
+    found: dict[str, bool] = {}
+    for chunk in _chunks(ids):
+        for ad_id, is_active in db.query(Ad.ad_id, Ad.is_active).filter(Ad.ad_id.in_(chunk)).all():
+            found[ad_id] = bool(is_active)
+    return found
+
+
+def load_existing_ads(db: Session, ad_ids: Iterable[str]) -> dict[str, Ad]:
+    """Map ad_id -> Ad ORM row for callers that need to keep working on the objects."""
+    ids = list({str(a) for a in ad_ids if a})
+    found: dict[str, Ad] = {}
+    for chunk in _chunks(ids):
+        for ad in db.query(Ad).filter(Ad.ad_id.in_(chunk)).all():
+            found[ad.ad_id] = ad
+    return found
+
+
+def _dialect_insert(db: Session):
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+def upsert_ads(
+    db: Session,
+    rows: list[dict],
+    update_fields: Optional[Iterable[str]] = STATUS_FIELDS,
+    commit: bool = True,
+) -> IngestResult:
+    """Insert new ads and refresh existing ones in bulk.
+
+    rows: dicts of Ad column values, each with at least ad_id and competitor_id.
+    update_fields: columns refreshed when the ad_id already exists. A NULL in the
+        incoming row never overwrites a stored value. Empty/None = insert-only.
+    """
+    result = IngestResult()
+
+    # Deduplicate by ad_id (last occurrence wins)
+    by_id: dict[str, dict] = {}
+    for row in rows:
+        ad_id = str(row.get("ad_id") or "")
+        if ad_id:
+            by_id[ad_id] = {**row, "ad_id": ad_id}
+    result.skipped = len(rows) - len(by_id)
+
+    update_fields = tuple(f for f in (update_fields or ()) if f not in ("ad_id", "competitor_id", "id"))
+    existing = existing_ad_status(db, by_id.keys())
+
+    new_rows = [r for ad_id, r in by_id.items() if ad_id not in existing]
+    upd_rows = [r for ad_id, r in by_id.items() if ad_id in existing]
+    result.new = len(new_rows)
+    if update_fields:
+        result.updated = len(upd_rows)
+        if "is_active" in update_fields:
+            result.deactivated = sum(
+                1 for r in upd_rows if existing[r["ad_id"]] and r.get("is_active") is False
+            )
+    else:
+        result.skipped += len(upd_rows)
+
+    insert = _dialect_insert(db)
+    to_write = new_rows + (upd_rows if update_fields else [])
+    if insert is not None:
+        _write_on_conflict(db, insert, to_write, update_fields)
+    else:
+        _write_portable(db, new_rows, upd_rows if update_fields else [], update_fields)
+
+    # Core writes bypass the session hook that maintains ad_attributes
+    list_fields = ("platform", *ATTRIBUTE_COLUMNS)
+    touched = [r["ad_id"] for r in new_rows]
+    if any(f in list_fields for f in update_fields):
+        touched += [r["ad_id"] for r in upd_rows if any(r.get(f) is not None for f in list_fields)]
+    if touched:
+        sync_ad_attributes(db, touched, by_ad_key=True)
+
+    if commit:
+        db.commit()
+    return result
+
+
+def _write_on_conflict(db: Session, insert, rows: list[dict], update_fields: tuple):
+    """INSERT ... ON CONFLICT (ad_id) DO UPDATE/NOTHING, grouped by key set for executemany."""
+    table = Ad.__table__
+    groups: dict[tuple, list[dict]] = {}
+    for r in rows:
+        groups.setdefault(tuple(sorted(r.keys())), []).append(r)
+
+    for keys, group in groups.items():
+        stmt = insert(table)
+        cols = [f for f in update_fields if f in keys]
+        if cols:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.ad_id],
+                set_={c: func.coalesce(getattr(stmt.excluded, c), table.c[c]) for c in cols},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.ad_id])
+        for chunk in _chunks(group):
+            db.execute(stmt, chunk)
+
+
+def _write_portable(db: Session, new_rows: list[dict], upd_rows: list[dict], update_fields: tuple):
+    """Fallback for dialects without ON CONFLICT: bulk insert + one load for updates."""
+    for chunk in _chunks(new_rows):
+        db.bulk_insert_mappings(Ad, chunk)
+    if not upd_rows:
+        return
+    stored = load_existing_ads(db, [r["ad_id"] for r in upd_rows])
+    for r in upd_rows:
+        ad = stored.get(r["ad_id"])
+        if not ad:
+            continue
+        for f in update_fields:
+            if f in r and r[f] is not None:
+                setattr(ad, f, r[f])
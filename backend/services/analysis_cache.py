@@ -0,0 +1,258 @@
+"""
+Content-addressed cache for AI analyses (analysis_cache table).
+
+The same visual and ad copy is re-analysed across many rows (DCO variants,
+one creative run on several pages). Analyses are stored under
+sha256(kind, model, prompt version, normalised text, image bytes), so an
+identical input never hits the LLMs twice. A second key replaces the image
+bytes by a perceptual hash (dHash, needs Pillow): re-encoded or resized copies
+of a visually identical image share the analysis too.
+
+Concurrent misses on the same key (two variants in the same pipeline batch)
+wait for the first call instead of starting their own.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import re
+import unicodedata
+from datetime import datetime
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database import AnalysisCache, run_in_db_thread
+from services.jobs import with_session
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(parts: Iterable) -> str:
+    """NFKC + casefold + collapsed whitespace, so cosmetic differences share a key."""
+    text = " | ".join(str(p) for p in parts if p)
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def prompt_version(template: str) -> str:
+    """Short hash of the prompt template: editing the prompt invalidates its entries."""
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+
+def perceptual_hash(data: bytes) -> Optional[str]:
+    """64-bit dHash (9x8 grayscale, horizontal gradients) as 16 hex chars.
+    None when Pillow is missing or the image cannot be decoded."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            pixels = list(img.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    except Exception:
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+def cache_keys(
+    kind: str, model: str, version: str, texts: Iterable, image: Optional[bytes] = None,
+) -> tuple[str, Optional[str]]:
+    """(content_hash, similar_key). similar_key is None without an image or a perceptual hash."""
+    base = "\x00".join((kind, model, version, normalize_text(texts)))
+    image_digest = hashlib.sha256(image).hexdigest() if image else ""
+    content_hash = hashlib.sha256(f"{base}\x00{image_digest}".encode("utf-8")).hexdigest()
+    phash = perceptual_hash(image) if image else None
+    similar_key = hashlib.sha256(f"{base}\x00phash:{phash}".encode("utf-8")).hexdigest() if phash else None
+    return content_hash, similar_key
+
+
+def lookup(db: Session, content_hash: str, similar_key: Optional[str] = None) -> Optional[tuple[dict, str]]:
+    """Cached analysis and how it matched ("exact" or "similar"), counting the hit."""
+    row = db.query(AnalysisCache).filter(AnalysisCache.content_hash == content_hash).first()
+    match, counter = "exact", AnalysisCache.hits
+    if row is None and similar_key:
+        row = db.query(AnalysisCache).filter(
+            AnalysisCache.similar_key == similar_key,
+        ).order_by(AnalysisCache.id).first()
+        match, counter = "similar", AnalysisCache.similar_hits
+    if row is None:
+        return None
+    try:
+        result = json.loads(row.result)
+    except (TypeError, ValueError):
+        return None
+    db.query(AnalysisCache).filter(AnalysisCache.id == row.id).update(
+        {counter: func.coalesce(counter, 0) + 1, AnalysisCache.last_hit_at: datetime.utcnow()},
+        synchronize_session=False,
+    )
+    db.commit()
+    return result, match
+
+
+def store(
+    db: Session, kind: str, content_hash: str, similar_key: Optional[str],
+    model: str, version: str, result: dict,
+):
+    """Insert or refresh an entry. Underscore keys (_fresh_url...) are per-ad and not cached."""
+    payload = json.dumps({k: v for k, v in result.items() if not k.startswith("_")}, ensure_ascii=False)
+    row = db.query(AnalysisCache).filter(AnalysisCache.content_hash == content_hash).first()
+    if row is None:
+        db.add(AnalysisCache(
+            kind=kind, content_hash=content_hash, similar_key=similar_key,
+            model=model, prompt_version=version, result=payload, hits=0, similar_hits=0,
+        ))
+    else:
+        row.result = payload
+        row.similar_key = similar_key
+        row.created_at = datetime.utcnow()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # stored meanwhile by another worker
+
+
+def stats(db: Session) -> dict:
+    """Entries and hit rate per kind. Each entry stands for one miss (one LLM analysis)."""
+    kinds = {}
+    for kind, entries, hits, similar in db.query(
+        AnalysisCache.kind, func.count(AnalysisCache.id),
+        func.coalesce(func.sum(AnalysisCache.hits), 0), func.coalesce(func.sum(AnalysisCache.similar_hits), 0),
+    ).group_by(AnalysisCache.kind):
+        served = hits + similar
+        kinds[kind] = {
+            "entries": entries,
+            "exact_hits": hits,
+            "similar_hits": similar,
+            "hit_rate": round(served / (served + entries), 3) if entries else 0.0,
+        }
+    return {"enabled": settings.ANALYSIS_CACHE_ENABLED, "kinds": kinds, "process": analysis_cache.counters}
+
+
+def _resolve(db: Session, kind, model, version, texts, image, use_cache):
+    content_hash, similar_key = cache_keys(kind, model, version, texts, image)
+    hit = lookup(db, content_hash, similar_key) if use_cache else None
+    return content_hash, similar_key, hit
+
+
+def _resolve_many(db: Session, kind, model, version, texts_list, use_cache):
+    return [_resolve(db, kind, model, version, texts, None, use_cache) for texts in texts_list]
+
+
+class AnalysisCacheService:
+    """Async front used by the analyzers."""
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Future] = {}
+        # Since process start: exact / similar hits, calls that waited for an identical one, LLM calls
+        self.counters = {"exact": 0, "similar": 0, "shared": 0, "miss": 0}
+
+    async def get_or_compute(
+        self,
+        kind: str,
+        model: str,
+        template: str,
+        texts: Iterable,
+        compute: Callable[[], Awaitable[Optional[dict]]],
+        image: Optional[bytes] = None,
+        use_cache: bool = True,
+    ) -> Optional[dict]:
+        """Return the cached analysis (marked with "_cache") or run `compute` and store its result.
+        use_cache=False forces a fresh analysis that replaces the entry."""
+        if not settings.ANALYSIS_CACHE_ENABLED:
+            return await compute()
+
+        version = prompt_version(template)
+        texts = tuple(texts)
+        try:
+            content_hash, similar_key, hit = await run_in_db_thread(
+                with_session, _resolve, kind, model, version, texts, image, use_cache,
+            )
+        except Exception as e:
+            logger.warning(f"Analysis cache lookup failed ({kind}): {e}")
+            return await compute()
+
+        if hit is not None:
+            result, match = hit
+            self.counters[match] += 1
+            result["_cache"] = match
+            return result
+
+        pending = self._inflight.get(content_hash) if use_cache else None
+        if pending is not None:
+            result = await asyncio.shield(pending)
+            if result:
+                self.counters["shared"] += 1
+                return dict(result, _cache="shared")
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[content_hash] = future
+        try:
+            result = await compute()
+            self.counters["miss"] += 1
+            if result:
+                future.set_result(dict(result))
+                try:
+                    await run_in_db_thread(
+                        with_session, store, kind, content_hash, similar_key, model, version, result,
+                    )
+                except Exception as e:
+                    logger.warning(f"Analysis cache store failed ({kind}): {e}")
+            else:
+                future.set_result(None)
+            return result
+        finally:
+            if not future.done():
+                future.set_result(None)  # failed or cancelled: waiters make their own call
+            if self._inflight.get(content_hash) is future:
+                del self._inflight[content_hash]
+
+
+    async def lookup_many(
+        self, kind: str, model: str, template: str, texts_list: List[Iterable], use_cache: bool = True,
+    ) -> List[tuple[Optional[tuple], Optional[dict]]]:
+        """Text-only lookups for a batched prompt, in one DB round trip.
+        Returns (entry, cached result or None) per item; pass entry to store_result()."""
+        if not settings.ANALYSIS_CACHE_ENABLED:
+            return [(None, None)] * len(texts_list)
+        version = prompt_version(template)
+        try:
+            resolved = await run_in_db_thread(
+                with_session, _resolve_many, kind, model, version, [tuple(t) for t in texts_list], use_cache,
+            )
+        except Exception as e:
+            logger.warning(f"Analysis cache lookup failed ({kind}): {e}")
+            return [(None, None)] * len(texts_list)
+        out = []
+        for content_hash, similar_key, hit in resolved:
+            entry = (kind, content_hash, similar_key, model, version)
+            if hit is None:
+                out.append((entry, None))
+                continue
+            result, match = hit
+            self.counters[match] += 1
+            result["_cache"] = match
+            out.append((entry, result))
+        return out
+
+    async def store_result(self, entry: Optional[tuple], result: Optional[dict]):
+        """Store a result computed outside get_or_compute (batched prompts)."""
+        self.counters["miss"] += 1
+        if entry is None or not result:
+            return
+        try:
+            await run_in_db_thread(with_session, store, *entry, result)
+        except Exception as e:
+            logger.warning(f"Analysis cache store failed ({entry[0]}): {e}")
+
+
+# Singleton
+analysis_cache = AnalysisCacheService()
@@ -6,9 +6,9 @@ import asyncio
 import logging
 from datetime import datetime
 
-import httpx
 
 from core.config import settings
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +28,7 @@ class ApifySnapchatService:
             return {"success": False, "error": "APIFY_API_KEY not configured"}
 
         try:
-            async with httpx.AsyncClient(timeout=180) as client:
+            async with http_client(timeout=180) as client:
                 # 1. Start the actor run
                 run_url = f"{APIFY_BASE}/acts/{ACTOR_ID}/runs?token={token}"
                 run_resp = await client.post(run_url, json={
@@ -13,9 +13,9 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional
 
-import httpx
 
 from core.config import settings
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -96,7 +96,7 @@ class BancoService:
         logger.info("BANCO: downloading ZIP (38MB) to disk...")
 
         # Stream download to disk (8KB chunks, no full response in memory)
-        async with httpx.AsyncClient(timeout=300.0, follow_redirects=True) as client:
+        async with http_client(timeout=300.0, follow_redirects=True) as client:
             async with client.stream("GET", BANCO_CSV_URL) as response:
                 response.raise_for_status()
                 with open(self._zip_path, "wb") as f:
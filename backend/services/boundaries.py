@@ -0,0 +1,205 @@
+"""
+Contours géographiques pré-simplifiés.
+Chaque GeoJSON (communes, départements, ...) est découpé une seule fois en un
+store SQLite : une ligne par feature avec son code, sa bbox et sa géométrie
+simplifiée par niveau de zoom (JSON prêt à servir). Les requêtes par code ou
+par bbox ne lisent que les features concernées.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from math import atan, degrees, pi, sinh
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tolérance Douglas-Peucker (degrés) par niveau de détail
+LEVELS = {
+    "low": 0.01,      # ~1 km : vue France / région
+    "medium": 0.002,  # ~200 m : vue département
+    "full": 0.0,      # géométrie source (déjà simplifiée à 100 m par data.gouv)
+}
+
+BBox = Tuple[float, float, float, float]  # (min_lon, min_lat, max_lon, max_lat)
+
+
+def zoom_level(zoom: Optional[int]) -> str:
+    """Niveau de détail pour un zoom Leaflet/XYZ (None = géométrie complète)."""
+    if zoom is None:
+        return "full"
+    if zoom <= 7:
+        return "low"
+    if zoom <= 10:
+        return "medium"
+    return "full"
+
+
+def tile_bbox(z: int, x: int, y: int) -> BBox:
+    """BBox (lon/lat) d'une tuile XYZ Web Mercator."""
+    n = 2 ** z
+
+    def lat(row: int) -> float:
+        return degrees(atan(sinh(pi * (1 - 2 * row / n))))
+
+    return (x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y))
+
+
+# =============================================================================
+# Simplification
+# =============================================================================
+
+def _simplify_line(points: List[List[float]], tolerance: float) -> List[List[float]]:
+    """Douglas-Peucker itératif."""
+    if tolerance <= 0 or len(points) < 3:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    tol2 = tolerance * tolerance
+    while stack:
+        start, end = stack.pop()
+        ax, ay = points[start][0], points[start][1]
+        bx, by = points[end][0], points[end][1]
+        dx, dy = bx - ax, by - ay
+        seg2 = dx * dx + dy * dy
+        max_d2, index = -1.0, -1
+        for i in range(start + 1, end):
+            px, py = points[i][0], points[i][1]
+            if seg2 == 0:
+                d2 = (px - ax) ** 2 + (py - ay) ** 2
+            else:
+                t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / seg2))
+                d2 = (px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2
+            if d2 > max_d2:
+                max_d2, index = d2, i
+        if index != -1 and max_d2 > tol2:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _simplify_ring(ring: List[List[float]], tolerance: float) -> List[List[float]]:
+    simplified = _simplify_line(ring, tolerance)
+    # Un anneau valide garde au moins 4 points (fermé)
+    return simplified if len(simplified) >= 4 else ring
+
+
+def simplify_geometry(geometry: Dict, tolerance: float) -> Dict:
+    if not geometry or tolerance <= 0:
+        return geometry
+    gtype = geometry.get("type")
+    coords = geometry.get("coordinates")
+    if gtype == "Polygon":
+        return {"type": gtype, "coordinates": [_simplify_ring(r, tolerance) for r in coords]}
+    if gtype == "MultiPolygon":
+        return {"type": gtype, "coordinates": [[_simplify_ring(r, tolerance) for r in poly] for poly in coords]}
+    return geometry
+
+
+def geometry_bbox(geometry: Dict) -> Optional[BBox]:
+    min_lon = min_lat = float("inf")
+    max_lon = max_lat = float("-inf")
+    stack = [geometry.get("coordinates") if geometry else None]
+    while stack:
+        item = stack.pop()
+        if not item:
+            continue
+        if isinstance(item[0], (int, float)):
+            lon, lat = item[0], item[1]
+            min_lon, max_lon = min(min_lon, lon), max(max_lon, lon)
+            min_lat, max_lat = min(min_lat, lat), max(max_lat, lat)
+        else:
+            stack.extend(item)
+    if min_lon == float("inf"):
+        return None
+    return (min_lon, min_lat, max_lon, max_lat)
+
+
+# =============================================================================
+# Store
+# =============================================================================
+
+class BoundaryStore:
+    """Store SQLite des features d'un type de contour."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with closing(sqlite3.connect(path)) as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        self.version = meta.get("version", "")
+        self.count = int(meta.get("count", 0))
+
+    @classmethod
+    def build(cls, geojson: Dict, path: Path) -> "BoundaryStore":
+        """Découpe un FeatureCollection en store (écriture atomique)."""
+        tmp_path = path.with_suffix(".tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+        features = geojson.get("features", [])
+        with closing(sqlite3.connect(tmp_path)) as conn:
+            level_cols = ", ".join(f"{level} TEXT" for level in LEVELS)
+            conn.execute(
+                "CREATE TABLE features (id INTEGER PRIMARY KEY, code TEXT, "
+                f"min_lon REAL, min_lat REAL, max_lon REAL, max_lat REAL, {level_cols})"
+            )
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            placeholders = ", ".join("?" for _ in range(6 + len(LEVELS)))
+            rows = []
+            for feature in features:
+                geometry = feature.get("geometry") or {}
+                properties = feature.get("properties") or {}
+                bbox = geometry_bbox(geometry) or (0.0, 0.0, 0.0, 0.0)
+                payloads = [
+                    json.dumps({
+                        "type": "Feature",
+                        "properties": properties,
+                        "geometry": simplify_geometry(geometry, tolerance),
+                    }, ensure_ascii=False, separators=(",", ":"))
+                    for tolerance in LEVELS.values()
+                ]
+                rows.append([None, str(properties.get("code") or ""), *bbox, *payloads])
+            conn.executemany(f"INSERT INTO features VALUES ({placeholders})", rows)
+            conn.execute("CREATE INDEX ix_features_code ON features (code)")
+            conn.execute("CREATE INDEX ix_features_bbox ON features (min_lon, max_lon)")
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("version", datetime.now().strftime("%Y%m%d%H%M%S")),
+                ("count", str(len(features))),
+            ])
+            conn.commit()
+        tmp_path.replace(path)
+        logger.info(f"Boundary store built: {path.name} ({len(features)} features)")
+        return cls(path)
+
+    def etag(self, level: str, code_prefix: Optional[str], bbox: Optional[BBox]) -> str:
+        key = f"{self.path.stem}:{self.version}:{level}:{code_prefix or ''}:{bbox or ''}"
+        return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + '"'
+
+    def query(self, level: str = "full", code_prefix: Optional[str] = None, bbox: Optional[BBox] = None) -> List[str]:
+        """Features (JSON sérialisé) filtrées par préfixe de code et/ou intersection de bbox."""
+        if level not in LEVELS:
+            level = "full"
+        where, params = [], []
+        if code_prefix:
+            where.append("code >= ? AND code < ?")
+            params += [code_prefix, code_prefix + "\uffff"]
+        if bbox:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            where.append("max_lon >= ? AND min_lon <= ? AND max_lat >= ? AND min_lat <= ?")
+            params += [min_lon, max_lon, min_lat, max_lat]
+        sql = f"SELECT {level} FROM features"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id"
+        with closing(sqlite3.connect(self.path)) as conn:
+            return [r[0] for r in conn.execute(sql, params)]
+
+    def feature_collection(self, level: str = "full", code_prefix: Optional[str] = None,
+                           bbox: Optional[BBox] = None) -> bytes:
+        """FeatureCollection sérialisé sans re-parser les géométries."""
+        features = self.query(level, code_prefix, bbox)
+        return ('{"type":"FeatureCollection","features":[' + ",".join(features) + "]}").encode("utf-8")
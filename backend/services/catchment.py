@@ -0,0 +1,284 @@
+"""
+Zones de chalandise matérialisées.
+Une ligne CatchmentZone par (concurrent, rayon), recalculée uniquement quand les
+magasins BANCO du concurrent (ou le dataset communes) changent. Les chevauchements
+entre concurrents sont calculés sur des bitsets de communes.
+"""
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import BigInteger, cast, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import CatchmentZone, StoreLocation, run_in_db_thread
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOTAL_POPULATION = 67000000
+# Nombre de matrices de chevauchement gardées en mémoire
+OVERLAP_CACHE_SIZE = 64
+# Coordonnées des magasins en micro-degrés dans les signatures (~0.1 m)
+COORD_SCALE = 1000000
+
+
+def radius_key(radius_km: float) -> float:
+    """Rayon normalisé utilisé comme clé (0.1 km)."""
+    return round(float(radius_km), 1)
+
+
+def store_signatures(db: Session, competitor_ids: List[int]) -> Dict[int, Tuple[str, int]]:
+    """competitor_id -> (signature, nb magasins) des magasins BANCO géolocalisés.
+
+    La signature agrège le contenu (id et coordonnées au micro-degré, en
+    entiers pour des sommes exactes) : un déplacement de magasin ou un
+    rechargement BANCO qui réutilise les mêmes id la changent aussi.
+    """
+    if not competitor_ids:
+        return {}
+    lat = cast(func.round(StoreLocation.latitude * COORD_SCALE), BigInteger)
+    lon = cast(func.round(StoreLocation.longitude * COORD_SCALE), BigInteger)
+    rows = (
+        db.query(
+            StoreLocation.competitor_id,
+            func.count(StoreLocation.id),
+            func.sum(StoreLocation.id),
+            func.sum(lat),
+            func.sum(lon),
+            # Pondéré par l'id (modulo : pas de dépassement bigint) : deux magasins qui
+            # échangent leurs coordonnées changent la somme
+            func.sum((StoreLocation.id % 997) * (lat - lon)),
+        )
+        .filter(
+            StoreLocation.source == "BANCO",
+            StoreLocation.competitor_id.in_(competitor_ids),
+            StoreLocation.latitude.isnot(None),
+            StoreLocation.longitude.isnot(None),
+        )
+        .group_by(StoreLocation.competitor_id)
+        .all()
+    )
+    sigs = {cid: ("0", 0) for cid in competitor_ids}
+    for cid, count, *sums in rows:
+        sigs[cid] = (":".join(str(int(v or 0)) for v in (count, *sums)), count)
+    return sigs
+
+
+def compute_covered_communes(commune_index, stores, radius_km: float) -> Dict[str, int]:
+    """Communes (code -> population) à moins de radius_km d'au moins un magasin."""
+    covered: Dict[str, int] = {}
+    for store in stores:
+        for commune, _dist in commune_index.query_radius(store.latitude, store.longitude, radius_km):
+            code = commune.get("code", "")
+            if code and code not in covered:
+                covered[code] = commune.get("population", 0) or 0
+    return covered
+
+
+async def load_catchment_zones(
+    db: Session,
+    competitor_ids: List[int],
+    radius_km: float,
+) -> Tuple[Dict[int, CatchmentZone], Dict[str, float]]:
+    """Retourne les zones matérialisées, en recalculant seulement celles périmées.
+
+    Les requêtes et le calcul des couvertures tournent dans le pool DB
+    (database.run_in_db_thread) pour ne pas bloquer la boucle asyncio.
+
+    Returns:
+        (zones par competitor_id, stats {"rebuilt", "index_build_ms"})
+    """
+    from services.datagouv import datagouv_service
+
+    radius = radius_key(radius_km)
+    stats = {"rebuilt": 0, "index_build_ms": 0}
+    version = datagouv_service.dataset_version("communes_2025")
+
+    zones, signatures, stale = await run_in_db_thread(_load_zones, db, competitor_ids, radius, version)
+    if not stale:
+        return zones, stats
+
+    all_communes = await datagouv_service.get_communes_with_data()
+    # Le chargement a pu rafraîchir le dataset : les zones portent la version réellement utilisée
+    version = datagouv_service.dataset_version("communes_2025")
+    await run_in_db_thread(_rebuild_zones, db, zones, signatures, stale, radius, version, all_communes, stats)
+    logger.info(f"Catchment zones rebuilt for {len(stale)} competitor(s) at {radius} km")
+    return zones, stats
+
+
+def _load_zones(db: Session, competitor_ids: List[int], radius: float, version: str):
+    signatures = store_signatures(db, competitor_ids)
+    zones = {
+        z.competitor_id: z
+        for z in db.query(CatchmentZone).filter(
+            CatchmentZone.competitor_id.in_(competitor_ids),
+            CatchmentZone.radius_km == radius,
+        ).all()
+    }
+    stale = [
+        cid for cid in competitor_ids
+        if cid not in zones
+        or zones[cid].stores_signature != signatures[cid][0]
+        or zones[cid].communes_version != version
+    ]
+    return zones, signatures, stale
+
+
+def _rebuild_zones(
+    db: Session,
+    zones: Dict[int, CatchmentZone],
+    signatures: Dict[int, tuple],
+    stale: List[int],
+    radius: float,
+    version: str,
+    all_communes: List[Dict],
+    stats: Dict[str, float],
+):
+    from services.spatial_index import build_commune_index
+
+    communes_with_coords = [
+        c for c in all_communes
+        if c.get("latitude") and c.get("longitude") and c.get("population")
+    ]
+    total_population = sum(c.get("population", 0) for c in communes_with_coords) or DEFAULT_TOTAL_POPULATION
+
+    index_start = time.time()
+    commune_index = build_commune_index(communes_with_coords)
+    stats["index_build_ms"] = round((time.time() - index_start) * 1000, 1)
+
+    stores_by_comp: Dict[int, list] = {}
+    for s in db.query(StoreLocation).filter(
+        StoreLocation.source == "BANCO",
+        StoreLocation.competitor_id.in_(stale),
+        StoreLocation.latitude.isnot(None),
+        StoreLocation.longitude.isnot(None),
+    ).all():
+        stores_by_comp.setdefault(s.competitor_id, []).append(s)
+
+    values = {}
+    now = datetime.utcnow()
+    for cid in stale:
+        stores = stores_by_comp.get(cid, [])
+        covered = compute_covered_communes(commune_index, stores, radius)
+        values[cid] = {
+            "stores_signature": signatures[cid][0],
+            "communes_version": version,
+            "total_stores": len(stores),
+            "population_covered": sum(covered.values()),
+            "nb_communes_covered": len(covered),
+            "total_population": total_population,
+            "communes": json.dumps(covered),
+            "computed_at": now,
+        }
+
+    created = [cid for cid in stale if cid not in zones]
+    _apply_zone_values(db, zones, values, radius)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Zone créée entre-temps par une requête concurrente : mise à jour de sa ligne
+        db.rollback()
+        for cid in created:
+            zones.pop(cid)
+        zones.update({
+            z.competitor_id: z
+            for z in db.query(CatchmentZone).filter(
+                CatchmentZone.competitor_id.in_(stale),
+                CatchmentZone.radius_km == radius,
+            )
+        })
+        _apply_zone_values(db, zones, values, radius)
+        db.commit()
+
+    stats["rebuilt"] = len(stale)
+
+
+def _apply_zone_values(db: Session, zones: Dict[int, CatchmentZone], values: Dict[int, Dict], radius: float):
+    for cid, fields in values.items():
+        zone = zones.get(cid)
+        if zone is None:
+            zone = CatchmentZone(competitor_id=cid, radius_km=radius)
+            db.add(zone)
+            zones[cid] = zone
+        for name, value in fields.items():
+            setattr(zone, name, value)
+
+
+# =============================================================================
+# Chevauchements (bitsets)
+# =============================================================================
+
+class CommuneBitsets:
+    """Attribue une position de bit à chaque code commune et encode les zones."""
+
+    def __init__(self):
+        self.positions: Dict[str, int] = {}
+        self.populations: List[int] = []
+
+    def encode(self, communes: Dict[str, int]) -> int:
+        positions = []
+        for code, population in communes.items():
+            pos = self.positions.get(code)
+            if pos is None:
+                pos = len(self.populations)
+                self.positions[code] = pos
+                self.populations.append(population)
+            positions.append(pos)
+        if not positions:
+            return 0
+        buf = bytearray(max(positions) // 8 + 1)
+        for pos in positions:
+            buf[pos >> 3] |= 1 << (pos & 7)
+        return int.from_bytes(buf, "little")
+
+    def population(self, bits: int) -> int:
+        total = 0
+        while bits:
+            low = bits & -bits
+            total += self.populations[low.bit_length() - 1]
+            bits ^= low
+        return total
+
+
+_overlap_cache: Dict[tuple, List[Dict]] = {}
+
+
+def compute_overlaps(zones: Dict[int, CatchmentZone], ordered_ids: List[int]) -> List[Dict]:
+    """Chevauchements deux à deux [{a, b, shared_population, shared_communes}].
+
+    Mis en cache par (zone, computed_at) : tant qu'aucune zone n'est recalculée,
+    la matrice est servie telle quelle.
+    """
+    key = tuple((cid, zones[cid].id, zones[cid].computed_at) for cid in ordered_ids if cid in zones)
+    cached = _overlap_cache.get(key)
+    if cached is not None:
+        return cached
+
+    registry = CommuneBitsets()
+    bitsets = {}
+    for cid in ordered_ids:
+        zone = zones.get(cid)
+        bitsets[cid] = registry.encode(json.loads(zone.communes or "{}")) if zone else 0
+
+    overlaps = []
+    for i in range(len(ordered_ids)):
+        for j in range(i + 1, len(ordered_ids)):
+            a_id, b_id = ordered_ids[i], ordered_ids[j]
+            shared = bitsets[a_id] & bitsets[b_id]
+            if not shared:
+                continue
+            overlaps.append({
+                "competitor_a": a_id,
+                "competitor_b": b_id,
+                "shared_population": registry.population(shared),
+                "shared_communes": shared.bit_count(),
+            })
+    overlaps.sort(key=lambda x: x["shared_population"], reverse=True)
+
+    if len(_overlap_cache) >= OVERLAP_CACHE_SIZE:
+        _overlap_cache.pop(next(iter(_overlap_cache)))
+    _overlap_cache[key] = overlaps
+    return overlaps
@@ -0,0 +1,169 @@
+"""
+Concurrent collection engine primitives.
+Bounded fan-out over competitors, per-provider concurrency caps and a
+per-run summary (wall-clock, time per source, failures).
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Iterable, Optional
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _provider_limits() -> dict[str, int]:
+    """Max in-flight calls per external provider during a collection run."""
+    return {
+        "scrapecreators": settings.SCRAPECREATORS_MAX_CONCURRENCY,
+        "meta_ad_library": settings.META_AD_LIBRARY_MAX_CONCURRENCY,
+        "searchapi": settings.SEARCHAPI_MAX_CONCURRENCY,
+    }
+
+
+class ProviderLimiter:
+    """One semaphore per provider, created lazily on the running loop."""
+
+    def __init__(self, limits: Optional[dict[str, int]] = None):
+        self.limits = limits if limits is not None else _provider_limits()
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._in_flight: dict[str, int] = defaultdict(int)
+
+    def _semaphore(self, provider: str) -> Optional[asyncio.Semaphore]:
+        limit = self.limits.get(provider)
+        if not limit or limit <= 0:
+            return None
+        sem = self._semaphores.get(provider)
+        if sem is None:
+            sem = asyncio.Semaphore(limit)
+            self._semaphores[provider] = sem
+        return sem
+
+    @asynccontextmanager
+    async def slot(self, provider: Optional[str]):
+        """Hold one concurrency slot for `provider` (no-op when uncapped)."""
+        sem = self._semaphore(provider) if provider else None
+        if sem is None:
+            yield
+            return
+        async with sem:
+            self._in_flight[provider] += 1
+            try:
+                yield
+            finally:
+                self._in_flight[provider] -= 1
+
+    @property
+    def stats(self) -> dict:
+        return {
+            name: {"limit": limit, "in_flight": self._in_flight.get(name, 0)}
+            for name, limit in self.limits.items()
+        }
+
+
+provider_limiter = ProviderLimiter()
+
+
+@dataclass
+class SourceFailure:
+    competitor: str
+    source: str
+    error: str
+
+
+@dataclass
+class CollectionSummary:
+    """Per-run report of a concurrent collection."""
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    concurrency: int = 1
+    competitors_total: int = 0
+    competitors_done: int = 0
+    source_seconds: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    source_calls: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    failures: list[SourceFailure] = field(default_factory=list)
+    _t0: float = field(default_factory=time.monotonic, repr=False)
+    _wall: Optional[float] = field(default=None, repr=False)
+
+    def record_source(self, source: str, seconds: float) -> None:
+        self.source_seconds[source] += seconds
+        self.source_calls[source] += 1
+
+    def record_failure(self, competitor: str, source: str, error) -> None:
+        self.failures.append(SourceFailure(competitor=competitor, source=source, error=str(error)[:300]))
+
+    def finish(self) -> None:
+        self.finished_at = datetime.utcnow()
+        self._wall = time.monotonic() - self._t0
+
+    @property
+    def wall_clock_seconds(self) -> float:
+        return self._wall if self._wall is not None else time.monotonic() - self._t0
+
+    def to_dict(self) -> dict:
+        return {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "wall_clock_seconds": round(self.wall_clock_seconds, 2),
+            "concurrency": self.concurrency,
+            "competitors_total": self.competitors_total,
+            "competitors_done": self.competitors_done,
+            "sources": {
+                source: {
+                    "calls": self.source_calls[source],
+                    "total_seconds": round(secs, 2),
+                    "avg_seconds": round(secs / self.source_calls[source], 2) if self.source_calls[source] else 0,
+                }
+                for source, secs in sorted(self.source_seconds.items(), key=lambda kv: -kv[1])
+            },
+            "failures_count": len(self.failures),
+            "failures": [f.__dict__ for f in self.failures[:100]],
+        }
+
+
+# Summary of the run in progress, visible to every worker task of that run
+current_run: ContextVar[Optional[CollectionSummary]] = ContextVar("collection_run", default=None)
+
+
+def record_failure(competitor: str, source: str, error) -> None:
+    """Report a swallowed per-source error to the active run (no-op outside a run)."""
+    run = current_run.get()
+    if run is not None:
+        run.record_failure(competitor, source, error)
+
+
+@asynccontextmanager
+async def timed_source(source: str, provider: Optional[str] = None):
+    """Time one source fetch for the active run, holding a provider slot if capped."""
+    async with provider_limiter.slot(provider):
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            run = current_run.get()
+            if run is not None:
+                run.record_source(source, time.monotonic() - t0)
+
+
+async def run_bounded(
+    items: Iterable,
+    worker: Callable[..., Awaitable],
+    concurrency: int,
+) -> list:
+    """Run `worker(item)` for every item with at most `concurrency` in flight.
+
+    Exceptions are returned in place of results, like gather(return_exceptions=True).
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def _guarded(item):
+        async with sem:
+            return await worker(item)
+
+    return await asyncio.gather(*[_guarded(item) for item in items], return_exceptions=True)
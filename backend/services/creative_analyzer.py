@@ -3,17 +3,26 @@ Creative Analyzer Service — Multi-model strategy.
 - Images: Gemini 2.5 Flash (vision)
 - Text-only: Gemini 2.0 Flash + Mistral Small 3.2 (double analysis with fusion)
 Extracts: concept, hook, tone, colors, text overlay, score, tags, etc.
+
+Bulk runs go through CreativePipeline: image downloads and model calls are
+separate concurrent stages, model calls are paced by a token bucket per
+provider, and results are handed back in batches for writeback.
 """
 import asyncio
 import base64
+import inspect
 import json
 import logging
 import os
-from typing import Optional
+import time
+from typing import Awaitable, Callable, List, Optional, Union
 
 import httpx
 
 from core.config import settings
+from services.analysis_cache import analysis_cache
+from services.http_client import http_client
+from services.llm_batch import PLACEHOLDER, build_batch_prompt, parse_batch
 
 logger = logging.getLogger(__name__)
 
@@ -127,6 +136,13 @@ MISTRAL_API_URL = "https://api.mistral.ai/v1/chat/completions"
 
 MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
 
+VISION_MODEL = "gemini-3-flash-preview"
+TEXT_MODEL = "gemini-3-flash-preview"
+MISTRAL_MODEL = "mistral-small-latest"
+
+# Output budget per ad in a batched prompt (a text analysis is ~700 tokens)
+BATCH_TOKENS_PER_ITEM = 1500
+
 # Categorical fields where we use "stronger model wins" on disagreement
 CATEGORICAL_FIELDS = (
     "concept", "tone", "layout", "cta_style", "product_category",
@@ -135,6 +151,54 @@ CATEGORICAL_FIELDS = (
 )
 
 
+# ── Provider rate limiting ───────────────────────────────────────────
+
+class TokenBucket:
+    """Async token bucket: `rate_per_minute` sustained, bursts up to `burst`.
+
+    Each acquire() reserves a token and sleeps until it is due, so concurrent
+    callers are served in order without a lock.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int | None = None):
+        self.rate = max(rate_per_minute, 1) / 60.0  # tokens per second
+        self.capacity = float(burst or max(1, int(self.rate * 5)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.acquired = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def _reserve(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        wait = self._reserve()
+        self.acquired += 1
+        if wait > 0:
+            self.waits += 1
+            self.wait_seconds += wait
+            await asyncio.sleep(wait)
+
+    def stats(self) -> dict:
+        return {
+            "rate_per_minute": round(self.rate * 60),
+            "acquired": self.acquired,
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 1),
+        }
+
+
+provider_buckets = {
+    "gemini": TokenBucket(settings.GEMINI_RPM),
+    "mistral": TokenBucket(settings.MISTRAL_RPM),
+}
+
+
 class CreativeAnalyzer:
     """Multi-model ad creative analyzer."""
 
@@ -165,8 +229,15 @@ class CreativeAnalyzer:
         ad_text: str = "",
         platform: str = "meta",
         ad_id: str = "",
+        image: tuple[Optional[bytes], str, str] | None = None,
+        use_cache: bool = True,
     ) -> Optional[dict]:
-        """Analyze an ad creative image with Gemini 2.5 Flash vision."""
+        """Analyze an ad creative image with Gemini 2.5 Flash vision.
+
+        `image` is a pre-downloaded (data, media_type, fresh_url) from _get_image
+        (pipeline download stage); otherwise the image is downloaded here.
+        The same image + text is answered from analysis_cache ("_cache" set on hits).
+        """
         if not self.gemini_key:
             logger.error("Cannot analyze: GEMINI_API_KEY not set")
             return None
@@ -174,22 +245,27 @@ class CreativeAnalyzer:
             return None
 
         # Download image — tries Meta API (free), ScrapeCreators, SearchAPI
-        image_data, media_type, fresh_url = await self._get_image(creative_url, ad_id)
+        image_data, media_type, fresh_url = image or await self._get_image(creative_url, ad_id)
         if not image_data:
             logger.error(f"Image download failed for: {creative_url[:100]}")
             return None
 
-        b64_image = base64.standard_b64encode(image_data).decode("utf-8")
-
         prompt = ANALYSIS_PROMPT.format(
             platform=platform,
             ad_text=(ad_text or "")[:500],
         )
 
-        result = await self._call_gemini_vision(
-            b64_image, media_type, prompt,
-            model="gemini-3-flash-preview",
-            ad_id=ad_id,
+        async def call():
+            b64_image = base64.standard_b64encode(image_data).decode("utf-8")
+            return await self._call_gemini_vision(
+                b64_image, media_type, prompt,
+                model=VISION_MODEL,
+                ad_id=ad_id,
+            )
+
+        result = await analysis_cache.get_or_compute(
+            "creative", VISION_MODEL, ANALYSIS_PROMPT, (platform, (ad_text or "")[:500]), call,
+            image=image_data, use_cache=use_cache,
         )
 
         # Attach fresh URL so caller can persist it in DB
@@ -203,19 +279,27 @@ class CreativeAnalyzer:
         ad_text: str,
         platform: str = "google",
         ad_id: str = "",
+        use_cache: bool = True,
     ) -> Optional[dict]:
-        """Double analysis: Gemini 2.0 Flash + Mistral Small, then fuse."""
+        """Double analysis: Gemini 2.0 Flash + Mistral Small, then fuse (cached per normalised text)."""
         if not ad_text or len(ad_text.strip()) < 10:
             return None
 
+        return await analysis_cache.get_or_compute(
+            "creative_text", f"{TEXT_MODEL}+{MISTRAL_MODEL}", TEXT_ANALYSIS_PROMPT,
+            (platform, ad_text[:1000]), lambda: self._analyze_text(ad_text, platform, ad_id),
+            use_cache=use_cache,
+        )
+
+    async def _analyze_text(self, ad_text: str, platform: str, ad_id: str) -> Optional[dict]:
         prompt = TEXT_ANALYSIS_PROMPT.format(
             platform=platform,
             ad_text=ad_text[:1000],
         )
 
         # Run both models in parallel
-        gemini_task = self._call_gemini_text(prompt, model="gemini-3-flash-preview")
-        mistral_task = self._call_mistral(prompt, model="mistral-small-latest")
+        gemini_task = self._call_gemini_text(prompt, model=TEXT_MODEL)
+        mistral_task = self._call_mistral(prompt, model=MISTRAL_MODEL)
 
         results = await asyncio.gather(gemini_task, mistral_task, return_exceptions=True)
 
@@ -230,6 +314,91 @@ class CreativeAnalyzer:
         # Fuse results
         return self._fuse_text_results(gemini_result, mistral_result, ad_id)
 
+    async def analyze_text_batch(
+        self,
+        items: List[dict],
+        batch_size: int | None = None,
+        use_cache: bool = True,
+    ) -> List[Optional[dict]]:
+        """Text-only analysis of many ads, `batch_size` ads per prompt (Gemini + Mistral, fused per ad).
+
+        Items are dicts with ad_text, platform, ad_id; results come back in the same
+        order. Cached ads skip the models; ads missing from a batch answer (parse
+        error, truncation) fall back to analyze_text_only.
+        """
+        batch_size = batch_size or settings.LLM_TEXT_BATCH_SIZE
+        results: List[Optional[dict]] = [None] * len(items)
+        todo = [i for i, item in enumerate(items) if item.get("ad_text") and len(item["ad_text"].strip()) >= 10]
+        if not todo:
+            return results
+
+        lookups = await analysis_cache.lookup_many(
+            "creative_text", f"{TEXT_MODEL}+{MISTRAL_MODEL}", TEXT_ANALYSIS_PROMPT,
+            [(items[i].get("platform") or "google", items[i]["ad_text"][:1000]) for i in todo],
+            use_cache=use_cache,
+        )
+        misses = []
+        for i, (entry, cached) in zip(todo, lookups):
+            if cached is not None:
+                results[i] = cached
+            else:
+                misses.append((i, entry))
+
+        chunks = [misses[n:n + batch_size] for n in range(0, len(misses), batch_size)]
+        answers = await asyncio.gather(
+            *[self._analyze_text_chunk([items[i] for i, _ in chunk]) for chunk in chunks],
+            return_exceptions=True,
+        )
+        fallback = []
+        for chunk, answer in zip(chunks, answers):
+            if isinstance(answer, Exception):
+                logger.warning(f"Text batch of {len(chunk)} ads failed: {answer!r}")
+                answer = [None] * len(chunk)
+            for (i, entry), result in zip(chunk, answer):
+                if result:
+                    results[i] = result
+                    await analysis_cache.store_result(entry, result)
+                else:
+                    fallback.append(i)
+
+        if fallback:
+            singles = await asyncio.gather(*[
+                self.analyze_text_only(
+                    items[i]["ad_text"], platform=items[i].get("platform") or "google",
+                    ad_id=items[i].get("ad_id", ""), use_cache=use_cache,
+                )
+                for i in fallback
+            ], return_exceptions=True)
+            for i, result in zip(fallback, singles):
+                results[i] = None if isinstance(result, Exception) else result
+
+        logger.info(
+            f"Text batch: {len(todo)} ads, {len(todo) - len(misses)} cached, "
+            f"{len(chunks)} prompts, {len(fallback)} single fallbacks"
+        )
+        return results
+
+    async def _analyze_text_chunk(self, chunk: List[dict]) -> List[Optional[dict]]:
+        """One batched prompt for up to LLM_TEXT_BATCH_SIZE ads, sent to both models."""
+        prompt = build_batch_prompt(
+            TEXT_ANALYSIS_PROMPT.format(platform=PLACEHOLDER, ad_text=PLACEHOLDER),
+            [{"platform": item.get("platform") or "google", "ad_text": item["ad_text"][:1000]} for item in chunk],
+            "publicités",
+        )
+        max_tokens = BATCH_TOKENS_PER_ITEM * len(chunk)
+        parser = lambda text: self._parse_batch(text, len(chunk))
+        gemini, mistral = await asyncio.gather(
+            self._call_gemini_text(prompt, model=TEXT_MODEL, max_tokens=max_tokens, parser=parser),
+            self._call_mistral(prompt, model=MISTRAL_MODEL, max_tokens=max_tokens, parser=parser),
+            return_exceptions=True,
+        )
+        gemini = gemini if isinstance(gemini, dict) else {}
+        mistral = mistral if isinstance(mistral, dict) else {}
+        return [
+            self._fuse_text_results(gemini.get(i), mistral.get(i), item.get("ad_id", ""))
+            for i, item in enumerate(chunk)
+        ]
+
     # ── Gemini Vision API ────────────────────────────────────────────
 
     async def _call_gemini_vision(
@@ -254,7 +423,7 @@ class CreativeAnalyzer:
                 "responseMimeType": "application/json",
             },
         }
-        return await self._call_api("Gemini-Vision", url, payload, ad_id, is_gemini=True)
+        return await self._call_api("Gemini-Vision", url, payload, ad_id, is_gemini=True, provider="gemini")
 
     # ── Gemini Text API ──────────────────────────────────────────────
 
@@ -262,6 +431,8 @@ class CreativeAnalyzer:
         self,
         prompt: str,
         model: str = "gemini-3-flash-preview",
+        max_tokens: int = 4096,
+        parser: Callable[[str], Optional[dict]] | None = None,
     ) -> Optional[dict]:
         if not self.gemini_key:
             return None
@@ -270,11 +441,11 @@ class CreativeAnalyzer:
             "contents": [{"parts": [{"text": prompt}]}],
             "generationConfig": {
                 "temperature": 0.1,
-                "maxOutputTokens": 4096,
+                "maxOutputTokens": max_tokens,
                 "responseMimeType": "application/json",
             },
         }
-        return await self._call_api("Gemini-Text", url, payload, "", is_gemini=True)
+        return await self._call_api("Gemini-Text", url, payload, "", is_gemini=True, provider="gemini", parser=parser)
 
     # ── Mistral API ──────────────────────────────────────────────────
 
@@ -282,6 +453,8 @@ class CreativeAnalyzer:
         self,
         prompt: str,
         model: str = "mistral-small-latest",
+        max_tokens: int = 4096,
+        parser: Callable[[str], Optional[dict]] | None = None,
     ) -> Optional[dict]:
         if not self.mistral_key:
             return None
@@ -289,7 +462,7 @@ class CreativeAnalyzer:
             "model": model,
             "messages": [{"role": "user", "content": prompt}],
             "temperature": 0.1,
-            "max_tokens": 4096,
+            "max_tokens": max_tokens,
             "response_format": {"type": "json_object"},
         }
         headers = {
@@ -298,7 +471,7 @@ class CreativeAnalyzer:
         }
         return await self._call_api(
             "Mistral", MISTRAL_API_URL, payload, "",
-            is_gemini=False, headers=headers,
+            is_gemini=False, headers=headers, provider="mistral", parser=parser,
         )
 
     # ── Unified API caller with retries ──────────────────────────────
@@ -311,11 +484,16 @@ class CreativeAnalyzer:
         ad_id: str,
         is_gemini: bool = True,
         headers: dict | None = None,
+        provider: str | None = None,
+        parser: Callable[[str], Optional[dict]] | None = None,
     ) -> Optional[dict]:
         max_retries = 3
+        bucket = provider_buckets.get(provider)
         for attempt in range(max_retries):
             try:
-                async with httpx.AsyncClient(timeout=60.0) as client:
+                if bucket:
+                    await bucket.acquire()
+                async with http_client(timeout=60.0) as client:
                     resp = await client.post(
                         url,
                         json=payload,
@@ -346,7 +524,7 @@ class CreativeAnalyzer:
                     choices = body.get("choices", [])
                     text_content = choices[0]["message"]["content"] if choices else ""
 
-                return self._parse_analysis(text_content)
+                return (parser or self._parse_analysis)(text_content)
 
             except httpx.TimeoutException:
                 logger.error(f"{label} timeout for {ad_id or 'text'}")
@@ -445,7 +623,7 @@ class CreativeAnalyzer:
     async def _download_image(self, url: str) -> tuple[Optional[bytes], str]:
         """Download image from URL. Returns (bytes, media_type) or (None, '')."""
         try:
-            async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
+            async with http_client(timeout=15.0, follow_redirects=True) as client:
                 response = await client.get(url)
 
             if response.status_code != 200:
@@ -501,7 +679,6 @@ class CreativeAnalyzer:
             import os
             meta_token = os.getenv("META_ACCESS_TOKEN", "")
             if meta_token:
-                import httpx as _httpx
                 snapshot_url = (
                     f"https://graph.facebook.com/v19.0/ads_archive"
                     f"?access_token={meta_token}"
@@ -517,7 +694,7 @@ class CreativeAnalyzer:
                 # Build the snapshot URL directly:
                 fresh_snapshot = f"https://www.facebook.com/ads/archive/render_ad/?id={ad_id}&access_token={meta_token}"
                 logger.info(f"Trying Meta snapshot URL for ad {ad_id}")
-                async with _httpx.AsyncClient(timeout=20.0, follow_redirects=True) as client:
+                async with http_client(timeout=20.0, follow_redirects=True) as client:
                     resp = await client.get(fresh_snapshot)
                 if resp.status_code == 200:
                     ct = resp.headers.get("content-type", "")
@@ -639,6 +816,18 @@ class CreativeAnalyzer:
                     logger.error(f"No JSON found in response: {text[:300]}")
                     return None
 
+        if not isinstance(data, dict):
+            logger.error(f"Analysis JSON is not an object: {text[:200]}")
+            return None
+        return self._normalize_analysis(data)
+
+    def _parse_batch(self, text: str, count: int) -> dict:
+        """Batched answer -> {index: validated analysis} (items that failed to parse are absent)."""
+        return {i: self._normalize_analysis(data) for i, data in parse_batch(text, count).items()}
+
+    @staticmethod
+    def _normalize_analysis(data: dict) -> dict:
+        """Clamp the score and coerce field types in place."""
         # Validate and clamp score
         score = data.get("score", 0)
         if isinstance(score, (int, float)):
@@ -666,5 +855,224 @@ class CreativeAnalyzer:
         return data
 
 
+# ── Bulk pipeline ────────────────────────────────────────────────────
+
+# (item, result or None, error or None) — error means "retry later"
+PipelineResult = tuple[dict, Optional[dict], Optional[Exception]]
+
+
+class CreativePipeline:
+    """Concurrent download → analyze → batched writeback for many ads.
+
+    Items are dicts with: key, ad_id, creative_url, ad_text, platform, text_only.
+    `writeback` (sync or async) receives lists of PipelineResult, at most
+    `batch_size` at a time. Model calls are paced by provider_buckets, not by
+    fixed sleeps; stage sizes only bound memory and open connections.
+    Text-only items travel in groups of LLM_TEXT_BATCH_SIZE and are analyzed
+    with one batched prompt per group (analyze_text_batch).
+    """
+
+    IMAGE_TIMEOUT = 60
+    TEXT_TIMEOUT = 45
+    TEXT_BATCH_TIMEOUT = 180
+    DOWNLOAD_TIMEOUT = 45
+
+    def __init__(
+        self,
+        analyzer: "CreativeAnalyzer",
+        download_workers: int | None = None,
+        analyze_workers: int | None = None,
+        batch_size: int | None = None,
+    ):
+        self.analyzer = analyzer
+        self.download_workers = download_workers or settings.CREATIVE_DOWNLOAD_CONCURRENCY
+        self.analyze_workers = analyze_workers or settings.CREATIVE_ANALYZE_CONCURRENCY
+        self.batch_size = batch_size or settings.CREATIVE_WRITE_BATCH
+        self._download_q: asyncio.Queue | None = None
+        self._analyze_q: asyncio.Queue | None = None
+        self._pending_writes = 0
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.processed = 0
+        self.failed = 0
+        self.cache_hits = 0  # answered by analysis_cache, no model call
+        self.batches_written = 0
+
+    async def _download_stage(self):
+        while True:
+            item = await self._download_q.get()
+            if item is None:
+                return
+            image = None
+            if isinstance(item, dict) and not item["text_only"]:
+                try:
+                    image = await asyncio.wait_for(
+                        self.analyzer._get_image(item["creative_url"], item["ad_id"]),
+                        timeout=self.DOWNLOAD_TIMEOUT,
+                    )
+                except Exception as e:
+                    logger.warning(f"Pipeline download failed for {item['ad_id']}: {e!r}")
+                    image = (None, "", "")
+            await self._analyze_q.put((item, image))
+
+    async def _analyze_stage(self, results: asyncio.Queue):
+        while True:
+            entry = await self._analyze_q.get()
+            if entry is None:
+                return
+            item, image = entry
+            if isinstance(item, list):
+                await self._analyze_text_group(item, results)
+                continue
+            try:
+                if item["text_only"]:
+                    result = await asyncio.wait_for(
+                        self.analyzer.analyze_text_only(
+                            ad_text=item["ad_text"], platform=item["platform"], ad_id=item["ad_id"],
+                        ),
+                        timeout=self.TEXT_TIMEOUT,
+                    )
+                else:
+                    result = await asyncio.wait_for(
+                        self.analyzer.analyze_creative(
+                            creative_url=item["creative_url"], ad_text=item["ad_text"],
+                            platform=item["platform"], ad_id=item["ad_id"], image=image,
+                        ),
+                        timeout=self.IMAGE_TIMEOUT,
+                    )
+                await results.put((item, result, None))
+            except Exception as e:
+                await results.put((item, None, e))
+
+    async def _analyze_text_group(self, group: List[dict], results: asyncio.Queue):
+        try:
+            answers = await asyncio.wait_for(
+                self.analyzer.analyze_text_batch(group, batch_size=len(group)),
+                timeout=self.TEXT_BATCH_TIMEOUT,
+            )
+        except Exception as e:
+            for item in group:
+                await results.put((item, None, e))
+            return
+        for item, result in zip(group, answers):
+            await results.put((item, result, None))
+
+    def _units(self, items: List[dict]) -> List[Union[dict, List[dict]]]:
+        """Image items one by one, text-only items grouped for batched prompts."""
+        size = settings.LLM_TEXT_BATCH_SIZE
+        units: List[Union[dict, List[dict]]] = []
+        group: List[dict] = []
+        for item in items:
+            if not item["text_only"]:
+                units.append(item)
+                continue
+            if not group:
+                units.append(group)
+            group.append(item)
+            if len(group) >= size:
+                group = []
+        return units
+
+    async def _flush(self, writeback: Callable, batch: List[PipelineResult]):
+        outcome = writeback(batch)
+        if inspect.isawaitable(outcome):
+            await outcome
+        self.batches_written += 1
+        self._pending_writes -= len(batch)
+        logger.info(
+            f"Creative pipeline: {self.processed} done, {self.failed} failed, "
+            f"{self.ads_per_minute():.1f} ads/min, queues {self.queue_depth()}"
+        )
+
+    async def run(
+        self,
+        items: List[dict],
+        writeback: Callable[[List[PipelineResult]], Union[None, Awaitable[None]]],
+        deadline: float | None = None,
+    ) -> List[str]:
+        """Process items; returns the keys that were not started before `deadline`
+        (a time.monotonic() value)."""
+        self._download_q = asyncio.Queue(maxsize=self.download_workers * 2)
+        self._analyze_q = asyncio.Queue(maxsize=self.analyze_workers * 2)
+        results: asyncio.Queue = asyncio.Queue()
+        self.started_at = self.started_at or time.monotonic()
+        self.finished_at = None
+
+        downloaders = [asyncio.create_task(self._download_stage()) for _ in range(self.download_workers)]
+        analyzers = [asyncio.create_task(self._analyze_stage(results)) for _ in range(self.analyze_workers)]
+
+        not_started: List[str] = []
+
+        async def feed():
+            units = self._units(items)
+            for i, unit in enumerate(units):
+                if deadline is not None and time.monotonic() >= deadline:
+                    for rest in units[i:]:
+                        not_started.extend(it["key"] for it in (rest if isinstance(rest, list) else [rest]))
+                    break
+                await self._download_q.put(unit)
+            for _ in downloaders:
+                await self._download_q.put(None)
+            await asyncio.gather(*downloaders)
+            for _ in analyzers:
+                await self._analyze_q.put(None)
+            await asyncio.gather(*analyzers)
+            await results.put(None)
+
+        feeder = asyncio.create_task(feed())
+        batch: List[PipelineResult] = []
+        try:
+            while True:
+                entry = await results.get()
+                if entry is None:
+                    break
+                _, result, error = entry
+                if error is not None:
+                    self.failed += 1
+                else:
+                    self.processed += 1
+                    if result and result.get("_cache"):
+                        self.cache_hits += 1
+                batch.append(entry)
+                self._pending_writes += 1
+                if len(batch) >= self.batch_size:
+                    await self._flush(writeback, batch)
+                    batch = []
+            if batch:
+                await self._flush(writeback, batch)
+            await feeder
+        finally:
+            for task in [feeder, *downloaders, *analyzers]:
+                task.cancel()
+            self.finished_at = time.monotonic()
+        return not_started
+
+    def ads_per_minute(self) -> float:
+        if not self.started_at:
+            return 0.0
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return (self.processed + self.failed) / elapsed * 60 if elapsed > 0 else 0.0
+
+    def queue_depth(self) -> dict:
+        return {
+            "download": self._download_q.qsize() if self._download_q else 0,
+            "analyze": self._analyze_q.qsize() if self._analyze_q else 0,
+            "write": self._pending_writes,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "running": self.started_at is not None and self.finished_at is None,
+            "processed": self.processed,
+            "failed": self.failed,
+            "cache_hits": self.cache_hits,
+            "batches_written": self.batches_written,
+            "ads_per_minute": round(self.ads_per_minute(), 1),
+            "queue_depth": self.queue_depth(),
+            "elapsed_seconds": round((self.finished_at or time.monotonic()) - self.started_at, 1) if self.started_at else 0,
+            "rate_limits": {name: bucket.stats() for name, bucket in provider_buckets.items()},
+        }
+
+
 # Singleton
 creative_analyzer = CreativeAnalyzer()
@@ -2,16 +2,20 @@
 Service d'intégration data.gouv.fr
 Téléchargement, cache et parsing des datasets publics pour l'analyse de zones.
 """
+import asyncio
 import csv
 import io
 import json
 import logging
-import httpx
+import sqlite3
+from contextlib import closing
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 from pathlib import Path
 
 from core.config import settings
+from services.socio_demo_store import AGE_FIELDS, CSP_FIELDS, SocioDemoStore
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +36,8 @@ DATASETS = {
         "url": "https://www.data.gouv.fr/api/1/datasets/r/f5df602b-3800-44d7-b2df-fa40a0350325",
         "delimiter": ",",
         "encoding": "utf-8",
+        "commune_column": "code_insee",
+        "department_column": "dep_code",
     },
 
     # === Loyers ===
@@ -40,12 +46,16 @@ DATASETS = {
         "url": "https://www.data.gouv.fr/api/1/datasets/r/bc9d5d13-07cc-4d38-8254-88db065bd42b",
         "delimiter": ";",
         "encoding": "utf-8",
+        "commune_column": "INSEE_C",
+        "department_column": "DEP",
     },
     "loyers_maisons": {
         "name": "Carte des loyers maisons par commune 2022",
         "url": "https://www.data.gouv.fr/api/1/datasets/r/dfb542cd-a808-41e2-9157-8d39b5c24edb",
         "delimiter": ";",
         "encoding": "utf-8",
+        "commune_column": "INSEE_C",
+        "department_column": "DEP",
     },
 
     # === Mobilité / Transport ===
@@ -54,6 +64,7 @@ DATASETS = {
         "url": "https://www.data.gouv.fr/api/1/datasets/r/f624e1db-8f22-4a96-9f5a-9f9ee2aae53e",
         "delimiter": ",",
         "encoding": "utf-8",
+        "commune_column": "geocode_commune",
     },
 
     # === Revenus & Pauvreté ===
@@ -79,6 +90,7 @@ DATASETS = {
         "encoding": "utf-8",
         "is_zip": True,
         "zip_file": "dossier_complet.csv",
+        "commune_column": "CODGEO",
     },
 
     # === Bornes de recharge électriques (IRVE) - Base nationale consolidée ===
@@ -152,12 +164,76 @@ EQUIPEMENTS_COMMERCE = {
 }
 
 
+# Indicateurs socio-démographiques -> colonnes sources du dossier complet INSEE
+# (~1900 colonnes), par ordre de préférence (millésime le plus récent d'abord)
+def _insee_years(field: str, prefix: str = "P") -> tuple:
+    return (f"{prefix}21_{field}", f"{prefix}20_{field}")
+
+
+SOCIO_DEMO_SOURCES = {
+    "population": ("P21_POP", "P20_POP", "P19_POP"),
+    "hommes": _insee_years("POPH"),
+    "femmes": _insee_years("POPF"),
+    "pop_0_14": _insee_years("POP0014"),
+    "pop_15_29": _insee_years("POP1529"),
+    "pop_30_44": _insee_years("POP3044"),
+    "pop_45_59": _insee_years("POP4559"),
+    "pop_60_74": _insee_years("POP6074"),
+    "pop_75_plus": _insee_years("POP75P"),
+    "csp_cadres": _insee_years("POP15P_CS3", "C"),
+    "csp_prof_inter": _insee_years("POP15P_CS4", "C"),
+    "csp_employes": _insee_years("POP15P_CS5", "C"),
+    "csp_ouvriers": _insee_years("POP15P_CS6", "C"),
+    "csp_retraites": _insee_years("POP15P_CS7", "C"),
+    "dipl_sans": _insee_years("NSCOL15P_DIPLMIN"),
+    "dipl_bac": _insee_years("NSCOL15P_BAC"),
+    "dipl_sup": _insee_years("NSCOL15P_SUP"),
+    "actifs": _insee_years("ACT1564"),
+    "chomeurs": _insee_years("CHOM1564"),
+    "menages": _insee_years("MEN"),
+    "proprietaires": _insee_years("RP_PROP"),
+    "locataires": _insee_years("RP_LOC"),
+    "revenu_median": ("MED21", "MED20", "MED19"),
+    "taux_pauvrete": ("TP60", "TP6021", "TP6020"),
+}
+
+# Colonnes lues pour construire le store socio-démographique
+SOCIO_DEMO_COLUMNS = ["CODGEO", "COM"] + [c for cols in SOCIO_DEMO_SOURCES.values() for c in cols]
+
+# Colonnes lues par get_irve_stations
+IRVE_COLUMNS = [
+    "consolidated_latitude", "Ylatitude", "latitude",
+    "consolidated_longitude", "Xlongitude", "longitude",
+    "consolidated_code_postal", "code_postal",
+    "puissance_nominale", "puissance_maximale",
+    "id_station_itinerance", "id_station_local", "nom_station",
+    "adresse_station", "consolidated_adresse", "consolidated_commune", "nom_commune",
+    "nbre_pdc", "nom_operateur", "nom_enseigne", "gratuit", "accessibilite_pmr",
+]
+
 import os
 
 # Max rows to load into memory per dataset (prevents OOM on 512MB Render)
 MAX_DATASET_ROWS = int(os.getenv("MAX_DATASET_ROWS", "50000"))
-# Datasets too large for low-memory environments (skip unless explicitly requested)
+# Datasets too large for memory: streamed from disk into the SQLite cache, never
+# loaded whole (set DATAGOUV_SKIP_HEAVY=true to disable them entirely)
 HEAVY_DATASETS = {"insee_socio_demo", "irve_bornes"}
+SKIP_HEAVY_DATASETS = os.getenv("DATAGOUV_SKIP_HEAVY", "false").lower() == "true"
+
+# SQLite cache
+CACHE_WRITE_BATCH = 5000
+SQLITE_MAX_PARAMS = 900
+
+
+def _quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _department_of(code: str) -> str:
+    """Département d'un code commune INSEE (97x pour l'outre-mer)."""
+    if not code or len(code) < 2:
+        return ""
+    return code[:3] if code.startswith("97") else code[:2]
 
 
 class DataGouvService:
@@ -166,13 +242,15 @@ class DataGouvService:
     def __init__(self):
         self.cache_dir = settings.DATAGOUV_CACHE_DIR
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._socio_demo_store: Optional[SocioDemoStore] = None
+        self._socio_demo_lock = asyncio.Lock()
 
     # =========================================================================
     # Cache Management
     # =========================================================================
 
     def _cache_path(self, key: str) -> Path:
-        return self.cache_dir / f"{key}.json"
+        return self.cache_dir / f"{key}.sqlite"
 
     def _is_cache_valid(self, key: str) -> bool:
         path = self._cache_path(key)
@@ -182,29 +260,156 @@ class DataGouvService:
         expiry = datetime.now() - timedelta(days=settings.DATAGOUV_CACHE_DAYS)
         return cache_time > expiry
 
-    def _read_cache(self, key: str) -> Optional[List[Dict]]:
+    def _cache_row_count(self, key: str) -> int:
+        """Nombre de lignes en cache (0 si absent ou illisible)."""
         path = self._cache_path(key)
-        if path.exists():
-            # Skip files > 100MB to avoid OOM
-            size_mb = path.stat().st_size / (1024 * 1024)
-            if size_mb > 100:
-                logger.warning(f"Cache file '{key}' too large ({size_mb:.0f}MB), skipping to avoid OOM")
-                return None
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Cache read error {key}: {e}")
+        if not path.exists():
+            return 0
+        try:
+            with closing(sqlite3.connect(path)) as conn:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'row_count'").fetchone()
+            return int(row[0]) if row else 0
+        except Exception as e:
+            logger.error(f"Cache meta error {key}: {e}")
+            return 0
+
+    def _has_valid_cache(self, key: str) -> bool:
+        return self._is_cache_valid(key) and self._cache_row_count(key) > 0
+
+    def _read_cache(
+        self,
+        key: str,
+        columns: Optional[List[str]] = None,
+        department: Optional[str] = None,
+        communes: Optional[List[str]] = None,
+    ) -> Optional[List[Dict]]:
+        """
+        Lit un dataset depuis le cache SQLite (une colonne TEXT par colonne CSV).
+
+        Args:
+            columns: projection (colonnes absentes du dataset ignorées)
+            department: filtre sur la colonne département indexée
+            communes: filtre sur la colonne code commune indexée
+        """
+        path = self._cache_path(key)
+        if not path.exists():
+            return None
+        try:
+            with closing(sqlite3.connect(path)) as conn:
+                stored = [r[1] for r in conn.execute('PRAGMA table_info("rows")')]
+                stored = [c for c in stored if c not in ("_commune", "_dep")]
+                selected = [c for c in columns if c in stored] if columns else stored
+                if not selected:
+                    return []
+                select = ", ".join(_quote_ident(c) for c in selected)
+                sql = f'SELECT {select} FROM "rows"'
+
+                if communes is not None:
+                    codes = list(dict.fromkeys(communes))
+                    result = []
+                    for i in range(0, len(codes), SQLITE_MAX_PARAMS):
+                        chunk = codes[i:i + SQLITE_MAX_PARAMS]
+                        placeholders = ", ".join("?" for _ in chunk)
+                        where = f" WHERE _commune IN ({placeholders})"
+                        params = chunk
+                        if department:
+                            where += " AND _dep = ?"
+                            params = chunk + [department]
+                        result.extend(dict(zip(selected, r)) for r in conn.execute(sql + where, params))
+                    return result
+
+                if department:
+                    cursor = conn.execute(sql + " WHERE _dep = ?", (department,))
+                else:
+                    cursor = conn.execute(sql)
+                return [dict(zip(selected, r)) for r in cursor]
+        except Exception as e:
+            logger.error(f"Cache read error {key}: {e}")
         return None
 
+    def _iter_cache(self, key: str, columns: Optional[List[str]] = None):
+        """Itère sur les lignes en cache sans les charger toutes (reconstruction d'index)."""
+        path = self._cache_path(key)
+        if not path.exists():
+            return
+        with closing(sqlite3.connect(path)) as conn:
+            stored = [r[1] for r in conn.execute('PRAGMA table_info("rows")')]
+            selected = [c for c in (columns or stored) if c in stored and c not in ("_commune", "_dep")]
+            if not selected:
+                return
+            select = ", ".join(_quote_ident(c) for c in selected)
+            for r in conn.execute(f'SELECT {select} FROM "rows"'):
+                yield dict(zip(selected, r))
+
     def _write_cache(self, key: str, data: List[Dict]):
+        fieldnames = list(data[0].keys()) if data else []
+        self._write_cache_rows(key, fieldnames, data)
+
+    def _write_cache_rows(self, key: str, fieldnames: List[str], rows) -> int:
+        """
+        Écrit un dataset dans le cache SQLite par lots, sans matérialiser les lignes.
+        Les colonnes commune/département déclarées dans DATASETS sont indexées.
+        Écriture dans un fichier temporaire puis remplacement atomique.
+
+        Les colonnes restent en TEXT : les lecteurs manipulent des chaînes (codes
+        INSEE/postaux à zéro initial, drapeaux "true"), les décimales françaises
+        utilisent la virgule, et les usages numériques passent par des stores
+        typés dérivés du cache (socio_demo_store, irve_index).
+        """
         path = self._cache_path(key)
+        tmp_path = path.with_suffix(".sqlite.tmp")
+        config = DATASETS.get(key, {})
+        commune_col = config.get("commune_column")
+        dep_col = config.get("department_column")
+        fieldnames = [f for f in dict.fromkeys(fieldnames) if f and f not in ("_commune", "_dep")]
+
+        count = 0
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False)
-            logger.info(f"Cache saved: {key} ({len(data)} rows)")
+            if tmp_path.exists():
+                tmp_path.unlink()
+            with closing(sqlite3.connect(tmp_path)) as conn:
+                cols = ", ".join(f"{_quote_ident(c)} TEXT" for c in fieldnames)
+                conn.execute(f'CREATE TABLE "rows" ({cols}, _commune TEXT, _dep TEXT)')
+                conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+                placeholders = ", ".join("?" for _ in range(len(fieldnames) + 2))
+                insert = f'INSERT INTO "rows" VALUES ({placeholders})'
+
+                batch = []
+                for row in rows:
+                    commune = (row.get(commune_col) or "").strip() if commune_col else ""
+                    dep = (row.get(dep_col) or "").strip() if dep_col else ""
+                    if not dep or commune.startswith("97"):
+                        dep = _department_of(commune)
+                    batch.append([row.get(c) for c in fieldnames] + [commune or None, dep or None])
+                    if len(batch) >= CACHE_WRITE_BATCH:
+                        conn.executemany(insert, batch)
+                        count += len(batch)
+                        batch = []
+                if batch:
+                    conn.executemany(insert, batch)
+                    count += len(batch)
+
+                conn.execute('CREATE INDEX ix_rows_commune ON "rows" (_commune)')
+                conn.execute('CREATE INDEX ix_rows_dep ON "rows" (_dep)')
+                conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                    ("row_count", str(count)),
+                    ("columns", json.dumps(fieldnames, ensure_ascii=False)),
+                    ("written_at", datetime.now().isoformat()),
+                ])
+                conn.commit()
+            os.replace(tmp_path, path)
+
+            # Ancien cache JSON (avant le format SQLite)
+            legacy = self.cache_dir / f"{key}.json"
+            if legacy.exists():
+                legacy.unlink()
+
+            logger.info(f"Cache saved: {key} ({count} rows)")
         except Exception as e:
             logger.error(f"Cache write error {key}: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return count
 
     # =========================================================================
     # CSV Download & Parse
@@ -218,7 +423,7 @@ class DataGouvService:
     ) -> List[Dict]:
         """Télécharge et parse un CSV."""
         try:
-            async with httpx.AsyncClient(timeout=120.0, follow_redirects=True) as client:
+            async with http_client(timeout=120.0, follow_redirects=True) as client:
                 response = await client.get(url)
                 response.raise_for_status()
 
@@ -246,21 +451,29 @@ class DataGouvService:
         self,
         dataset_key: str,
         force_refresh: bool = False,
+        columns: Optional[List[str]] = None,
+        department: Optional[str] = None,
+        communes: Optional[List[str]] = None,
     ) -> List[Dict]:
-        """Télécharge un dataset avec cache."""
+        """
+        Télécharge un dataset avec cache.
+
+        columns/department/communes sont appliqués à la lecture du cache SQLite
+        (projection + filtre indexé) : seules les lignes utiles sont chargées.
+        """
         if dataset_key not in DATASETS:
             logger.warning(f"Unknown dataset: {dataset_key}")
             return []
 
-        # Skip heavy datasets on low-memory environments
-        if dataset_key in HEAVY_DATASETS:
-            logger.warning(f"Skipping heavy dataset '{dataset_key}' to avoid OOM (set MAX_DATASET_ROWS higher to override)")
+        heavy = dataset_key in HEAVY_DATASETS
+        if heavy and SKIP_HEAVY_DATASETS:
+            logger.warning(f"Skipping heavy dataset '{dataset_key}' (DATAGOUV_SKIP_HEAVY=true)")
             return []
 
-        # Check cache
-        if not force_refresh and self._is_cache_valid(dataset_key):
-            cached = self._read_cache(dataset_key)
-            if cached:
+        # Check cache (lectures SQLite dans un thread, hors de la boucle asyncio)
+        if not force_refresh and await asyncio.to_thread(self._has_valid_cache, dataset_key):
+            cached = await asyncio.to_thread(self._read_cache, dataset_key, columns, department, communes)
+            if cached is not None:
                 logger.info(f"Loaded from cache: {dataset_key} ({len(cached)} rows)")
                 return cached
 
@@ -268,6 +481,12 @@ class DataGouvService:
         config = DATASETS[dataset_key]
         logger.info(f"Downloading: {config['name']}")
 
+        # Heavy datasets: streamed to disk then into SQLite, never held in memory
+        if heavy:
+            if await self._download_to_cache(dataset_key):
+                return await asyncio.to_thread(self._read_cache, dataset_key, columns, department, communes) or []
+            return []
+
         # Handle ZIP files
         if config.get("is_zip"):
             data = await self._fetch_csv_from_zip(
@@ -289,10 +508,96 @@ class DataGouvService:
             data = data[:MAX_DATASET_ROWS]
 
         if data:
-            self._write_cache(dataset_key, data)
+            await asyncio.to_thread(self._write_cache, dataset_key, data)
+            if columns or department or communes is not None:
+                filtered = await asyncio.to_thread(self._read_cache, dataset_key, columns, department, communes)
+                if filtered is not None:
+                    return filtered
 
         return data
 
+    async def ensure_cached(self, dataset_key: str) -> bool:
+        """S'assure que le cache SQLite du dataset est présent et valide, sans lire les lignes."""
+        if await asyncio.to_thread(self._has_valid_cache, dataset_key):
+            return True
+        if dataset_key in HEAVY_DATASETS:
+            if SKIP_HEAVY_DATASETS:
+                logger.warning(f"Skipping heavy dataset '{dataset_key}' (DATAGOUV_SKIP_HEAVY=true)")
+                return False
+            return await self._download_to_cache(dataset_key)
+        return bool(await self.fetch_dataset(dataset_key, force_refresh=True))
+
+    async def _download_to_cache(self, dataset_key: str) -> bool:
+        """Télécharge un dataset en streaming sur disque puis le charge dans le cache SQLite.
+
+        Le parsing et l'écriture du cache (plusieurs centaines de Mo) tournent
+        dans un thread pour ne pas bloquer la boucle asyncio.
+        """
+        import tempfile
+
+        config = DATASETS[dataset_key]
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".download")
+        os.close(fd)
+        tmp_path = Path(tmp_name)
+        try:
+            async with http_client(timeout=600.0, follow_redirects=True) as client:
+                async with client.stream("GET", config["url"]) as response:
+                    response.raise_for_status()
+                    with open(tmp_path, "wb") as f:
+                        async for chunk in response.aiter_bytes(1024 * 1024):
+                            f.write(chunk)
+
+            count = await asyncio.to_thread(self._load_downloaded_file, dataset_key, tmp_path)
+            return count > 0
+        except Exception as e:
+            logger.error(f"Streaming download error {dataset_key}: {e}")
+            return False
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def _load_downloaded_file(self, dataset_key: str, path: Path) -> int:
+        """Charge un fichier téléchargé (CSV ou ZIP) dans le cache SQLite ; retourne le nombre de lignes."""
+        import zipfile
+
+        config = DATASETS[dataset_key]
+        delimiter = config.get("delimiter", ";")
+        encoding = config.get("encoding", "utf-8")
+        if config.get("is_zip"):
+            with zipfile.ZipFile(path) as zf:
+                names = zf.namelist()
+                csv_files = [n for n in names if n.endswith(".csv")]
+                target = config.get("zip_file") if config.get("zip_file") in names else (csv_files[0] if csv_files else None)
+                if not target:
+                    logger.error(f"No CSV file found in ZIP: {config['url']}")
+                    return 0
+                logger.info(f"Extracting: {target}")
+                with zf.open(target) as raw:
+                    sample = raw.read(64 * 1024)
+                with zf.open(target) as raw:
+                    return self._load_csv_stream(dataset_key, raw, sample, delimiter, encoding)
+        with open(path, "rb") as raw:
+            sample = raw.read(64 * 1024)
+            raw.seek(0)
+            return self._load_csv_stream(dataset_key, raw, sample, delimiter, encoding)
+
+    def _load_csv_stream(self, dataset_key: str, raw, sample: bytes, delimiter: str, encoding: str) -> int:
+        """Parse un flux CSV binaire ligne à ligne vers le cache SQLite."""
+        import codecs
+
+        chosen = "utf-8"
+        for enc in [encoding, "utf-8", "latin-1", "cp1252"]:
+            try:
+                codecs.getincrementaldecoder(enc)().decode(sample, final=False)
+                chosen = enc
+                break
+            except UnicodeDecodeError:
+                continue
+
+        text = io.TextIOWrapper(raw, encoding=chosen, errors="replace", newline="")
+        reader = csv.DictReader(text, delimiter=delimiter)
+        return self._write_cache_rows(dataset_key, reader.fieldnames or [], reader)
+
     async def _fetch_csv_from_zip(
         self,
         url: str,
@@ -304,7 +609,7 @@ class DataGouvService:
         import zipfile
 
         try:
-            async with httpx.AsyncClient(timeout=300.0, follow_redirects=True) as client:
+            async with http_client(timeout=300.0, follow_redirects=True) as client:
                 logger.info(f"Downloading ZIP: {url}")
                 response = await client.get(url)
                 response.raise_for_status()
@@ -358,7 +663,7 @@ class DataGouvService:
         Fallback sur données locales si non disponible.
         """
         # Charge le dataset communes 2025 (inclut population + coordonnées)
-        communes_data = await self.fetch_dataset("communes_2025")
+        communes_data = await self.fetch_dataset("communes_2025", department=department)
 
         result = []
 
@@ -500,7 +805,7 @@ class DataGouvService:
             type_bien: "appartement" ou "maison"
         """
         dataset_key = "loyers_maisons" if type_bien == "maison" else "loyers_appartements"
-        data = await self.fetch_dataset(dataset_key)
+        data = await self.fetch_dataset(dataset_key, department=department)
 
         result = []
         for row in data:
@@ -755,73 +1060,32 @@ class DataGouvService:
         }
 
     async def _aggregate_socio_demo(self, communes: List[Dict]) -> Optional[Dict]:
-        """Agrège les données socio-démographiques pour une liste de communes."""
-        commune_codes = [c.get("code") or c.get("code_commune", "") for c in communes]
-        socio_data = await self.get_socio_demo_data(commune_codes)
-
-        if not socio_data:
+        """
+        Agrège les données socio-démographiques pour une liste de communes.
+        Pondération par population calculée en une requête sur le store indexé.
+        """
+        store = await self.get_socio_demo_store()
+        if store is None:
             return None
 
-        # Agrégation pondérée par population
-        total_pop = 0
-        total_hommes = 0
-        total_femmes = 0
-        age_totals = {"0-14": 0, "15-29": 0, "30-44": 0, "45-59": 0, "60-74": 0, "75+": 0}
-        chomeurs_total = 0
-        actifs_total = 0
-        proprietaires_total = 0
-        menages_total = 0
-        revenus_list = []
-        pauvrete_list = []
-        csp_totals = {"cadres": 0, "prof_intermediaires": 0, "employes": 0, "ouvriers": 0, "retraites": 0}
-        communes_with_data = 0
-
-        for commune in communes:
-            code = commune.get("code") or commune.get("code_commune", "")
-            if code not in socio_data:
-                continue
-
-            data = socio_data[code]
-            pop = data.get("population") or commune.get("population", 0)
-            if not pop:
-                continue
-
-            communes_with_data += 1
-            total_pop += pop
-
-            # Genre
-            if data.get("genre"):
-                total_hommes += data["genre"].get("hommes") or 0
-                total_femmes += data["genre"].get("femmes") or 0
-
-            # Tranches d'âge (pondérées)
-            if data.get("tranches_age"):
-                for age_group, pct in data["tranches_age"].items():
-                    if pct and age_group in age_totals:
-                        age_totals[age_group] += pop * pct / 100
-
-            # Chômage
-            if data.get("taux_chomage"):
-                chomeurs_total += pop * data["taux_chomage"] / 100
-                actifs_total += pop
-
-            # Propriétaires
-            if data.get("pct_proprietaires"):
-                proprietaires_total += pop * data["pct_proprietaires"] / 100
-                menages_total += pop
-
-            # Revenus
-            if data.get("revenu_median"):
-                revenus_list.append((pop, data["revenu_median"]))
-
-            if data.get("taux_pauvrete"):
-                pauvrete_list.append((pop, data["taux_pauvrete"]))
+        zone = [
+            (c.get("code") or c.get("code_commune", ""), c.get("population", 0))
+            for c in communes
+        ]
+        totals = store.aggregate(zone)
+        if not totals:
+            return None
 
-            # CSP
-            if data.get("csp"):
-                for csp_type, value in data["csp"].items():
-                    if value and csp_type in csp_totals:
-                        csp_totals[csp_type] += value
+        communes_with_data = totals["communes"]
+        total_pop = totals["population"]
+        total_hommes = totals["hommes"]
+        total_femmes = totals["femmes"]
+        age_totals = totals["ages"]
+        chomeurs_total = totals["chomeurs"]
+        actifs_total = totals["actifs"]
+        proprietaires_total = totals["proprietaires"]
+        menages_total = totals["menages"]
+        csp_totals = totals["csp"]
 
         if communes_with_data == 0 or total_pop == 0:
             return None
@@ -834,19 +1098,13 @@ class DataGouvService:
 
         # Revenu médian pondéré
         revenu_median = None
-        if revenus_list:
-            weighted_sum = sum(pop * rev for pop, rev in revenus_list)
-            total_weight = sum(pop for pop, _ in revenus_list)
-            if total_weight > 0:
-                revenu_median = round(weighted_sum / total_weight, 0)
+        if totals["revenu_weight"] > 0:
+            revenu_median = round(totals["revenu_weighted"] / totals["revenu_weight"], 0)
 
         # Taux de pauvreté pondéré
         taux_pauvrete = None
-        if pauvrete_list:
-            weighted_sum = sum(pop * tp for pop, tp in pauvrete_list)
-            total_weight = sum(pop for pop, _ in pauvrete_list)
-            if total_weight > 0:
-                taux_pauvrete = round(weighted_sum / total_weight, 1)
+        if totals["pauvrete_weight"] > 0:
+            taux_pauvrete = round(totals["pauvrete_weighted"] / totals["pauvrete_weight"], 1)
 
         # CSP en pourcentages
         csp_total = sum(csp_totals.values())
@@ -898,6 +1156,54 @@ class DataGouvService:
     # Données socio-démographiques INSEE
     # =========================================================================
 
+    async def get_socio_demo_store(self):
+        """
+        Store socio-démographique typé, indexé par code commune
+        (services/socio_demo_store.py). Construit une seule fois depuis le cache
+        du dossier complet, reconstruit quand ce cache change de version.
+        """
+        if not await self.ensure_cached("insee_socio_demo"):
+            return None
+
+        version = self.dataset_version("insee_socio_demo")
+        store = self._socio_demo_store
+        if store is not None and store.version == version:
+            return store
+
+        # Une seule construction à la fois, hors de la boucle d'événements
+        async with self._socio_demo_lock:
+            store = self._socio_demo_store
+            if store is not None and store.version == version:
+                return store
+            try:
+                store = await asyncio.to_thread(self._open_socio_demo_store, version)
+            except Exception as e:
+                logger.error(f"Socio-demo store error: {e}")
+                return None
+            self._socio_demo_store = store
+            return store
+
+    def _open_socio_demo_store(self, version: str) -> SocioDemoStore:
+        """Store sur disque s'il est à jour, sinon reconstruit depuis le cache brut."""
+        path = self.cache_dir / "socio_demo.sqlite"
+        if path.exists():
+            store = SocioDemoStore(path)
+            if store.version == version:
+                return store
+        return SocioDemoStore.build(self._iter_socio_demo_records(), path, version)
+
+    def _iter_socio_demo_records(self):
+        """(code, {indicateur: float}) parsés depuis le cache brut du dossier complet."""
+        for row in self._iter_cache("insee_socio_demo", SOCIO_DEMO_COLUMNS):
+            code = row.get("CODGEO") or row.get("COM") or ""
+            if not code:
+                continue
+            values = {}
+            for field, sources in SOCIO_DEMO_SOURCES.items():
+                raw = next((row.get(c) for c in sources if row.get(c)), None)
+                values[field] = self._safe_float(raw)
+            yield code, values
+
     async def get_socio_demo_data(self, commune_codes: List[str] = None) -> Dict[str, Dict]:
         """
         Récupère les données socio-démographiques INSEE pour les communes.
@@ -911,116 +1217,57 @@ class DataGouvService:
         - Type de logement (propriétaires/locataires)
         - Revenus médians
         """
-        data = await self.fetch_dataset("insee_socio_demo")
-
-        if not data:
+        store = await self.get_socio_demo_store()
+        if store is None:
             logger.warning("Socio-demo data not available")
             return {}
 
-        result = {}
+        rows = store.get(list(commune_codes) if commune_codes else None)
+        return {code: self._socio_demo_entry(values) for code, values in rows.items()}
 
-        for row in data:
-            try:
-                # Code commune (CODGEO)
-                code = row.get("CODGEO") or row.get("COM") or ""
-                if not code:
-                    continue
+    @staticmethod
+    def _socio_demo_entry(v: Dict[str, Optional[float]]) -> Dict:
+        """Indicateurs dérivés d'une commune à partir des valeurs absolues du store."""
+        pop_total = v["population"]
 
-                if commune_codes and code not in commune_codes:
-                    continue
+        # Genre
+        genre = None
+        if pop_total and pop_total > 0 and v["hommes"] is not None and v["femmes"] is not None:
+            genre = {
+                "hommes": v["hommes"],
+                "femmes": v["femmes"],
+                "pct_hommes": round(v["hommes"] / pop_total * 100, 1),
+                "pct_femmes": round(v["femmes"] / pop_total * 100, 1),
+            }
 
-                # Population totale
-                pop_total = self._safe_float(row.get("P21_POP") or row.get("P20_POP") or row.get("P19_POP"))
-
-                # Population par genre
-                pop_hommes = self._safe_float(row.get("P21_POPH") or row.get("P20_POPH"))
-                pop_femmes = self._safe_float(row.get("P21_POPF") or row.get("P20_POPF"))
-
-                # Tranches d'âge (pourcentages)
-                pop_0_14 = self._safe_float(row.get("P21_POP0014") or row.get("P20_POP0014"))
-                pop_15_29 = self._safe_float(row.get("P21_POP1529") or row.get("P20_POP1529"))
-                pop_30_44 = self._safe_float(row.get("P21_POP3044") or row.get("P20_POP3044"))
-                pop_45_59 = self._safe_float(row.get("P21_POP4559") or row.get("P20_POP4559"))
-                pop_60_74 = self._safe_float(row.get("P21_POP6074") or row.get("P20_POP6074"))
-                pop_75_plus = self._safe_float(row.get("P21_POP75P") or row.get("P20_POP75P"))
-
-                # CSP des 15-64 ans
-                csp_cadres = self._safe_float(row.get("C21_POP15P_CS3") or row.get("C20_POP15P_CS3"))  # Cadres
-                csp_prof_inter = self._safe_float(row.get("C21_POP15P_CS4") or row.get("C20_POP15P_CS4"))  # Prof. intermédiaires
-                csp_employes = self._safe_float(row.get("C21_POP15P_CS5") or row.get("C20_POP15P_CS5"))  # Employés
-                csp_ouvriers = self._safe_float(row.get("C21_POP15P_CS6") or row.get("C20_POP15P_CS6"))  # Ouvriers
-                csp_retraites = self._safe_float(row.get("C21_POP15P_CS7") or row.get("C20_POP15P_CS7"))  # Retraités
-
-                # Diplômes (15 ans et plus hors scolarisés)
-                dipl_sans = self._safe_float(row.get("P21_NSCOL15P_DIPLMIN") or row.get("P20_NSCOL15P_DIPLMIN"))  # Sans diplôme
-                dipl_bac = self._safe_float(row.get("P21_NSCOL15P_BAC") or row.get("P20_NSCOL15P_BAC"))  # Bac
-                dipl_sup = self._safe_float(row.get("P21_NSCOL15P_SUP") or row.get("P20_NSCOL15P_SUP"))  # Supérieur
-
-                # Activité
-                actifs = self._safe_float(row.get("P21_ACT1564") or row.get("P20_ACT1564"))
-                chomeurs = self._safe_float(row.get("P21_CHOM1564") or row.get("P20_CHOM1564"))
-
-                # Logement
-                menages = self._safe_float(row.get("P21_MEN") or row.get("P20_MEN"))
-                proprietaires = self._safe_float(row.get("P21_RP_PROP") or row.get("P20_RP_PROP"))
-                locataires = self._safe_float(row.get("P21_RP_LOC") or row.get("P20_RP_LOC"))
-
-                # Revenus (si disponibles)
-                revenu_median = self._safe_float(row.get("MED21") or row.get("MED20") or row.get("MED19"))
-                taux_pauvrete = self._safe_float(row.get("TP60") or row.get("TP6021") or row.get("TP6020"))
-
-                # Genre
-                genre = None
-                if pop_total and pop_total > 0 and pop_hommes is not None and pop_femmes is not None:
-                    genre = {
-                        "hommes": pop_hommes,
-                        "femmes": pop_femmes,
-                        "pct_hommes": round(pop_hommes / pop_total * 100, 1),
-                        "pct_femmes": round(pop_femmes / pop_total * 100, 1),
-                    }
+        # Calculer pourcentages si on a les valeurs absolues
+        pct_age = {}
+        if pop_total and pop_total > 0:
+            for age_group, field in AGE_FIELDS.items():
+                if v[field]:
+                    pct_age[age_group] = round(v[field] / pop_total * 100, 1)
 
-                # Calculer pourcentages si on a les valeurs absolues
-                pct_age = {}
-                if pop_total and pop_total > 0:
-                    if pop_0_14: pct_age["0-14"] = round(pop_0_14 / pop_total * 100, 1)
-                    if pop_15_29: pct_age["15-29"] = round(pop_15_29 / pop_total * 100, 1)
-                    if pop_30_44: pct_age["30-44"] = round(pop_30_44 / pop_total * 100, 1)
-                    if pop_45_59: pct_age["45-59"] = round(pop_45_59 / pop_total * 100, 1)
-                    if pop_60_74: pct_age["60-74"] = round(pop_60_74 / pop_total * 100, 1)
-                    if pop_75_plus: pct_age["75+"] = round(pop_75_plus / pop_total * 100, 1)
-
-                # Taux de chômage
-                taux_chomage = None
-                if actifs and actifs > 0 and chomeurs:
-                    taux_chomage = round(chomeurs / actifs * 100, 1)
-
-                # % propriétaires
-                pct_proprietaires = None
-                if menages and menages > 0 and proprietaires:
-                    pct_proprietaires = round(proprietaires / menages * 100, 1)
-
-                result[code] = {
-                    "population": pop_total,
-                    "genre": genre,
-                    "tranches_age": pct_age if pct_age else None,
-                    "taux_chomage": taux_chomage,
-                    "pct_proprietaires": pct_proprietaires,
-                    "revenu_median": revenu_median,
-                    "taux_pauvrete": taux_pauvrete,
-                    "csp": {
-                        "cadres": csp_cadres,
-                        "prof_intermediaires": csp_prof_inter,
-                        "employes": csp_employes,
-                        "ouvriers": csp_ouvriers,
-                        "retraites": csp_retraites,
-                    } if any([csp_cadres, csp_prof_inter, csp_employes, csp_ouvriers]) else None,
-                }
+        # Taux de chômage
+        taux_chomage = None
+        if v["actifs"] and v["actifs"] > 0 and v["chomeurs"]:
+            taux_chomage = round(v["chomeurs"] / v["actifs"] * 100, 1)
 
-            except Exception as e:
-                logger.debug(f"Error parsing socio-demo row: {e}")
-                continue
+        # % propriétaires
+        pct_proprietaires = None
+        if v["menages"] and v["menages"] > 0 and v["proprietaires"]:
+            pct_proprietaires = round(v["proprietaires"] / v["menages"] * 100, 1)
 
-        return result
+        csp_present = any(v[f] for f in ("csp_cadres", "csp_prof_inter", "csp_employes", "csp_ouvriers"))
+        return {
+            "population": pop_total,
+            "genre": genre,
+            "tranches_age": pct_age if pct_age else None,
+            "taux_chomage": taux_chomage,
+            "pct_proprietaires": pct_proprietaires,
+            "revenu_median": v["revenu_median"],
+            "taux_pauvrete": v["taux_pauvrete"],
+            "csp": {csp: v[field] for csp, field in CSP_FIELDS.items()} if csp_present else None,
+        }
 
     def _safe_float(self, value) -> Optional[float]:
         """Convertit une valeur en float de manière sécurisée."""
@@ -1045,68 +1292,32 @@ class DataGouvService:
         """
         Récupère les bornes de recharge IRVE.
         Filtrage par rayon autour d'un point ou par département.
+        Servi depuis l'index mmap (services/irve_index.py), reconstruit
+        automatiquement quand le cache du dataset est rafraîchi.
         """
-        data = await self.fetch_dataset("irve_bornes")
-
-        result = []
-        for row in data:
-            try:
-                # Coordonnées
-                lat_str = row.get("consolidated_latitude") or row.get("Ylatitude") or row.get("latitude")
-                lng_str = row.get("consolidated_longitude") or row.get("Xlongitude") or row.get("longitude")
-
-                if not lat_str or not lng_str:
-                    continue
-
-                station_lat = float(str(lat_str).replace(",", "."))
-                station_lng = float(str(lng_str).replace(",", "."))
-
-                # Filtre par département
-                code_postal = row.get("consolidated_code_postal") or row.get("code_postal") or ""
-                dep = code_postal[:2] if len(code_postal) >= 2 else ""
-                if department and dep != department:
-                    continue
-
-                # Filtre par rayon
-                if lat and lng:
-                    dist = self._haversine(lat, lng, station_lat, station_lng)
-                    if dist > radius_km:
-                        continue
-                else:
-                    dist = None
-
-                # Puissance
-                puissance_str = row.get("puissance_nominale") or row.get("puissance_maximale") or "0"
-                try:
-                    puissance = float(str(puissance_str).replace(",", "."))
-                except:
-                    puissance = 0
+        from services.irve_index import get_irve_index
 
-                result.append({
-                    "id": row.get("id_station_itinerance") or row.get("id_station_local"),
-                    "nom": row.get("nom_station") or "Station IRVE",
-                    "adresse": row.get("adresse_station") or row.get("consolidated_adresse") or "",
-                    "commune": row.get("consolidated_commune") or row.get("nom_commune") or "",
-                    "code_postal": code_postal,
-                    "latitude": station_lat,
-                    "longitude": station_lng,
-                    "nb_points_charge": int(row.get("nbre_pdc") or 1),
-                    "puissance_max_kw": puissance,
-                    "operateur": row.get("nom_operateur") or row.get("nom_enseigne") or "",
-                    "gratuit": row.get("gratuit") == "true" or row.get("gratuit") == "TRUE",
-                    "accessibilite_pmr": row.get("accessibilite_pmr") == "true",
-                    "distance_km": round(dist, 2) if dist else None,
-                })
+        if not await self.ensure_cached("irve_bornes"):
+            return []
 
-            except Exception as e:
-                logger.debug(f"Error parsing IRVE row: {e}")
-                continue
+        index = await get_irve_index(
+            self.cache_dir / "irve_bornes.idx",
+            self.dataset_version("irve_bornes"),
+            lambda: self._iter_cache("irve_bornes", IRVE_COLUMNS),
+        )
+        if index is None:
+            return []
 
-        # Tri par distance si disponible
         if lat and lng:
-            result.sort(key=lambda x: x.get("distance_km") or 999)
+            hits = index.query_radius(lat, lng, radius_km)
+            if department:
+                hits = [(i, d) for i, d in hits if index.department_of(i) == department]
+            hits.sort(key=lambda x: x[1])
+            return [index.station(i, dist) for i, dist in hits]
 
-        return result
+        if department:
+            return [index.station(i) for i in index.in_department(department)]
+        return [index.station(i) for i in range(index.count)]
 
     # =========================================================================
     # Données IDF Mobilités (Vélos, Covoiturage)
@@ -1225,60 +1436,75 @@ class DataGouvService:
     # GeoJSON boundaries
     # =========================================================================
 
-    async def get_geojson_boundaries(
-        self,
-        boundary_type: str = "departements",
-        code_filter: Optional[str] = None,
-    ) -> Dict[str, Any]:
+    async def get_boundary_store(self, boundary_type: str):
         """
-        Récupère les contours géographiques (communes, départements, EPCI, académies).
-        Cache local pour éviter les téléchargements répétés.
+        Store pré-simplifié d'un type de contour (services/boundaries.py).
+        Construit depuis le GeoJSON source (téléchargé ou ancien cache local),
+        reconstruit au-delà de 30 jours.
         """
+        from services.boundaries import BoundaryStore
+
         key = f"{boundary_type}_contours"
         if key not in GEOJSON_DATASETS:
-            return {"type": "FeatureCollection", "features": []}
+            return None
 
-        cache_path = self.cache_dir / f"{key}.geojson"
+        store_path = self.cache_dir / f"{key}.boundaries.sqlite"
+        max_age = timedelta(days=30)
+        if store_path.exists():
+            try:
+                if datetime.now() - datetime.fromtimestamp(store_path.stat().st_mtime) < max_age:
+                    return BoundaryStore(store_path)
+            except Exception as e:
+                logger.error(f"Boundary store read error {key}: {e}")
 
-        # Check cache
-        if cache_path.exists():
+        # Ancien cache GeoJSON brut encore valide : pas de re-téléchargement
+        geojson = None
+        legacy_path = self.cache_dir / f"{key}.geojson"
+        if legacy_path.exists() and datetime.now() - datetime.fromtimestamp(legacy_path.stat().st_mtime) < max_age:
             try:
-                cache_time = datetime.fromtimestamp(cache_path.stat().st_mtime)
-                if datetime.now() - cache_time < timedelta(days=30):
-                    with open(cache_path, "r", encoding="utf-8") as f:
-                        geojson = json.load(f)
-                    if code_filter:
-                        geojson["features"] = [
-                            f for f in geojson["features"]
-                            if f.get("properties", {}).get("code", "").startswith(code_filter)
-                        ]
-                    return geojson
+                with open(legacy_path, "r", encoding="utf-8") as f:
+                    geojson = json.load(f)
             except Exception as e:
                 logger.error(f"GeoJSON cache read error: {e}")
 
-        # Download
-        url = GEOJSON_DATASETS[key]["url"]
-        try:
-            async with httpx.AsyncClient(timeout=180.0, follow_redirects=True) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                geojson = response.json()
-
-                # Save to cache
-                with open(cache_path, "w", encoding="utf-8") as f:
-                    json.dump(geojson, f, ensure_ascii=False)
+        if geojson is None:
+            url = GEOJSON_DATASETS[key]["url"]
+            try:
+                async with http_client(timeout=180.0, follow_redirects=True) as client:
+                    response = await client.get(url)
+                    response.raise_for_status()
+                    geojson = response.json()
+            except Exception as e:
+                logger.error(f"GeoJSON fetch error {url}: {e}")
+                return None
 
-                if code_filter:
-                    geojson["features"] = [
-                        f for f in geojson["features"]
-                        if f.get("properties", {}).get("code", "").startswith(code_filter)
-                    ]
+        try:
+            # Simplification de chaque contour : CPU seul, hors de la boucle asyncio
+            store = await asyncio.to_thread(BoundaryStore.build, geojson, store_path)
+        except Exception as e:
+            logger.error(f"Boundary store build error {key}: {e}")
+            return None
+        if legacy_path.exists():
+            legacy_path.unlink()
+        return store
 
-                return geojson
+    async def get_geojson_boundaries(
+        self,
+        boundary_type: str = "departements",
+        code_filter: Optional[str] = None,
+        bbox: Optional[tuple] = None,
+        zoom: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Récupère les contours géographiques (communes, départements, EPCI, académies).
+        Lit uniquement les features filtrées (code / bbox) au niveau de détail du zoom.
+        """
+        from services.boundaries import zoom_level
 
-        except Exception as e:
-            logger.error(f"GeoJSON fetch error {url}: {e}")
+        store = await self.get_boundary_store(boundary_type)
+        if store is None:
             return {"type": "FeatureCollection", "features": []}
+        return json.loads(store.feature_collection(zoom_level(zoom), code_filter, bbox))
 
     # =========================================================================
     # Points d'intérêt (via API externe)
@@ -1327,7 +1553,7 @@ class DataGouvService:
         """
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(timeout=30.0) as client:
                 response = await client.post(
                     "https://overpass-api.de/api/interpreter",
                     data={"data": query},
@@ -1397,6 +1623,13 @@ class DataGouvService:
 
         return status
 
+    def dataset_version(self, key: str) -> str:
+        """Version du cache d'un dataset (mtime du fichier), "none" si absent."""
+        path = self._cache_path(key)
+        if not path.exists():
+            return "none"
+        return str(int(path.stat().st_mtime))
+
     async def refresh_all(self):
         """Rafraîchit tous les datasets (skips heavy ones)."""
         logger.info("Refreshing all data.gouv.fr datasets...")
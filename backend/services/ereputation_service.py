@@ -10,11 +10,11 @@ import os
 from datetime import datetime
 from typing import Optional
 
-import httpx
 from sqlalchemy.orm import Session
 
 from core.config import settings
 from database import EReputationAudit, EReputationComment, Competitor
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -262,7 +262,7 @@ class EReputationService:
             )
 
             try:
-                async with httpx.AsyncClient() as client:
+                async with http_client() as client:
                     resp = await client.post(
                         f"{GEMINI_API_URL}?key={self.gemini_key}",
                         json={
@@ -422,7 +422,7 @@ class EReputationService:
         )
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client() as client:
                 resp = await client.post(
                     f"{GEMINI_API_URL}?key={self.gemini_key}",
                     json={
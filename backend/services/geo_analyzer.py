@@ -11,6 +11,7 @@ from typing import Any
 import httpx
 
 from core.config import settings
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -354,7 +355,7 @@ class GeoAnalyzer:
             self.errors.append("claude: ANTHROPIC_API_KEY manquante")
             return ""
         try:
-            async with httpx.AsyncClient(timeout=60) as client:
+            async with http_client(timeout=60) as client:
                 resp = await client.post(
                     "https://api.anthropic.com/v1/messages",
                     headers={
@@ -410,7 +411,7 @@ class GeoAnalyzer:
                 "https://generativelanguage.googleapis.com/v1beta/"
                 f"models/gemini-3-flash-preview:generateContent?key={settings.GEMINI_API_KEY}"
             )
-            async with httpx.AsyncClient(timeout=60) as client:
+            async with http_client(timeout=60) as client:
                 resp = await client.post(
                     url,
                     headers={"content-type": "application/json"},
@@ -456,7 +457,7 @@ class GeoAnalyzer:
             self.errors.append("chatgpt: OPENAI_API_KEY manquante")
             return ""
         try:
-            async with httpx.AsyncClient(timeout=60) as client:
+            async with http_client(timeout=60) as client:
                 resp = await client.post(
                     "https://api.openai.com/v1/chat/completions",
                     headers={
@@ -509,7 +510,7 @@ class GeoAnalyzer:
             self.errors.append("mistral: MISTRAL_API_KEY manquante")
             return ""
         try:
-            async with httpx.AsyncClient(timeout=60) as client:
+            async with http_client(timeout=60) as client:
                 resp = await client.post(
                     "https://api.mistral.ai/v1/chat/completions",
                     headers={
@@ -577,7 +578,7 @@ class GeoAnalyzer:
         for attempt in range(max_retries):
             try:
                 url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent?key={settings.GEMINI_API_KEY}"
-                async with httpx.AsyncClient(timeout=45) as client:
+                async with http_client(timeout=45) as client:
                     resp = await client.post(
                         url,
                         json={
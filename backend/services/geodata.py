@@ -2,7 +2,7 @@
 Service de données géographiques.
 Intégration data.gouv.fr et INSEE pour analyses de zones.
 """
-import httpx
+from services.http_client import http_client
 import csv
 import io
 import json
@@ -94,7 +94,7 @@ class GeoDataService:
     async def fetch_csv(self, url: str, encoding: str = "utf-8") -> List[Dict]:
         """Télécharge et parse un CSV."""
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with http_client(timeout=60.0) as client:
                 response = await client.get(url)
                 response.raise_for_status()
 
@@ -184,6 +184,7 @@ class GeoDataService:
         center_lon: float,
         radius_km: float,
         communes_data: List[Dict],
+        index=None,
     ) -> Dict[str, Any]:
         """
         Analyse une zone de chalandise autour d'un point.
@@ -193,30 +194,20 @@ class GeoDataService:
             center_lon: Longitude du centre
             radius_km: Rayon de la zone en km
             communes_data: Données des communes avec lat/lon
+            index: GridIndex déjà construit sur communes_data (analyses répétées)
 
         Returns:
             Agrégats de la zone
         """
-        bbox = get_bounding_box(center_lat, center_lon, radius_km)
+        from services.spatial_index import build_commune_index
 
+        # Index en grille : seules les cellules couvrant le rayon sont parcourues
+        if index is None:
+            index = build_commune_index(communes_data)
         communes_in_zone = []
-        for commune in communes_data:
-            lat = commune.get("latitude")
-            lon = commune.get("longitude")
-
-            if not lat or not lon:
-                continue
-
-            # Filtre rapide par bounding box
-            if not (bbox["min_lat"] <= lat <= bbox["max_lat"] and
-                    bbox["min_lon"] <= lon <= bbox["max_lon"]):
-                continue
-
-            # Vérification précise par distance
-            distance = haversine_distance(center_lat, center_lon, lat, lon)
-            if distance <= radius_km:
-                commune["distance_km"] = round(distance, 2)
-                communes_in_zone.append(commune)
+        for commune, distance in index.query_radius(center_lat, center_lon, radius_km):
+            commune["distance_km"] = round(distance, 2)
+            communes_in_zone.append(commune)
 
         # Agrégations
         total_population = sum(c.get("population", 0) for c in communes_in_zone)
@@ -274,16 +265,11 @@ def get_communes_by_department(department: str) -> List[Dict]:
 
 def find_nearest_commune(lat: float, lon: float) -> Dict:
     """Trouve la commune la plus proche d'un point."""
-    nearest = None
-    min_distance = float("inf")
-
-    for commune in COMMUNES_REFERENCE:
-        distance = haversine_distance(lat, lon, commune["lat"], commune["lon"])
-        if distance < min_distance:
-            min_distance = distance
-            nearest = commune
+    from services.spatial_index import get_reference_index
 
-    if nearest:
-        nearest["distance_km"] = round(min_distance, 2)
+    found = get_reference_index().nearest(lat, lon)
+    if not found:
+        return None
 
-    return nearest
+    commune, distance = found
+    return {**commune, "distance_km": round(distance, 2)}
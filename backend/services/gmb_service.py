@@ -11,9 +11,9 @@ import time
 from datetime import datetime, timedelta
 from typing import Optional
 
-import httpx
 
 from core.config import settings
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -211,7 +211,7 @@ class GMBService:
             params["ll"] = f"@{latitude},{longitude},14z"
 
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with http_client(timeout=30) as client:
                 resp = await client.get(SEARCHAPI_BASE, params=params)
                 resp.raise_for_status()
                 data = resp.json()
@@ -274,7 +274,7 @@ class GMBService:
             params["locationbias"] = f"circle:5000@{latitude},{longitude}"
 
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with http_client(timeout=30) as client:
                 resp = await client.get(
                     f"{GOOGLE_PLACES_BASE}/findplacefromtext/json",
                     params=params,
@@ -0,0 +1,110 @@
+"""
+Bulk ingestion of Google Trends points and Google News articles.
+
+A trends timeline is fetched again every day and overlaps the previous ones:
+points are upserted on (competitor_id, keyword, date), the latest fetch
+overwriting the value. News articles are inserted once per link; links
+already stored are skipped in the database (ON CONFLICT DO NOTHING) instead
+of failing row by row.
+"""
+import logging
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from database import GoogleNewsArticle, GoogleTrendsData
+from services.ad_ingestion import _chunks, _dialect_insert
+
+logger = logging.getLogger(__name__)
+
+TRENDS_KEY = ("competitor_id", "keyword", "date")
+
+
+def trends_rows(timeline_data: Iterable[dict], kw_to_comp: dict[str, int]) -> list[dict]:
+    """GoogleTrendsData rows of a SearchAPI timeline, for the keywords mapped to a competitor."""
+    now = datetime.utcnow()
+    rows = []
+    for point in timeline_data:
+        date_str = point.get("date", "")
+        for kw, val in point.get("values", {}).items():
+            comp_id = kw_to_comp.get(kw)
+            if comp_id is not None:
+                rows.append({"competitor_id": comp_id, "keyword": kw, "date": date_str, "value": val,
+                             "recorded_at": now})
+    return rows
+
+
+def news_rows(competitor_id: int, articles: Iterable[dict]) -> list[dict]:
+    """GoogleNewsArticle rows of a SearchAPI news result (articles without a link are dropped)."""
+    return [
+        {
+            "competitor_id": competitor_id,
+            "title": article.get("title", ""),
+            "link": article["link"],
+            "source": article.get("source", ""),
+            "date": article.get("date", ""),
+            "snippet": article.get("snippet", ""),
+            "thumbnail": article.get("thumbnail", ""),
+            "collected_at": datetime.utcnow(),
+        }
+        for article in articles
+        if article.get("link")
+    ]
+
+
+def upsert_trends(db: Session, rows: list[dict], commit: bool = True) -> int:
+    """Insert or refresh trends points keyed on (competitor_id, keyword, date). Returns the points written."""
+    # Last occurrence of a key wins
+    by_key = {tuple(r[k] for k in TRENDS_KEY): r for r in rows}
+    rows = list(by_key.values())
+    table = GoogleTrendsData.__table__
+
+    insert = _dialect_insert(db)
+    if insert is not None:
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[k] for k in TRENDS_KEY],
+            set_={"value": stmt.excluded.value, "recorded_at": stmt.excluded.recorded_at},
+        )
+        for chunk in _chunks(rows):
+            db.execute(stmt, chunk)
+    else:
+        key_cols = tuple_(*[table.c[k] for k in TRENDS_KEY])
+        stored = {}
+        for chunk in _chunks(list(by_key)):
+            for row in db.query(GoogleTrendsData.id, *[table.c[k] for k in TRENDS_KEY]).filter(key_cols.in_(chunk)):
+                stored[tuple(row[1:])] = row.id
+        db.bulk_update_mappings(GoogleTrendsData, [
+            {"id": stored[key], "value": r["value"], "recorded_at": r["recorded_at"]}
+            for key, r in by_key.items() if key in stored
+        ])
+        db.bulk_insert_mappings(GoogleTrendsData, [r for key, r in by_key.items() if key not in stored])
+
+    if commit:
+        db.commit()
+    return len(rows)
+
+
+def insert_news(db: Session, rows: list[dict], commit: bool = True) -> int:
+    """Insert the articles whose link is not stored yet. Returns the number of new articles."""
+    by_link = {r["link"]: r for r in rows}
+    existing = set()
+    for chunk in _chunks(list(by_link)):
+        existing.update(link for (link,) in db.query(GoogleNewsArticle.link).filter(GoogleNewsArticle.link.in_(chunk)))
+    new_rows = [r for link, r in by_link.items() if link not in existing]
+
+    insert = _dialect_insert(db)
+    if insert is not None:
+        # Also covers links stored concurrently since the lookup above
+        stmt = insert(GoogleNewsArticle.__table__).on_conflict_do_nothing(index_elements=["link"])
+        for chunk in _chunks(new_rows):
+            db.execute(stmt, chunk)
+    else:
+        for chunk in _chunks(new_rows):
+            db.bulk_insert_mappings(GoogleNewsArticle, chunk)
+
+    if commit:
+        db.commit()
+    return len(new_rows)
@@ -0,0 +1,262 @@
+"""
+Couche HTTP partagée pour tous les fournisseurs externes.
+Un seul httpx.AsyncClient (pool de connexions keep-alive, HTTP/2 si `h2` est
+installé) ouvert dans le lifespan FastAPI et partagé avec le scheduler.
+Limite de connexions simultanées par hôte et métriques (saturation, latence).
+
+Usage (remplace `async with httpx.AsyncClient(timeout=30) as client:`):
+
+    async with http_client(timeout=30) as client:
+        response = await client.get(url, params=params)
+
+Hors lifespan (scripts, tests) ou depuis une autre boucle asyncio, un client
+éphémère est créé comme avant.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from itertools import islice
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+# Connexions simultanées max par hôte (défaut: settings.HTTP_PER_HOST_LIMIT)
+HOST_LIMITS = {
+    "api.scrapecreators.com": 10,
+    "graph.facebook.com": 6,
+    "www.searchapi.io": 5,
+    "api.anthropic.com": 8,
+    "api.openai.com": 8,
+    "generativelanguage.googleapis.com": 8,
+    "api.mistral.ai": 8,
+}
+
+LATENCY_WINDOW = 200  # dernières mesures conservées par hôte pour le p95
+# Hôtes suivis au plus (sémaphore + métriques) : les téléchargements de créas
+# touchent des CDN arbitraires, les hôtes inactifs les moins récents hors
+# HOST_LIMITS sont oubliés au-delà
+MAX_TRACKED_HOSTS = 256
+
+
+class _HostStats:
+    __slots__ = ("requests", "errors", "in_flight", "max_in_flight", "waits", "wait_ms", "latencies")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.waits = 0
+        self.wait_ms = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def as_dict(self, limit: int) -> Dict:
+        ordered = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "limit": limit,
+            "saturated_waits": self.waits,
+            "avg_wait_ms": round(self.wait_ms / self.waits, 1) if self.waits else 0,
+            "avg_latency_ms": round(sum(ordered) / len(ordered), 1) if ordered else None,
+            "p95_latency_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1) if ordered else None,
+        }
+
+
+class HttpClientPool:
+    """Client httpx partagé + sémaphores par hôte + métriques."""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: "OrderedDict[str, _HostStats]" = OrderedDict()  # ordre LRU
+        self._ephemeral_clients = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self._client is not None and not self._client.is_closed
+
+    async def start(self):
+        if self.is_open:
+            return
+        self._client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=30.0,
+            ),
+            http2=HTTP2_AVAILABLE,
+        )
+        self._loop = asyncio.get_running_loop()
+        self._semaphores = {}
+        logger.info(
+            f"HTTP pool opened (max {settings.HTTP_MAX_CONNECTIONS} connections, "
+            f"http2={'on' if HTTP2_AVAILABLE else 'off'})"
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+        self._semaphores = {}
+
+    def _shared(self) -> Optional[httpx.AsyncClient]:
+        """Client partagé s'il est utilisable depuis la boucle courante."""
+        if not self.is_open:
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        return self._client if loop is self._loop else None
+
+    def _host_limit(self, host: str) -> int:
+        return HOST_LIMITS.get(host, settings.HTTP_PER_HOST_LIMIT)
+
+    def _host_entry(self, host: str) -> Tuple[asyncio.Semaphore, _HostStats]:
+        stats = self._stats.get(host)
+        if stats is None:
+            self._prune_hosts()
+            stats = self._stats[host] = _HostStats()
+        else:
+            self._stats.move_to_end(host)
+        sem = self._semaphores.get(host)
+        if sem is None:
+            sem = self._semaphores[host] = asyncio.Semaphore(self._host_limit(host))
+        return sem, stats
+
+    def _prune_hosts(self):
+        """Fait de la place pour un nouvel hôte en oubliant les plus anciens sans requête en cours."""
+        excess = len(self._stats) + 1 - MAX_TRACKED_HOSTS
+        if excess <= 0:
+            return
+        idle = (h for h, s in self._stats.items() if s.in_flight == 0 and h not in HOST_LIMITS)
+        for host in list(islice(idle, excess)):
+            del self._stats[host]
+            self._semaphores.pop(host, None)
+
+    @asynccontextmanager
+    async def _slot(self, url):
+        """Réserve une connexion pour l'hôte et mesure attente + latence."""
+        host = urlsplit(str(url)).hostname or ""
+        sem, stats = self._host_entry(host)
+
+        if sem.locked():
+            stats.waits += 1
+            wait_start = time.perf_counter()
+            await sem.acquire()
+            stats.wait_ms += (time.perf_counter() - wait_start) * 1000
+        else:
+            await sem.acquire()
+
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.latencies.append((time.perf_counter() - start) * 1000)
+            stats.in_flight -= 1
+            sem.release()
+
+    @asynccontextmanager
+    async def client(self, timeout=None, follow_redirects: bool = False, headers: Optional[Dict] = None):
+        """Client pour un bloc `async with` : partagé si possible, éphémère sinon."""
+        shared = self._shared()
+        if shared is None:
+            self._ephemeral_clients += 1
+            async with httpx.AsyncClient(
+                timeout=timeout if timeout is not None else DEFAULT_TIMEOUT,
+                follow_redirects=follow_redirects,
+                headers=headers,
+            ) as client:
+                yield client
+            return
+        yield PooledClient(self, shared, timeout, follow_redirects, headers)
+
+    def metrics(self) -> Dict:
+        pool = None
+        if self.is_open:
+            pool_impl = getattr(self._client, "_transport", None)
+            connections = getattr(getattr(pool_impl, "_pool", None), "connections", None)
+            if connections is not None:
+                pool = {
+                    "connections": len(connections),
+                    "max_connections": settings.HTTP_MAX_CONNECTIONS,
+                    "idle": sum(1 for c in connections if c.is_idle()),
+                }
+        return {
+            "open": self.is_open,
+            "http2": HTTP2_AVAILABLE,
+            "pool": pool,
+            "in_flight": sum(s.in_flight for s in self._stats.values()),
+            "ephemeral_clients": self._ephemeral_clients,
+            "hosts": {host: s.as_dict(self._host_limit(host)) for host, s in sorted(self._stats.items())},
+        }
+
+
+class PooledClient:
+    """Vue sur le client partagé avec timeout/redirections/en-têtes par défaut du bloc appelant."""
+
+    def __init__(self, pool: HttpClientPool, client: httpx.AsyncClient, timeout,
+                 follow_redirects: bool, headers: Optional[Dict] = None):
+        self._pool = pool
+        self._client = client
+        self._timeout = timeout if timeout is not None else DEFAULT_TIMEOUT
+        self._follow_redirects = follow_redirects
+        self._headers = headers
+
+    def _defaults(self, kwargs: Dict) -> Dict:
+        kwargs.setdefault("timeout", self._timeout)
+        kwargs.setdefault("follow_redirects", self._follow_redirects)
+        if self._headers:
+            kwargs["headers"] = {**self._headers, **(kwargs.get("headers") or {})}
+        return kwargs
+
+    async def request(self, method: str, url, **kwargs) -> httpx.Response:
+        async with self._pool._slot(url):
+            return await self._client.request(method, url, **self._defaults(kwargs))
+
+    async def get(self, url, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url, **kwargs):
+        async with self._pool._slot(url):
+            async with self._client.stream(method, url, **self._defaults(kwargs)) as response:
+                yield response
+
+
+http_pool = HttpClientPool()
+
+
+def http_client(timeout=None, follow_redirects: bool = False, headers: Optional[Dict] = None):
+    """Raccourci: `async with http_client(timeout=30) as client: ...`"""
+    return http_pool.client(timeout=timeout, follow_redirects=follow_redirects, headers=headers)
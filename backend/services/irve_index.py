@@ -0,0 +1,275 @@
+"""
+Index IRVE pré-calculé et mappé en mémoire.
+Les bornes sont parsées une seule fois depuis le cache data.gouv vers un fichier
+binaire (tableaux typés + grille lat/lon + index département), relu via mmap.
+Reconstruit automatiquement quand le cache source change de version.
+"""
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+from array import array
+from math import cos, floor, radians
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.geodata import haversine_distance
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"IRVEIDX1"
+CELL_DEG = 0.1
+KM_PER_DEG_LAT = 111.0
+
+# Champs texte renvoyés pour chaque borne (stockés en JSON dans un blob)
+TEXT_FIELDS = ("id", "nom", "adresse", "commune", "code_postal")
+
+FLAG_GRATUIT = 1
+FLAG_PMR = 2
+
+
+def _to_float(value) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(str(value).replace(",", "."))
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_station(row: Dict) -> Optional[Dict]:
+    """Normalise une ligne brute IRVE (même règles que l'ancien parsing à la volée)."""
+    lat = _to_float(row.get("consolidated_latitude") or row.get("Ylatitude") or row.get("latitude"))
+    lng = _to_float(row.get("consolidated_longitude") or row.get("Xlongitude") or row.get("longitude"))
+    if lat is None or lng is None:
+        return None
+    try:
+        nb_pdc = int(row.get("nbre_pdc") or 1)
+    except (ValueError, TypeError):
+        return None
+
+    code_postal = row.get("consolidated_code_postal") or row.get("code_postal") or ""
+    flags = 0
+    if row.get("gratuit") in ("true", "TRUE"):
+        flags |= FLAG_GRATUIT
+    if row.get("accessibilite_pmr") == "true":
+        flags |= FLAG_PMR
+
+    return {
+        "latitude": lat,
+        "longitude": lng,
+        "department": code_postal[:2] if len(code_postal) >= 2 else "",
+        "puissance": _to_float(row.get("puissance_nominale") or row.get("puissance_maximale") or "0") or 0.0,
+        "nb_pdc": nb_pdc,
+        "flags": flags,
+        "operateur": row.get("nom_operateur") or row.get("nom_enseigne") or "",
+        "text": [
+            row.get("id_station_itinerance") or row.get("id_station_local"),
+            row.get("nom_station") or "Station IRVE",
+            row.get("adresse_station") or row.get("consolidated_adresse") or "",
+            row.get("consolidated_commune") or row.get("nom_commune") or "",
+            code_postal,
+        ],
+    }
+
+
+def _cell(lat: float, lng: float) -> Tuple[int, int]:
+    return floor(lat / CELL_DEG), floor(lng / CELL_DEG)
+
+
+def build_index_file(rows: Iterable[Dict], path: Path, version: str) -> int:
+    """Parse les lignes IRVE et écrit le fichier d'index (remplacement atomique)."""
+    stations = [s for s in (parse_station(r) for r in rows) if s]
+    stations.sort(key=lambda s: _cell(s["latitude"], s["longitude"]))
+
+    operators: Dict[str, int] = {}
+    cells: Dict[str, List[int]] = {}
+    by_dep: Dict[str, List[int]] = {}
+    lat, lng, power = array("d"), array("d"), array("d")
+    pdc, op_idx, dep_order = array("i"), array("i"), array("i")
+    flags = array("B")
+    text_offsets = array("q", [0])
+    blob = bytearray()
+
+    for i, s in enumerate(stations):
+        lat.append(s["latitude"])
+        lng.append(s["longitude"])
+        power.append(s["puissance"])
+        pdc.append(s["nb_pdc"])
+        flags.append(s["flags"])
+        op_idx.append(operators.setdefault(s["operateur"], len(operators)))
+        blob += json.dumps(s["text"], ensure_ascii=False).encode("utf-8")
+        text_offsets.append(len(blob))
+
+        row, col = _cell(s["latitude"], s["longitude"])
+        key = f"{row},{col}"
+        if key in cells:
+            cells[key][1] = i + 1
+        else:
+            cells[key] = [i, i + 1]
+        by_dep.setdefault(s["department"], []).append(i)
+
+    departments = {}
+    for dep, members in by_dep.items():
+        departments[dep] = [len(dep_order), len(dep_order) + len(members)]
+        dep_order.extend(members)
+
+    arrays = [
+        ("lat", lat), ("lng", lng), ("power", power), ("pdc", pdc),
+        ("operator", op_idx), ("dep_order", dep_order), ("flags", flags),
+        ("text_offsets", text_offsets), ("text", array("B", bytes(blob))),
+    ]
+    layout, offset = {}, 0
+    for name, arr in arrays:
+        size = len(arr) * arr.itemsize
+        layout[name] = [offset, arr.typecode, len(arr)]
+        offset += size + (-size % 8)
+
+    header = json.dumps({
+        "version": version,
+        "count": len(stations),
+        "arrays": layout,
+        "cells": cells,
+        "departments": departments,
+        "operators": list(operators),
+    }).encode("utf-8")
+    header += b" " * (-len(header) % 8)
+
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for _, arr in arrays:
+            data = arr.tobytes()
+            f.write(data)
+            f.write(b"\0" * (-len(data) % 8))
+    os.replace(tmp_path, path)
+    logger.info(f"IRVE index built: {len(stations)} stations, {len(cells)} cells")
+    return len(stations)
+
+
+class IrveIndex:
+    """Lecture mmap d'un fichier d'index IRVE."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC:
+            raise ValueError(f"Not an IRVE index: {path}")
+        (header_len,) = struct.unpack("<Q", self._mm[8:16])
+        meta = json.loads(self._mm[16:16 + header_len])
+        base = 16 + header_len
+
+        self.version: str = meta["version"]
+        self.count: int = meta["count"]
+        self.cells: Dict[Tuple[int, int], Tuple[int, int]] = {
+            tuple(int(x) for x in k.split(",")): tuple(v) for k, v in meta["cells"].items()
+        }
+        self.departments: Dict[str, Tuple[int, int]] = {k: tuple(v) for k, v in meta["departments"].items()}
+        self.operators: List[str] = meta["operators"]
+
+        view = memoryview(self._mm)
+        for name, (offset, typecode, length) in meta["arrays"].items():
+            start = base + offset
+            itemsize = array(typecode).itemsize
+            setattr(self, name, view[start:start + length * itemsize].cast(typecode))
+
+    def query_radius(self, lat: float, lng: float, radius_km: float) -> List[Tuple[int, float]]:
+        """[(station, distance_km)] dans le rayon (non trié)."""
+        lat_delta = radius_km / KM_PER_DEG_LAT
+        lng_delta = radius_km / (KM_PER_DEG_LAT * max(cos(radians(lat)), 0.01))
+        min_lat, max_lat = lat - lat_delta, lat + lat_delta
+        min_lng, max_lng = lng - lng_delta, lng + lng_delta
+        row_lo, col_lo = _cell(min_lat, min_lng)
+        row_hi, col_hi = _cell(max_lat, max_lng)
+
+        lats, lngs = self.lat, self.lng
+        found = []
+        for row in range(row_lo, row_hi + 1):
+            for col in range(col_lo, col_hi + 1):
+                span = self.cells.get((row, col))
+                if not span:
+                    continue
+                for i in range(span[0], span[1]):
+                    plat, plng = lats[i], lngs[i]
+                    if plat < min_lat or plat > max_lat or plng < min_lng or plng > max_lng:
+                        continue
+                    dist = haversine_distance(lat, lng, plat, plng)
+                    if dist <= radius_km:
+                        found.append((i, dist))
+        return found
+
+    def in_department(self, department: str) -> List[int]:
+        span = self.departments.get(department)
+        if not span:
+            return []
+        return list(self.dep_order[span[0]:span[1]])
+
+    def department_of(self, i: int) -> str:
+        return self.station_text(i)[4][:2]
+
+    def station_text(self, i: int) -> list:
+        return json.loads(bytes(self.text[self.text_offsets[i]:self.text_offsets[i + 1]]))
+
+    def station(self, i: int, distance: Optional[float] = None) -> Dict:
+        """Reconstruit le dict renvoyé par l'API pour la borne i."""
+        station_id, nom, adresse, commune, code_postal = self.station_text(i)
+        flags = self.flags[i]
+        return {
+            "id": station_id,
+            "nom": nom,
+            "adresse": adresse,
+            "commune": commune,
+            "code_postal": code_postal,
+            "latitude": self.lat[i],
+            "longitude": self.lng[i],
+            "nb_points_charge": self.pdc[i],
+            "puissance_max_kw": self.power[i],
+            "operateur": self.operators[self.operator[i]],
+            "gratuit": bool(flags & FLAG_GRATUIT),
+            "accessibilite_pmr": bool(flags & FLAG_PMR),
+            "distance_km": round(distance, 2) if distance else None,
+        }
+
+
+_index: Optional[IrveIndex] = None
+# Une seule reconstruction à la fois : deux requêtes concurrentes réécriraient
+# le même fichier d'index
+_build_lock = asyncio.Lock()
+
+
+def _load_or_build(index_path: Path, version: str, load_rows) -> IrveIndex:
+    if index_path.exists():
+        candidate = IrveIndex(index_path)
+        if candidate.version == version:
+            return candidate
+    build_index_file(load_rows(), index_path, version)
+    return IrveIndex(index_path)
+
+
+def _is_current(index_path: Path, version: str) -> bool:
+    return _index is not None and _index.version == version and _index.path == index_path
+
+
+async def get_irve_index(index_path: Path, version: str, load_rows) -> Optional[IrveIndex]:
+    """Index courant ; reconstruit si absent ou si la version du cache source a changé.
+
+    load_rows: callable renvoyant un itérable des lignes brutes (appelé seulement
+    lors d'une reconstruction, dans un thread pour ne pas bloquer la boucle).
+    """
+    global _index
+    if _is_current(index_path, version):
+        return _index
+    async with _build_lock:
+        if _is_current(index_path, version):
+            return _index
+        try:
+            _index = await asyncio.to_thread(_load_or_build, index_path, version, load_rows)
+            return _index
+        except Exception as e:
+            logger.error(f"IRVE index error: {e}")
+            return None
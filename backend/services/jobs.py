@@ -0,0 +1,228 @@
+"""
+Job runs and DB-backed job locks shared by the API and the worker.
+The API only enqueues runs (job_runs); services/worker.py claims and executes
+them. A leased lock (job_locks) guarantees a job runs in at most one process,
+whether it was triggered by cron or by an admin.
+"""
+import asyncio
+import logging
+import os
+import socket
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database import SessionLocal, JobLock, JobRun, run_in_db_thread
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# JobRun being executed in the current task (producers tag the items they enqueue)
+current_run_id: ContextVar[Optional[int]] = ContextVar("current_run_id", default=None)
+
+
+class LockLost(Exception):
+    """The job's lease was taken over by another holder while the job was running."""
+
+
+# =============================================================================
+# Locks
+# =============================================================================
+
+def acquire_lock(db: Session, job_id: str, holder: str, ttl: timedelta) -> bool:
+    """Take (or renew) the lock if it is free, expired or already ours."""
+    now = datetime.utcnow()
+    updated = db.query(JobLock).filter(
+        JobLock.job_id == job_id,
+        or_(JobLock.expires_at < now, JobLock.holder == holder),
+    ).update(
+        {"holder": holder, "acquired_at": now, "expires_at": now + ttl},
+        synchronize_session=False,
+    )
+    if updated:
+        db.commit()
+        return True
+    try:
+        db.add(JobLock(job_id=job_id, holder=holder, acquired_at=now, expires_at=now + ttl))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+
+
+def renew_lock(db: Session, job_id: str, holder: str, ttl: timedelta) -> bool:
+    updated = db.query(JobLock).filter(JobLock.job_id == job_id, JobLock.holder == holder).update(
+        {"expires_at": datetime.utcnow() + ttl}, synchronize_session=False,
+    )
+    db.commit()
+    return bool(updated)
+
+
+def release_lock(db: Session, job_id: str, holder: str):
+    db.query(JobLock).filter(JobLock.job_id == job_id, JobLock.holder == holder).delete(synchronize_session=False)
+    db.commit()
+
+
+def with_session(fn, *args):
+    """Run fn(db, *args) in a short-lived session (for run_in_db_thread)."""
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def job_lock(job_id: str, holder: str = WORKER_ID, ttl: Optional[timedelta] = None):
+    """Yield True if the lock was acquired; the lease is renewed while the block runs.
+
+    If a renewal finds the lease held by someone else (it expired and was taken
+    over), the block is cancelled and LockLost is raised instead, so the job
+    never keeps running next to the new holder.
+    """
+    ttl = ttl or timedelta(minutes=settings.JOB_LOCK_TTL_MINUTES)
+    acquired = await run_in_db_thread(with_session, acquire_lock, job_id, holder, ttl)
+    if not acquired:
+        yield False
+        return
+
+    owner = asyncio.current_task()
+    lost = False
+
+    async def heartbeat():
+        nonlocal lost
+        while True:
+            await asyncio.sleep(ttl.total_seconds() / 3)
+            try:
+                renewed = await run_in_db_thread(with_session, renew_lock, job_id, holder, ttl)
+            except Exception as e:
+                logger.warning(f"Job lock renew failed for {job_id}: {e}")
+                continue
+            if not renewed:
+                logger.error(f"Job lock for {job_id} lost by {holder}, cancelling the run")
+                lost = True
+                owner.cancel()
+                return
+
+    renewer = asyncio.create_task(heartbeat())
+    try:
+        yield True
+    except asyncio.CancelledError:
+        if not lost:
+            raise
+        owner.uncancel()
+        raise LockLost(f"Lock of {job_id} lost during the run")
+    finally:
+        renewer.cancel()
+        await run_in_db_thread(with_session, release_lock, job_id, holder)
+
+
+# =============================================================================
+# Runs
+# =============================================================================
+
+def enqueue_job(db: Session, job_id: str, requested_by: Optional[str] = None, source: str = "manual") -> JobRun:
+    """Queue a run, reusing a run of the same job that is still waiting."""
+    existing = db.query(JobRun).filter(JobRun.job_id == job_id, JobRun.status == "queued").first()
+    if existing:
+        return existing
+    run = JobRun(job_id=job_id, status="queued", source=source, requested_by=requested_by)
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def start_run(db: Session, job_id: str, source: str = "cron", worker: str = WORKER_ID) -> JobRun:
+    """Record a run that starts immediately (cron trigger)."""
+    run = JobRun(job_id=job_id, status="running", source=source, worker=worker, started_at=datetime.utcnow())
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def claim_next_run(db: Session, worker: str = WORKER_ID, skip_jobs: tuple = ()) -> Optional[JobRun]:
+    """Atomically move the oldest queued run to running."""
+    query = db.query(JobRun).filter(JobRun.status == "queued")
+    if skip_jobs:
+        query = query.filter(JobRun.job_id.notin_(skip_jobs))
+    for run in query.order_by(JobRun.enqueued_at, JobRun.id).limit(5).all():
+        claimed = db.query(JobRun).filter(JobRun.id == run.id, JobRun.status == "queued").update(
+            {"status": "running", "worker": worker, "started_at": datetime.utcnow()},
+            synchronize_session=False,
+        )
+        db.commit()
+        if claimed:
+            db.refresh(run)
+            return run
+    return None
+
+
+def requeue_run(db: Session, run_id: int):
+    """Put a claimed run back (job locked elsewhere)."""
+    db.query(JobRun).filter(JobRun.id == run_id).update(
+        {"status": "queued", "worker": None, "started_at": None}, synchronize_session=False,
+    )
+    db.commit()
+
+
+def recover_stale_runs(db: Session, ttl: Optional[timedelta] = None) -> int:
+    """Fail the runs left "running" by a worker that died: started more than a
+    lock TTL ago and their job's lock no longer held. Returns how many were reset."""
+    ttl = ttl or timedelta(minutes=settings.JOB_LOCK_TTL_MINUTES)
+    now = datetime.utcnow()
+    live_jobs = db.query(JobLock.job_id).filter(JobLock.expires_at >= now)
+    recovered = db.query(JobRun).filter(
+        JobRun.status == "running",
+        or_(JobRun.started_at.is_(None), JobRun.started_at < now - ttl),
+        JobRun.job_id.notin_(live_jobs),
+    ).update(
+        {"status": "failed", "error": "Interrupted: worker stopped during the run", "finished_at": now},
+        synchronize_session=False,
+    )
+    db.commit()
+    return recovered
+
+
+def finish_run(db: Session, run_id: int, error: Optional[str] = None):
+    db.query(JobRun).filter(JobRun.id == run_id).update(
+        {"status": "failed" if error else "done", "error": error, "finished_at": datetime.utcnow()},
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def recent_runs(db: Session, limit: int = 20) -> List[dict]:
+    runs = db.query(JobRun).order_by(JobRun.id.desc()).limit(limit).all()
+    return [
+        {
+            "id": r.id,
+            "job_id": r.job_id,
+            "status": r.status,
+            "source": r.source,
+            "requested_by": r.requested_by,
+            "worker": r.worker,
+            "error": r.error,
+            "enqueued_at": r.enqueued_at.isoformat() if r.enqueued_at else None,
+            "started_at": r.started_at.isoformat() if r.started_at else None,
+            "finished_at": r.finished_at.isoformat() if r.finished_at else None,
+        }
+        for r in runs
+    ]
+
+
+def active_locks(db: Session) -> List[dict]:
+    now = datetime.utcnow()
+    return [
+        {"job_id": lock.job_id, "holder": lock.holder, "expires_at": lock.expires_at.isoformat()}
+        for lock in db.query(JobLock).filter(JobLock.expires_at >= now).all()
+    ]
@@ -0,0 +1,96 @@
+"""
+Batched LLM prompts: N items analysed in one request.
+
+The single-item prompt stays the source of truth for the expected JSON; the
+batch wrapper asks for one such object per item, tagged with its index, under
+{"results": [...]} (Mistral's json_object mode needs an object at the top).
+parse_batch maps the answer back by index and keeps every complete object of
+a truncated answer, so one bad item only sends that item to the single path.
+"""
+import json
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+BATCH_PROMPT = """Tu vas analyser {count} {noun} INDEPENDAMMENT les unes des autres.
+Pour CHAQUE element de la liste ci-dessous, applique les consignes d'analyse et produis l'objet JSON decrit.
+Les champs entre <voir element> sont donnes dans chaque element de la liste.
+
+Retourne UNIQUEMENT un JSON valide (pas de markdown, pas de commentaire, pas de ```) de la forme :
+{{"results": [{{"index": <index de l'element>, ...champs de l'analyse...}}, ...]}}
+avec exactement {count} objets, un par element, dans l'ordre des index.
+
+=== CONSIGNES D'ANALYSE (pour UN element) ===
+{instructions}
+
+=== ELEMENTS A ANALYSER ===
+{items_json}"""
+
+PLACEHOLDER = "<voir element>"
+
+
+def build_batch_prompt(instructions: str, items: List[dict], noun: str) -> str:
+    """`instructions` is the single-item prompt already formatted with PLACEHOLDER;
+    `items` are the per-item fields (an "index" key is added)."""
+    payload = [{"index": i, **item} for i, item in enumerate(items)]
+    return BATCH_PROMPT.format(
+        count=len(items),
+        noun=noun,
+        instructions=instructions,
+        items_json=json.dumps(payload, ensure_ascii=False, indent=1),
+    )
+
+
+def _strip_fences(text: str) -> str:
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1]
+    if text.endswith("```"):
+        text = text.rsplit("```", 1)[0]
+    return text.strip()
+
+
+def _salvage_objects(text: str) -> List[dict]:
+    """Complete objects of a truncated {"results": [...]} answer."""
+    decoder = json.JSONDecoder()
+    start = text.find("[")
+    pos = start + 1 if start >= 0 else len(text)
+    objects = []
+    while True:
+        pos = text.find("{", pos)
+        if pos < 0:
+            break
+        try:
+            obj, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break
+        objects.append(obj)
+    return objects
+
+
+def parse_batch(text: str, count: int) -> Dict[int, dict]:
+    """index -> raw analysis dict for the items that came back intact."""
+    text = _strip_fences(text)
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = _salvage_objects(text)
+        logger.warning(f"Batch answer truncated or invalid, kept {len(data)}/{count} items")
+    if isinstance(data, dict):
+        data = data.get("results", data.get("items", []))
+    if not isinstance(data, list):
+        return {}
+
+    parsed: Dict[int, dict] = {}
+    for position, entry in enumerate(data):
+        if not isinstance(entry, dict):
+            continue
+        index = entry.pop("index", position)
+        try:
+            index = int(index)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < count and index not in parsed:
+            parsed[index] = entry
+    return parsed
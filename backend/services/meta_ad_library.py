@@ -13,6 +13,7 @@ from typing import Optional
 import httpx
 
 from core.config import settings
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -78,7 +79,7 @@ class MetaAdLibraryService:
             "limit": 25,
         }
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with http_client(timeout=30) as client:
                 resp = await client.get(url, params=params)
                 resp.raise_for_status()
                 data = resp.json()
@@ -130,7 +131,7 @@ class MetaAdLibraryService:
             }
 
             try:
-                async with httpx.AsyncClient(timeout=60) as client:
+                async with http_client(timeout=60) as client:
                     resp = await client.get(url, params=params)
                     resp.raise_for_status()
                     data = resp.json()
@@ -193,7 +194,7 @@ class MetaAdLibraryService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=60) as client:
+            async with http_client(timeout=60) as client:
                 resp = await client.get(url, params=params)
                 resp.raise_for_status()
                 data = resp.json()
@@ -233,7 +234,7 @@ class MetaAdLibraryService:
             return None
 
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with http_client(timeout=30) as client:
                 resp = await client.get(
                     "https://www.searchapi.io/api/v1/search",
                     params={
@@ -285,7 +286,7 @@ class MetaAdLibraryService:
         sample = random.sample(ads, min(sample_size, len(ads)))
         payers = {}
 
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_client(timeout=30) as client:
             for i, ad in enumerate(sample):
                 ad_id = ad.get("id")
                 if not ad_id:
@@ -402,7 +403,7 @@ class MetaAdLibraryService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with http_client(timeout=30) as client:
                 resp = await client.get(url, params=params)
                 resp.raise_for_status()
                 data = resp.json()
@@ -460,7 +461,7 @@ class MetaAdLibraryService:
         if not self.searchapi_key:
             return []
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with http_client(timeout=30) as client:
                 resp = await client.get(
                     "https://www.searchapi.io/api/v1/search",
                     params={
@@ -486,7 +487,7 @@ class MetaAdLibraryService:
             import urllib.parse
             all_ads = []
             next_token = None
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with http_client(timeout=30) as client:
                 for _ in range(50):  # Max 50 pages
                     params = {
                         "engine": "meta_ad_library",
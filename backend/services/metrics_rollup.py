@@ -0,0 +1,207 @@
+"""
+Daily channel metrics rollup (competitor_daily_metrics table).
+
+Dashboards need each competitor's latest Instagram / TikTok / YouTube /
+store / Snapchat values and the values N days ago. Recomputing them from the
+raw *_data history costs more as history grows, so each competitor gets one
+row per day with collected data, carrying forward the latest known value of
+every channel as of the end of that day.
+
+The table is maintained on ingest: a session hook collects the metric rows
+added in a flush and rebuilds the affected competitor-days (normally just
+today) in the same transaction, starting from the competitor's previous
+rollup row, so ingest cost does not depend on the raw history. Readers pick
+one row per competitor.
+"""
+import logging
+from datetime import date, datetime, time as dt_time
+from types import SimpleNamespace
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from database import (
+    AppData, CompetitorDailyMetric, InstagramData, SnapchatData, TikTokData, YouTubeData,
+)
+
+logger = logging.getLogger(__name__)
+
+# prefix -> (dashboard channel name, model, store filter, fields)
+CHANNELS = {
+    "ig": ("instagram", InstagramData, None,
+           ("followers", "posts_count", "engagement_rate", "avg_likes", "avg_comments")),
+    "tt": ("tiktok", TikTokData, None, ("followers", "likes", "videos_count")),
+    "yt": ("youtube", YouTubeData, None, ("subscribers", "total_views", "videos_count", "engagement_rate")),
+    "ps": ("playstore", AppData, "playstore",
+           ("app_name", "rating", "reviews_count", "downloads", "downloads_numeric", "version")),
+    "as": ("appstore", AppData, "appstore",
+           ("app_name", "rating", "reviews_count", "downloads", "downloads_numeric", "version")),
+    "snap": ("snapchat", SnapchatData, None, ("subscribers", "engagement_rate", "spotlight_count")),
+}
+METRIC_TABLES = sorted({model.__tablename__ for _, model, _, _ in CHANNELS.values()})
+TRACKED_MODELS = (InstagramData, TikTokData, YouTubeData, AppData, SnapchatData)
+REBUILD_CHUNK = 50  # competitors per rebuild pass (bounds memory on full backfills)
+METRIC_COLUMNS = [
+    f"{prefix}_{f}" for prefix, (_, _, _, fields) in CHANNELS.items() for f in (*fields, "recorded_at")
+]
+
+
+def _channel_filters(model, store, competitor_ids):
+    filters = [model.competitor_id.in_(competitor_ids)]
+    if store is not None:
+        filters.append(model.store == store)
+    return filters
+
+
+def rebuild_daily_metrics(conn, competitor_ids: list[int], day_from: date = None) -> int:
+    """Recompute the rollup rows of these competitors from day_from on (all days if None).
+
+    Works on a Session or a Connection; the caller commits. Returns the number
+    of rows written.
+    """
+    written = 0
+    ids = sorted(set(competitor_ids))
+    for i in range(0, len(ids), REBUILD_CHUNK):
+        written += _rebuild_chunk(conn, ids[i:i + REBUILD_CHUNK], day_from)
+    return written
+
+
+def _rebuild_chunk(conn, comp_ids: list[int], day_from: date | None) -> int:
+    since = datetime.combine(day_from, dt_time.min) if day_from else None
+    state = {cid: {} for cid in comp_ids}
+    events = []  # (competitor_id, recorded_at, prefix, row)
+    # Values carried into day_from: the rollup row just before it already holds
+    # them; only competitors without one fall back to the raw history
+    unseeded = _seed_from_rollup(conn, state, day_from) if since is not None else []
+
+    for prefix, (_, model, store, fields) in CHANNELS.items():
+        columns = [model.competitor_id, model.recorded_at, *[getattr(model, f) for f in fields]]
+        filters = _channel_filters(model, store, comp_ids)
+
+        if unseeded:
+            rn = func.row_number().over(
+                partition_by=model.competitor_id, order_by=model.recorded_at.desc(),
+            ).label("rn")
+            inner = select(*columns, rn).where(
+                *_channel_filters(model, store, unseeded), model.recorded_at < since,
+            ).subquery()
+            for row in conn.execute(select(inner).where(inner.c.rn == 1)):
+                _apply(state[row.competitor_id], prefix, fields, row)
+
+        stmt = select(*columns).where(*filters, model.recorded_at.isnot(None))
+        if since is not None:
+            stmt = stmt.where(model.recorded_at >= since)
+        events.extend((r.competitor_id, r.recorded_at, prefix, r) for r in conn.execute(stmt))
+
+    events.sort(key=lambda e: (e[0], e[1]))
+    rows = []
+    current = None  # (competitor_id, day)
+    for comp_id, recorded_at, prefix, row in events:
+        key = (comp_id, recorded_at.date())
+        if current is not None and key != current:
+            rows.append(_row(current, state[current[0]]))
+        current = key
+        _apply(state[comp_id], prefix, CHANNELS[prefix][3], row)
+    if current is not None:
+        rows.append(_row(current, state[current[0]]))
+
+    stale = delete(CompetitorDailyMetric).where(CompetitorDailyMetric.competitor_id.in_(comp_ids))
+    if day_from is not None:
+        stale = stale.where(CompetitorDailyMetric.day >= day_from)
+    conn.execute(stale)
+    if rows:
+        conn.execute(insert(CompetitorDailyMetric), rows)
+    return len(rows)
+
+
+def _seed_from_rollup(conn, state: dict, day_from: date) -> list[int]:
+    """Load the last rollup row before day_from into state; returns the competitors without one."""
+    rn = func.row_number().over(
+        partition_by=CompetitorDailyMetric.competitor_id, order_by=CompetitorDailyMetric.day.desc(),
+    ).label("rn")
+    inner = select(*CompetitorDailyMetric.__table__.c, rn).where(
+        CompetitorDailyMetric.competitor_id.in_(list(state)), CompetitorDailyMetric.day < day_from,
+    ).subquery()
+    seeded = set()
+    for row in conn.execute(select(inner).where(inner.c.rn == 1)):
+        state[row.competitor_id].update({c: getattr(row, c) for c in METRIC_COLUMNS})
+        seeded.add(row.competitor_id)
+    return [cid for cid in state if cid not in seeded]
+
+
+def _apply(values: dict, prefix: str, fields: tuple, row):
+    for f in fields:
+        values[f"{prefix}_{f}"] = getattr(row, f)
+    values[f"{prefix}_recorded_at"] = row.recorded_at
+
+
+def _row(key: tuple, values: dict) -> dict:
+    comp_id, day = key
+    row = {"competitor_id": comp_id, "day": day, "updated_at": datetime.utcnow()}
+    row.update({c: values.get(c) for c in METRIC_COLUMNS})
+    return row
+
+
+# ─── Ingest hook (registered on Session in database.py) ─────────────
+
+def collect_flushed(session: Session):
+    """after_flush: remember the metric rows inserted by this flush."""
+    added = [obj for obj in session.new if isinstance(obj, TRACKED_MODELS)]
+    if added:
+        session.info.setdefault("pending_metric_rows", []).extend(added)
+
+
+def apply_pending(session: Session):
+    """after_flush_postexec: rebuild the competitor-days touched by the flush."""
+    added = session.info.pop("pending_metric_rows", None)
+    if not added:
+        return
+    first_day: dict[int, date] = {}
+    for obj in added:
+        if obj.competitor_id is None:
+            continue
+        day = (obj.recorded_at or datetime.utcnow()).date()
+        first_day[obj.competitor_id] = min(day, first_day.get(obj.competitor_id, day))
+
+    by_day: dict[date, list[int]] = {}
+    for comp_id, day in first_day.items():
+        by_day.setdefault(day, []).append(comp_id)
+    conn = session.connection()
+    for day, comp_ids in by_day.items():
+        rebuild_daily_metrics(conn, comp_ids, day_from=day)
+
+
+# ─── Readers ────────────────────────────────────────────────────────
+
+def load_channel_metrics(db: Session, competitor_ids: list[int], as_of: datetime = None) -> dict[str, dict]:
+    """Latest channel values per competitor, as of the end of as_of's day (now if None).
+
+    Returns {channel: {competitor_id: record}} for instagram, tiktok, youtube,
+    playstore, appstore and snapchat; records expose the raw model's attribute
+    names (followers, rating, ..., recorded_at). Competitors without data on a
+    channel are absent from that channel's map. One query whatever the history.
+    """
+    result = {name: {} for name, _, _, _ in CHANNELS.values()}
+    if not competitor_ids:
+        return result
+
+    rn = func.row_number().over(
+        partition_by=CompetitorDailyMetric.competitor_id,
+        order_by=CompetitorDailyMetric.day.desc(),
+    ).label("rn")
+    filters = [CompetitorDailyMetric.competitor_id.in_(competitor_ids)]
+    if as_of is not None:
+        filters.append(CompetitorDailyMetric.day <= as_of.date())
+    inner = select(*CompetitorDailyMetric.__table__.c, rn).where(*filters).subquery()
+
+    for row in db.execute(select(inner).where(inner.c.rn == 1)):
+        for prefix, (name, _, _, fields) in CHANNELS.items():
+            recorded_at = getattr(row, f"{prefix}_recorded_at")
+            if recorded_at is None:
+                continue
+            result[name][row.competitor_id] = SimpleNamespace(
+                competitor_id=row.competitor_id,
+                recorded_at=recorded_at,
+                **{f: getattr(row, f"{prefix}_{f}") for f in fields},
+            )
+    return result
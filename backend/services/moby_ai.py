@@ -10,9 +10,9 @@ import os
 import re
 from typing import Optional
 
-import httpx
 
 from core.config import settings
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -141,7 +141,7 @@ class MobyService:
             },
         }
 
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with http_client(timeout=20) as client:
             response = await client.post(url, json=payload)
             response.raise_for_status()
             body = response.json()
@@ -173,7 +173,7 @@ class MobyService:
             "temperature": 0.2,
         }
 
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with http_client(timeout=20) as client:
             response = await client.post(MISTRAL_API_URL, headers=headers, json=payload)
             response.raise_for_status()
             body = response.json()
@@ -0,0 +1,131 @@
+"""
+Monthly range partitioning of the metric history tables (PostgreSQL only).
+
+instagram_data, tiktok_data, youtube_data, app_data, snapchat_data and
+ad_snapshots only grow. Partitioned by month on recorded_at, time-bounded
+queries scan only the partitions they touch, and old months can be detached
+or dropped without a bulk DELETE.
+
+Opt-in with HISTORY_PARTITIONING=true: init_db converts each plain table once
+(rename, create the partitioned table, copy, drop the old one; one
+transaction per table, which locks it while the rows are copied). The monthly
+scheduler job then creates the partitions of the coming months ahead of time;
+rows outside every monthly partition land in the table's DEFAULT partition.
+"""
+import logging
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TABLES = ("instagram_data", "tiktok_data", "youtube_data", "app_data", "snapchat_data", "ad_snapshots")
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def month_ranges(start: date, end: date) -> list[tuple[str, date, date]]:
+    """(suffix, from, to) of each month from start's month to end's month, inclusive."""
+    ranges = []
+    current = date(start.year, start.month, 1)
+    while current <= end:
+        nxt = _add_months(current, 1)
+        ranges.append((f"y{current.year}m{current.month:02d}", current, nxt))
+        current = nxt
+    return ranges
+
+
+def _is_partitioned(conn, table: str) -> bool:
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :t AND pg_table_is_visible(c.oid)"
+    ), {"t": table}).first())
+
+
+def _create_partition(conn, table: str, suffix: str, lo: date, hi: date) -> bool:
+    name = f"{table}_{suffix}"
+    if conn.execute(text("SELECT to_regclass(:n)"), {"n": name}).scalar():
+        return False
+    conn.execute(text(
+        f'CREATE TABLE "{name}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+    ))
+    return True
+
+
+def _convert_table(conn, table: str, months_ahead: int):
+    """Swap a plain history table for a monthly-partitioned copy of it."""
+    from database import Base
+
+    legacy = f"{table}_legacy"
+    model_table = Base.metadata.tables[table]
+    seq = conn.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table}).scalar()
+
+    conn.execute(text(f'ALTER TABLE "{table}" RENAME TO "{legacy}"'))
+    # The partition key has to be part of the primary key, so it cannot be NULL
+    conn.execute(text(f'UPDATE "{legacy}" SET recorded_at = NOW() WHERE recorded_at IS NULL'))
+    conn.execute(text(
+        f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS) PARTITION BY RANGE (recorded_at)'
+    ))
+    # "<table>_pkey" still belongs to the renamed table until it is dropped
+    conn.execute(text(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_part_pkey" PRIMARY KEY (id, recorded_at)'))
+    conn.execute(text(
+        f'ALTER TABLE "{table}" ADD FOREIGN KEY (competitor_id) REFERENCES competitors (id)'
+    ))
+    conn.execute(text(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT'))
+
+    first = conn.execute(text(f'SELECT MIN(recorded_at) FROM "{legacy}"')).scalar()
+    today = datetime.utcnow().date()
+    for suffix, lo, hi in month_ranges(first.date() if first else today, _add_months(today, months_ahead)):
+        _create_partition(conn, table, suffix, lo, hi)
+
+    conn.execute(text(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"'))
+    if seq:
+        conn.execute(text(f"ALTER SEQUENCE {seq} OWNED BY \"{table}\".id"))
+    conn.execute(text(f'DROP TABLE "{legacy}"'))
+    # Dropping the old table dropped its indexes: recreate the model's ones
+    for index in model_table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def partition_history_tables(engine, months_ahead: int = None) -> list[str]:
+    """Convert the history tables that are not partitioned yet. Returns the converted tables."""
+    months_ahead = settings.HISTORY_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    converted = []
+    for table in HISTORY_TABLES:
+        with engine.begin() as conn:
+            if _is_partitioned(conn, table):
+                continue
+            logger.info(f"Partitioning {table} by month")
+            _convert_table(conn, table, months_ahead)
+            converted.append(table)
+    return converted
+
+
+def ensure_history_partitions(engine, months_ahead: int = None) -> int:
+    """Create the monthly partitions up to months_ahead months from now. Returns the number created.
+
+    A month whose rows already sit in the DEFAULT partition cannot be created;
+    it is logged and skipped (those rows stay readable in the default partition).
+    """
+    if engine.dialect.name != "postgresql":
+        return 0
+    months_ahead = settings.HISTORY_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    today = datetime.utcnow().date()
+    created = 0
+    for table in HISTORY_TABLES:
+        with engine.connect() as conn:
+            if not _is_partitioned(conn, table):
+                continue
+        for suffix, lo, hi in month_ranges(today, _add_months(today, months_ahead)):
+            try:
+                with engine.begin() as conn:
+                    created += _create_partition(conn, table, suffix, lo, hi)
+            except Exception as e:
+                logger.warning(f"Partition {table}_{suffix} not created: {e}")
+    return created
@@ -0,0 +1,185 @@
+"""
+Cache de réponses API à deux niveaux.
+- LRUCache : mémoire, borné en nombre d'entrées et en octets.
+- SQLiteResponseCache : disque (SQLite WAL), borné en octets, partagé entre
+  processus (API, scheduler, MCP) via un même fichier.
+
+Les deux niveaux stockent (data, stored_at) ; la fraîcheur (TTL, stale) est
+décidée par l'appelant.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Entry = Tuple[dict, float]  # (data, stored_at)
+
+
+def _payload_size(data: dict) -> int:
+    return len(json.dumps(data, separators=(",", ":"), default=str))
+
+
+class LRUCache:
+    """Cache mémoire LRU borné (entrées + octets). Interface type dict : key -> (data, stored_at)."""
+
+    def __init__(self, max_entries: int = 2000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[dict, float, int]]" = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def __getitem__(self, key: str) -> Entry:
+        data, stored_at, _ = self._entries[key]
+        self._entries.move_to_end(key)
+        return data, stored_at
+
+    def get(self, key: str) -> Optional[Entry]:
+        return self[key] if key in self._entries else None
+
+    def __setitem__(self, key: str, entry: Entry):
+        data, stored_at = entry
+        size = _payload_size(data)
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[2]
+        self._entries[key] = (data, stored_at, size)
+        self.bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def __delitem__(self, key: str):
+        self.bytes -= self._entries.pop(key)[2]
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+        self.evictions = 0
+
+
+class SQLiteResponseCache:
+    """Cache disque borné en octets, éviction par dernier accès.
+
+    Le volume est suivi par un compteur en mémoire : le SUM(size) complet n'est
+    recalculé qu'au dépassement du budget, ce qui resynchronise aussi les
+    écritures des autres processus.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 200 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, data TEXT NOT NULL, stored_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed ON responses (accessed_at)")
+            self._bytes = self._total_size(conn)
+
+    @staticmethod
+    def _total_size(conn) -> int:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path, timeout=5, isolation_level=None))
+
+    def get(self, key: str) -> Optional[Entry]:
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute("SELECT data, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if not row:
+                    return None
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return json.loads(row[0]), row[1]
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Response cache read error: {e}")
+            return None
+
+    def set(self, key: str, data: dict, stored_at: float):
+        payload = json.dumps(data, separators=(",", ":"), default=str)
+        try:
+            with self._lock, self._connect() as conn:
+                previous = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, stored_at, time.time(), len(payload)),
+                )
+                self._bytes += len(payload) - (previous[0] if previous else 0)
+                if self._bytes > self.max_bytes:
+                    self._evict(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache write error: {e}")
+
+    def _evict(self, conn):
+        total = self._bytes = self._total_size(conn)
+        if total <= self.max_bytes:
+            return
+        # Supprime les entrées les moins récemment lues jusqu'à repasser sous 90 % du budget
+        target = total - int(self.max_bytes * 0.9)
+        freed, keys = 0, []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            keys.append(key)
+            freed += size
+            if freed >= target:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k in keys])
+        self._bytes -= freed
+        self.evictions += len(keys)
+
+    def delete(self, key: str):
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            if row:
+                self._bytes -= row[0]
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+        self._bytes = 0
+        self.evictions = 0
+
+    def stats(self) -> Dict:
+        try:
+            with self._connect() as conn:
+                count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        except sqlite3.Error:
+            count, size = 0, 0
+        return {"size": count, "bytes": size, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+def open_disk_cache(path, max_bytes: int) -> Optional[SQLiteResponseCache]:
+    """Ouvre le cache disque, ou None (cache mémoire seul) si le fichier est inutilisable.
+
+    Appelé à l'import des clients API : un répertoire en lecture seule ne doit
+    pas empêcher l'application de démarrer.
+    """
+    if not path:
+        return None
+    try:
+        return SQLiteResponseCache(path, max_bytes=max_bytes)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Response cache disabled, {path} not usable: {e}")
+        return None
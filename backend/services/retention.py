@@ -0,0 +1,209 @@
+"""
+Retention and downsampling of the raw metric history.
+
+The *_data history tables, ad_snapshots and google_trends_data keep one row
+per collection forever. Dashboards read the rollups (competitor_daily_metrics,
+ad_daily_stats), signals only look back a couple of weeks, so old raw rows are
+thinned out by age:
+
+- the last RETENTION_DAILY_DAYS days (today excluded): last row per day
+- then until RETENTION_WEEKLY_DAYS: last row per week
+- older: last row per month
+
+per series (competitor, store, keyword or ad). Zone bounds are aligned on
+Mondays / first days of month so a bucket never straddles two zones, which
+makes the monthly rows final. In those final rows, app_data description and
+changelog are set to NULL when unchanged since the previous row of the series
+(the oldest row of a run keeps the text; the latest row is never touched).
+
+Rollups already computed from raw rows are kept as they are; rebuilding them
+from raw (competitor merge) only sees the retained rows.
+
+Runs weekly from the scheduler; RETENTION_DRY_RUN only reports the rows and
+bytes that would be reclaimed.
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import String, Text, delete, func, literal, select, update
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.utils import date_bucket
+from database import (
+    AdSnapshot, AppData, GoogleTrendsData, InstagramData, SnapchatData, SystemSetting, TikTokData, YouTubeData,
+)
+
+logger = logging.getLogger(__name__)
+
+REPORT_KEY = "retention_report"
+
+# table -> (model, series key columns, time column, large text columns deduplicated)
+POLICIES = {
+    "instagram_data": (InstagramData, ("competitor_id",), "recorded_at", ()),
+    "tiktok_data": (TikTokData, ("competitor_id",), "recorded_at", ()),
+    "youtube_data": (YouTubeData, ("competitor_id",), "recorded_at", ()),
+    "snapchat_data": (SnapchatData, ("competitor_id",), "recorded_at", ()),
+    "app_data": (AppData, ("competitor_id", "store"), "recorded_at", ("description", "changelog")),
+    "ad_snapshots": (AdSnapshot, ("ad_id",), "recorded_at", ()),
+    "google_trends_data": (GoogleTrendsData, ("competitor_id", "keyword"), "date", ()),  # date: "YYYY-MM-DD"
+}
+ROW_OVERHEAD = 24  # tuple header + item pointer, bytes
+FIXED_WIDTH = 8  # numeric / datetime columns, bytes
+CHUNK_SIZE = 500
+
+
+def retention_zones(now: datetime, daily_days: int, weekly_days: int) -> list[tuple[str, datetime | None, datetime]]:
+    """(interval, from, to) of the day / week / month zones, newest first."""
+    today = datetime(now.year, now.month, now.day)
+    daily_from = today - timedelta(days=daily_days)
+    daily_from -= timedelta(days=daily_from.weekday())  # Monday
+    weekly_from = today - timedelta(days=max(weekly_days, daily_days))
+    weekly_from = min(datetime(weekly_from.year, weekly_from.month, 1), daily_from)
+    return [("day", daily_from, today), ("week", weekly_from, daily_from), ("month", None, weekly_from)]
+
+
+def _bound(model, ts_name: str, value: datetime):
+    # google_trends_data.date is an ISO string, compared as text
+    if isinstance(getattr(model, ts_name).type, String):
+        return value.strftime("%Y-%m-%d")
+    return value
+
+
+def _excess_ids(dialect: str, model, keys: tuple, ts_name: str, interval: str, lo, hi):
+    """ids of the rows of a zone that are not the latest of their series and bucket."""
+    ts = getattr(model, ts_name)
+    filters = [ts < _bound(model, ts_name, hi)]
+    if lo is not None:
+        filters.append(ts >= _bound(model, ts_name, lo))
+    bucket = date_bucket(dialect, ts, interval)
+    rn = func.row_number().over(
+        partition_by=[*[getattr(model, k) for k in keys], bucket],
+        order_by=[ts.desc(), model.id.desc()],
+    )
+    inner = select(model.id.label("id"), rn.label("rn")).where(*filters).subquery()
+    return select(inner.c.id).where(inner.c.rn > 1)
+
+
+def _row_bytes(model):
+    """Approximate stored size of a row: text lengths + fixed-width columns + overhead."""
+    columns = list(model.__table__.c)
+    texts = [c for c in columns if isinstance(c.type, (String, Text))]
+    size = literal(ROW_OVERHEAD + FIXED_WIDTH * (len(columns) - len(texts)))
+    for c in texts:
+        size = size + func.coalesce(func.length(c), 0)
+    return size
+
+
+def _dedupe_text(db: Session, model, keys: tuple, ts_name: str, columns: tuple, before: datetime,
+                 excluded, dry_run: bool) -> dict:
+    """NULL the text columns of final rows whose value did not change since the previous row."""
+    ts = getattr(model, ts_name)
+    key_cols = [getattr(model, k) for k in keys]
+    # Only series still collected: their latest row is newer than `before`
+    live = {tuple(r) for r in db.execute(select(*key_cols).where(ts >= before).distinct())}
+    stmt = (
+        select(model.id, *key_cols, *[getattr(model, c) for c in columns])
+        .where(ts < before, model.id.notin_(excluded))
+        .order_by(*key_cols, ts, model.id)
+        .execution_options(yield_per=CHUNK_SIZE)
+    )
+    to_null = {c: [] for c in columns}
+    reclaimed = 0
+    series, last = None, {}
+    for row in db.execute(stmt):
+        key = tuple(getattr(row, k) for k in keys)
+        if key != series:
+            series, last = key, {}
+        if key not in live:
+            continue
+        for c in columns:
+            value = getattr(row, c)
+            if value is None:
+                continue
+            if value == last.get(c):
+                to_null[c].append(row.id)
+                reclaimed += len(value.encode())
+            else:
+                last[c] = value
+
+    if not dry_run:
+        for c, ids in to_null.items():
+            for i in range(0, len(ids), CHUNK_SIZE):
+                db.execute(update(model).where(model.id.in_(ids[i:i + CHUNK_SIZE])).values({c: None}))
+    return {"values": sum(len(ids) for ids in to_null.values()), "bytes": reclaimed}
+
+
+def apply_retention(db: Session, dry_run: bool = None, now: datetime = None) -> dict:
+    """Downsample every table of POLICIES (and dedupe its text columns); commits per table.
+
+    Returns the report: per table, the rows and bytes reclaimed (or that would
+    be, with dry_run) per zone and by text deduplication.
+    """
+    dry_run = settings.RETENTION_DRY_RUN if dry_run is None else dry_run
+    now = now or datetime.utcnow()
+    dialect = db.get_bind().dialect.name
+    zones = retention_zones(now, settings.RETENTION_DAILY_DAYS, settings.RETENTION_WEEKLY_DAYS)
+    report = {
+        "run_at": now.isoformat(),
+        "dry_run": dry_run,
+        "zones": {interval: [lo.date().isoformat() if lo else None, hi.date().isoformat()]
+                  for interval, lo, hi in zones},
+        "tables": {},
+        "total_rows": 0,
+        "total_bytes": 0,
+    }
+
+    for table, (model, keys, ts_name, text_columns) in POLICIES.items():
+        entry = {"rows": 0, "bytes": 0, "by_zone": {}}
+        for interval, lo, hi in zones:
+            excess = _excess_ids(dialect, model, keys, ts_name, interval, lo, hi)
+            rows, size = db.execute(
+                select(func.count(model.id), func.coalesce(func.sum(_row_bytes(model)), 0))
+                .where(model.id.in_(excess))
+            ).one()
+            entry["by_zone"][interval] = {"rows": rows, "bytes": int(size)}
+            entry["rows"] += rows
+            entry["bytes"] += int(size)
+            if rows and not dry_run:
+                db.execute(delete(model).where(model.id.in_(excess)).execution_options(synchronize_session=False))
+
+        if text_columns:
+            interval, lo, hi = zones[-1]
+            excess = _excess_ids(dialect, model, keys, ts_name, interval, lo, hi)
+            entry["text_dedupe"] = _dedupe_text(db, model, keys, ts_name, text_columns, hi, excess, dry_run)
+            entry["bytes"] += entry["text_dedupe"]["bytes"]
+
+        if not dry_run:
+            db.commit()
+        report["tables"][table] = entry
+        report["total_rows"] += entry["rows"]
+        report["total_bytes"] += entry["bytes"]
+
+    _save_report(db, report)
+    db.commit()
+    logger.info(
+        f"Retention {'dry run' if dry_run else 'run'}: {report['total_rows']} rows, "
+        f"{report['total_bytes']} bytes {'reclaimable' if dry_run else 'reclaimed'}"
+    )
+    return report
+
+
+def _save_report(db: Session, report: dict):
+    row = db.query(SystemSetting).filter(SystemSetting.key == REPORT_KEY).first()
+    if row:
+        row.value = json.dumps(report)
+    else:
+        db.add(SystemSetting(key=REPORT_KEY, value=json.dumps(report)))
+
+
+def get_last_report(db: Session) -> dict | None:
+    """Report of the last retention run (dry or not)."""
+    row = db.query(SystemSetting).filter(SystemSetting.key == REPORT_KEY).first()
+    if row and row.value:
+        try:
+            return json.loads(row.value)
+        except ValueError:
+            pass
+    return None
@@ -2,15 +2,19 @@
 Scheduler service for automated data collection.
 Uses APScheduler for daily background jobs.
 """
+import asyncio
+import json
 import logging
 from datetime import datetime
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy.orm import Session
 
-from database import SessionLocal, Competitor, AppData, InstagramData, TikTokData, YouTubeData, Ad, SnapchatData, GoogleTrendsData, GoogleNewsArticle
+from database import SessionLocal, SystemSetting, run_in_db_thread, Competitor, AppData, InstagramData, TikTokData, YouTubeData, Ad, SnapchatData
 from core.config import settings
 from core.trends import parse_download_count
+from services.collection import provider_limiter, record_failure, timed_source
+from services.ad_ingestion import upsert_ads
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +24,27 @@ class DataCollectionScheduler:
 
     def __init__(self):
         self.scheduler = AsyncIOScheduler()
+        self.last_collection_summary: dict | None = None
         self._setup_jobs()
+        # job id -> coroutine function, used by the worker to run enqueued jobs
+        self.job_functions = {job.id: job.func for job in self.scheduler.get_jobs()}
+        self.job_functions["all"] = self.run_all
+        # task_type -> (idempotent per-item handler, pause between items in seconds)
+        self.task_handlers = {
+            "social_analysis": (self._analyze_post_task, 0.0),
+            "gmb_enrichment": (self._enrich_store_task, 1.1),
+            "ereputation_audit": (self._ereputation_audit_task, 2.0),
+        }
+        # task_type -> batch drainer (replaces the per-item loop)
+        self.task_pipelines = {
+            "creative_analysis": self._drain_creative_pipeline,
+        }
+        # task_type -> batch step run on each leased batch before the per-item handler;
+        # returns {item_key: error} for items it could not process
+        self.task_batch_steps = {
+            "social_analysis": self._analyze_posts_batch,
+        }
+        self._draining: set[str] = set()
 
     def _setup_jobs(self):
         """Configure all scheduled jobs."""
@@ -150,9 +174,33 @@ class DataCollectionScheduler:
             replace_existing=True
         )
 
+        # Weekly retention / downsampling of the raw metric history (Sunday 5 AM)
+        self.scheduler.add_job(
+            self.weekly_history_retention,
+            CronTrigger(day_of_week="sun", hour=5, minute=0),
+            id="weekly_history_retention",
+            name="Weekly History Retention",
+            replace_existing=True
+        )
+
+        # Monthly partitions of the history tables (PostgreSQL, HISTORY_PARTITIONING)
+        self.scheduler.add_job(
+            self.monthly_history_partitions,
+            CronTrigger(day=20, hour=4, minute=30),
+            id="monthly_history_partitions",
+            name="Monthly History Partitions",
+            replace_existing=True
+        )
+
     async def start(self):
-        """Start the scheduler."""
+        """Start the cron triggers (worker process only).
+
+        Each trigger goes through run_job so cron runs take the same DB lock and
+        leave the same job_runs trace as manual runs.
+        """
         if settings.SCHEDULER_ENABLED:
+            for job in self.scheduler.get_jobs():
+                self.scheduler.modify_job(job.id, func=self.run_job, args=[job.id])
             self.scheduler.start()
             logger.info(
                 f"Scheduler started. Daily collection at "
@@ -167,24 +215,153 @@ class DataCollectionScheduler:
             self.scheduler.shutdown(wait=True)
             logger.info("Scheduler stopped")
 
+    async def run_job(self, job_id: str, run_id: int | None = None, source: str = "cron") -> bool:
+        """Run a job under its DB lock and record the run.
+
+        run_id is the queued JobRun claimed by the worker (manual trigger); cron
+        runs create their own. Returns False if another process holds the lock.
+        """
+        from services import jobs
+
+        func = self.job_functions.get(job_id)
+        if func is None:
+            raise ValueError(f"Unknown job: {job_id}")
+
+        try:
+            async with jobs.job_lock(job_id) as acquired:
+                if not acquired:
+                    logger.info(f"Job {job_id} already running elsewhere, skipped")
+                    return False
+                if run_id is None:
+                    run = await run_in_db_thread(jobs.with_session, jobs.start_run, job_id, source)
+                    run_id = run.id
+                error = None
+                token = jobs.current_run_id.set(run_id)
+                try:
+                    await func()
+                except Exception as e:
+                    logger.error(f"Job {job_id} failed: {e}")
+                    error = str(e)
+                finally:
+                    jobs.current_run_id.reset(token)
+                await run_in_db_thread(jobs.with_session, jobs.finish_run, run_id, error)
+        except jobs.LockLost as e:
+            await run_in_db_thread(jobs.with_session, jobs.finish_run, run_id, str(e))
+        return True
+
+    async def run_all(self):
+        """Full pipeline: collection, signals, analyses, SEO/GEO/VGEO, trends, news, ASO, e-reputation."""
+        for job_id in (
+            "daily_collection", "daily_signals", "daily_creative_analysis", "daily_social_analysis",
+            "daily_seo_tracking", "daily_geo_tracking", "daily_vgeo_analysis", "daily_google_trends",
+            "daily_google_news", "daily_aso_analysis", "weekly_ereputation_audit",
+        ):
+            await self.run_job(job_id, source="all")
+
+    async def drain_tasks(self, task_type: str, max_seconds: float | None = None) -> dict:
+        """Lease and process queued items of a task type until the queue is empty
+        (or max_seconds elapsed). Items waiting for a retry backoff stay queued for
+        a later drain; each item is committed together with its done state."""
+        from services import jobs, task_queue
+
+        if task_type in self._draining:
+            return {"done": 0, "failed": 0, "skipped": True}
+        if task_type in self.task_pipelines:
+            self._draining.add(task_type)
+            try:
+                return await self.task_pipelines[task_type](max_seconds)
+            finally:
+                self._draining.discard(task_type)
+        handler, pause = self.task_handlers[task_type]
+        batch_step = self.task_batch_steps.get(task_type)
+        self._draining.add(task_type)
+
+        loop = asyncio.get_event_loop()
+        start_time = loop.time()
+        done = failed = 0
+        db = SessionLocal()
+        try:
+            while max_seconds is None or loop.time() - start_time < max_seconds:
+                batch = [(t.id, t.item_key) for t in task_queue.lease_batch(db, task_type, jobs.WORKER_ID)]
+                if not batch:
+                    break
+                batch_errors = {}
+                if batch_step:
+                    try:
+                        batch_errors = await batch_step(db, [key for _, key in batch])
+                    except Exception as e:
+                        db.rollback()
+                        logger.warning(f"{task_type} batch step failed, items go one by one: {e!r}")
+                for i, (task_id, item_key) in enumerate(batch):
+                    if max_seconds is not None and loop.time() - start_time >= max_seconds:
+                        task_queue.release(db, [tid for tid, _ in batch[i:]])
+                        logger.info(f"{task_type}: time limit reached, remaining items stay queued")
+                        break
+                    try:
+                        if item_key in batch_errors:
+                            raise RuntimeError(batch_errors[item_key])
+                        await handler(db, item_key)
+                        task_queue.complete(db, task_id)
+                        done += 1
+                    except Exception as e:
+                        db.rollback()
+                        logger.warning(f"{task_type} item {item_key} failed: {e!r}")
+                        task_queue.fail(db, task_id, str(e) or type(e).__name__)
+                        failed += 1
+                    if pause:
+                        await asyncio.sleep(pause)
+        finally:
+            self._draining.discard(task_type)
+            db.close()
+
+        logger.info(f"{task_type} drain: {done} done, {failed} failed")
+        return {"done": done, "failed": failed}
+
+    def _enqueue_tasks(self, db: Session, task_type: str, keys) -> int:
+        from services import jobs, task_queue
+        queued = task_queue.enqueue_items(db, task_type, keys, run_id=jobs.current_run_id.get())
+        logger.info(f"{task_type}: {queued} items queued")
+        return queued
+
     async def daily_data_collection(self):
-        """Run all daily data collection tasks."""
+        """Run all daily data collection tasks.
+
+        Competitors are collected concurrently (COLLECTION_CONCURRENCY in flight),
+        each worker with its own DB session; provider calls are capped per provider.
+        """
+        from services.collection import CollectionSummary, current_run, run_bounded
+
         logger.info(f"Starting daily data collection at {datetime.utcnow()}")
 
+        summary = CollectionSummary(concurrency=settings.COLLECTION_CONCURRENCY)
+        token = current_run.set(summary)
         db = SessionLocal()
         try:
-            competitors = (
-                db.query(Competitor)
-                .filter(Competitor.is_active == True)
-                .all()
-            )
+            competitor_ids = [
+                row[0] for row in
+                db.query(Competitor.id).filter(Competitor.is_active == True).all()
+            ]
+            summary.competitors_total = len(competitor_ids)
+
+            async def _collect_one(competitor_id: int):
+                worker_db = SessionLocal()
+                try:
+                    competitor = worker_db.query(Competitor).get(competitor_id)
+                    if competitor:
+                        await self._fetch_competitor_data(worker_db, competitor)
+                        summary.competitors_done += 1
+                finally:
+                    worker_db.close()
 
-            for competitor in competitors:
-                await self._fetch_competitor_data(db, competitor)
+            results = await run_bounded(competitor_ids, _collect_one, settings.COLLECTION_CONCURRENCY)
+            for cid, res in zip(competitor_ids, results):
+                if isinstance(res, Exception):
+                    summary.record_failure(str(cid), "worker", res)
 
-            logger.info(f"Daily collection completed for {len(competitors)} competitors")
+            logger.info(f"Daily collection completed for {len(competitor_ids)} competitors")
 
             # Enrich payer/beneficiary via SearchAPI.io (if configured)
+            competitors = db.query(Competitor).filter(Competitor.id.in_(competitor_ids)).all() if competitor_ids else []
             await self._enrich_payers_searchapi(db, competitors)
 
             # Enrich EU transparency data (age/gender/reach) for Meta ads
@@ -193,40 +370,50 @@ class DataCollectionScheduler:
             logger.error(f"Error in daily data collection: {e}")
         finally:
             db.close()
+            summary.finish()
+            current_run.reset(token)
+            self.last_collection_summary = summary.to_dict()
+            self._store_last_collection(self.last_collection_summary)
+            logger.info(
+                f"Collection run: {summary.competitors_done}/{summary.competitors_total} competitors "
+                f"in {summary.wall_clock_seconds:.1f}s, {len(summary.failures)} failures, "
+                f"per source: { {k: round(v, 1) for k, v in summary.source_seconds.items()} }"
+            )
 
     async def _fetch_competitor_data(self, db: Session, competitor: Competitor):
-        """Fetch all data sources for a single competitor."""
+        """Fetch all data sources for a single competitor (timed per source)."""
         name = competitor.name
 
-        # Facebook/Instagram ads
-        await self._fetch_ads(db, competitor, name)
-
+        # (source label, provider cap, fetcher) — ads handles its own provider slots
+        sources = [("ads", None, self._fetch_ads)]
         if competitor.playstore_app_id:
-            await self._fetch_playstore(db, competitor, name)
-
+            sources.append(("playstore", None, self._fetch_playstore))
         if competitor.appstore_app_id:
-            await self._fetch_appstore(db, competitor, name)
-
+            sources.append(("appstore", None, self._fetch_appstore))
         if competitor.instagram_username:
-            await self._fetch_instagram(db, competitor, name)
-
+            sources.append(("instagram", "scrapecreators", self._fetch_instagram))
         if competitor.tiktok_username:
-            await self._fetch_tiktok(db, competitor, name)
-
+            sources.append(("tiktok", "scrapecreators", self._fetch_tiktok))
         if competitor.youtube_channel_id:
-            await self._fetch_youtube(db, competitor, name)
-
+            sources.append(("youtube", None, self._fetch_youtube))
         # Snapchat profile (via username)
         if competitor.snapchat_username:
-            await self._fetch_snapchat_profile(db, competitor, name)
-
+            sources.append(("snapchat_profile", "scrapecreators", self._fetch_snapchat_profile))
         # Snapchat Ads (via entity name)
         if competitor.snapchat_entity_name:
-            await self._fetch_snapchat(db, competitor, name)
-
+            sources.append(("snapchat_ads", None, self._fetch_snapchat))
         # Google Ads (via domain)
         if competitor.website:
-            await self._fetch_google_ads(db, competitor, name)
+            sources.append(("google_ads", "scrapecreators", self._fetch_google_ads))
+
+        for source, provider, fetch in sources:
+            try:
+                async with timed_source(source, provider):
+                    await fetch(db, competitor, name)
+            except Exception as e:
+                logger.error(f"{source} fetch crashed for {name}: {e}")
+                record_failure(name, source, e)
+                db.rollback()
 
     async def _fetch_ads(self, db: Session, competitor: Competitor, name: str):
         """Fetch Facebook/Instagram ads from Ad Library.
@@ -235,7 +422,6 @@ class DataCollectionScheduler:
         """
         try:
             from routers.facebook import _name_matches, _parse_date
-            from database import Ad
             import json
 
             page_id = competitor.facebook_page_id
@@ -255,10 +441,11 @@ class DataCollectionScheduler:
                                     page_ids_to_fetch.extend(str(cid) for cid in child_ids if cid)
                             except (json.JSONDecodeError, TypeError):
                                 pass
-                        meta_ads = await meta_ad_library.get_active_ads(
-                            page_ids_to_fetch if len(page_ids_to_fetch) > 1 else page_id,
-                            country="FR",
-                        )
+                        async with provider_limiter.slot("meta_ad_library"):
+                            meta_ads = await meta_ad_library.get_active_ads(
+                                page_ids_to_fetch if len(page_ids_to_fetch) > 1 else page_id,
+                                country="FR",
+                            )
                         if meta_ads:
                             new_count = self._store_meta_api_ads(db, competitor, meta_ads, _parse_date)
                             if new_count >= 0:
@@ -276,7 +463,8 @@ class DataCollectionScheduler:
                 if page_id:
                     cursor = None
                     for _ in range(30):
-                        result = await scrapecreators.fetch_facebook_company_ads(page_id=page_id, cursor=cursor)
+                        async with provider_limiter.slot("scrapecreators"):
+                            result = await scrapecreators.fetch_facebook_company_ads(page_id=page_id, cursor=cursor)
                         if not result.get("success"):
                             break
                         batch = result.get("ads", [])
@@ -288,13 +476,15 @@ class DataCollectionScheduler:
                         use_page_id = True
 
                 if not ads_list:
-                    result = await scrapecreators.search_facebook_ads(
-                        company_name=name, country="FR", limit=50
-                    )
+                    async with provider_limiter.slot("scrapecreators"):
+                        result = await scrapecreators.search_facebook_ads(
+                            company_name=name, country="FR", limit=50
+                        )
                     if not result.get("success"):
                         return
                     ads_list = result.get("ads", [])
 
+                rows = []
                 for ad in ads_list:
                     ad_id = str(ad.get("ad_archive_id", ""))
                     if not ad_id:
@@ -303,8 +493,6 @@ class DataCollectionScheduler:
                     page_name_val = snapshot.get("page_name", "") or ad.get("page_name", "")
                     if not use_page_id and not _name_matches(name, page_name_val):
                         continue
-                    if db.query(Ad).filter(Ad.ad_id == ad_id).first():
-                        continue
 
                     cards = snapshot.get("cards", [])
                     first_card = cards[0] if cards else {}
@@ -314,7 +502,7 @@ class DataCollectionScheduler:
                     if not isinstance(pub_platforms, list):
                         pub_platforms = [pub_platforms] if pub_platforms else []
 
-                    new_ad = Ad(
+                    rows.append(dict(
                         competitor_id=competitor.id,
                         ad_id=ad_id,
                         platform="instagram" if any("INSTAGRAM" in str(p).upper() for p in pub_platforms) else "facebook",
@@ -326,33 +514,33 @@ class DataCollectionScheduler:
                         is_active=ad.get("is_active", not bool(end_date)),
                         page_name=page_name_val or None,
                         ad_library_url=ad.get("url", "") or None,
-                    )
-                    db.add(new_ad)
-                    new_count += 1
+                    ))
 
-                if new_count:
-                    db.commit()
-                    logger.info(f"Ads: {new_count} new ads via ScrapeCreators for {name}")
+                if rows:
+                    ingest = upsert_ads(db, rows, update_fields=("is_active", "end_date"))
+                    logger.info(
+                        f"Ads: {ingest.new} new, {ingest.updated} updated, "
+                        f"{ingest.deactivated} deactivated via ScrapeCreators for {name}"
+                    )
             except Exception as e:
                 logger.error(f"ScrapeCreators fallback failed for {name}: {e}")
+                record_failure(name, "ads", e)
         except Exception as e:
             logger.error(f"Ads fetch failed for {name}: {e}")
+            record_failure(name, "ads", e)
 
     @staticmethod
     def _store_meta_api_ads(db: Session, competitor, meta_ads: list[dict], _parse_date) -> int:
         """Map Meta Ad Library API response to Ad model and store in DB.
         Returns count of new ads stored.
         """
-        from database import Ad
         import json
 
-        new_count = 0
+        rows = []
         for ad in meta_ads:
             ad_id = str(ad.get("id", ""))
             if not ad_id:
                 continue
-            if db.query(Ad).filter(Ad.ad_id == ad_id).first():
-                continue
 
             # Determine platform from publisher_platforms
             pub_platforms = ad.get("publisher_platforms", [])
@@ -407,7 +595,7 @@ class DataCollectionScheduler:
                 payer = bp_list[0].get("payer")
                 beneficiary = bp_list[0].get("beneficiary")
 
-            new_ad = Ad(
+            rows.append(dict(
                 competitor_id=competitor.id,
                 ad_id=ad_id,
                 platform=platform,
@@ -431,13 +619,11 @@ class DataCollectionScheduler:
                 payer=payer,
                 beneficiary=beneficiary,
                 byline=ad.get("bylines", ""),
-            )
-            db.add(new_ad)
-            new_count += 1
+            ))
 
-        if new_count:
-            db.commit()
-        return new_count
+        if not rows:
+            return 0
+        return upsert_ads(db, rows).new
 
     async def _fetch_snapchat(self, db: Session, competitor: Competitor, name: str):
         """Fetch Snapchat ads via Apify."""
@@ -452,15 +638,13 @@ class DataCollectionScheduler:
                 logger.warning(f"Snapchat fetch returned no data for {name}: {result.get('error')}")
                 return
 
-            new_count = 0
+            rows = []
             for ad_data in result.get("ads", []):
                 ad_id = ad_data.get("snap_id", "")
                 if not ad_id:
                     continue
-                if db.query(Ad).filter(Ad.ad_id == ad_id).first():
-                    continue
 
-                new_ad = Ad(
+                rows.append(dict(
                     competitor_id=competitor.id,
                     ad_id=ad_id,
                     platform="snapchat",
@@ -475,15 +659,15 @@ class DataCollectionScheduler:
                     page_name=ad_data.get("page_name", ""),
                     display_format=ad_data.get("display_format", "SNAP"),
                     ad_library_url="https://adsgallery.snap.com/",
-                )
-                db.add(new_ad)
-                new_count += 1
+                ))
 
-            if new_count:
-                db.commit()
-                logger.info(f"Snapchat: {new_count} new ads stored for {name}")
+            if rows:
+                ingest = upsert_ads(db, rows, update_fields=None)
+                if ingest.new:
+                    logger.info(f"Snapchat: {ingest.new} new ads stored for {name}")
         except Exception as e:
             logger.error(f"Snapchat fetch failed for {name}: {e}")
+            record_failure(name, "snapchat_ads", e)
 
     async def _fetch_google_ads(self, db: Session, competitor: Competitor, name: str):
         """Fetch Google Ads from Transparency Center."""
@@ -498,6 +682,7 @@ class DataCollectionScheduler:
                     logger.info(f"Google Ads: {new} new, {updated} updated for {name}")
         except Exception as e:
             logger.error(f"Google Ads fetch failed for {name}: {e}")
+            record_failure(name, "google_ads", e)
 
     async def _enrich_transparency(self, db: Session):
         """Enrich Meta ads with EU transparency data (age/gender/reach).
@@ -505,7 +690,6 @@ class DataCollectionScheduler:
         Fallback: ScrapeCreators get_facebook_ad_detail.
         """
         try:
-            import asyncio
             import json
             from database import Ad
 
@@ -529,7 +713,8 @@ class DataCollectionScheduler:
                 try:
                     # Primary: SearchAPI ad_details
                     if use_searchapi:
-                        detail = await meta_ad_library.enrich_ad_details(ad.ad_id)
+                        async with provider_limiter.slot("searchapi"):
+                            detail = await meta_ad_library.enrich_ad_details(ad.ad_id)
                         if detail:
                             ad.eu_total_reach = detail.get("eu_total_reach") or 0
                             payer = detail.get("payer")
@@ -548,7 +733,8 @@ class DataCollectionScheduler:
 
                     # Fallback: ScrapeCreators
                     from services.scrapecreators import scrapecreators
-                    sc_detail = await scrapecreators.get_facebook_ad_detail(ad.ad_id)
+                    async with provider_limiter.slot("scrapecreators"):
+                        sc_detail = await scrapecreators.get_facebook_ad_detail(ad.ad_id)
                     if not sc_detail.get("success"):
                         ad.eu_total_reach = 0
                         return False
@@ -613,10 +799,15 @@ class DataCollectionScheduler:
             if not ads:
                 return
 
+            async def _lookup(ad):
+                async with provider_limiter.slot("searchapi"):
+                    return await searchapi.get_ad_details(ad.ad_id)
+
+            results = await asyncio.gather(*[_lookup(ad) for ad in ads], return_exceptions=True)
+
             enriched = 0
-            for ad in ads:
-                result = await searchapi.get_ad_details(ad.ad_id)
-                if not result.get("success"):
+            for ad, result in zip(ads, results):
+                if isinstance(result, Exception) or not result.get("success"):
                     continue
                 payer = result.get("payer")
                 beneficiary = result.get("beneficiary")
@@ -636,9 +827,9 @@ class DataCollectionScheduler:
     async def _fetch_playstore(self, db: Session, competitor: Competitor, name: str):
         """Fetch Play Store data."""
         try:
-            from routers.playstore import fetch_playstore_app
+            from routers.playstore import async_fetch_playstore
 
-            result = fetch_playstore_app(competitor.playstore_app_id)
+            result = await async_fetch_playstore(competitor.playstore_app_id)
             if result.get("success"):
                 app_data = AppData(
                     competitor_id=competitor.id,
@@ -659,6 +850,7 @@ class DataCollectionScheduler:
                 logger.info(f"Play Store data fetched for {name}")
         except Exception as e:
             logger.error(f"Play Store fetch failed for {name}: {e}")
+            record_failure(name, "playstore", e)
 
     async def _fetch_appstore(self, db: Session, competitor: Competitor, name: str):
         """Fetch App Store data."""
@@ -685,6 +877,7 @@ class DataCollectionScheduler:
                 logger.info(f"App Store data fetched for {name}")
         except Exception as e:
             logger.error(f"App Store fetch failed for {name}: {e}")
+            record_failure(name, "appstore", e)
 
     async def _fetch_instagram(self, db: Session, competitor: Competitor, name: str):
         """Fetch Instagram data via FallbackChain (ScrapeCreators → Apify)."""
@@ -721,6 +914,7 @@ class DataCollectionScheduler:
                 logger.warning(f"Instagram fetch returned no data for {name}: {result.errors}")
         except Exception as e:
             logger.error(f"Instagram fetch failed for {name}: {e}")
+            record_failure(name, "instagram", e)
 
     async def _fetch_tiktok(self, db: Session, competitor: Competitor, name: str):
         """Fetch TikTok data via FallbackChain."""
@@ -756,6 +950,7 @@ class DataCollectionScheduler:
                 logger.warning(f"TikTok fetch returned no data for {name}: {result.errors}")
         except Exception as e:
             logger.error(f"TikTok fetch failed for {name}: {e}")
+            record_failure(name, "tiktok", e)
 
     async def _fetch_youtube(self, db: Session, competitor: Competitor, name: str):
         """Fetch YouTube data."""
@@ -783,6 +978,7 @@ class DataCollectionScheduler:
                 logger.info(f"YouTube data fetched for {name}")
         except Exception as e:
             logger.error(f"YouTube fetch failed for {name}: {e}")
+            record_failure(name, "youtube", e)
 
     async def _fetch_snapchat_profile(self, db: Session, competitor: Competitor, name: str):
         """Fetch Snapchat profile data via ScrapeCreators."""
@@ -822,6 +1018,7 @@ class DataCollectionScheduler:
             logger.info(f"Snapchat profile fetched for {name}: {result.get('subscribers', 0)} subscribers")
         except Exception as e:
             logger.error(f"Snapchat profile fetch failed for {name}: {e}")
+            record_failure(name, "snapchat_profile", e)
 
     async def daily_snapshots_and_signals(self):
         """Take ad snapshots and run signal detection after daily collection."""
@@ -842,20 +1039,16 @@ class DataCollectionScheduler:
         finally:
             db.close()
 
+    CREATIVE_SKIP_URL_PATTERNS = ["googlesyndication.com", "2mdn.net", "doubleclick.net"]
+
     async def daily_creative_analysis(self):
-        """Analyze all unanalyzed ad creatives automatically."""
-        import asyncio
-        import json
+        """Queue every unanalyzed ad creative, then drain the creative_analysis queue."""
+        MAX_TIME = 14400  # 4 hours max per run, the rest stays queued
 
         logger.info(f"Starting daily creative analysis at {datetime.utcnow()}")
         db = SessionLocal()
         try:
-            from services.creative_analyzer import creative_analyzer
-
-            SKIP_URL_PATTERNS = ["googlesyndication.com", "2mdn.net", "doubleclick.net"]
-            BATCH_SIZE = 50
-            MAX_BATCHES = 500  # No artificial cap — process all unanalyzed ads
-            MAX_TIME = 14400  # 4 hours max
+            from sqlalchemy import or_, func as sa_func
 
             # Auto-reset previous failures (score=0) for retry
             failed = db.query(Ad).filter(
@@ -870,145 +1063,175 @@ class DataCollectionScheduler:
                 db.commit()
                 logger.info(f"Creative analysis: reset {len(failed)} failed analyses for retry")
 
-            total_analyzed = 0
-            total_errors = 0
-            start_time = asyncio.get_event_loop().time()
-
-            for batch_num in range(MAX_BATCHES):
-                elapsed = asyncio.get_event_loop().time() - start_time
-                if elapsed >= MAX_TIME:
-                    logger.info(f"Creative analysis: time limit reached after {total_analyzed} ads")
-                    break
-
-                # Fetch next batch of unanalyzed ads (images OR text-only)
-                from sqlalchemy import or_, func as sa_func
-                candidates = db.query(Ad).filter(
-                    Ad.creative_analyzed_at.is_(None),
-                    or_(
-                        (Ad.creative_url.isnot(None)) & (Ad.creative_url != ""),
-                        (Ad.ad_text.isnot(None)) & (sa_func.length(Ad.ad_text) >= 10),
-                    ),
-                ).limit(BATCH_SIZE * 3).all()
-
-                if not candidates:
-                    break
+            # Unanalyzed ads (images OR text-only)
+            candidates = db.query(Ad.id, Ad.display_format, Ad.creative_url, Ad.ad_text).filter(
+                Ad.creative_analyzed_at.is_(None),
+                or_(
+                    (Ad.creative_url.isnot(None)) & (Ad.creative_url != ""),
+                    (Ad.ad_text.isnot(None)) & (sa_func.length(Ad.ad_text) >= 10),
+                ),
+            ).all()
 
-                ads_to_analyze = []
-                for ad in candidates:
-                    fmt = (ad.display_format or "").upper()
-                    url = ad.creative_url or ""
-                    has_text = ad.ad_text and len(ad.ad_text.strip()) >= 10
-                    # Skip VIDEO only if no ad text to analyze
-                    if fmt == "VIDEO" and not has_text:
-                        continue
-                    if any(p in url for p in SKIP_URL_PATTERNS) and not has_text:
-                        ad.creative_analyzed_at = datetime.utcnow()
-                        ad.creative_score = 0
-                        ad.creative_summary = "URL non analysable (réseau publicitaire)"
-                        continue
-                    if len(ads_to_analyze) < BATCH_SIZE:
-                        ads_to_analyze.append(ad)
+            to_analyze, not_analyzable = [], []
+            for ad_id, display_format, creative_url, ad_text in candidates:
+                fmt = (display_format or "").upper()
+                url = creative_url or ""
+                has_text = ad_text and len(ad_text.strip()) >= 10
+                # Skip VIDEO only if no ad text to analyze
+                if fmt == "VIDEO" and not has_text:
+                    continue
+                if any(p in url for p in self.CREATIVE_SKIP_URL_PATTERNS) and not has_text:
+                    not_analyzable.append(ad_id)
+                    continue
+                to_analyze.append(ad_id)
+
+            if not_analyzable:
+                db.query(Ad).filter(Ad.id.in_(not_analyzable)).update({
+                    "creative_analyzed_at": datetime.utcnow(),
+                    "creative_score": 0,
+                    "creative_summary": "URL non analysable (réseau publicitaire)",
+                }, synchronize_session=False)
                 db.commit()
 
-                if not ads_to_analyze:
-                    break
-
-                for ad in ads_to_analyze:
-                    elapsed = asyncio.get_event_loop().time() - start_time
-                    if elapsed >= MAX_TIME:
-                        break
-
-                    try:
-                        platform = "tiktok" if ad.platform == "tiktok" else "google" if ad.platform == "google" else "meta"
-                        url = ad.creative_url or ""
-                        # Facebook snapshot URLs are not real images — treat as text-only
-                        is_snapshot = "facebook.com/ads/archive/render_ad" in url
-                        has_image = url and not is_snapshot and not any(
-                            p in url for p in SKIP_URL_PATTERNS
-                        )
-                        has_text = ad.ad_text and len(ad.ad_text.strip()) >= 10
-                        if not has_image and has_text:
-                            result = await asyncio.wait_for(
-                                creative_analyzer.analyze_text_only(
-                                    ad_text=ad.ad_text,
-                                    platform=platform,
-                                    ad_id=ad.ad_id or "",
-                                ),
-                                timeout=45,
-                            )
-                        else:
-                            result = await asyncio.wait_for(
-                                creative_analyzer.analyze_creative(
-                                    creative_url=ad.creative_url,
-                                    ad_text=ad.ad_text or "",
-                                    platform=platform,
-                                    ad_id=ad.ad_id or "",
-                                ),
-                                timeout=60,
-                            )
-
-                        if result:
-                            ad.creative_analysis = json.dumps(result, ensure_ascii=False)
-                            ad.creative_concept = result.get("concept", "")[:100]
-                            ad.creative_hook = result.get("hook", "")[:500]
-                            ad.creative_tone = result.get("tone", "")[:100]
-                            ad.creative_text_overlay = result.get("text_overlay", "")
-                            ad.creative_dominant_colors = json.dumps(result.get("dominant_colors", []))
-                            ad.creative_has_product = result.get("has_product", False)
-                            ad.creative_has_face = result.get("has_face", False)
-                            ad.creative_has_logo = result.get("has_logo", False)
-                            ad.creative_layout = result.get("layout", "")[:50]
-                            ad.creative_cta_style = result.get("cta_style", "")[:50]
-                            ad.creative_score = result.get("score", 0)
-                            ad.creative_tags = json.dumps(result.get("tags", []), ensure_ascii=False)
-                            ad.creative_summary = result.get("summary", "")
-                            ad.product_category = result.get("product_category", "")[:100]
-                            ad.product_subcategory = result.get("product_subcategory", "")[:100]
-                            ad.ad_objective = result.get("ad_objective", "")[:50]
-                            ad.creative_analyzed_at = datetime.utcnow()
-                            total_analyzed += 1
-                        else:
-                            ad.creative_analyzed_at = datetime.utcnow()
-                            ad.creative_score = 0
-                            total_errors += 1
-
-                    except asyncio.TimeoutError:
-                        logger.warning(f"Timeout analyzing ad {ad.ad_id}")
-                        total_errors += 1
-                    except Exception as e:
-                        logger.error(f"Error analyzing ad {ad.ad_id}: {e}")
-                        ad.creative_analyzed_at = datetime.utcnow()
-                        ad.creative_score = 0
-                        total_errors += 1
-
-                    await asyncio.sleep(1.0)
+            self._enqueue_tasks(db, "creative_analysis", to_analyze)
+        except Exception as e:
+            logger.error(f"Daily creative analysis failed: {e}")
+            return
+        finally:
+            db.close()
 
-                db.commit()
-                logger.info(f"Creative analysis batch {batch_num + 1}: {total_analyzed} analyzed, {total_errors} errors")
+        result = await self.drain_tasks("creative_analysis", max_seconds=MAX_TIME)
 
-            # Count remaining
+        db = SessionLocal()
+        try:
             remaining = db.query(Ad).filter(Ad.creative_analyzed_at.is_(None)).count()
-            logger.info(f"Daily creative analysis complete: {total_analyzed} analyzed, {total_errors} errors, {remaining} remaining")
+        finally:
+            db.close()
+        logger.info(
+            f"Daily creative analysis complete: {result['done']} analyzed, "
+            f"{result['failed']} errors, {remaining} remaining"
+        )
 
-        except Exception as e:
-            logger.error(f"Daily creative analysis failed: {e}")
+    async def _drain_creative_pipeline(self, max_seconds: float | None = None) -> dict:
+        """Drain creative_analysis through CreativePipeline: leased ads are downloaded
+        and analyzed concurrently (provider token buckets pace the model calls) and
+        written back in batches, each batch committed with its tasks' state.
+
+        Only about two rounds of the pipeline's concurrency are leased at a time so a
+        batch fits in the lease window; each writeback also renews the leases still
+        in flight, so another drainer never re-analyzes ads that are being processed."""
+        import time
+        from services import jobs, task_queue
+        from services.creative_analyzer import creative_analyzer, CreativePipeline
+
+        pipeline = CreativePipeline(creative_analyzer)
+        lease_size = 2 * max(settings.CREATIVE_DOWNLOAD_CONCURRENCY, settings.CREATIVE_ANALYZE_CONCURRENCY)
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        db = SessionLocal()
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                leased = task_queue.lease_batch(db, "creative_analysis", jobs.WORKER_ID, limit=lease_size)
+                if not leased:
+                    break
+                task_ids = {t.item_key: t.id for t in leased}
+                ads = db.query(Ad).filter(Ad.id.in_([int(k) for k in task_ids])).all()
+
+                # Idempotent: deleted or already analyzed ads are simply marked done
+                items = [self._creative_item(ad) for ad in ads if ad.creative_analyzed_at is None]
+                pending_keys = {item["key"] for item in items}
+                task_queue.complete_many(db, [tid for key, tid in task_ids.items() if key not in pending_keys])
+
+                not_started = await pipeline.run(
+                    items,
+                    lambda batch: self._write_creative_results(db, task_ids, batch, pipeline),
+                    deadline=deadline,
+                )
+                if not_started:
+                    task_queue.release(db, [task_ids[key] for key in not_started])
+                    logger.info(f"Creative analysis: time limit reached, {len(not_started)} ads stay queued")
+                    break
         finally:
             db.close()
+        return {"done": pipeline.processed, "failed": pipeline.failed, "ads_per_minute": round(pipeline.ads_per_minute(), 1)}
+
+    @staticmethod
+    def _creative_item(ad: Ad) -> dict:
+        url = ad.creative_url or ""
+        # Facebook snapshot URLs are not real images — treat as text-only
+        is_snapshot = "facebook.com/ads/archive/render_ad" in url
+        has_image = bool(url) and not is_snapshot and not any(
+            p in url for p in DataCollectionScheduler.CREATIVE_SKIP_URL_PATTERNS
+        )
+        has_text = bool(ad.ad_text and len(ad.ad_text.strip()) >= 10)
+        return {
+            "key": str(ad.id),
+            "ad_id": ad.ad_id or "",
+            "creative_url": ad.creative_url,
+            "ad_text": ad.ad_text or "",
+            "platform": "tiktok" if ad.platform == "tiktok" else "google" if ad.platform == "google" else "meta",
+            "text_only": not has_image and has_text,
+        }
+
+    def _write_creative_results(self, db: Session, task_ids: dict, batch: list, pipeline=None):
+        """Apply one pipeline batch to the ads and their tasks in a single commit
+        (and renew the leases of the ads still in the pipeline)."""
+        from services import jobs, task_queue
+
+        ads = {str(ad.id): ad for ad in db.query(Ad).filter(Ad.id.in_([int(item["key"]) for item, _, _ in batch]))}
+        done_ids = []
+        for item, result, error in batch:
+            task_id = task_ids[item["key"]]
+            if error is not None:
+                # Timeout / transport error: retried with backoff by the queue
+                task_queue.fail(db, task_id, repr(error), commit=False)
+                continue
+            ad = ads.get(item["key"])
+            if ad is not None and ad.creative_analyzed_at is None:
+                self._apply_creative_result(ad, result)
+            done_ids.append(task_id)
+        task_queue.complete_many(db, done_ids, commit=False)
+        task_queue.renew_leases(db, "creative_analysis", list(task_ids.values()), jobs.WORKER_ID, commit=False)
+        if pipeline is not None:
+            self._store_setting(db, "creative_pipeline_stats", pipeline.stats())
+        db.commit()
+
+    @staticmethod
+    def _apply_creative_result(ad: Ad, result: dict | None):
+        if result:
+            result.pop("_cache", None)
+            ad.creative_analysis = json.dumps(result, ensure_ascii=False)
+            ad.creative_concept = result.get("concept", "")[:100]
+            ad.creative_hook = result.get("hook", "")[:500]
+            ad.creative_tone = result.get("tone", "")[:100]
+            ad.creative_text_overlay = result.get("text_overlay", "")
+            ad.creative_dominant_colors = json.dumps(result.get("dominant_colors", []))
+            ad.creative_has_product = result.get("has_product", False)
+            ad.creative_has_face = result.get("has_face", False)
+            ad.creative_has_logo = result.get("has_logo", False)
+            ad.creative_layout = result.get("layout", "")[:50]
+            ad.creative_cta_style = result.get("cta_style", "")[:50]
+            ad.creative_score = result.get("score", 0)
+            ad.creative_tags = json.dumps(result.get("tags", []), ensure_ascii=False)
+            ad.creative_summary = result.get("summary", "")
+            ad.product_category = result.get("product_category", "")[:100]
+            ad.product_subcategory = result.get("product_subcategory", "")[:100]
+            ad.ad_objective = result.get("ad_objective", "")[:50]
+        else:
+            # Empty answer / unusable image: flagged as failed, reset and requeued by the next daily run
+            ad.creative_score = 0
+        ad.creative_analyzed_at = datetime.utcnow()
 
     async def daily_social_analysis(self):
-        """Collect social posts (TikTok, YouTube, Instagram) + AI analysis for all competitors."""
-        import asyncio
+        """Collect social posts (TikTok, YouTube, Instagram), then queue + drain their AI analysis."""
         logger.info(f"Starting daily social content analysis at {datetime.utcnow()}")
 
         db = SessionLocal()
         try:
             from database import SocialPost, AdvertiserCompetitor
             from services.scrapecreators import scrapecreators
-            from services.social_content_analyzer import social_content_analyzer
 
             competitors = db.query(Competitor).filter(Competitor.is_active == True).all()
             total_new = 0
-            total_analyzed = 0
 
             # ── Phase 1: Collect posts ──
             for comp in competitors:
@@ -1110,7 +1333,7 @@ class DataCollectionScheduler:
             db.commit()
             logger.info(f"Social collection done: {total_new} new posts from {len(competitors)} competitors")
 
-            # ── Phase 2: AI analysis on unanalyzed posts ──
+            # ── Phase 2: queue AI analysis of unanalyzed posts ──
             # First reset previous failures (analyzed but score=0 = failed)
             failed = db.query(SocialPost).filter(
                 SocialPost.content_analyzed_at.isnot(None),
@@ -1124,57 +1347,101 @@ class DataCollectionScheduler:
                 db.commit()
                 logger.info(f"Reset {len(failed)} failed social analyses for retry")
 
-            unanalyzed = db.query(SocialPost).filter(SocialPost.content_analyzed_at.is_(None)).all()
-            comp_names = {}
-            for post in unanalyzed:
-                if post.competitor_id not in comp_names:
-                    comp = db.query(Competitor).get(post.competitor_id)
-                    comp_names[post.competitor_id] = comp.name if comp else ""
-
-            for post in unanalyzed:
-                try:
-                    result = await asyncio.wait_for(
-                        social_content_analyzer.analyze_content(
-                            platform=post.platform,
-                            title=post.title or "",
-                            description=post.description or "",
-                            thumbnail_url=post.thumbnail_url or "",
-                            views=post.views or 0,
-                            likes=post.likes or 0,
-                            comments=post.comments or 0,
-                            shares=post.shares or 0,
-                            competitor_name=comp_names.get(post.competitor_id, ""),
-                        ),
-                        timeout=30,
-                    )
-                    if result:
-                        import json
-                        post.content_analysis = json.dumps(result, ensure_ascii=False) if isinstance(result, dict) else result
-                        post.content_theme = result.get("theme", "") if isinstance(result, dict) else ""
-                        post.content_tone = result.get("tone", "") if isinstance(result, dict) else ""
-                        post.content_engagement_score = result.get("engagement_score", 0) if isinstance(result, dict) else 0
-                        post.content_topics = json.dumps(result.get("content_topics", []), ensure_ascii=False) if isinstance(result, dict) else "[]"
-                        post.content_products = json.dumps(result.get("content_products", []), ensure_ascii=False) if isinstance(result, dict) else "[]"
-                        post.content_analyzed_at = datetime.utcnow()
-                        total_analyzed += 1
-                        if total_analyzed % 10 == 0:
-                            db.commit()
-                except Exception as e:
-                    logger.error(f"Social analysis error for post {post.post_id}: {e}")
-                    post.content_analyzed_at = datetime.utcnow()
-                    post.content_engagement_score = 0
-
-            db.commit()
-            logger.info(f"Social analysis done: {total_analyzed} posts analyzed")
+            unanalyzed = db.query(SocialPost.id).filter(SocialPost.content_analyzed_at.is_(None)).all()
+            self._enqueue_tasks(db, "social_analysis", [row[0] for row in unanalyzed])
 
         except Exception as e:
             logger.error(f"Daily social analysis failed: {e}")
+            return
         finally:
             db.close()
 
+        result = await self.drain_tasks("social_analysis")
+        logger.info(f"Social analysis done: {result['done']} posts analyzed, {result['failed']} errors")
+
+    async def _analyze_post_task(self, db: Session, item_key: str):
+        """social_analysis handler: analyze one social post (no-op if already analyzed)."""
+        from database import SocialPost
+        from services.social_content_analyzer import social_content_analyzer
+
+        post = db.query(SocialPost).get(int(item_key))
+        if post is None or post.content_analyzed_at is not None:
+            return
+        comp = db.query(Competitor).get(post.competitor_id)
+
+        result = await asyncio.wait_for(
+            social_content_analyzer.analyze_content(
+                platform=post.platform,
+                title=post.title or "",
+                description=post.description or "",
+                thumbnail_url=post.thumbnail_url or "",
+                views=post.views or 0,
+                likes=post.likes or 0,
+                comments=post.comments or 0,
+                shares=post.shares or 0,
+                competitor_name=comp.name if comp else "",
+            ),
+            timeout=30,
+        )
+        if not result:
+            raise RuntimeError("empty analysis")
+        self._apply_social_result(post, result)
+
+    async def _analyze_posts_batch(self, db: Session, item_keys: list) -> dict:
+        """social_analysis batch step: posts without thumbnail are analyzed with batched
+        text prompts (LLM_TEXT_BATCH_SIZE posts per request). Posts with a thumbnail
+        need vision and are left to _analyze_post_task."""
+        from database import SocialPost
+        from services.social_content_analyzer import social_content_analyzer
+
+        posts = db.query(SocialPost).filter(
+            SocialPost.id.in_([int(k) for k in item_keys]),
+            SocialPost.content_analyzed_at.is_(None),
+        ).all()
+        text_posts = [
+            p for p in posts
+            if not p.thumbnail_url and f"{p.title or ''} {p.description or ''}".strip()
+        ]
+        if len(text_posts) < 2:
+            return {}
+        names = dict(db.query(Competitor.id, Competitor.name).filter(
+            Competitor.id.in_({p.competitor_id for p in text_posts}),
+        ).all())
+
+        results = await asyncio.wait_for(
+            social_content_analyzer.analyze_content_batch([
+                {
+                    "title": p.title, "description": p.description, "platform": p.platform,
+                    "competitor_name": names.get(p.competitor_id, ""),
+                    "views": p.views, "likes": p.likes, "comments": p.comments, "shares": p.shares,
+                }
+                for p in text_posts
+            ]),
+            timeout=180,
+        )
+        errors = {}
+        for post, result in zip(text_posts, results):
+            if result:
+                self._apply_social_result(post, result)
+            else:
+                errors[str(post.id)] = "empty analysis"
+        db.commit()
+        return errors
+
+    @staticmethod
+    def _apply_social_result(post, result):
+        if isinstance(result, dict):
+            result.pop("_cache", None)
+        post.content_analysis = json.dumps(result, ensure_ascii=False) if isinstance(result, dict) else result
+        post.content_theme = result.get("theme", "") if isinstance(result, dict) else ""
+        post.content_tone = result.get("tone", "") if isinstance(result, dict) else ""
+        post.content_engagement_score = result.get("engagement_score", 0) if isinstance(result, dict) else 0
+        post.content_topics = json.dumps(result.get("content_topics", []), ensure_ascii=False) if isinstance(result, dict) else "[]"
+        post.content_products = json.dumps(result.get("content_products", []), ensure_ascii=False) if isinstance(result, dict) else "[]"
+        post.content_analyzed_at = datetime.utcnow()
+
     async def daily_seo_tracking(self):
         """Run SEO SERP tracking for ALL active advertisers automatically."""
-        import asyncio
         logger.info(f"Starting daily SEO tracking at {datetime.utcnow()}")
 
         db = SessionLocal()
@@ -1329,12 +1596,12 @@ class DataCollectionScheduler:
 
     async def daily_google_trends(self):
         """Collect Google Trends interest data for ALL active advertisers."""
-        import asyncio
         logger.info(f"Starting daily Google Trends collection at {datetime.utcnow()}")
 
         db = SessionLocal()
         try:
             from database import Advertiser, AdvertiserCompetitor
+            from services.google_ingestion import trends_rows, upsert_trends
             from services.searchapi import searchapi
 
             advertisers = db.query(Advertiser).filter(Advertiser.is_active == True).all()
@@ -1359,21 +1626,8 @@ class DataCollectionScheduler:
                     result = await searchapi.fetch_google_trends(keywords, geo="FR")
 
                     if result.get("success") and result.get("timeline_data"):
-                        adv_points = 0
-                        for point in result["timeline_data"]:
-                            date_str = point.get("date", "")
-                            for kw, val in point.get("values", {}).items():
-                                comp_id = kw_to_comp.get(kw)
-                                if comp_id is not None:
-                                    db.add(GoogleTrendsData(
-                                        competitor_id=comp_id,
-                                        keyword=kw,
-                                        date=date_str,
-                                        value=val,
-                                    ))
-                                    adv_points += 1
-
-                        db.commit()
+                        # The timeline overlaps yesterday's: upsert on (competitor, keyword, date)
+                        adv_points = upsert_trends(db, trends_rows(result["timeline_data"], kw_to_comp))
                         total_points += adv_points
                         logger.info(f"Google Trends done for {adv.company_name}: {adv_points} data points")
                     else:
@@ -1393,14 +1647,13 @@ class DataCollectionScheduler:
 
     async def daily_google_news(self):
         """Collect Google News articles for ALL active advertisers."""
-        import asyncio
         logger.info(f"Starting daily Google News collection at {datetime.utcnow()}")
 
         db = SessionLocal()
         try:
             from database import Advertiser, AdvertiserCompetitor
+            from services.google_ingestion import insert_news, news_rows
             from services.searchapi import searchapi
-            from sqlalchemy.exc import IntegrityError
 
             advertisers = db.query(Advertiser).filter(Advertiser.is_active == True).all()
             total_added = 0
@@ -1425,25 +1678,7 @@ class DataCollectionScheduler:
                             logger.warning(f"Google News fetch failed for {comp.name}: {result.get('error')}")
                             continue
 
-                        for article in result.get("articles", []):
-                            if not article.get("link"):
-                                continue
-                            news = GoogleNewsArticle(
-                                competitor_id=comp.id,
-                                title=article.get("title", ""),
-                                link=article["link"],
-                                source=article.get("source", ""),
-                                date=article.get("date", ""),
-                                snippet=article.get("snippet", ""),
-                                thumbnail=article.get("thumbnail", ""),
-                            )
-                            db.add(news)
-                            try:
-                                db.flush()
-                                adv_added += 1
-                            except IntegrityError:
-                                db.rollback()
-
+                        adv_added += insert_news(db, news_rows(comp.id, result.get("articles", [])), commit=False)
                     except Exception as e:
                         logger.error(f"Google News error for {comp.name}: {e}")
 
@@ -1517,7 +1752,6 @@ class DataCollectionScheduler:
 
     async def daily_aso_analysis(self):
         """Run ASO scoring for ALL active advertisers' competitors with app store IDs."""
-        import asyncio
         import json
         import math
 
@@ -1729,14 +1963,13 @@ class DataCollectionScheduler:
             db.close()
 
     async def weekly_gmb_enrichment(self):
-        """Enrich stores with Google My Business data (rating, reviews, phone, etc.)."""
-        import asyncio
+        """Queue stores to enrich with Google My Business data (rating, reviews, phone, etc.), then drain."""
         logger.info(f"Starting weekly GMB enrichment at {datetime.utcnow()}")
 
         db = SessionLocal()
         try:
             from database import Advertiser, AdvertiserCompetitor, StoreLocation
-            from services.gmb_service import gmb_service, compute_gmb_score
+            from services.gmb_service import gmb_service
 
             if not gmb_service.is_configured:
                 logger.warning("GMB service not configured, skipping weekly enrichment")
@@ -1786,67 +2019,11 @@ class DataCollectionScheduler:
                 logger.info("All stores recently enriched, nothing to do")
                 return
 
-            enriched = 0
-            errors = 0
-            skipped = 0
-
-            for store in stores:
-                comp_name = comp_map.get(store.competitor_id)
-                if not comp_name:
-                    skipped += 1
-                    logger.debug(f"Skipping store {store.id}: competitor_id={store.competitor_id} not in active comp_map")
-                    continue
-
-                try:
-                    result = await gmb_service.enrich_store(
-                        store_name=store.name or "",
-                        brand_name=comp_name,
-                        city=store.city or "",
-                        latitude=store.latitude,
-                        longitude=store.longitude,
-                    )
-
-                    if result.get("success"):
-                        store.google_rating = result.get("rating")
-                        store.google_reviews_count = result.get("reviews_count")
-                        store.google_place_id = result.get("place_id")
-                        store.google_phone = result.get("phone")
-                        store.google_website = result.get("website")
-                        store.google_type = result.get("type")
-                        store.google_thumbnail = result.get("thumbnail")
-                        store.google_open_state = result.get("open_state")
-                        store.google_hours = result.get("hours")
-                        store.google_price = result.get("price")
-                        try:
-                            store.gmb_score = compute_gmb_score(
-                                rating=result.get("rating"),
-                                reviews_count=result.get("reviews_count"),
-                                phone=result.get("phone"),
-                                website=result.get("website"),
-                                hours=result.get("hours"),
-                                thumbnail=result.get("thumbnail"),
-                                gtype=result.get("type"),
-                                open_state=result.get("open_state"),
-                            )
-                        except Exception as e:
-                            logger.warning(f"compute_gmb_score failed for store {store.id}: {e}")
-                            store.gmb_score = None
-                        store.rating_fetched_at = datetime.utcnow()
-                        enriched += 1
-                    else:
-                        errors += 1
-                        logger.warning(f"GMB enrichment failed for {comp_name} - {store.city}: {result.get('error')}")
-                except Exception as e:
-                    errors += 1
-                    logger.error(f"GMB enrichment error for store {store.id}: {e}")
-
-                # Rate limit between API calls
-                await asyncio.sleep(1.1)
-
-            db.commit()
+            self._enqueue_tasks(db, "gmb_enrichment", [store.id for store in stores])
+            result = await self.drain_tasks("gmb_enrichment")
             logger.info(
-                f"Weekly GMB enrichment completed: {enriched} enriched, "
-                f"{skipped} skipped, {errors} errors, {len(stores)} processed"
+                f"Weekly GMB enrichment completed: {result['done']} enriched, "
+                f"{result['failed']} errors, {len(stores)} queued"
             )
 
         except Exception as e:
@@ -1854,6 +2031,57 @@ class DataCollectionScheduler:
         finally:
             db.close()
 
+    async def _enrich_store_task(self, db: Session, item_key: str):
+        """gmb_enrichment handler: enrich one store (no-op if enriched in the last 30 days)."""
+        from datetime import timedelta
+        from database import StoreLocation
+        from services.gmb_service import gmb_service, compute_gmb_score
+
+        store = db.query(StoreLocation).get(int(item_key))
+        if store is None:
+            return
+        if store.rating_fetched_at and store.rating_fetched_at >= datetime.utcnow() - timedelta(days=30):
+            return
+        competitor = db.query(Competitor).get(store.competitor_id)
+        if competitor is None:
+            return
+
+        result = await gmb_service.enrich_store(
+            store_name=store.name or "",
+            brand_name=competitor.name,
+            city=store.city or "",
+            latitude=store.latitude,
+            longitude=store.longitude,
+        )
+        if not result.get("success"):
+            raise RuntimeError(f"GMB enrichment failed for {competitor.name} - {store.city}: {result.get('error')}")
+
+        store.google_rating = result.get("rating")
+        store.google_reviews_count = result.get("reviews_count")
+        store.google_place_id = result.get("place_id")
+        store.google_phone = result.get("phone")
+        store.google_website = result.get("website")
+        store.google_type = result.get("type")
+        store.google_thumbnail = result.get("thumbnail")
+        store.google_open_state = result.get("open_state")
+        store.google_hours = result.get("hours")
+        store.google_price = result.get("price")
+        try:
+            store.gmb_score = compute_gmb_score(
+                rating=result.get("rating"),
+                reviews_count=result.get("reviews_count"),
+                phone=result.get("phone"),
+                website=result.get("website"),
+                hours=result.get("hours"),
+                thumbnail=result.get("thumbnail"),
+                gtype=result.get("type"),
+                open_state=result.get("open_state"),
+            )
+        except Exception as e:
+            logger.warning(f"compute_gmb_score failed for store {store.id}: {e}")
+            store.gmb_score = None
+        store.rating_fetched_at = datetime.utcnow()
+
     async def weekly_market_data_refresh(self):
         """Refresh market data from data.gouv.fr."""
         logger.info(f"Starting weekly market data refresh at {datetime.utcnow()}")
@@ -1880,49 +2108,120 @@ class DataCollectionScheduler:
         except Exception as e:
             logger.error(f"Meta token refresh job failed: {e}")
 
+    async def weekly_history_retention(self):
+        """Downsample old raw metric history (report only while RETENTION_DRY_RUN)."""
+        if not settings.RETENTION_ENABLED:
+            return
+        from services import jobs
+        from services.retention import apply_retention
+        report = await run_in_db_thread(jobs.with_session, apply_retention)
+        logger.info(
+            f"History retention: {report['total_rows']} rows / {report['total_bytes']} bytes"
+            f"{' (dry run)' if report['dry_run'] else ''}"
+        )
+
+    async def monthly_history_partitions(self):
+        """Create the coming months' partitions of the history tables ahead of time."""
+        if not settings.HISTORY_PARTITIONING:
+            return
+        from database import engine
+        from services.partitioning import ensure_history_partitions
+        created = await run_in_db_thread(ensure_history_partitions, engine)
+        logger.info(f"History partitions: {created} created")
+
     async def weekly_ereputation_audit(self):
-        """Run e-reputation audit for all active competitors (max 10 per run)."""
-        import asyncio
+        """Queue the e-reputation audit of active competitors (max 10 per run), then drain."""
         logger.info(f"Starting weekly e-reputation audit at {datetime.utcnow()}")
 
+        db = SessionLocal()
         try:
-            from services.ereputation_service import ereputation_service
-
-            db = SessionLocal()
-            try:
-                competitors = db.query(Competitor).filter(Competitor.is_active == True).all()
-                audited = 0
-                for comp in competitors[:10]:
-                    try:
-                        await ereputation_service.run_audit(comp, db)
-                        audited += 1
-                        logger.info(f"E-reputation audit done for {comp.name}")
-                    except Exception as e:
-                        logger.error(f"E-reputation audit failed for {comp.name}: {e}")
-                    await asyncio.sleep(2)
-                logger.info(f"Weekly e-reputation audit complete: {audited}/{len(competitors[:10])} competitors")
-            finally:
-                db.close()
+            competitors = db.query(Competitor.id).filter(Competitor.is_active == True).limit(10).all()
+            self._enqueue_tasks(db, "ereputation_audit", [row[0] for row in competitors])
         except Exception as e:
             logger.error(f"Weekly e-reputation audit failed: {e}")
+            return
+        finally:
+            db.close()
+
+        result = await self.drain_tasks("ereputation_audit")
+        logger.info(f"Weekly e-reputation audit complete: {result['done']} audited, {result['failed']} errors")
+
+    async def _ereputation_audit_task(self, db: Session, item_key: str):
+        """ereputation_audit handler: audit one competitor (no-op if audited in the last 12 hours,
+        so a retried or resumed item never produces a duplicate audit)."""
+        from datetime import timedelta
+        from database import EReputationAudit
+        from services.ereputation_service import ereputation_service
+
+        comp = db.query(Competitor).get(int(item_key))
+        if comp is None:
+            return
+        recent = db.query(EReputationAudit.id).filter(
+            EReputationAudit.competitor_id == comp.id,
+            EReputationAudit.created_at >= datetime.utcnow() - timedelta(hours=12),
+        ).first()
+        if recent:
+            return
+        await ereputation_service.run_audit(comp, db)
+        logger.info(f"E-reputation audit done for {comp.name}")
+
+    @staticmethod
+    def _store_setting(db: Session, key: str, value: dict):
+        """Upsert a JSON value in system_settings (caller commits)."""
+        row = db.query(SystemSetting).filter(SystemSetting.key == key).first()
+        if row:
+            row.value = json.dumps(value, default=str)
+        else:
+            db.add(SystemSetting(key=key, value=json.dumps(value, default=str)))
+
+    @classmethod
+    def _store_last_collection(cls, summary: dict):
+        """Persist the collection summary so the API process can report it."""
+        db = SessionLocal()
+        try:
+            cls._store_setting(db, "last_collection_summary", summary)
+            db.commit()
+        except Exception as e:
+            logger.warning(f"Could not store collection summary: {e}")
+        finally:
+            db.close()
 
     def get_status(self) -> dict:
-        """Get scheduler status and next run times."""
-        jobs = [
-            {
+        """Get scheduler status, next run times, queued/running jobs and locks."""
+        from services import jobs
+
+        now = datetime.now(self.scheduler.timezone)
+        job_list = []
+        for job in self.scheduler.get_jobs():
+            # Pending jobs (API process: scheduler not started) have no next_run_time yet
+            next_run = job.next_run_time if self.scheduler.running else job.trigger.get_next_fire_time(None, now)
+            job_list.append({
                 "id": job.id,
                 "name": job.name,
-                "next_run": job.next_run_time.isoformat() if job.next_run_time else None
-            }
-            for job in self.scheduler.get_jobs()
-        ]
+                "next_run": next_run.isoformat() if next_run else None,
+            })
 
-        return {
+        status = {
             "enabled": settings.SCHEDULER_ENABLED,
+            "mode": settings.SCHEDULER_MODE,
             "running": self.scheduler.running,
-            "jobs": jobs
+            "jobs": job_list,
+            "last_collection": self.last_collection_summary,
         }
 
+        db = SessionLocal()
+        try:
+            if status["last_collection"] is None:
+                row = db.query(SystemSetting).filter(SystemSetting.key == "last_collection_summary").first()
+                status["last_collection"] = json.loads(row.value) if row else None
+            status["runs"] = jobs.recent_runs(db)
+            status["locks"] = jobs.active_locks(db)
+        except Exception as e:
+            logger.warning(f"Scheduler status: job tables unavailable ({e})")
+        finally:
+            db.close()
+        return status
+
 
 # Singleton instance
 scheduler = DataCollectionScheduler()
@@ -2,6 +2,7 @@
 ScrapeCreators API service.
 Unified social media data extraction via https://api.scrapecreators.com
 """
+import asyncio
 import logging
 import os
 import re
@@ -9,6 +10,8 @@ import time
 import httpx
 from typing import Dict, Optional
 from core.config import settings
+from services.http_client import http_client
+from services.response_cache import LRUCache, SQLiteResponseCache, open_disk_cache
 
 logger = logging.getLogger(__name__)
 
@@ -29,14 +32,27 @@ class ScrapeCreatorsAPI:
         (re.compile(r"/v\d+/.+/channel$"), 6 * 3600),      # Channels: 6h
     ]
 
-    def __init__(self, api_key: Optional[str] = None):
+    # Stale-while-revalidate: an expired entry younger than ttl * (1 + factor)
+    # is served immediately while a background request refreshes it.
+    _STALE_FACTOR = 1.0
+
+    def __init__(self, api_key: Optional[str] = None, disk_cache: Optional[SQLiteResponseCache] = None):
         self.api_key = api_key or settings.SCRAPECREATORS_API_KEY
         if not self.api_key:
             logger.warning("ScrapeCreators API key not configured. Set SCRAPECREATORS_API_KEY in .env")
-        self._cache: dict[str, tuple[dict, float]] = {}
+        self._cache = LRUCache(
+            max_entries=settings.SCRAPECREATORS_CACHE_MAX_ENTRIES,
+            max_bytes=settings.SCRAPECREATORS_CACHE_MAX_MB * 1024 * 1024,
+        )
+        self._disk = disk_cache
         self._cache_ttl_default = int(os.getenv("SCRAPECREATORS_CACHE_TTL_MINUTES", "60")) * 60
         self._cache_hits = 0
         self._cache_misses = 0
+        self._stale_hits = 0
+        self._disk_hits = 0
+        self._coalesced = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._refresh_tasks: set[asyncio.Task] = set()
 
     @property
     def _headers(self) -> dict:
@@ -55,40 +71,101 @@ class ScrapeCreatorsAPI:
         return f"{path}|{frozen}"
 
     def clear_cache(self) -> None:
-        """Clear all cached responses."""
+        """Clear all cached responses (memory and disk)."""
         self._cache.clear()
+        if self._disk:
+            self._disk.clear()
         self._cache_hits = 0
         self._cache_misses = 0
+        self._stale_hits = 0
+        self._disk_hits = 0
+        self._coalesced = 0
 
     @property
     def cache_stats(self) -> dict:
         """Return cache statistics for monitoring."""
+        lookups = self._cache_hits + self._cache_misses
         return {
             "size": len(self._cache),
             "hits": self._cache_hits,
             "misses": self._cache_misses,
+            "hit_ratio": round(self._cache_hits / lookups, 3) if lookups else None,
+            "stale_hits": self._stale_hits,
+            "disk_hits": self._disk_hits,
+            "coalesced": self._coalesced,
+            "bytes": self._cache.bytes,
+            "evictions": self._cache.evictions,
+            "disk": self._disk.stats() if self._disk else None,
         }
 
+    async def _cache_lookup(self, cache_key: str) -> Optional[tuple[dict, float]]:
+        """Memory first, then disk (promoted to memory on hit); disk I/O runs in a thread."""
+        entry = self._cache.get(cache_key)
+        if entry is None and self._disk:
+            entry = await asyncio.to_thread(self._disk.get, cache_key)
+            if entry is not None:
+                self._disk_hits += 1
+                self._cache[cache_key] = entry
+        return entry
+
+    async def _cache_store(self, cache_key: str, data: dict) -> None:
+        now = time.time()
+        self._cache[cache_key] = (data, now)
+        if self._disk:
+            await asyncio.to_thread(self._disk.set, cache_key, data, now)
+
+    def _fetch_coalesced(self, cache_key: str, path: str, params: dict | None) -> asyncio.Future:
+        """One upstream request per cache key at a time; concurrent callers share it."""
+        future = self._inflight.get(cache_key)
+        if future is not None:
+            self._coalesced += 1
+            return future
+
+        async def run():
+            try:
+                return await self._fetch(cache_key, path, params)
+            finally:
+                self._inflight.pop(cache_key, None)
+
+        future = asyncio.ensure_future(run())
+        self._inflight[cache_key] = future
+        return future
+
+    def _schedule_refresh(self, cache_key: str, path: str, params: dict | None) -> None:
+        if cache_key in self._inflight:
+            return
+        task = self._fetch_coalesced(cache_key, path, params)
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
     async def _get(self, path: str, params: dict = None) -> Dict:
-        """Make a GET request to the ScrapeCreators API (with in-memory cache)."""
+        """Make a GET request to the ScrapeCreators API (memory LRU + disk cache)."""
         cache_key = self._make_cache_key(path, params)
         ttl = self._get_ttl(path)
 
         # Check cache
-        if cache_key in self._cache:
-            cached_data, cached_ts = self._cache[cache_key]
-            if time.time() - cached_ts < ttl:
+        entry = await self._cache_lookup(cache_key)
+        if entry is not None:
+            cached_data, cached_ts = entry
+            age = time.time() - cached_ts
+            if age < ttl:
                 self._cache_hits += 1
                 logger.debug(f"Cache HIT for {path} (TTL {ttl}s)")
                 return cached_data
-            else:
-                # Expired — remove stale entry
-                del self._cache[cache_key]
+            if age < ttl * (1 + self._STALE_FACTOR):
+                # Stale — serve now, refresh in background
+                self._cache_hits += 1
+                self._stale_hits += 1
+                self._schedule_refresh(cache_key, path, params)
+                return cached_data
 
         self._cache_misses += 1
+        return await asyncio.shield(self._fetch_coalesced(cache_key, path, params))
 
+    async def _fetch(self, cache_key: str, path: str, params: dict | None) -> Dict:
+        """Call the API and cache successful responses."""
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client() as client:
                 response = await client.get(
                     f"{BASE_URL}{path}",
                     headers=self._headers,
@@ -113,7 +190,7 @@ class ScrapeCreatorsAPI:
                     data["success"] = True
 
                 # Cache successful responses only
-                self._cache[cache_key] = (data, time.time())
+                await self._cache_store(cache_key, data)
                 return data
 
         except httpx.HTTPStatusError as e:
@@ -809,5 +886,11 @@ class ScrapeCreatorsAPI:
         return data.get("credits_remaining")
 
 
-# Singleton instance
-scrapecreators = ScrapeCreatorsAPI()
+# Singleton instance (disk cache shared by every process pointing at the same file;
+# memory-only if that file cannot be opened)
+scrapecreators = ScrapeCreatorsAPI(
+    disk_cache=open_disk_cache(
+        settings.SCRAPECREATORS_CACHE_PATH,
+        max_bytes=settings.SCRAPECREATORS_DISK_CACHE_MAX_MB * 1024 * 1024,
+    ),
+)
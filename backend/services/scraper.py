@@ -1,7 +1,7 @@
 """
 Generic scraping utilities and helpers
 """
-import httpx
+from services.http_client import http_client
 from bs4 import BeautifulSoup
 from typing import Optional, Dict, Any
 import asyncio
@@ -42,7 +42,7 @@ class Scraper:
         await self.rate_limiter.wait()
 
         try:
-            async with httpx.AsyncClient(headers=self.headers, follow_redirects=True) as client:
+            async with http_client(headers=self.headers, follow_redirects=True) as client:
                 response = await client.get(url, params=params, timeout=30.0)
                 if response.status_code == 200:
                     return response.text
@@ -56,7 +56,7 @@ class Scraper:
         await self.rate_limiter.wait()
 
         try:
-            async with httpx.AsyncClient(headers=self.headers, follow_redirects=True) as client:
+            async with http_client(headers=self.headers, follow_redirects=True) as client:
                 response = await client.get(url, params=params, timeout=30.0)
                 if response.status_code == 200:
                     return response.json()
@@ -8,6 +8,7 @@ import os
 import time
 
 import httpx
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -49,7 +50,7 @@ class SearchAPIService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with http_client(timeout=30) as client:
                 resp = await client.get(SEARCHAPI_BASE, params=params)
                 resp.raise_for_status()
                 data = resp.json()
@@ -105,7 +106,7 @@ class SearchAPIService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with http_client(timeout=30) as client:
                 resp = await client.get(SEARCHAPI_BASE, params=params)
                 resp.raise_for_status()
                 data = resp.json()
@@ -148,7 +149,7 @@ class SearchAPIService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with http_client(timeout=30) as client:
                 resp = await client.get(SEARCHAPI_BASE, params=params)
                 resp.raise_for_status()
                 data = resp.json()
@@ -193,7 +194,7 @@ class SearchAPIService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with http_client(timeout=30) as client:
                 resp = await client.get(SEARCHAPI_BASE, params=params)
                 resp.raise_for_status()
                 data = resp.json()
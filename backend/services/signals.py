@@ -1,17 +1,21 @@
 """
 Signal detection engine.
 Analyzes daily data to detect significant changes, anomalies, and competitive moves.
-Runs after each daily data collection.
+Runs after each daily data collection: set-based, a handful of queries and one
+commit per run whatever the number of competitors.
 """
+import json
 import logging
+import time
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import DateTime, func, insert, literal, or_, select
 
 from database import (
     Competitor, InstagramData, TikTokData, YouTubeData,
-    AppData, Ad, Signal, AdSnapshot,
+    AppData, Ad, Signal, AdSnapshot, SystemSetting, rollup_ad_snapshots,
 )
+from core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -52,97 +56,279 @@ THRESHOLDS = {
 }
 
 
+DETECTION_STATS_KEY = "signal_detection_stats"
+
+# Series loaded per source: (model, columns, partition columns, days of history kept)
+SERIES_SOURCES = {
+    "instagram": (InstagramData, ("followers", "engagement_rate", "posts_count"), ("competitor_id",), 14),
+    "tiktok": (TikTokData, ("followers", "videos_count"), ("competitor_id",), 14),
+    "youtube": (YouTubeData, ("subscribers",), ("competitor_id",), 7),
+    "apps": (AppData, ("store", "rating", "reviews_count"), ("competitor_id", "store"), 7),
+}
+LATEST_ROWS = 10  # rows kept per series beyond the window, for latest-vs-previous checks
+DEDUPE_HOURS = 24
+HIGH_REACH = 1_000_000
+
+# Last run's timings in this process (the persisted copy lives in system_settings)
+last_detection_stats: dict = {}
+
+
+class SignalContext:
+    """Everything the detectors need, loaded for all competitors in a few queries.
+
+    Detectors read series and counts from here and call emit(); nothing touches
+    the database until flush(), which inserts every new signal in one commit.
+    """
+
+    def __init__(self, now: datetime = None):
+        self.now = now or datetime.utcnow()
+        self.series: dict[str, dict[int, list]] = {name: {} for name in SERIES_SOURCES}
+        self.active_ads: dict[int, int] = {}
+        self.prev_active_ads: dict[int, int] = {}
+        self.big_ads: dict[int, list] = {}
+        self.signaled_ads: set[tuple[int, str]] = set()  # (competitor_id, ad_id) with high_reach_campaign
+        self.recent: set[tuple[int, str]] = set()  # (competitor_id, signal_type) in the last DEDUPE_HOURS
+        self.pending: list[Signal] = []
+
+    @classmethod
+    def load(cls, db: Session, competitor_ids: list[int], now: datetime = None) -> "SignalContext":
+        ctx = cls(now)
+        if not competitor_ids:
+            return ctx
+        for name, (model, columns, partition, days) in SERIES_SOURCES.items():
+            ctx.series[name] = _load_series(
+                db, model, columns, partition, competitor_ids, ctx.now - timedelta(days=days),
+            )
+
+        week_ago = ctx.now - timedelta(days=7)
+        ctx.active_ads = dict(db.query(Ad.competitor_id, func.count(Ad.id)).filter(
+            Ad.competitor_id.in_(competitor_ids),
+            Ad.is_active == True,
+        ).group_by(Ad.competitor_id).all())
+        # Ads that were active a week ago (started before week_ago and not ended)
+        ctx.prev_active_ads = dict(db.query(Ad.competitor_id, func.count(Ad.id)).filter(
+            Ad.competitor_id.in_(competitor_ids),
+            Ad.start_date <= week_ago,
+            (Ad.end_date.is_(None) | (Ad.end_date >= week_ago)),
+        ).group_by(Ad.competitor_id).all())
+
+        big_ads = db.query(
+            Ad.competitor_id, Ad.ad_id, Ad.platform, Ad.eu_total_reach, Ad.ad_text,
+        ).filter(
+            Ad.competitor_id.in_(competitor_ids),
+            Ad.created_at >= ctx.now - timedelta(days=3),
+            Ad.eu_total_reach > HIGH_REACH,
+        ).all()
+        for ad in big_ads:
+            ctx.big_ads.setdefault(ad.competitor_id, []).append(ad)
+        if big_ads:
+            ctx.signaled_ads = set(db.query(Signal.competitor_id, Signal.metric_name).filter(
+                Signal.competitor_id.in_(competitor_ids),
+                Signal.signal_type == "high_reach_campaign",
+                Signal.metric_name.in_({ad.ad_id for ad in big_ads}),
+            ).all())
+
+        ctx.recent = set(db.query(Signal.competitor_id, Signal.signal_type).filter(
+            Signal.competitor_id.in_(competitor_ids),
+            Signal.detected_at >= ctx.now - timedelta(hours=DEDUPE_HOURS),
+        ).distinct().all())
+        return ctx
+
+    def rows(self, source: str, competitor_id: int, store: str = None) -> list:
+        """Loaded rows of a series, oldest first."""
+        rows = self.series[source].get(competitor_id, [])
+        if store is not None:
+            rows = [r for r in rows if r.store == store]
+        return rows
+
+    def window(self, source: str, competitor_id: int, days: int = 7, store: str = None) -> list:
+        """Rows of the last N days, oldest first."""
+        cutoff = self.now - timedelta(days=days)
+        return [r for r in self.rows(source, competitor_id, store) if r.recorded_at >= cutoff]
+
+    def latest_pair(self, source: str, competitor_id: int, min_gap_hours: int = 6):
+        """The most recent record and the previous one at least min_gap_hours older
+        (or simply the one before when none is)."""
+        records = self.rows(source, competitor_id)[-LATEST_ROWS:][::-1]
+        if len(records) < 2:
+            return None, None
+        latest = records[0]
+        for prev in records[1:]:
+            if (latest.recorded_at - prev.recorded_at) > timedelta(hours=min_gap_hours):
+                return latest, prev
+        return latest, records[1]
+
+    def already_signaled(self, competitor_id: int, signal_type: str) -> bool:
+        return (competitor_id, signal_type) in self.recent
+
+    def emit(self, comp: Competitor, **kwargs) -> dict:
+        """Queue a signal and return its dict representation.
+
+        Brand signals (is_brand=True) are always downgraded to 'info' severity
+        since changes in our own brand are expected, not alarming.
+        """
+        is_brand = getattr(comp, "is_brand", False) or False
+        severity = kwargs.get("severity", "info")
+        if is_brand:
+            severity = "info"  # Own brand signals are never critical/warning
+        kwargs["severity"] = severity
+
+        self.pending.append(Signal(
+            competitor_id=comp.id,
+            advertiser_id=comp.advertiser_id,
+            is_brand=is_brand,
+            detected_at=self.now,
+            **kwargs,
+        ))
+        self.recent.add((comp.id, kwargs.get("signal_type")))
+        if kwargs.get("signal_type") == "high_reach_campaign":
+            self.signaled_ads.add((comp.id, kwargs.get("metric_name")))
+        return {
+            "competitor": comp.name,
+            "type": kwargs.get("signal_type"),
+            "severity": severity,
+            "title": kwargs.get("title"),
+        }
+
+    def flush(self, db: Session) -> int:
+        """Insert the queued signals (single transaction). Caller commits."""
+        db.add_all(self.pending)
+        count = len(self.pending)
+        self.pending = []
+        return count
+
+
+def _load_series(db: Session, model, columns, partition, competitor_ids, cutoff) -> dict[int, list]:
+    """Rows of every competitor's series in one windowed query: the last LATEST_ROWS
+    per partition plus everything since cutoff, grouped by competitor, oldest first."""
+    rn = func.row_number().over(
+        partition_by=[getattr(model, c) for c in partition],
+        order_by=model.recorded_at.desc(),
+    ).label("rn")
+    fields = ("competitor_id", "recorded_at", *columns)
+    inner = select(*[getattr(model, c) for c in fields], rn).where(
+        model.competitor_id.in_(competitor_ids),
+    ).subquery()
+    stmt = select(*[inner.c[c] for c in fields]).where(
+        or_(inner.c.rn <= LATEST_ROWS, inner.c.recorded_at >= cutoff),
+    ).order_by(inner.c.competitor_id, inner.c.recorded_at)
+
+    grouped: dict[int, list] = {}
+    for row in db.execute(stmt):
+        grouped.setdefault(row.competitor_id, []).append(row)
+    return grouped
+
+
 def detect_all_signals(db: Session, advertiser_id: int = None) -> list[dict]:
-    """Run all signal detections. Returns list of new signals created."""
+    """Run all signal detections. Returns list of new signals created.
+
+    Series and counts are loaded for every competitor up front, each detector
+    then runs in memory over all competitors and the new signals are inserted
+    in a single commit. Per-step timings go to system_settings.
+    """
+    started = time.perf_counter()
     competitors = db.query(Competitor).filter(Competitor.is_active == True)
     if advertiser_id:
         competitors = competitors.filter(Competitor.advertiser_id == advertiser_id)
     competitors = competitors.all()
 
+    ctx = SignalContext.load(db, [c.id for c in competitors])
+    timings = {"load": _elapsed_ms(started)}
+
     new_signals = []
-    for comp in competitors:
-        new_signals.extend(_detect_instagram_signals(db, comp))
-        new_signals.extend(_detect_tiktok_signals(db, comp))
-        new_signals.extend(_detect_youtube_signals(db, comp))
-        new_signals.extend(_detect_app_signals(db, comp))
-        new_signals.extend(_detect_ad_signals(db, comp))
-        # Trend-based intelligence (multi-day patterns)
-        new_signals.extend(_detect_growth_trends(db, comp))
-        new_signals.extend(_detect_review_velocity(db, comp))
-        new_signals.extend(_detect_engagement_trends(db, comp))
-        new_signals.extend(_detect_posting_frequency(db, comp))
-
-    logger.info(f"Signal detection complete: {len(new_signals)} new signals")
+    per_detector = {}
+    for name, detector in DETECTORS:
+        step = time.perf_counter()
+        found = []
+        for comp in competitors:
+            found.extend(detector(ctx, comp))
+        timings[name] = _elapsed_ms(step)
+        per_detector[name] = len(found)
+        new_signals.extend(found)
+
+    step = time.perf_counter()
+    ctx.flush(db)
+    db.commit()
+    timings["insert"] = _elapsed_ms(step)
+    timings["total"] = _elapsed_ms(started)
+
+    stats = {
+        "at": ctx.now.isoformat(),
+        "advertiser_id": advertiser_id,
+        "competitors": len(competitors),
+        "signals": len(new_signals),
+        "signals_by_detector": per_detector,
+        "timings_ms": timings,
+    }
+    _store_stats(db, stats)
+    db.commit()
+    last_detection_stats.clear()
+    last_detection_stats.update(stats)
+    logger.info(
+        f"Signal detection complete: {len(new_signals)} new signals for {len(competitors)} competitors "
+        f"in {timings['total']}ms ({', '.join(f'{k}={v}ms' for k, v in timings.items() if k != 'total')})"
+    )
     return new_signals
 
 
-def snapshot_active_ads(db: Session):
-    """Take a daily snapshot of all active ads metrics."""
-    active_ads = db.query(Ad).filter(Ad.is_active == True).all()
-    count = 0
-    for ad in active_ads:
-        snapshot = AdSnapshot(
-            ad_id=ad.ad_id,
-            competitor_id=ad.competitor_id,
-            platform=ad.platform,
-            is_active=ad.is_active,
-            impressions_min=ad.impressions_min,
-            impressions_max=ad.impressions_max,
-            estimated_spend_min=ad.estimated_spend_min,
-            estimated_spend_max=ad.estimated_spend_max,
-            eu_total_reach=ad.eu_total_reach,
-        )
-        db.add(snapshot)
-        count += 1
-    db.commit()
-    logger.info(f"Ad snapshots: {count} active ads snapshotted")
-    return count
+def _elapsed_ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 1)
 
 
-def _create_signal(db: Session, comp: Competitor, **kwargs) -> dict:
-    """Create a signal and return its dict representation.
+def _store_stats(db: Session, stats: dict):
+    """Upsert the run's stats in system_settings (committed with the signals)."""
+    row = db.query(SystemSetting).filter(SystemSetting.key == DETECTION_STATS_KEY).first()
+    if row:
+        row.value = json.dumps(stats, default=str)
+    else:
+        db.add(SystemSetting(key=DETECTION_STATS_KEY, value=json.dumps(stats, default=str)))
 
-    Brand signals (is_brand=True) are always downgraded to 'info' severity
-    since changes in our own brand are expected, not alarming.
-    """
-    is_brand = getattr(comp, "is_brand", False) or False
-    severity = kwargs.get("severity", "info")
-    if is_brand:
-        severity = "info"  # Own brand signals are never critical/warning
-    kwargs["severity"] = severity
-
-    signal = Signal(
-        competitor_id=comp.id,
-        advertiser_id=comp.advertiser_id,
-        is_brand=is_brand,
-        **kwargs,
-    )
-    db.add(signal)
-    db.commit()
-    return {
-        "competitor": comp.name,
-        "type": kwargs.get("signal_type"),
-        "severity": severity,
-        "title": kwargs.get("title"),
-    }
 
+def get_detection_stats(db: Session) -> dict:
+    """Stats of the last detection run (any process)."""
+    row = db.query(SystemSetting).filter(SystemSetting.key == DETECTION_STATS_KEY).first()
+    if row and row.value:
+        try:
+            return json.loads(row.value)
+        except ValueError:
+            pass
+    return dict(last_detection_stats)
 
-def _get_two_latest(db: Session, model, competitor_id: int, min_gap_hours: int = 6):
-    """Get the two most recent records with minimum time gap."""
-    records = db.query(model).filter(
-        model.competitor_id == competitor_id
-    ).order_by(desc(model.recorded_at)).limit(10).all()
 
-    if len(records) < 2:
-        return None, None
+def snapshot_active_ads(db: Session, rollup: bool = None) -> int:
+    """Take today's snapshot of all active ads metrics.
 
-    latest = records[0]
-    # Find the previous record with enough time gap
-    for prev in records[1:]:
-        if (latest.recorded_at - prev.recorded_at) > timedelta(hours=min_gap_hours):
-            return latest, prev
+    A single INSERT ... SELECT from ads; ads already snapshotted today are
+    skipped, so reruns are no-ops. The day is then rolled up per competitor
+    into ad_daily_stats (AD_DAILY_ROLLUP). Returns the number of new snapshots.
+    """
+    if rollup is None:
+        rollup = settings.AD_DAILY_ROLLUP
+    now = datetime.utcnow()
+    day_start = datetime.combine(now.date(), datetime.min.time())
+
+    ads = Ad.__table__
+    snap = AdSnapshot.__table__
+    done = snap.alias("done")
+    already_today = select(done.c.id).where(
+        done.c.ad_id == ads.c.ad_id,
+        done.c.recorded_at >= day_start,
+        done.c.recorded_at < day_start + timedelta(days=1),
+    ).exists()
+    columns = [
+        "ad_id", "competitor_id", "platform", "is_active", "impressions_min", "impressions_max",
+        "estimated_spend_min", "estimated_spend_max", "eu_total_reach",
+    ]
+    rows = select(
+        *[ads.c[c] for c in columns], literal(now, DateTime),
+    ).where(ads.c.is_active == True, ~already_today)
+    count = db.execute(insert(snap).from_select(columns + ["recorded_at"], rows)).rowcount or 0
 
-    return latest, records[1] if len(records) > 1 else None
+    if rollup:
+        rollup_ad_snapshots(db, now.date(), now.date())
+    db.commit()
+    logger.info(f"Ad snapshots: {count} active ads snapshotted")
+    return count
 
 
 def _pct_change(new_val, old_val):
@@ -166,9 +352,9 @@ def _severity(pct: float, warning_threshold: float, critical_threshold: float) -
 # Platform-specific detectors
 # =============================================================================
 
-def _detect_instagram_signals(db: Session, comp: Competitor) -> list:
+def _detect_instagram_signals(ctx: SignalContext, comp: Competitor) -> list:
     signals = []
-    latest, prev = _get_two_latest(db, InstagramData, comp.id)
+    latest, prev = ctx.latest_pair("instagram", comp.id)
     if not latest or not prev:
         return signals
 
@@ -178,7 +364,7 @@ def _detect_instagram_signals(db: Session, comp: Competitor) -> list:
         sev = _severity(pct, THRESHOLDS["followers_warning"], THRESHOLDS["followers_critical"])
         if sev:
             direction = "hausse" if pct > 0 else "baisse"
-            signals.append(_create_signal(db, comp,
+            signals.append(ctx.emit(comp,
                 signal_type=f"follower_{'spike' if pct > 0 else 'drop'}",
                 severity=sev,
                 platform="instagram",
@@ -196,7 +382,7 @@ def _detect_instagram_signals(db: Session, comp: Competitor) -> list:
         sev = _severity(diff, THRESHOLDS["engagement_warning"], THRESHOLDS["engagement_critical"])
         if sev:
             direction = "hausse" if diff > 0 else "baisse"
-            signals.append(_create_signal(db, comp,
+            signals.append(ctx.emit(comp,
                 signal_type=f"engagement_{'spike' if diff > 0 else 'drop'}",
                 severity=sev,
                 platform="instagram",
@@ -211,9 +397,9 @@ def _detect_instagram_signals(db: Session, comp: Competitor) -> list:
     return signals
 
 
-def _detect_tiktok_signals(db: Session, comp: Competitor) -> list:
+def _detect_tiktok_signals(ctx: SignalContext, comp: Competitor) -> list:
     signals = []
-    latest, prev = _get_two_latest(db, TikTokData, comp.id)
+    latest, prev = ctx.latest_pair("tiktok", comp.id)
     if not latest or not prev:
         return signals
 
@@ -222,7 +408,7 @@ def _detect_tiktok_signals(db: Session, comp: Competitor) -> list:
         sev = _severity(pct, THRESHOLDS["followers_warning"], THRESHOLDS["followers_critical"])
         if sev:
             direction = "hausse" if pct > 0 else "baisse"
-            signals.append(_create_signal(db, comp,
+            signals.append(ctx.emit(comp,
                 signal_type=f"follower_{'spike' if pct > 0 else 'drop'}",
                 severity=sev,
                 platform="tiktok",
@@ -237,9 +423,9 @@ def _detect_tiktok_signals(db: Session, comp: Competitor) -> list:
     return signals
 
 
-def _detect_youtube_signals(db: Session, comp: Competitor) -> list:
+def _detect_youtube_signals(ctx: SignalContext, comp: Competitor) -> list:
     signals = []
-    latest, prev = _get_two_latest(db, YouTubeData, comp.id)
+    latest, prev = ctx.latest_pair("youtube", comp.id)
     if not latest or not prev:
         return signals
 
@@ -248,7 +434,7 @@ def _detect_youtube_signals(db: Session, comp: Competitor) -> list:
         sev = _severity(pct, THRESHOLDS["followers_warning"], THRESHOLDS["followers_critical"])
         if sev:
             direction = "hausse" if pct > 0 else "baisse"
-            signals.append(_create_signal(db, comp,
+            signals.append(ctx.emit(comp,
                 signal_type=f"subscriber_{'spike' if pct > 0 else 'drop'}",
                 severity=sev,
                 platform="youtube",
@@ -263,18 +449,14 @@ def _detect_youtube_signals(db: Session, comp: Competitor) -> list:
     return signals
 
 
-def _detect_app_signals(db: Session, comp: Competitor) -> list:
+def _detect_app_signals(ctx: SignalContext, comp: Competitor) -> list:
     signals = []
     for store in ["playstore", "appstore"]:
-        records = db.query(AppData).filter(
-            AppData.competitor_id == comp.id,
-            AppData.store == store,
-        ).order_by(desc(AppData.recorded_at)).limit(5).all()
-
+        records = ctx.rows("apps", comp.id, store=store)
         if len(records) < 2:
             continue
 
-        latest, prev = records[0], records[1]
+        latest, prev = records[-1], records[-2]
 
         # Rating change
         if latest.rating and prev.rating:
@@ -283,7 +465,7 @@ def _detect_app_signals(db: Session, comp: Competitor) -> list:
             if sev:
                 store_label = "Play Store" if store == "playstore" else "App Store"
                 direction = "hausse" if diff > 0 else "baisse"
-                signals.append(_create_signal(db, comp,
+                signals.append(ctx.emit(comp,
                     signal_type=f"rating_{'up' if diff > 0 else 'drop'}",
                     severity=sev,
                     platform=store,
@@ -298,31 +480,19 @@ def _detect_app_signals(db: Session, comp: Competitor) -> list:
     return signals
 
 
-def _detect_ad_signals(db: Session, comp: Competitor) -> list:
+def _detect_ad_signals(ctx: SignalContext, comp: Competitor) -> list:
     """Detect significant changes in advertising activity."""
     signals = []
 
     # Compare active ads count: now vs 7 days ago
-    now = datetime.utcnow()
-    week_ago = now - timedelta(days=7)
-
-    current_active = db.query(func.count(Ad.id)).filter(
-        Ad.competitor_id == comp.id,
-        Ad.is_active == True,
-    ).scalar() or 0
-
-    # Count ads that were active a week ago (started before week_ago and not ended)
-    prev_active = db.query(func.count(Ad.id)).filter(
-        Ad.competitor_id == comp.id,
-        Ad.start_date <= week_ago,
-        (Ad.end_date.is_(None) | (Ad.end_date >= week_ago)),
-    ).scalar() or 0
+    current_active = ctx.active_ads.get(comp.id, 0)
+    prev_active = ctx.prev_active_ads.get(comp.id, 0)
 
     if prev_active >= THRESHOLDS["min_ads"]:
         pct = _pct_change(current_active, prev_active)
         sev = _severity(pct, THRESHOLDS["ads_warning"], THRESHOLDS["ads_critical"])
         if sev and pct > 0:  # Only alert on increases (new campaigns)
-            signals.append(_create_signal(db, comp,
+            signals.append(ctx.emit(comp,
                 signal_type="ad_surge",
                 severity=sev,
                 platform="meta_ads",
@@ -335,22 +505,10 @@ def _detect_ad_signals(db: Session, comp: Competitor) -> list:
             ))
 
     # Detect new high-reach campaigns (eu_total_reach > 1M in last 3 days)
-    three_days_ago = now - timedelta(days=3)
-    big_ads = db.query(Ad).filter(
-        Ad.competitor_id == comp.id,
-        Ad.created_at >= three_days_ago,
-        Ad.eu_total_reach > 1_000_000,
-    ).all()
-
-    for ad in big_ads:
-        # Check if we already signaled this ad
-        existing = db.query(Signal).filter(
-            Signal.competitor_id == comp.id,
-            Signal.signal_type == "high_reach_campaign",
-            Signal.metric_name == ad.ad_id,
-        ).first()
-        if not existing:
-            signals.append(_create_signal(db, comp,
+    for ad in ctx.big_ads.get(comp.id, []):
+        # Skip ads we already signaled
+        if (comp.id, ad.ad_id) not in ctx.signaled_ads:
+            signals.append(ctx.emit(comp,
                 signal_type="high_reach_campaign",
                 severity="warning",
                 platform=ad.platform or "meta_ads",
@@ -368,25 +526,6 @@ def _detect_ad_signals(db: Session, comp: Competitor) -> list:
 # Trend-based intelligence (multi-day pattern analysis)
 # =============================================================================
 
-def _get_series(db: Session, model, competitor_id: int, days: int = 7):
-    """Get the last N days of records for a competitor."""
-    cutoff = datetime.utcnow() - timedelta(days=days)
-    return db.query(model).filter(
-        model.competitor_id == competitor_id,
-        model.recorded_at >= cutoff,
-    ).order_by(model.recorded_at).all()
-
-
-def _already_signaled(db: Session, comp_id: int, signal_type: str, hours: int = 24) -> bool:
-    """Check if we already created this type of signal recently."""
-    cutoff = datetime.utcnow() - timedelta(hours=hours)
-    return db.query(Signal).filter(
-        Signal.competitor_id == comp_id,
-        Signal.signal_type == signal_type,
-        Signal.detected_at >= cutoff,
-    ).first() is not None
-
-
 def _linear_slope(values: list[float]) -> float:
     """Simple linear regression slope (growth rate per day)."""
     n = len(values)
@@ -399,7 +538,7 @@ def _linear_slope(values: list[float]) -> float:
     return num / den if den != 0 else 0.0
 
 
-def _detect_growth_trends(db: Session, comp: Competitor) -> list:
+def _detect_growth_trends(ctx: SignalContext, comp: Competitor) -> list:
     """
     Detect growth acceleration / deceleration over 7 days.
     Compare first-half slope vs second-half slope.
@@ -408,17 +547,17 @@ def _detect_growth_trends(db: Session, comp: Competitor) -> list:
     signals = []
 
     sources = [
-        (InstagramData, "followers", "instagram", "followers Instagram", THRESHOLDS["min_followers"]),
-        (TikTokData, "followers", "tiktok", "followers TikTok", THRESHOLDS["min_followers"]),
-        (YouTubeData, "subscribers", "youtube", "abonnes YouTube", THRESHOLDS["min_followers"]),
+        ("followers", "instagram", "followers Instagram", THRESHOLDS["min_followers"]),
+        ("followers", "tiktok", "followers TikTok", THRESHOLDS["min_followers"]),
+        ("subscribers", "youtube", "abonnes YouTube", THRESHOLDS["min_followers"]),
     ]
 
-    for model, field, platform, label, min_val in sources:
+    for field, platform, label, min_val in sources:
         sig_type = f"growth_trend_{platform}"
-        if _already_signaled(db, comp.id, sig_type):
+        if ctx.already_signaled(comp.id, sig_type):
             continue
 
-        records = _get_series(db, model, comp.id, days=7)
+        records = ctx.window(platform, comp.id, days=7)
         values = [getattr(r, field) or 0 for r in records]
         if len(values) < 5 or values[0] < min_val:
             continue
@@ -434,7 +573,7 @@ def _detect_growth_trends(db: Session, comp: Competitor) -> list:
         if slope_first > 0 and slope_second > slope_first * 3 and slope_second > 10:
             total_gain = values[-1] - values[0]
             pct_gain = (total_gain / values[0]) * 100 if values[0] > 0 else 0
-            signals.append(_create_signal(db, comp,
+            signals.append(ctx.emit(comp,
                 signal_type=sig_type,
                 severity="warning",
                 platform=platform,
@@ -453,7 +592,7 @@ def _detect_growth_trends(db: Session, comp: Competitor) -> list:
         elif slope_first > 0 and slope_second < -abs(slope_first) * 0.5:
             total_change = values[-1] - values[0]
             pct = (total_change / values[0]) * 100 if values[0] > 0 else 0
-            signals.append(_create_signal(db, comp,
+            signals.append(ctx.emit(comp,
                 signal_type=sig_type,
                 severity="warning",
                 platform=platform,
@@ -476,10 +615,10 @@ def _detect_growth_trends(db: Session, comp: Competitor) -> list:
                     consecutive_drops += 1
                 else:
                     consecutive_drops = 0
-            if consecutive_drops >= 5 and not _already_signaled(db, comp.id, f"sustained_decline_{platform}"):
+            if consecutive_drops >= 5 and not ctx.already_signaled(comp.id, f"sustained_decline_{platform}"):
                 total_loss = values[-1] - values[-consecutive_drops - 1]
                 pct = (total_loss / values[-consecutive_drops - 1]) * 100 if values[-consecutive_drops - 1] > 0 else 0
-                signals.append(_create_signal(db, comp,
+                signals.append(ctx.emit(comp,
                     signal_type=f"sustained_decline_{platform}",
                     severity="critical",
                     platform=platform,
@@ -497,7 +636,7 @@ def _detect_growth_trends(db: Session, comp: Competitor) -> list:
     return signals
 
 
-def _detect_review_velocity(db: Session, comp: Competitor) -> list:
+def _detect_review_velocity(ctx: SignalContext, comp: Competitor) -> list:
     """
     Detect sudden surges in app reviews (campaign or crisis indicator).
     """
@@ -505,10 +644,10 @@ def _detect_review_velocity(db: Session, comp: Competitor) -> list:
 
     for store in ["playstore", "appstore"]:
         sig_type = f"review_surge_{store}"
-        if _already_signaled(db, comp.id, sig_type):
+        if ctx.already_signaled(comp.id, sig_type):
             continue
 
-        records = _get_series(db, AppData, comp.id, days=7)
+        records = ctx.window("apps", comp.id, days=7)
         store_records = [r for r in records if r.store == store and r.reviews_count]
         if len(store_records) < 3:
             continue
@@ -525,7 +664,7 @@ def _detect_review_velocity(db: Session, comp: Competitor) -> list:
         # 3x normal daily review gain
         if avg_daily > 0 and latest_gain > avg_daily * 3 and latest_gain > 50:
             store_label = "Play Store" if store == "playstore" else "App Store"
-            signals.append(_create_signal(db, comp,
+            signals.append(ctx.emit(comp,
                 signal_type=sig_type,
                 severity="warning",
                 platform=store,
@@ -546,8 +685,8 @@ def _detect_review_velocity(db: Session, comp: Competitor) -> list:
             rating_drop = ratings[0] - ratings[-1]
             if rating_drop >= 0.3 and latest_gain > avg_daily * 2:
                 store_label = "Play Store" if store == "playstore" else "App Store"
-                if not _already_signaled(db, comp.id, f"review_bombing_{store}"):
-                    signals.append(_create_signal(db, comp,
+                if not ctx.already_signaled(comp.id, f"review_bombing_{store}"):
+                    signals.append(ctx.emit(comp,
                         signal_type=f"review_bombing_{store}",
                         severity="critical",
                         platform=store,
@@ -566,14 +705,14 @@ def _detect_review_velocity(db: Session, comp: Competitor) -> list:
     return signals
 
 
-def _detect_engagement_trends(db: Session, comp: Competitor) -> list:
+def _detect_engagement_trends(ctx: SignalContext, comp: Competitor) -> list:
     """Detect sustained engagement changes on Instagram over 5+ days."""
     signals = []
     sig_type = "engagement_trend_instagram"
-    if _already_signaled(db, comp.id, sig_type):
+    if ctx.already_signaled(comp.id, sig_type):
         return signals
 
-    records = _get_series(db, InstagramData, comp.id, days=7)
+    records = ctx.window("instagram", comp.id, days=7)
     rates = [r.engagement_rate for r in records if r.engagement_rate is not None]
     if len(rates) < 5:
         return signals
@@ -584,7 +723,7 @@ def _detect_engagement_trends(db: Session, comp: Competitor) -> list:
     total_change = rates[-1] - rates[0]
 
     if rising >= len(rates) - 2 and total_change > 0.5:
-        signals.append(_create_signal(db, comp,
+        signals.append(ctx.emit(comp,
             signal_type=sig_type,
             severity="info",
             platform="instagram",
@@ -600,7 +739,7 @@ def _detect_engagement_trends(db: Session, comp: Competitor) -> list:
             change_percent=round(total_change, 2),
         ))
     elif falling >= len(rates) - 2 and total_change < -0.5:
-        signals.append(_create_signal(db, comp,
+        signals.append(ctx.emit(comp,
             signal_type=sig_type,
             severity="warning",
             platform="instagram",
@@ -619,14 +758,14 @@ def _detect_engagement_trends(db: Session, comp: Competitor) -> list:
     return signals
 
 
-def _detect_posting_frequency(db: Session, comp: Competitor) -> list:
+def _detect_posting_frequency(ctx: SignalContext, comp: Competitor) -> list:
     """Detect changes in social media posting frequency."""
     signals = []
 
     # Instagram: posts_count delta over 14 days
     sig_type = "posting_surge_instagram"
-    if not _already_signaled(db, comp.id, sig_type):
-        records = _get_series(db, InstagramData, comp.id, days=14)
+    if not ctx.already_signaled(comp.id, sig_type):
+        records = ctx.window("instagram", comp.id, days=14)
         posts = [(r.recorded_at, r.posts_count) for r in records if r.posts_count]
         if len(posts) >= 7:
             mid = len(posts) // 2
@@ -635,7 +774,7 @@ def _detect_posting_frequency(db: Session, comp: Competitor) -> list:
 
             if first_half_rate > 0 and second_half_rate > first_half_rate * 2.5 and second_half_rate > 0.5:
                 total_new = posts[-1][1] - posts[0][1]
-                signals.append(_create_signal(db, comp,
+                signals.append(ctx.emit(comp,
                     signal_type=sig_type,
                     severity="info",
                     platform="instagram",
@@ -653,8 +792,8 @@ def _detect_posting_frequency(db: Session, comp: Competitor) -> list:
 
     # TikTok: videos_count delta
     sig_type = "posting_surge_tiktok"
-    if not _already_signaled(db, comp.id, sig_type):
-        records = _get_series(db, TikTokData, comp.id, days=14)
+    if not ctx.already_signaled(comp.id, sig_type):
+        records = ctx.window("tiktok", comp.id, days=14)
         videos = [(r.recorded_at, r.videos_count) for r in records if r.videos_count]
         if len(videos) >= 7:
             mid = len(videos) // 2
@@ -663,7 +802,7 @@ def _detect_posting_frequency(db: Session, comp: Competitor) -> list:
 
             if first_half_rate > 0 and second_half_rate > first_half_rate * 2.5 and second_half_rate > 0.3:
                 total_new = videos[-1][1] - videos[0][1]
-                signals.append(_create_signal(db, comp,
+                signals.append(ctx.emit(comp,
                     signal_type=sig_type,
                     severity="info",
                     platform="tiktok",
@@ -679,3 +818,17 @@ def _detect_posting_frequency(db: Session, comp: Competitor) -> list:
                 ))
 
     return signals
+
+
+DETECTORS = [
+    ("instagram", _detect_instagram_signals),
+    ("tiktok", _detect_tiktok_signals),
+    ("youtube", _detect_youtube_signals),
+    ("apps", _detect_app_signals),
+    ("ads", _detect_ad_signals),
+    # Trend-based intelligence (multi-day patterns)
+    ("growth_trends", _detect_growth_trends),
+    ("review_velocity", _detect_review_velocity),
+    ("engagement_trends", _detect_engagement_trends),
+    ("posting_frequency", _detect_posting_frequency),
+]
@@ -9,9 +9,9 @@ import logging
 import os
 from typing import Any
 
-import httpx
 
 from core.config import settings
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -215,7 +215,7 @@ class SmartFilterService:
             },
         }
 
-        async with httpx.AsyncClient(timeout=15) as client:
+        async with http_client(timeout=15) as client:
             response = await client.post(url, json=payload)
             response.raise_for_status()
             body = response.json()
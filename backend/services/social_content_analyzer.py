@@ -9,11 +9,14 @@ import base64
 import json
 import logging
 import os
-from typing import Optional
+from typing import Callable, List, Optional
 
 import httpx
 
 from core.config import settings
+from services.analysis_cache import analysis_cache
+from services.http_client import http_client
+from services.llm_batch import PLACEHOLDER, build_batch_prompt, parse_batch
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +63,25 @@ MISTRAL_API_URL = "https://api.mistral.ai/v1/chat/completions"
 
 MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5 MB
 
+# Output budget per post in a batched prompt
+BATCH_TOKENS_PER_ITEM = 1500
+
+# Interactions / views thresholds of the engagement bands in the cache key
+ENGAGEMENT_RATE_BANDS = (0.01, 0.03, 0.06, 0.1)
+
+
+def engagement_bucket(views, likes, comments, shares) -> str:
+    """Coarse engagement level used in the analysis cache key.
+
+    Orders of magnitude of views and interactions plus the interaction rate
+    band: stable across daily collections of the same post, different for
+    posts whose engagement would change the model's engagement_score.
+    """
+    views = int(views or 0)
+    interactions = sum(int(x or 0) for x in (likes, comments, shares))
+    band = sum(interactions / views >= t for t in ENGAGEMENT_RATE_BANDS) if views else -1
+    return f"{len(str(views)) if views else 0}:{len(str(interactions)) if interactions else 0}:{band}"
+
 
 class SocialContentAnalyzer:
     """Analyze social media post content using Gemini Flash (vision + text) + Mistral."""
@@ -83,8 +105,15 @@ class SocialContentAnalyzer:
         comments: int = 0,
         shares: int = 0,
         thumbnail_url: str = "",
+        use_cache: bool = True,
     ) -> Optional[dict]:
-        """Analyze a social post with vision (if thumbnail) + text (Gemini + Mistral)."""
+        """Analyze a social post with vision (if thumbnail) + text (Gemini + Mistral).
+
+        Cached in analysis_cache by thumbnail bytes + title/description + engagement
+        level: a video cross-posted by several pages is analyzed once. Counters go
+        into the key bucketed (engagement_bucket), so the engagement_score of the
+        answer stays right without missing the cache on every collection.
+        """
         if not self.gemini_key and not self.mistral_key:
             logger.error("Cannot analyze: neither GEMINI_API_KEY nor MISTRAL_API_KEY set")
             return None
@@ -94,18 +123,7 @@ class SocialContentAnalyzer:
             logger.warning("No text content or thumbnail to analyze")
             return None
 
-        # Load prompt from DB (fallback to hardcoded)
-        db_prompt_text = ANALYSIS_PROMPT
-        try:
-            from database import SessionLocal, PromptTemplate
-            _db = SessionLocal()
-            row = _db.query(PromptTemplate).filter(PromptTemplate.key == "social_content").first()
-            if row:
-                db_prompt_text = row.prompt_text
-            _db.close()
-        except Exception:
-            pass
-
+        db_prompt_text = self._load_prompt()
         prompt = db_prompt_text.format(
             platform=platform,
             competitor_name=(competitor_name or "")[:100],
@@ -117,16 +135,176 @@ class SocialContentAnalyzer:
             shares=shares,
         )
 
+        # Thumbnail is downloaded up front: its bytes are part of the cache key
+        image = None
+        if thumbnail_url and self.gemini_key:
+            image = await self._download_image(thumbnail_url)
+            if not image[0]:
+                logger.warning(f"Thumbnail download failed, falling back to text: {thumbnail_url[:80]}")
+                image = None
+
+        return await analysis_cache.get_or_compute(
+            "social", self._models(), db_prompt_text,
+            self._cache_texts(platform, competitor_name, title, description,
+                              engagement_bucket(views, likes, comments, shares)),
+            lambda: self._analyze(prompt, thumbnail_url, image),
+            image=image[0] if image else None,
+            use_cache=use_cache,
+        )
+
+    async def analyze_content_batch(
+        self,
+        posts: List[dict],
+        batch_size: int | None = None,
+        use_cache: bool = True,
+    ) -> List[Optional[dict]]:
+        """Text-only analysis of many posts, `batch_size` posts per prompt (Gemini + Mistral).
+
+        Posts are dicts with the analyze_content arguments (thumbnail_url is
+        ignored: posts with a thumbnail go through analyze_content). Results come
+        back in order; posts missing from a batch answer fall back to analyze_content.
+        """
+        batch_size = batch_size or settings.LLM_TEXT_BATCH_SIZE
+        results: List[Optional[dict]] = [None] * len(posts)
+        if not self.gemini_key and not self.mistral_key:
+            logger.error("Cannot analyze: neither GEMINI_API_KEY nor MISTRAL_API_KEY set")
+            return results
+        todo = [i for i, p in enumerate(posts) if f"{p.get('title') or ''} {p.get('description') or ''}".strip()]
+        if not todo:
+            return results
+
+        template = self._load_prompt()
+        lookups = await analysis_cache.lookup_many(
+            "social", self._models(), template,
+            [self._cache_texts(posts[i].get("platform") or "tiktok", posts[i].get("competitor_name"),
+                               posts[i].get("title"), posts[i].get("description"),
+                               engagement_bucket(posts[i].get("views"), posts[i].get("likes"),
+                                                 posts[i].get("comments"), posts[i].get("shares")))
+             for i in todo],
+            use_cache=use_cache,
+        )
+        misses = []
+        for i, (entry, cached) in zip(todo, lookups):
+            if cached is not None:
+                results[i] = cached
+            else:
+                misses.append((i, entry))
+
+        chunks = [misses[n:n + batch_size] for n in range(0, len(misses), batch_size)]
+        answers = await asyncio.gather(
+            *[self._analyze_chunk(template, [posts[i] for i, _ in chunk]) for chunk in chunks],
+            return_exceptions=True,
+        )
+        fallback = []
+        for chunk, answer in zip(chunks, answers):
+            if isinstance(answer, Exception):
+                logger.warning(f"Social batch of {len(chunk)} posts failed: {answer!r}")
+                answer = [None] * len(chunk)
+            for (i, entry), result in zip(chunk, answer):
+                if result:
+                    results[i] = result
+                    await analysis_cache.store_result(entry, result)
+                else:
+                    fallback.append(i)
+
+        if fallback:
+            singles = await asyncio.gather(*[
+                self.analyze_content(**{**self._post_args(posts[i]), "thumbnail_url": "", "use_cache": use_cache})
+                for i in fallback
+            ], return_exceptions=True)
+            for i, result in zip(fallback, singles):
+                results[i] = None if isinstance(result, Exception) else result
+
+        logger.info(
+            f"Social batch: {len(todo)} posts, {len(todo) - len(misses)} cached, "
+            f"{len(chunks)} prompts, {len(fallback)} single fallbacks"
+        )
+        return results
+
+    async def _analyze_chunk(self, template: str, chunk: List[dict]) -> List[Optional[dict]]:
+        """One batched prompt for up to LLM_TEXT_BATCH_SIZE posts, sent to both models."""
+        prompt = build_batch_prompt(
+            template.format(
+                platform=PLACEHOLDER, competitor_name=PLACEHOLDER, title=PLACEHOLDER, description=PLACEHOLDER,
+                views=PLACEHOLDER, likes=PLACEHOLDER, comments=PLACEHOLDER, shares=PLACEHOLDER,
+            ),
+            [
+                {
+                    "platform": args["platform"],
+                    "competitor_name": args["competitor_name"][:100],
+                    "title": args["title"][:500],
+                    "description": args["description"][:1000],
+                    "views": args["views"], "likes": args["likes"],
+                    "comments": args["comments"], "shares": args["shares"],
+                }
+                for args in map(self._post_args, chunk)
+            ],
+            "publications",
+        )
+        max_tokens = BATCH_TOKENS_PER_ITEM * len(chunk)
+        parser = lambda text: self._parse_batch(text, len(chunk))
+        gemini, mistral = await asyncio.gather(
+            self._call_gemini_text(prompt, max_tokens=max_tokens, parser=parser),
+            self._call_mistral(prompt, max_tokens=max_tokens, parser=parser),
+            return_exceptions=True,
+        )
+        gemini = gemini if isinstance(gemini, dict) else {}
+        mistral = mistral if isinstance(mistral, dict) else {}
+        return [self._fuse_results(gemini.get(i), mistral.get(i)) for i in range(len(chunk))]
+
+    @staticmethod
+    def _post_args(post: dict) -> dict:
+        return {
+            "title": post.get("title") or "",
+            "description": post.get("description") or "",
+            "platform": post.get("platform") or "tiktok",
+            "competitor_name": post.get("competitor_name") or "",
+            "views": post.get("views") or 0,
+            "likes": post.get("likes") or 0,
+            "comments": post.get("comments") or 0,
+            "shares": post.get("shares") or 0,
+        }
+
+    @staticmethod
+    def _load_prompt() -> str:
+        """Prompt from DB (prompt_templates "social_content"), fallback to hardcoded."""
+        try:
+            from database import SessionLocal, PromptTemplate
+            _db = SessionLocal()
+            try:
+                row = _db.query(PromptTemplate).filter(PromptTemplate.key == "social_content").first()
+                if row:
+                    return row.prompt_text
+            finally:
+                _db.close()
+        except Exception:
+            pass
+        return ANALYSIS_PROMPT
+
+    def _models(self) -> str:
+        models = []
+        if self.gemini_key:
+            models.append("gemini-3-flash-preview")
+        if self.mistral_key:
+            models.append("mistral-small-latest")
+        return "+".join(models)
+
+    @staticmethod
+    def _cache_texts(platform, competitor_name, title, description, engagement: str) -> tuple:
+        return (platform, (competitor_name or "")[:100], (title or "")[:500], (description or "")[:1000],
+                engagement)
+
+    async def _analyze(self, prompt: str, thumbnail_url: str, image: tuple[bytes, str] | None) -> Optional[dict]:
         # Strategy: if thumbnail available, use Gemini Vision + Mistral text in parallel
         # If no thumbnail, use Gemini text + Mistral text in parallel
         tasks = []
 
-        if thumbnail_url and self.gemini_key:
-            tasks.append(self._call_gemini_vision(prompt, thumbnail_url))
+        if image and self.gemini_key:
+            tasks.append(self._call_gemini_vision(prompt, thumbnail_url, image=image))
         elif self.gemini_key:
             tasks.append(self._call_gemini_text(prompt))
         else:
-            tasks.append(asyncio.coroutine(lambda: None)() if False else self._noop())
+            tasks.append(self._noop())
 
         if self.mistral_key:
             tasks.append(self._call_mistral(prompt))
@@ -153,9 +331,10 @@ class SocialContentAnalyzer:
 
     async def _call_gemini_vision(
         self, prompt: str, thumbnail_url: str, model: str = "gemini-3-flash-preview",
+        image: tuple[bytes, str] | None = None,
     ) -> Optional[dict]:
-        """Download thumbnail + send to Gemini Vision."""
-        image_data, media_type = await self._download_image(thumbnail_url)
+        """Download thumbnail (unless given as (data, media_type)) + send to Gemini Vision."""
+        image_data, media_type = image or await self._download_image(thumbnail_url)
         if not image_data:
             logger.warning(f"Thumbnail download failed, falling back to text: {thumbnail_url[:80]}")
             return await self._call_gemini_text(prompt)
@@ -179,7 +358,10 @@ class SocialContentAnalyzer:
 
     # ── Gemini Text ──────────────────────────────────────────────────
 
-    async def _call_gemini_text(self, prompt: str, model: str = "gemini-3-flash-preview") -> Optional[dict]:
+    async def _call_gemini_text(
+        self, prompt: str, model: str = "gemini-3-flash-preview",
+        max_tokens: int | None = None, parser: Callable[[str], Optional[dict]] | None = None,
+    ) -> Optional[dict]:
         if not self.gemini_key:
             return None
         url = GEMINI_API_URL.format(model=model) + f"?key={self.gemini_key}"
@@ -190,11 +372,16 @@ class SocialContentAnalyzer:
                 "responseMimeType": "application/json",
             },
         }
-        return await self._call_api("Gemini-Text", url, payload, is_gemini=True)
+        if max_tokens:
+            payload["generationConfig"]["maxOutputTokens"] = max_tokens
+        return await self._call_api("Gemini-Text", url, payload, is_gemini=True, parser=parser)
 
     # ── Mistral Text ─────────────────────────────────────────────────
 
-    async def _call_mistral(self, prompt: str, model: str = "mistral-small-latest") -> Optional[dict]:
+    async def _call_mistral(
+        self, prompt: str, model: str = "mistral-small-latest",
+        max_tokens: int = 4096, parser: Callable[[str], Optional[dict]] | None = None,
+    ) -> Optional[dict]:
         if not self.mistral_key:
             return None
         headers = {
@@ -204,11 +391,11 @@ class SocialContentAnalyzer:
         payload = {
             "model": model,
             "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 4096,
+            "max_tokens": max_tokens,
             "temperature": 0.3,
             "response_format": {"type": "json_object"},
         }
-        return await self._call_api("Mistral", MISTRAL_API_URL, payload, is_gemini=False, headers=headers)
+        return await self._call_api("Mistral", MISTRAL_API_URL, payload, is_gemini=False, headers=headers, parser=parser)
 
     # ── Unified API caller ───────────────────────────────────────────
 
@@ -219,11 +406,12 @@ class SocialContentAnalyzer:
         payload: dict,
         is_gemini: bool = True,
         headers: dict | None = None,
+        parser: Callable[[str], Optional[dict]] | None = None,
     ) -> Optional[dict]:
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
+                async with http_client(timeout=30.0) as client:
                     resp = await client.post(url, json=payload, headers=headers)
 
                 if resp.status_code == 429:
@@ -257,7 +445,7 @@ class SocialContentAnalyzer:
                            "output_tokens": usage.get("output_tokens", usage.get("candidatesTokenCount"))},
                 )
 
-                return self._parse_analysis(text)
+                return (parser or self._parse_analysis)(text)
 
             except httpx.TimeoutException:
                 logger.error(f"{label} API timeout for social content analysis")
@@ -284,7 +472,7 @@ class SocialContentAnalyzer:
     async def _download_image(self, url: str) -> tuple[Optional[bytes], str]:
         """Download image from URL. Returns (bytes, media_type) or (None, '')."""
         try:
-            async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
+            async with http_client(timeout=15.0, follow_redirects=True) as client:
                 response = await client.get(url)
 
             if response.status_code != 200:
@@ -393,6 +581,18 @@ class SocialContentAnalyzer:
                 logger.error(f"No JSON found in response: {text[:200]}")
                 return None
 
+        if not isinstance(data, dict):
+            logger.error(f"Analysis JSON is not an object: {text[:200]}")
+            return None
+        return self._normalize_analysis(data)
+
+    def _parse_batch(self, text: str, count: int) -> dict:
+        """Batched answer -> {index: validated analysis} (items that failed to parse are absent)."""
+        return {i: self._normalize_analysis(data) for i, data in parse_batch(text, count).items()}
+
+    @staticmethod
+    def _normalize_analysis(data: dict) -> dict:
+        """Clamp the score and coerce field types in place."""
         # Validate and clamp score
         score = data.get("engagement_score", 0)
         if isinstance(score, (int, float)):
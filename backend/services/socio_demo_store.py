@@ -0,0 +1,170 @@
+"""
+Store socio-démographique INSEE indexé par code commune.
+Les indicateurs du dossier complet sont parsés une seule fois en colonnes REAL
+(SQLite, clé primaire = code commune) : une recherche de N communes coûte N
+lectures d'index et l'agrégation d'une zone est une seule requête SQL.
+"""
+import logging
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FIELDS = (
+    "population", "hommes", "femmes",
+    "pop_0_14", "pop_15_29", "pop_30_44", "pop_45_59", "pop_60_74", "pop_75_plus",
+    "csp_cadres", "csp_prof_inter", "csp_employes", "csp_ouvriers", "csp_retraites",
+    "dipl_sans", "dipl_bac", "dipl_sup",
+    "actifs", "chomeurs", "menages", "proprietaires", "locataires",
+    "revenu_median", "taux_pauvrete",
+)
+
+AGE_FIELDS = {
+    "0-14": "pop_0_14", "15-29": "pop_15_29", "30-44": "pop_30_44",
+    "45-59": "pop_45_59", "60-74": "pop_60_74", "75+": "pop_75_plus",
+}
+CSP_FIELDS = {
+    "cadres": "csp_cadres", "prof_intermediaires": "csp_prof_inter", "employes": "csp_employes",
+    "ouvriers": "csp_ouvriers", "retraites": "csp_retraites",
+}
+
+SQLITE_MAX_PARAMS = 900
+
+
+def _truthy(col: str) -> str:
+    """Équivalent SQL du test Python `if value:` sur un float éventuellement NULL."""
+    return f"COALESCE(s.{col}, 0) != 0"
+
+
+def _aggregate_sql() -> str:
+    """
+    Agrégation pondérée d'une zone en une requête (mêmes règles que l'agrégation
+    ligne à ligne : taux arrondis à 0.1 puis pondérés par la population).
+    """
+    p = "p"
+    has_pop = "COALESCE(s.population, 0) > 0"
+    csp_present = " OR ".join(_truthy(c) for c in ("csp_cadres", "csp_prof_inter", "csp_employes", "csp_ouvriers"))
+    parts = [
+        "COUNT(*)",
+        f"SUM({p})",
+        f"SUM(CASE WHEN {has_pop} AND s.hommes IS NOT NULL AND s.femmes IS NOT NULL THEN s.hommes ELSE 0 END)",
+        f"SUM(CASE WHEN {has_pop} AND s.hommes IS NOT NULL AND s.femmes IS NOT NULL THEN s.femmes ELSE 0 END)",
+    ]
+    for col in AGE_FIELDS.values():
+        parts.append(
+            f"SUM(CASE WHEN {has_pop} AND {_truthy(col)} "
+            f"THEN {p} * round(s.{col} / s.population * 100, 1) / 100 ELSE 0 END)"
+        )
+    chom = "round(s.chomeurs / s.actifs * 100, 1)"
+    chom_ok = f"COALESCE(s.actifs, 0) > 0 AND {_truthy('chomeurs')} AND {chom} != 0"
+    prop = "round(s.proprietaires / s.menages * 100, 1)"
+    prop_ok = f"COALESCE(s.menages, 0) > 0 AND {_truthy('proprietaires')} AND {prop} != 0"
+    parts += [
+        f"SUM(CASE WHEN {chom_ok} THEN {p} * {chom} / 100 ELSE 0 END)",
+        f"SUM(CASE WHEN {chom_ok} THEN {p} ELSE 0 END)",
+        f"SUM(CASE WHEN {prop_ok} THEN {p} * {prop} / 100 ELSE 0 END)",
+        f"SUM(CASE WHEN {prop_ok} THEN {p} ELSE 0 END)",
+        f"SUM(CASE WHEN {_truthy('revenu_median')} THEN {p} * s.revenu_median ELSE 0 END)",
+        f"SUM(CASE WHEN {_truthy('revenu_median')} THEN {p} ELSE 0 END)",
+        f"SUM(CASE WHEN {_truthy('taux_pauvrete')} THEN {p} * s.taux_pauvrete ELSE 0 END)",
+        f"SUM(CASE WHEN {_truthy('taux_pauvrete')} THEN {p} ELSE 0 END)",
+    ]
+    for col in CSP_FIELDS.values():
+        parts.append(f"SUM(CASE WHEN ({csp_present}) AND {_truthy(col)} THEN s.{col} ELSE 0 END)")
+
+    return (
+        f"SELECT {', '.join(parts)} FROM ("
+        "  SELECT s.*, COALESCE(NULLIF(s.population, 0), z.pop) AS p"
+        "  FROM zone z JOIN socio_demo s ON s.code = z.code"
+        ") s WHERE COALESCE(p, 0) != 0"
+    )
+
+
+AGGREGATE_SQL = _aggregate_sql()
+
+
+class SocioDemoStore:
+    """Table socio_demo (code TEXT PRIMARY KEY, une colonne REAL par indicateur)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with closing(sqlite3.connect(path)) as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        self.version = meta.get("version", "")
+        self.count = int(meta.get("count", 0))
+
+    @classmethod
+    def build(cls, records: Iterable[Tuple[str, Dict[str, Optional[float]]]], path: Path, version: str) -> "SocioDemoStore":
+        """Ingestion unique (code, {champ: valeur}) ; dernière ligne gagnante par code."""
+        tmp_path = path.with_suffix(".tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+        count = 0
+        with closing(sqlite3.connect(tmp_path)) as conn:
+            cols = ", ".join(f"{f} REAL" for f in FIELDS)
+            conn.execute(f"CREATE TABLE socio_demo (code TEXT PRIMARY KEY, {cols})")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            insert = f"INSERT OR REPLACE INTO socio_demo VALUES (?, {', '.join('?' for _ in FIELDS)})"
+            batch = []
+            for code, values in records:
+                batch.append([code] + [values.get(f) for f in FIELDS])
+                if len(batch) >= 5000:
+                    conn.executemany(insert, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                conn.executemany(insert, batch)
+                count += len(batch)
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [("version", version), ("count", str(count))])
+            conn.commit()
+        tmp_path.replace(path)
+        logger.info(f"Socio-demo store built: {count} communes")
+        return cls(path)
+
+    def get(self, codes: Optional[List[str]] = None) -> Dict[str, Dict[str, Optional[float]]]:
+        """code -> {champ: valeur} pour les codes demandés (tous si None)."""
+        select = f"SELECT code, {', '.join(FIELDS)} FROM socio_demo"
+        result = {}
+        with closing(sqlite3.connect(self.path)) as conn:
+            if codes is None:
+                cursors = [conn.execute(select)]
+            else:
+                unique = list(dict.fromkeys(c for c in codes if c))
+                cursors = [
+                    conn.execute(
+                        f"{select} WHERE code IN ({', '.join('?' for _ in chunk)})", chunk
+                    )
+                    for chunk in (unique[i:i + SQLITE_MAX_PARAMS] for i in range(0, len(unique), SQLITE_MAX_PARAMS))
+                ]
+            for cursor in cursors:
+                for row in cursor:
+                    result[row[0]] = dict(zip(FIELDS, row[1:]))
+        return result
+
+    def aggregate(self, zone: List[Tuple[str, float]]) -> Optional[Dict]:
+        """
+        Sommes pondérées pour une zone [(code, population de repli)].
+        Retourne None si aucune commune de la zone n'a de données.
+        """
+        with closing(sqlite3.connect(self.path)) as conn:
+            conn.execute("CREATE TEMP TABLE zone (code TEXT PRIMARY KEY, pop REAL)")
+            conn.executemany("INSERT OR IGNORE INTO zone VALUES (?, ?)", [(c, p or 0) for c, p in zone if c])
+            row = conn.execute(AGGREGATE_SQL).fetchone()
+
+        if not row or not row[0]:
+            return None
+        values = iter(row)
+        result = {
+            "communes": next(values),
+            "population": next(values) or 0,
+            "hommes": next(values) or 0,
+            "femmes": next(values) or 0,
+            "ages": {group: next(values) or 0 for group in AGE_FIELDS},
+        }
+        for key in ("chomeurs", "actifs", "proprietaires", "menages",
+                    "revenu_weighted", "revenu_weight", "pauvrete_weighted", "pauvrete_weight"):
+            result[key] = next(values) or 0
+        result["csp"] = {csp: next(values) or 0 for csp in CSP_FIELDS}
+        return result
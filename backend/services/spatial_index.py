@@ -0,0 +1,133 @@
+"""
+Index spatial en grille lat/lon.
+Remplace les boucles "tous les points x bbox + haversine" par une recherche
+limitée aux cellules qui recouvrent le rayon demandé.
+"""
+import logging
+from math import cos, floor, radians
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from services.geodata import haversine_distance
+
+logger = logging.getLogger(__name__)
+
+# ~11 km en latitude : un rayon de 10 km ne touche que 3x3 à 4x4 cellules
+DEFAULT_CELL_DEG = 0.1
+KM_PER_DEG_LAT = 111.0
+
+
+class GridIndex:
+    """Grille de cellules (cell_deg x cell_deg) -> points (lat, lon, payload)."""
+
+    def __init__(self, cell_deg: float = DEFAULT_CELL_DEG):
+        self.cell_deg = cell_deg
+        self.cells: Dict[Tuple[int, int], List[Tuple[float, float, Any]]] = {}
+        self.size = 0
+
+    @classmethod
+    def build(
+        cls,
+        items: Iterable[Any],
+        get_coords: Callable[[Any], Tuple[Optional[float], Optional[float]]],
+        cell_deg: float = DEFAULT_CELL_DEG,
+    ) -> "GridIndex":
+        """Construit l'index ; les éléments sans coordonnées sont ignorés."""
+        index = cls(cell_deg)
+        for item in items:
+            lat, lon = get_coords(item)
+            if lat is None or lon is None:
+                continue
+            index.add(lat, lon, item)
+        return index
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return floor(lat / self.cell_deg), floor(lon / self.cell_deg)
+
+    def add(self, lat: float, lon: float, payload: Any):
+        self.cells.setdefault(self._cell(lat, lon), []).append((lat, lon, payload))
+        self.size += 1
+
+    def __len__(self) -> int:
+        return self.size
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> List[Tuple[Any, float]]:
+        """Retourne [(payload, distance_km)] des points à moins de radius_km (non trié)."""
+        lat_delta = radius_km / KM_PER_DEG_LAT
+        lon_delta = radius_km / (KM_PER_DEG_LAT * max(cos(radians(lat)), 0.01))
+        min_lat, max_lat = lat - lat_delta, lat + lat_delta
+        min_lon, max_lon = lon - lon_delta, lon + lon_delta
+        row_lo, col_lo = self._cell(min_lat, min_lon)
+        row_hi, col_hi = self._cell(max_lat, max_lon)
+
+        found = []
+        cells = self.cells
+        for row in range(row_lo, row_hi + 1):
+            for col in range(col_lo, col_hi + 1):
+                bucket = cells.get((row, col))
+                if not bucket:
+                    continue
+                for plat, plon, payload in bucket:
+                    if plat < min_lat or plat > max_lat or plon < min_lon or plon > max_lon:
+                        continue
+                    dist = haversine_distance(lat, lon, plat, plon)
+                    if dist <= radius_km:
+                        found.append((payload, dist))
+        return found
+
+    def nearest(self, lat: float, lon: float) -> Optional[Tuple[Any, float]]:
+        """Retourne (payload, distance_km) du point le plus proche, ou None si vide.
+
+        Élargit la recherche par anneaux de cellules jusqu'au premier point trouvé,
+        puis vérifie avec une requête de rayon égal à cette distance (un point d'une
+        cellule voisine peut être plus proche que celui de la cellule centrale).
+        """
+        if not self.size:
+            return None
+        row0, col0 = self._cell(lat, lon)
+        max_ring = max(max(abs(r - row0), abs(c - col0)) for r, c in self.cells)
+
+        candidate: Optional[Tuple[Any, float]] = None
+        for ring in range(max_ring + 1):
+            for row in range(row0 - ring, row0 + ring + 1):
+                for col in range(col0 - ring, col0 + ring + 1):
+                    if ring and abs(row - row0) != ring and abs(col - col0) != ring:
+                        continue  # intérieur déjà visité
+                    for plat, plon, payload in self.cells.get((row, col), ()):
+                        dist = haversine_distance(lat, lon, plat, plon)
+                        if candidate is None or dist < candidate[1]:
+                            candidate = (payload, dist)
+            if candidate is not None:
+                break
+
+        in_radius = self.query_radius(lat, lon, candidate[1])
+        return min(in_radius, key=lambda x: x[1]) if in_radius else candidate
+
+
+# =============================================================================
+# Index des communes
+# =============================================================================
+
+def commune_coords(commune: Dict) -> Tuple[Optional[float], Optional[float]]:
+    """Coordonnées d'une commune (format data.gouv ou COMMUNES_REFERENCE)."""
+    lat = commune.get("latitude", commune.get("lat"))
+    lon = commune.get("longitude", commune.get("lon"))
+    if not lat or not lon:
+        return None, None
+    return lat, lon
+
+
+def build_commune_index(communes: Iterable[Dict], cell_deg: float = DEFAULT_CELL_DEG) -> GridIndex:
+    """Index des communes ; une construction sur ~35k communes prend ~100 ms."""
+    return GridIndex.build(communes, commune_coords, cell_deg)
+
+
+_reference_index: Optional[GridIndex] = None
+
+
+def get_reference_index() -> GridIndex:
+    """Index (construit une seule fois) de COMMUNES_REFERENCE."""
+    global _reference_index
+    if _reference_index is None:
+        from services.geodata import COMMUNES_REFERENCE
+        _reference_index = build_commune_index(COMMUNES_REFERENCE)
+    return _reference_index
@@ -0,0 +1,239 @@
+"""
+Durable per-item task queue (task_items) for long pipelines.
+
+Scheduler jobs enqueue one task per item (ad, post, store, competitor); workers
+lease batches, run an idempotent handler per item and mark it done. A crashed
+worker's leases expire and are picked up again; failures are retried with
+exponential backoff until max_attempts, then parked as "dead".
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, or_, and_
+from sqlalchemy.orm import Session
+
+from database import TaskItem
+
+logger = logging.getLogger(__name__)
+
+# task_type -> lease (seconds), max attempts, owning scheduler job
+TASK_TYPES: Dict[str, dict] = {
+    "creative_analysis": {"lease_seconds": 180, "max_attempts": 3, "job_id": "daily_creative_analysis"},
+    "social_analysis": {"lease_seconds": 120, "max_attempts": 3, "job_id": "daily_social_analysis"},
+    "gmb_enrichment": {"lease_seconds": 120, "max_attempts": 3, "job_id": "weekly_gmb_enrichment"},
+    "ereputation_audit": {"lease_seconds": 1800, "max_attempts": 2, "job_id": "weekly_ereputation_audit"},
+}
+
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 3600
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff: 1 min, 2 min, 4 min... capped at 6 h."""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS))
+
+
+def enqueue_items(db: Session, task_type: str, keys: Iterable, run_id: Optional[int] = None) -> int:
+    """Add one pending task per key. Keys already pending/leased are left alone;
+    done/dead keys are re-armed (the producer only selects items that still need work).
+    Returns the number of tasks (re)queued."""
+    keys = list(dict.fromkeys(str(k) for k in keys))
+    if not keys:
+        return 0
+    now = datetime.utcnow()
+    existing = {}
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        for task in db.query(TaskItem).filter(TaskItem.task_type == task_type, TaskItem.item_key.in_(chunk)):
+            existing[task.item_key] = task
+
+    queued = 0
+    for key in keys:
+        task = existing.get(key)
+        if task is None:
+            db.add(TaskItem(task_type=task_type, item_key=key, run_id=run_id, status="pending", available_at=now))
+        elif task.status in ("done", "dead"):
+            task.status = "pending"
+            task.attempts = 0
+            task.last_error = None
+            task.available_at = now
+            task.finished_at = None
+            task.run_id = run_id
+        else:
+            continue
+        queued += 1
+    db.commit()
+    return queued
+
+
+def lease_batch(db: Session, task_type: str, owner: str, limit: int = 20) -> List[TaskItem]:
+    """Lease up to `limit` ready tasks: pending past their backoff, or leased with an expired lease."""
+    now = datetime.utcnow()
+    lease_until = now + timedelta(seconds=TASK_TYPES[task_type]["lease_seconds"])
+    ready = or_(
+        and_(TaskItem.status == "pending", TaskItem.available_at <= now),
+        and_(TaskItem.status == "leased", TaskItem.lease_expires_at < now),
+    )
+    candidate_ids = [
+        row[0] for row in db.query(TaskItem.id)
+        .filter(TaskItem.task_type == task_type, ready)
+        .order_by(TaskItem.available_at, TaskItem.id)
+        .limit(limit)
+        .all()
+    ]
+    leased_ids = []
+    for task_id in candidate_ids:
+        # Conditional update re-checks readiness: only one worker wins a given task
+        claimed = db.query(TaskItem).filter(TaskItem.id == task_id, ready).update(
+            {"status": "leased", "lease_owner": owner, "lease_expires_at": lease_until},
+            synchronize_session=False,
+        )
+        if claimed:
+            leased_ids.append(task_id)
+    db.commit()
+    if not leased_ids:
+        return []
+    return db.query(TaskItem).filter(TaskItem.id.in_(leased_ids)).order_by(TaskItem.id).all()
+
+
+def complete(db: Session, task_id: int):
+    """Mark done and commit (together with the handler's own changes)."""
+    complete_many(db, [task_id])
+
+
+def complete_many(db: Session, task_ids: List[int], commit: bool = True):
+    """Mark a batch done; with commit=False the caller commits it with its writeback."""
+    if task_ids:
+        db.query(TaskItem).filter(TaskItem.id.in_(task_ids)).update(
+            {"status": "done", "lease_owner": None, "lease_expires_at": None,
+             "last_error": None, "finished_at": datetime.utcnow()},
+            synchronize_session=False,
+        )
+    if commit:
+        db.commit()
+
+
+def renew_leases(db: Session, task_type: str, task_ids: List[int], owner: str, commit: bool = True) -> int:
+    """Extend the leases still held by `owner` (long batches); returns how many were renewed."""
+    renewed = 0
+    if task_ids:
+        renewed = db.query(TaskItem).filter(
+            TaskItem.id.in_(task_ids), TaskItem.status == "leased", TaskItem.lease_owner == owner,
+        ).update(
+            {"lease_expires_at": datetime.utcnow() + timedelta(seconds=TASK_TYPES[task_type]["lease_seconds"])},
+            synchronize_session=False,
+        )
+    if commit:
+        db.commit()
+    return renewed
+
+
+def release(db: Session, task_ids: List[int]):
+    """Give leased tasks back untouched (drain stopped before reaching them)."""
+    if task_ids:
+        db.query(TaskItem).filter(TaskItem.id.in_(task_ids), TaskItem.status == "leased").update(
+            {"status": "pending", "lease_owner": None, "lease_expires_at": None},
+            synchronize_session=False,
+        )
+        db.commit()
+
+
+def fail(db: Session, task_id: int, error: str, commit: bool = True):
+    """Record a failed attempt: back to pending after a backoff, or dead after max_attempts."""
+    task = db.query(TaskItem).get(task_id)
+    if task is None:
+        return
+    task.attempts = (task.attempts or 0) + 1
+    task.last_error = error[:2000]
+    task.lease_owner = None
+    task.lease_expires_at = None
+    if task.attempts >= TASK_TYPES[task.task_type]["max_attempts"]:
+        task.status = "dead"
+        task.finished_at = datetime.utcnow()
+    else:
+        task.status = "pending"
+        task.available_at = datetime.utcnow() + retry_delay(task.attempts)
+    if commit:
+        db.commit()
+
+
+def ready_task_types(db: Session) -> List[str]:
+    """Task types with at least one task that can be leased now."""
+    now = datetime.utcnow()
+    rows = db.query(TaskItem.task_type).filter(or_(
+        and_(TaskItem.status == "pending", TaskItem.available_at <= now),
+        and_(TaskItem.status == "leased", TaskItem.lease_expires_at < now),
+    )).distinct().all()
+    return [r[0] for r in rows]
+
+
+def queue_stats(db: Session) -> Dict[str, dict]:
+    """Backlog and throughput per task type."""
+    now = datetime.utcnow()
+    stats = {
+        task_type: {
+            "job_id": cfg["job_id"], "pending": 0, "leased": 0, "done": 0, "dead": 0,
+            "retrying": 0, "done_last_hour": 0, "done_last_24h": 0, "oldest_pending_at": None,
+        }
+        for task_type, cfg in TASK_TYPES.items()
+    }
+
+    def grouped(*filters):
+        query = db.query(TaskItem.task_type, func.count(TaskItem.id)).filter(*filters)
+        return [(t, c) for t, c in query.group_by(TaskItem.task_type) if t in stats]
+
+    for status in ("pending", "leased", "done", "dead"):
+        for task_type, count in grouped(TaskItem.status == status):
+            stats[task_type][status] = count
+    for task_type, count in grouped(TaskItem.status == "pending", TaskItem.attempts > 0):
+        stats[task_type]["retrying"] = count
+    for task_type, count in grouped(TaskItem.status == "done", TaskItem.finished_at >= now - timedelta(hours=1)):
+        stats[task_type]["done_last_hour"] = count
+    for task_type, count in grouped(TaskItem.status == "done", TaskItem.finished_at >= now - timedelta(hours=24)):
+        stats[task_type]["done_last_24h"] = count
+
+    for task_type, oldest in db.query(TaskItem.task_type, func.min(TaskItem.available_at)).filter(
+        TaskItem.status.in_(("pending", "leased")),
+    ).group_by(TaskItem.task_type):
+        if task_type in stats and oldest:
+            stats[task_type]["oldest_pending_at"] = oldest.isoformat()
+
+    for entry in stats.values():
+        entry["backlog"] = entry["pending"] + entry["leased"]
+    return stats
+
+
+def run_progress(db: Session, run_ids: List[int]) -> Dict[int, dict]:
+    """Per JobRun progress: task counts by status."""
+    progress: Dict[int, dict] = {}
+    if not run_ids:
+        return progress
+    for run_id, task_type, status, count in db.query(
+        TaskItem.run_id, TaskItem.task_type, TaskItem.status, func.count(TaskItem.id),
+    ).filter(TaskItem.run_id.in_(run_ids)).group_by(TaskItem.run_id, TaskItem.task_type, TaskItem.status):
+        entry = progress.setdefault(run_id, {"task_type": task_type, "total": 0})
+        entry[status] = count
+        entry["total"] += count
+    return progress
+
+
+def failed_items(db: Session, task_type: str, limit: int = 50) -> List[dict]:
+    tasks = db.query(TaskItem).filter(
+        TaskItem.task_type == task_type, or_(TaskItem.status == "dead", TaskItem.attempts > 0),
+    ).order_by(TaskItem.id.desc()).limit(limit).all()
+    return [
+        {"item_key": t.item_key, "status": t.status, "attempts": t.attempts, "last_error": t.last_error,
+         "available_at": t.available_at.isoformat() if t.available_at else None}
+        for t in tasks
+    ]
+
+
+def retry_dead(db: Session, task_type: str) -> int:
+    """Re-arm dead tasks of a type (admin action)."""
+    count = db.query(TaskItem).filter(TaskItem.task_type == task_type, TaskItem.status == "dead").update(
+        {"status": "pending", "attempts": 0, "available_at": datetime.utcnow(), "finished_at": None},
+        synchronize_session=False,
+    )
+    db.commit()
+    return count
@@ -19,11 +19,11 @@ import logging
 from datetime import datetime, timedelta
 from typing import Any
 
-import httpx
 
 from core.config import settings
 from services.youtube_api import youtube_api
 from services.geo_analyzer import GeoAnalyzer
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -341,7 +341,7 @@ class VgeoAnalyzer:
 
         try:
             url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent?key={settings.GEMINI_API_KEY}"
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with http_client(timeout=30) as client:
                 resp = await client.post(url, json={
                     "contents": [{"parts": [{"text": prompt}]}],
                     "generationConfig": {
@@ -524,7 +524,7 @@ class VgeoAnalyzer:
 
         try:
             url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent?key={settings.GEMINI_API_KEY}"
-            async with httpx.AsyncClient(timeout=45) as client:
+            async with http_client(timeout=45) as client:
                 resp = await client.post(url, json={
                     "contents": [{"parts": [{"text": prompt}]}],
                     "generationConfig": {
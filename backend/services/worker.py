@@ -0,0 +1,116 @@
+"""
+Worker process for scheduled and manually triggered jobs.
+
+    python -m services.worker
+
+Runs the APScheduler cron triggers and drains the job_runs queue filled by the
+API's /api/scheduler/run-* endpoints. Every job runs under a DB lock, so
+several workers (or a worker during a redeploy) never run the same job twice.
+Items left in task_items by an interrupted run (expired lease, retry due) are
+drained on the next poll, so long pipelines resume where they stopped.
+"""
+import asyncio
+import logging
+import signal
+
+from core.config import settings
+from database import init_db, run_in_db_thread
+from services import jobs, task_queue
+from services.http_client import http_pool
+from services.scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Claims queued runs and executes them; one run per job at a time."""
+
+    def __init__(self, sched=scheduler, poll_seconds: float | None = None):
+        self.scheduler = sched
+        self.poll_seconds = poll_seconds if poll_seconds is not None else settings.WORKER_POLL_SECONDS
+        self._running: dict[int, asyncio.Task] = {}  # run_id -> task
+        self._busy_jobs: set[str] = set()
+        self._drains: dict[str, asyncio.Task] = {}  # task_type -> resume drain
+        self._stopping = asyncio.Event()
+
+    async def _execute(self, run_id: int, job_id: str):
+        try:
+            if job_id not in self.scheduler.job_functions:
+                await run_in_db_thread(jobs.with_session, jobs.finish_run, run_id, f"Unknown job: {job_id}")
+                return
+            ran = await self.scheduler.run_job(job_id, run_id=run_id, source="manual")
+            if not ran:
+                # Locked by another process: retry on a later poll
+                await run_in_db_thread(jobs.with_session, jobs.requeue_run, run_id)
+        except Exception as e:
+            logger.error(f"Run {run_id} ({job_id}) crashed: {e}")
+            await run_in_db_thread(jobs.with_session, jobs.finish_run, run_id, str(e))
+        finally:
+            self._running.pop(run_id, None)
+            self._busy_jobs.discard(job_id)
+
+    async def poll_once(self) -> int:
+        """Start every claimable run and resume orphaned task items; returns how many runs were started."""
+        started = 0
+        while True:
+            run = await run_in_db_thread(
+                jobs.with_session, jobs.claim_next_run, jobs.WORKER_ID, tuple(self._busy_jobs),
+            )
+            if run is None:
+                break
+            logger.info(f"Claimed run {run.id} ({run.job_id}, requested by {run.requested_by})")
+            self._busy_jobs.add(run.job_id)
+            self._running[run.id] = asyncio.create_task(self._execute(run.id, run.job_id))
+            started += 1
+
+        for task_type in await run_in_db_thread(jobs.with_session, task_queue.ready_task_types):
+            drain = self._drains.get(task_type)
+            if (drain and not drain.done()) or task_type in self.scheduler._draining:
+                continue
+            logger.info(f"Resuming queued {task_type} items")
+            self._drains[task_type] = asyncio.create_task(self.scheduler.drain_tasks(task_type))
+        return started
+
+    async def run(self):
+        recovered = await run_in_db_thread(jobs.with_session, jobs.recover_stale_runs)
+        if recovered:
+            logger.warning(f"Marked {recovered} run(s) interrupted by a previous worker as failed")
+        await self.scheduler.start()
+        logger.info(f"Worker {jobs.WORKER_ID} polling every {self.poll_seconds}s")
+        try:
+            while not self._stopping.is_set():
+                try:
+                    await self.poll_once()
+                except Exception as e:
+                    logger.error(f"Worker poll failed: {e}")
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self.scheduler.stop()
+            pending = list(self._running.values()) + [d for d in self._drains.values() if not d.done()]
+            if pending:
+                logger.info(f"Waiting for {len(pending)} running job(s) to finish")
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def stop(self):
+        self._stopping.set()
+
+
+async def main():
+    init_db()
+    await http_pool.start()
+    worker = Worker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await http_pool.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(main())
@@ -8,8 +8,9 @@ from sqlalchemy.orm import sessionmaker
 os.environ["DATABASE_URL"] = "sqlite:///./test.db"
 os.environ["JWT_SECRET"] = "test-secret-key"
 os.environ["JWT_EXPIRATION_DAYS"] = "1"
+os.environ["SCRAPECREATORS_CACHE_PATH"] = ""
 
-from database import Base, get_db, User, Advertiser, Competitor, UserAdvertiser, AdvertiserCompetitor
+from database import Base, get_db, get_async_db, AsyncDBSession, User, Advertiser, Competitor, UserAdvertiser, AdvertiserCompetitor
 from core.auth import hash_password, create_access_token
 from main import app
 
@@ -37,7 +38,16 @@ def override_get_db():
         db.close()
 
 
+async def override_get_async_db():
+    db = AsyncDBSession(TestingSessionLocal)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
 
 
 @pytest.fixture
@@ -0,0 +1,105 @@
+"""Tests for services/ad_analytics.py — SQL-side ad aggregation and its callers."""
+import os
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+os.environ.setdefault("JWT_SECRET", "test-secret-key")
+
+import pytest
+
+from database import Ad
+from routers.watch import _build_ad_intelligence
+from services.ad_analytics import aggregate_ads, parse_platforms
+
+
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+def _add_ad(db, comp_id, n, **kwargs):
+    kwargs.setdefault("start_date", NOW - timedelta(days=5))
+    kwargs.setdefault("is_active", True)
+    ad = Ad(competitor_id=comp_id, ad_id=f"ad-{comp_id}-{n}", **kwargs)
+    db.add(ad)
+    return ad
+
+
+@pytest.fixture
+def ads(db, test_competitor):
+    cid = test_competitor.id
+    _add_ad(db, cid, 1, estimated_spend_min=100, estimated_spend_max=200, display_format="VIDEO",
+            publisher_platforms='["FACEBOOK", "INSTAGRAM"]', page_name="Carrefour", byline="Carrefour SA")
+    _add_ad(db, cid, 2, impressions_min=10000, impressions_max=20000, display_format="IMAGE",
+            publisher_platforms='["FACEBOOK", "MESSENGER"]', page_name="Carrefour Market",
+            beneficiary="Carrefour Market FR", eu_total_reach=50)
+    _add_ad(db, cid, 3, eu_total_reach=10000, platform="google", is_active=False,
+            start_date=NOW - timedelta(days=200), end_date=NOW - timedelta(days=150))
+    db.commit()
+    return cid
+
+
+class TestAggregateAds:
+    def test_spend_estimation(self, db, ads):
+        row = aggregate_ads(db, [ads], ())[0]
+        assert row.ads == 3
+        assert row.active == 2
+        # declared 100-200 + impressions 30-60 + reach 21-39
+        assert row.spend_min == pytest.approx(151)
+        assert row.spend_max == pytest.approx(299)
+        assert row.reach == 10050
+
+    def test_period_overlap(self, db, ads):
+        rows = aggregate_ads(db, [ads], ("display_format",), NOW - timedelta(days=90), NOW)
+        assert sorted(r.display_format for r in rows) == ["IMAGE", "VIDEO"]
+
+    def test_page_and_payer_dimensions(self, db, ads):
+        pages = {r.page for r in aggregate_ads(db, [ads], ("page",))}
+        assert pages == {"Carrefour", "Carrefour Market FR", None}
+        payers = {r.payer: r.ads for r in aggregate_ads(db, [ads], ("payer",))}
+        assert payers == {"Carrefour SA": 1, None: 2}
+
+    def test_empty_ids(self, db):
+        assert aggregate_ads(db, [], ("competitor_id",)) == []
+
+
+class TestParsePlatforms:
+    def test_raw_and_fallback(self):
+        assert parse_platforms('["FACEBOOK", "MESSENGER"]', None) == ("FACEBOOK", "MESSENGER")
+        assert parse_platforms(None, "google") == ("GOOGLE",)
+        assert parse_platforms("not json", None) == ()
+
+    def test_normalised(self):
+        assert parse_platforms('["FACEBOOK", "MESSENGER"]', None, normalise=True) == ("facebook",)
+
+
+class TestCallers:
+    def test_ads_overview(self, client, ads, adv_headers):
+        start = (NOW - timedelta(days=90)).strftime("%Y-%m-%d")
+        end = NOW.strftime("%Y-%m-%d")
+        resp = client.get(f"/api/ads/overview?start_date={start}&end_date={end}", headers=adv_headers)
+        assert resp.status_code == 200
+        data = resp.json()
+        comp = data["competitors"][0]
+        assert comp["total_ads"] == 2
+        assert comp["spend_min"] == 130
+        assert comp["pages"] == ["Carrefour", "Carrefour Market FR"]
+        assert comp["by_format"] == {"VIDEO": 1, "IMAGE": 1}
+        assert comp["by_platform"]["facebook"]["ads"] == 2
+        assert comp["by_platform"]["instagram"] == {"ads": 1, "spend_min": 50, "spend_max": 100, "reach": 0}
+        assert data["totals"]["active_ads"] == 2
+        week = (NOW - timedelta(days=5)).strftime("%G-W%V")
+        assert data["timeline"] == [{"week": week, "Carrefour": 2, "Carrefour_spend": 130}]
+
+    def test_ad_intelligence(self, db, ads):
+        result = _build_ad_intelligence(db, [{"id": ads, "name": "Carrefour"}], "Test Brand")
+        assert result["total_ads"] == 3
+        assert result["total_active"] == 2
+        assert result["total_estimated_spend"]["min"] == pytest.approx(151)
+        platforms = {p["platform"]: p["count"] for p in result["platform_breakdown"]}
+        assert platforms == {"FACEBOOK": 2, "INSTAGRAM": 1, "MESSENGER": 1, "GOOGLE": 1}
+        advertisers = {a["name"]: a for a in result["advertisers"]}
+        assert advertisers["Inconnu"]["total"] == 1
+        assert advertisers["Carrefour"]["top_format"] == "VIDEO"
+        assert result["payers"] == [{"name": "Carrefour SA", "total": 1, "active": 1, "pages": ["Carrefour"]}]
+        summary = result["competitor_summary"][0]
+        assert summary["formats"] == {"VIDEO": 1, "IMAGE": 1, "AUTRE": 1}
+        assert summary["platforms"] == ["FACEBOOK", "GOOGLE", "INSTAGRAM", "MESSENGER"]
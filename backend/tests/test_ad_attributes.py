@@ -0,0 +1,126 @@
+"""Tests for services/ad_attributes.py — JSON list columns exploded into ad_attributes."""
+import json
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+os.environ.setdefault("JWT_SECRET", "test-secret-key")
+
+from database import Ad, AdAttribute, _backfill_ad_attributes
+from services.ad_attributes import attribute_filter, explode
+from services.ad_ingestion import upsert_ads
+
+
+def _attrs(db, ad_id=None):
+    q = db.query(AdAttribute.kind, AdAttribute.value)
+    if ad_id is not None:
+        q = q.filter(AdAttribute.ad_id == ad_id)
+    return sorted(q.all())
+
+
+def _ad(n, **kwargs):
+    return Ad(competitor_id=1, ad_id=f"ad-{n}", **kwargs)
+
+
+class TestExplode:
+    def test_all_kinds(self):
+        ad = _ad(
+            1,
+            publisher_platforms='["FACEBOOK", "INSTAGRAM", "FACEBOOK"]',
+            targeted_countries='["FR"]',
+            location_audience=json.dumps([{"name": "Paris", "type": "city"}, {"name": ""}]),
+            creative_tags=json.dumps(["promo", " famille "], ensure_ascii=False),
+            products_detected=json.dumps(["saumon fumé"], ensure_ascii=False),
+            creative_dominant_colors='["#FF0000"]',
+        )
+        assert explode(ad) == [
+            ("platform", "FACEBOOK"), ("platform", "INSTAGRAM"),
+            ("country", "FR"),
+            ("location", "Paris"),
+            ("tag", "promo"), ("tag", "famille"),
+            ("product", "saumon fumé"),
+            ("color", "#FF0000"),
+        ]
+
+    def test_platform_fallback_and_bad_json(self):
+        assert explode(_ad(1, platform="google", creative_tags="not json")) == [("platform", "GOOGLE")]
+
+    def test_malformed_items_skipped(self, db):
+        ad = _ad(
+            1,
+            location_audience='[{"name": null}, {"name": 75}, {"type": "city"}]',
+            creative_tags='[null, ["nested"], {"a": 1}, true, "promo"]',
+        )
+        assert explode(ad) == [("location", "75"), ("tag", "promo")]
+        db.add(ad)
+        db.commit()  # the flush hook must not fail on them
+        assert _attrs(db, ad.id) == [("location", "75"), ("tag", "promo")]
+
+
+class TestSessionHook:
+    def test_insert_update_delete(self, db):
+        ad = _ad(1, publisher_platforms='["FACEBOOK"]', creative_tags='["promo"]')
+        db.add(ad)
+        db.commit()
+        assert _attrs(db, ad.id) == [("platform", "FACEBOOK"), ("tag", "promo")]
+
+        ad.creative_tags = '["famille"]'
+        db.commit()
+        assert _attrs(db, ad.id) == [("platform", "FACEBOOK"), ("tag", "famille")]
+
+        db.delete(ad)
+        db.commit()
+        assert _attrs(db) == []
+
+    def test_unrelated_update_keeps_rows(self, db):
+        ad = _ad(1, creative_tags='["promo"]')
+        db.add(ad)
+        db.commit()
+        ad.is_active = False
+        db.commit()
+        assert _attrs(db, ad.id) == [("tag", "promo")]
+
+    def test_rollback_discards_rows(self, db):
+        db.add(_ad(1, creative_tags='["promo"]'))
+        db.flush()
+        db.rollback()
+        assert _attrs(db) == []
+
+
+class TestUpsertAds:
+    def test_core_inserts_are_exploded(self, db):
+        upsert_ads(db, [
+            {"ad_id": "a", "competitor_id": 1, "platform": "facebook", "targeted_countries": '["FR", "BE"]'},
+            {"ad_id": "b", "competitor_id": 1, "platform": "google"},
+        ])
+        assert _attrs(db) == [("country", "BE"), ("country", "FR"), ("platform", "FACEBOOK"), ("platform", "GOOGLE")]
+
+    def test_list_field_update(self, db):
+        upsert_ads(db, [{"ad_id": "a", "competitor_id": 1, "creative_tags": '["promo"]'}])
+        upsert_ads(db, [{"ad_id": "a", "competitor_id": 1, "creative_tags": '["noel"]'}],
+                   update_fields=("creative_tags",))
+        assert _attrs(db) == [("tag", "noel")]
+
+
+class TestFilterAndBackfill:
+    def test_attribute_filter(self, db):
+        db.add(_ad(1, location_audience=json.dumps([{"name": "Paris 75001"}])))
+        db.add(_ad(2, location_audience=json.dumps([{"name": "Lyon"}])))
+        db.commit()
+        found = db.query(Ad.ad_id).filter(attribute_filter("location", "paris")).all()
+        assert [r.ad_id for r in found] == ["ad-1"]
+        assert db.query(Ad).filter(attribute_filter("location", "Paris", exact=True)).count() == 0
+
+    def test_backfill_and_orphan_cleanup(self, db):
+        ad = _ad(1, creative_tags='["promo"]')
+        db.add(ad)
+        db.commit()
+        db.query(AdAttribute).delete()
+        db.commit()
+
+        _backfill_ad_attributes(db.get_bind())
+        assert _attrs(db, ad.id) == [("tag", "promo")]
+
+        db.query(Ad).delete(synchronize_session=False)  # bulk delete bypasses the hook
+        db.commit()
+        _backfill_ad_attributes(db.get_bind())
+        assert _attrs(db) == []
@@ -0,0 +1,76 @@
+"""Tests for the bulk ad ingestion service."""
+from datetime import datetime
+
+from database import Ad, Competitor
+from services.ad_ingestion import upsert_ads
+
+
+def _competitor(db, name="Carrefour"):
+    comp = Competitor(name=name, is_active=True)
+    db.add(comp)
+    db.commit()
+    db.refresh(comp)
+    return comp
+
+
+def test_inserts_new_ads(db):
+    comp = _competitor(db)
+    rows = [
+        {"competitor_id": comp.id, "ad_id": "a1", "platform": "facebook", "is_active": True},
+        {"competitor_id": comp.id, "ad_id": "a2", "platform": "instagram", "is_active": True},
+    ]
+    result = upsert_ads(db, rows)
+
+    assert (result.new, result.updated, result.deactivated) == (2, 0, 0)
+    ads = db.query(Ad).filter(Ad.competitor_id == comp.id).all()
+    assert {a.ad_id for a in ads} == {"a1", "a2"}
+    assert all(a.created_at is not None for a in ads)
+
+
+def test_updates_existing_and_counts_deactivated(db):
+    comp = _competitor(db)
+    db.add(Ad(competitor_id=comp.id, ad_id="a1", platform="facebook", is_active=True,
+              ad_text="keep me", impressions_min=10))
+    db.commit()
+
+    end = datetime(2026, 1, 31)
+    result = upsert_ads(db, [
+        {"competitor_id": comp.id, "ad_id": "a1", "is_active": False, "end_date": end,
+         "impressions_min": None, "ad_text": "ignored"},
+        {"competitor_id": comp.id, "ad_id": "a2", "is_active": True},
+    ])
+
+    assert (result.new, result.updated, result.deactivated) == (1, 1, 1)
+    db.expire_all()
+    ad = db.query(Ad).filter(Ad.ad_id == "a1").one()
+    assert ad.is_active is False
+    assert ad.end_date == end
+    assert ad.impressions_min == 10  # NULL never overwrites a stored value
+    assert ad.ad_text == "keep me"  # not an update field
+
+
+def test_insert_only_skips_existing(db):
+    comp = _competitor(db)
+    db.add(Ad(competitor_id=comp.id, ad_id="a1", platform="snapchat", is_active=True))
+    db.commit()
+
+    result = upsert_ads(db, [
+        {"competitor_id": comp.id, "ad_id": "a1", "is_active": False},
+        {"competitor_id": comp.id, "ad_id": "a1", "is_active": False},
+        {"competitor_id": comp.id, "ad_id": ""},
+    ], update_fields=None)
+
+    assert (result.new, result.updated, result.skipped) == (0, 0, 3)
+    db.expire_all()
+    assert db.query(Ad).filter(Ad.ad_id == "a1").one().is_active is True
+
+
+def test_ad_owned_by_other_competitor_keeps_owner(db):
+    comp = _competitor(db)
+    other = _competitor(db, "Leclerc")
+    db.add(Ad(competitor_id=other.id, ad_id="shared", platform="facebook", is_active=True))
+    db.commit()
+
+    upsert_ads(db, [{"competitor_id": comp.id, "ad_id": "shared", "is_active": True}])
+    db.expire_all()
+    assert db.query(Ad).filter(Ad.ad_id == "shared").one().competitor_id == other.id
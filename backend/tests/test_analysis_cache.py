@@ -0,0 +1,120 @@
+"""Tests for the content-addressed AI analysis cache (services/analysis_cache.py)."""
+import asyncio
+import json
+from unittest.mock import AsyncMock, PropertyMock, patch
+
+import pytest
+
+from database import Ad, AnalysisCache
+from services import analysis_cache
+from services.creative_analyzer import CreativeAnalyzer
+
+FAKE_JPEG = b'\xff\xd8' + b'\x00' * 2000
+TEXT_RESULT = {"concept": "promo", "score": 70, "tags": ["prix"]}
+
+
+def _keys(analyzer):
+    return patch.object(type(analyzer), "gemini_key", new_callable=PropertyMock, return_value="k")
+
+
+@pytest.mark.asyncio
+async def test_text_analysis_is_cached_on_normalised_text(db):
+    analyzer = CreativeAnalyzer()
+    call = AsyncMock(return_value=dict(TEXT_RESULT))
+    with patch.object(analyzer, "_analyze_text", call):
+        first = await analyzer.analyze_text_only("Promo  -20% sur TOUT le rayon", ad_id="a1")
+        second = await analyzer.analyze_text_only("promo -20% sur tout le rayon ", ad_id="a2")
+        with patch("services.creative_analyzer.TEXT_ANALYSIS_PROMPT", "new prompt {platform} {ad_text}"):
+            await analyzer.analyze_text_only("promo -20% sur tout le rayon", ad_id="a3")
+
+    assert "_cache" not in first
+    assert second["_cache"] == "exact" and second["concept"] == "promo"
+    assert call.await_count == 2  # prompt change = new version, new analysis
+    assert db.query(AnalysisCache).count() == 2
+
+
+@pytest.mark.asyncio
+async def test_same_image_on_other_ads_skips_the_model(db):
+    analyzer = CreativeAnalyzer()
+    vision = AsyncMock(return_value={"concept": "produit", "score": 80})
+    with _keys(analyzer), \
+         patch.object(analyzer, "_get_image", AsyncMock(return_value=(FAKE_JPEG, "image/jpeg", "https://fresh/1.jpg"))), \
+         patch.object(analyzer, "_call_gemini_vision", vision):
+        await analyzer.analyze_creative("https://a/1.jpg", ad_text="Soldes", ad_id="1")
+        hit = await analyzer.analyze_creative("https://b/2.jpg", ad_text="soldes", ad_id="2")
+        forced = await analyzer.analyze_creative("https://b/2.jpg", ad_text="soldes", ad_id="2", use_cache=False)
+
+    assert vision.await_count == 2
+    assert hit["_cache"] == "exact" and hit["_fresh_url"] == "https://fresh/1.jpg"
+    assert "_cache" not in forced
+    stored = json.loads(db.query(AnalysisCache).one().result)
+    assert "_fresh_url" not in stored  # per-ad data stays out of the cache
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call(db):
+    analyzer = CreativeAnalyzer()
+
+    async def slow(*args):
+        await asyncio.sleep(0.05)
+        return dict(TEXT_RESULT)
+
+    call = AsyncMock(side_effect=slow)
+    with patch.object(analyzer, "_analyze_text", call):
+        results = await asyncio.gather(*[
+            analyzer.analyze_text_only("Livraison offerte des 50 euros", ad_id=str(i)) for i in range(3)
+        ])
+
+    assert call.await_count == 1
+    assert sorted(r.get("_cache", "") for r in results) == ["", "shared", "shared"]
+
+
+def test_perceptual_hash_matches_visually_identical_images(db):
+    # Two encodings of the same visual: different bytes, same perceptual hash
+    with patch("services.analysis_cache.perceptual_hash", return_value="00ff00ff00ff00ff"):
+        exact_a, similar_a = analysis_cache.cache_keys("creative", "m", "v1", ("meta", "txt"), b"jpeg-bytes")
+        exact_b, similar_b = analysis_cache.cache_keys("creative", "m", "v1", ("meta", "txt"), b"png-bytes")
+    assert exact_a != exact_b and similar_a == similar_b
+
+    analysis_cache.store(db, "creative", exact_a, similar_a, "m", "v1", {"score": 55})
+    result, match = analysis_cache.lookup(db, exact_b, similar_b)
+    assert match == "similar" and result == {"score": 55}
+    assert db.query(AnalysisCache).one().similar_hits == 1
+
+
+def test_dhash_is_stable_across_resizes():
+    Image = pytest.importorskip("PIL.Image")
+    import io
+
+    img = Image.new("L", (64, 64))
+    img.putdata([(x * 4 + y) % 256 for y in range(64) for x in range(64)])
+
+    def encode(im, fmt):
+        buf = io.BytesIO()
+        im.save(buf, format=fmt)
+        return buf.getvalue()
+
+    assert analysis_cache.perceptual_hash(encode(img, "PNG")) == \
+        analysis_cache.perceptual_hash(encode(img.resize((128, 128)), "PNG"))
+    assert analysis_cache.perceptual_hash(b"not an image") is None
+
+
+def test_cache_hit_fills_ad_fields_and_stats(client, auth_headers, test_user, test_competitor, db):
+    from services.scheduler import DataCollectionScheduler
+    user, _ = test_user
+    user.is_admin = True
+    ad = Ad(competitor_id=test_competitor.id, ad_id="c1", platform="facebook")
+    db.add(ad)
+    db.commit()
+
+    exact, _ = analysis_cache.cache_keys("creative_text", "m", "v1", ("google", "texte"))
+    analysis_cache.store(db, "creative_text", exact, None, "m", "v1", dict(TEXT_RESULT))
+    result, match = analysis_cache.lookup(db, exact)
+    DataCollectionScheduler._apply_creative_result(ad, dict(result, _cache=match))
+    db.commit()
+    assert ad.creative_concept == "promo" and "_cache" not in json.loads(ad.creative_analysis)
+
+    resp = client.get("/api/admin/analysis-cache", headers=auth_headers)
+    assert resp.status_code == 200
+    kind = resp.json()["kinds"]["creative_text"]
+    assert kind["entries"] == 1 and kind["exact_hits"] == 1 and kind["hit_rate"] == 0.5
@@ -0,0 +1,65 @@
+"""Tests for the async DB access path (database.get_async_db / AsyncDBSession)."""
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+
+from database import AsyncDBSession, Competitor, run_in_db_thread
+from main import app
+from tests.conftest import TestingSessionLocal
+
+
+async def test_run_sync_runs_off_the_event_loop(db, test_competitor):
+    loop_thread = threading.get_ident()
+    session = AsyncDBSession(TestingSessionLocal)
+
+    def query(s):
+        return threading.get_ident(), s.query(Competitor).count()
+
+    try:
+        thread_id, count = await session.run_sync(query)
+    finally:
+        await session.close()
+    assert thread_id != loop_thread
+    assert count == 1
+    assert await run_in_db_thread(lambda x: x * 2, 21) == 42
+
+
+def test_dashboard_and_timeseries_endpoints(client, adv_headers, test_competitor):
+    resp = client.get("/api/watch/dashboard", headers=adv_headers)
+    assert resp.status_code == 200
+    resp = client.get("/api/trends/timeseries", headers=adv_headers)
+    assert resp.status_code == 200
+    assert str(test_competitor.id) in resp.json()["competitors"]
+
+
+async def test_slow_dashboard_does_not_stall_other_endpoints(adv_headers, test_competitor):
+    """Load test: p99 of /api/health while a slow dashboard query is in flight."""
+    import routers.watch as watch
+
+    real_build = watch._build_dashboard_data
+
+    def slow_build(*args, **kwargs):
+        time.sleep(0.5)  # simulated slow SQL
+        return real_build(*args, **kwargs)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        with patch.object(watch, "_build_dashboard_data", slow_build):
+            dashboard = asyncio.create_task(client.get("/api/watch/dashboard", headers=adv_headers))
+            await asyncio.sleep(0.05)
+
+            latencies = []
+            while not dashboard.done():
+                t0 = time.perf_counter()
+                await client.get("/api/health")
+                latencies.append((time.perf_counter() - t0) * 1000)
+                await asyncio.sleep(0.01)  # pace the probe like a real client
+            assert (await dashboard).status_code == 200
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    assert len(latencies) >= 5
+    assert p99 < 250, f"p99={p99:.0f}ms over {len(latencies)} requests"
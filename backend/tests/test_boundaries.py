@@ -0,0 +1,110 @@
+"""Tests for services/boundaries.py and the /api/layers/boundaries endpoints."""
+import json
+from math import cos, sin, pi
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from services.boundaries import BoundaryStore, simplify_geometry, tile_bbox, zoom_level
+
+
+def _circle(lon, lat, r=0.1, n=400):
+    ring = [[lon + r * cos(2 * pi * i / n), lat + r * sin(2 * pi * i / n)] for i in range(n)]
+    return ring + [ring[0]]
+
+
+def _collection():
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "properties": {"code": "75056", "nom": "Paris"},
+             "geometry": {"type": "Polygon", "coordinates": [_circle(2.35, 48.85)]}},
+            {"type": "Feature", "properties": {"code": "75101", "nom": "Paris 1er"},
+             "geometry": {"type": "Polygon", "coordinates": [_circle(2.34, 48.86, 0.01)]}},
+            {"type": "Feature", "properties": {"code": "69123", "nom": "Lyon"},
+             "geometry": {"type": "MultiPolygon", "coordinates": [[_circle(4.83, 45.76)]]}},
+        ],
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BoundaryStore.build(_collection(), tmp_path / "communes.boundaries.sqlite")
+
+
+def test_simplify_keeps_closed_ring():
+    geom = {"type": "Polygon", "coordinates": [_circle(2.35, 48.85)]}
+    simplified = simplify_geometry(geom, 0.01)
+    ring = simplified["coordinates"][0]
+    assert 4 <= len(ring) < 401
+    assert ring[0] == ring[-1]
+    assert simplify_geometry(geom, 0) is geom
+
+
+def test_zoom_levels_and_tiles():
+    assert zoom_level(None) == "full"
+    assert zoom_level(5) == "low"
+    assert zoom_level(9) == "medium"
+    assert zoom_level(14) == "full"
+    min_lon, min_lat, max_lon, max_lat = tile_bbox(0, 0, 0)
+    assert (min_lon, max_lon) == (-180.0, 180.0)
+    assert max_lat == pytest.approx(85.0511, abs=1e-3)
+
+
+def test_store_filters_by_code_prefix_and_bbox(store):
+    assert store.count == 3
+    by_code = [json.loads(f)["properties"]["code"] for f in store.query(code_prefix="75")]
+    assert by_code == ["75056", "75101"]
+    by_bbox = [json.loads(f)["properties"]["code"] for f in store.query(bbox=(4.5, 45.5, 5.0, 46.0))]
+    assert by_bbox == ["69123"]
+
+
+def test_store_levels_reduce_geometry(store):
+    full = json.loads(store.query("full", code_prefix="69")[0])
+    low = json.loads(store.query("low", code_prefix="69")[0])
+    assert len(low["geometry"]["coordinates"][0][0]) < len(full["geometry"]["coordinates"][0][0])
+    payload = json.loads(store.feature_collection("low"))
+    assert payload["type"] == "FeatureCollection" and len(payload["features"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_store_built_from_legacy_geojson_off_the_event_loop(tmp_path):
+    import threading
+    from services.datagouv import DataGouvService
+
+    svc = DataGouvService()
+    svc.cache_dir = tmp_path
+    (tmp_path / "communes_contours.geojson").write_text(json.dumps(_collection()))
+    threads = []
+    build = BoundaryStore.build
+
+    def recording_build(*args):
+        threads.append(threading.get_ident())
+        return build(*args)
+
+    with patch.object(BoundaryStore, "build", side_effect=recording_build):
+        built = await svc.get_boundary_store("communes")
+
+    assert threads and threads[0] != threading.get_ident()
+    assert len(built.query("low", code_prefix="75")) == 2
+    assert not (tmp_path / "communes_contours.geojson").exists()
+
+
+def test_boundaries_endpoint_etag(client, store):
+    from services.datagouv import datagouv_service
+
+    with patch.object(datagouv_service, "get_boundary_store", new=AsyncMock(return_value=store)):
+        resp = client.get("/api/layers/boundaries/communes?code=69")
+        assert resp.status_code == 200
+        assert [f["properties"]["nom"] for f in resp.json()["features"]] == ["Lyon"]
+        etag = resp.headers["etag"]
+
+        cached = client.get("/api/layers/boundaries/communes?code=69", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+
+        tile = client.get("/api/layers/boundaries/communes/tiles/6/32/22")
+        assert tile.status_code == 200
+        assert tile.headers["etag"] != etag
+
+    assert client.get("/api/layers/boundaries/unknown").status_code == 400
+    assert client.get("/api/layers/boundaries/communes?bbox=1,2").status_code == 400
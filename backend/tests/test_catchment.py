@@ -0,0 +1,193 @@
+"""Tests for services/catchment.py — materialised catchment zones."""
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from database import CatchmentZone, Competitor, StoreLocation
+from services.catchment import CommuneBitsets, compute_overlaps, load_catchment_zones
+
+COMMUNES = [
+    {"code": "75056", "latitude": 48.8566, "longitude": 2.3522, "population": 2000000},
+    {"code": "92012", "latitude": 48.8352, "longitude": 2.2409, "population": 120000},
+    {"code": "69123", "latitude": 45.7640, "longitude": 4.8357, "population": 520000},
+]
+
+
+def _competitor(db, name):
+    comp = Competitor(name=name, is_active=True)
+    db.add(comp)
+    db.commit()
+    db.refresh(comp)
+    return comp
+
+
+def _store(db, comp, lat, lon):
+    db.add(StoreLocation(competitor_id=comp.id, source="BANCO", latitude=lat, longitude=lon))
+    db.commit()
+
+
+def _patched_datagouv(version="v1"):
+    from services.datagouv import datagouv_service
+    return patch.multiple(
+        datagouv_service,
+        get_communes_with_data=AsyncMock(return_value=[dict(c) for c in COMMUNES]),
+        dataset_version=lambda key: version,
+    )
+
+
+@pytest.mark.asyncio
+async def test_builds_zone_then_serves_from_table(db):
+    comp = _competitor(db, "Carrefour")
+    _store(db, comp, 48.85, 2.30)
+
+    with _patched_datagouv():
+        zones, stats = await load_catchment_zones(db, [comp.id], 10)
+        assert stats["rebuilt"] == 1
+        zone = zones[comp.id]
+        assert json.loads(zone.communes) == {"75056": 2000000, "92012": 120000}
+        assert zone.population_covered == 2120000
+        assert zone.total_stores == 1
+
+        zones, stats = await load_catchment_zones(db, [comp.id], 10)
+        assert stats["rebuilt"] == 0
+    assert db.query(CatchmentZone).count() == 1
+
+
+@pytest.mark.asyncio
+async def test_rebuilds_only_changed_competitor(db):
+    a = _competitor(db, "Carrefour")
+    b = _competitor(db, "Leclerc")
+    _store(db, a, 48.85, 2.30)
+    _store(db, b, 45.76, 4.83)
+
+    with _patched_datagouv():
+        await load_catchment_zones(db, [a.id, b.id], 10)
+        _store(db, b, 48.86, 2.35)
+        zones, stats = await load_catchment_zones(db, [a.id, b.id], 10)
+
+    assert stats["rebuilt"] == 1
+    assert zones[b.id].nb_communes_covered == 3
+
+
+@pytest.mark.asyncio
+async def test_rebuilds_when_communes_dataset_changes(db):
+    comp = _competitor(db, "Carrefour")
+    _store(db, comp, 48.85, 2.30)
+
+    with _patched_datagouv("v1"):
+        await load_catchment_zones(db, [comp.id], 10)
+    with _patched_datagouv("v2"):
+        _, stats = await load_catchment_zones(db, [comp.id], 10)
+    assert stats["rebuilt"] == 1
+
+
+def test_bitsets_population_and_count():
+    reg = CommuneBitsets()
+    a = reg.encode({"x": 10, "y": 20, "z": 30})
+    b = reg.encode({"y": 20, "z": 30, "w": 5})
+    shared = a & b
+    assert shared.bit_count() == 2
+    assert reg.population(shared) == 50
+    assert reg.encode({}) == 0
+
+
+def test_compute_overlaps(db):
+    a = _competitor(db, "Carrefour")
+    b = _competitor(db, "Leclerc")
+    c = _competitor(db, "Auchan")
+    zones = {}
+    for comp, communes in [(a, {"1": 100, "2": 200}), (b, {"2": 200, "3": 50}), (c, {"9": 1})]:
+        zone = CatchmentZone(competitor_id=comp.id, radius_km=10, communes=json.dumps(communes))
+        db.add(zone)
+        zones[comp.id] = zone
+    db.commit()
+
+    overlaps = compute_overlaps(zones, [a.id, b.id, c.id])
+    assert overlaps == [
+        {"competitor_a": a.id, "competitor_b": b.id, "shared_population": 200, "shared_communes": 1},
+    ]
+    assert compute_overlaps(zones, [a.id, b.id, c.id]) is overlaps  # cached
+
+
+def test_catchment_endpoint_serves_materialised_zones(client, db, auth_headers, test_competitor):
+    _store(db, test_competitor, 48.85, 2.30)
+
+    with _patched_datagouv():
+        first = client.get("/api/geo/catchment-zones?radius_km=10", headers=auth_headers)
+        second = client.get("/api/geo/catchment-zones?radius_km=10", headers=auth_headers)
+
+    assert first.status_code == 200
+    assert first.json()["zones_rebuilt"] == 1
+    data = second.json()
+    assert data["zones_rebuilt"] == 0
+    assert data["competitors"][0]["population_covered"] == 2120000
+    assert data["competitors"][0]["total_stores"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rebuilds_on_moved_store_or_reloaded_rows(db):
+    comp = _competitor(db, "Carrefour")
+    _store(db, comp, 45.76, 4.83)
+
+    with _patched_datagouv():
+        await load_catchment_zones(db, [comp.id], 10)
+        # Same row, new coordinates: count and ids unchanged
+        db.query(StoreLocation).update({"latitude": 48.85, "longitude": 2.30})
+        db.commit()
+        zones, stats = await load_catchment_zones(db, [comp.id], 10)
+        assert stats["rebuilt"] == 1
+        assert json.loads(zones[comp.id].communes) == {"75056": 2000000, "92012": 120000}
+
+        # BANCO refresh: delete + insert reusing the same id, same content
+        store_id = db.query(StoreLocation.id).scalar()
+        db.query(StoreLocation).delete()
+        db.add(StoreLocation(id=store_id, competitor_id=comp.id, source="BANCO", latitude=48.85, longitude=2.30))
+        db.commit()
+        _, stats = await load_catchment_zones(db, [comp.id], 10)
+        assert stats["rebuilt"] == 0
+
+
+@pytest.mark.asyncio
+async def test_zone_records_version_read_after_communes_load(db):
+    from services.datagouv import datagouv_service
+    comp = _competitor(db, "Carrefour")
+    _store(db, comp, 48.85, 2.30)
+    version = {"v": "v1"}
+
+    async def refreshing_load():
+        version["v"] = "v2"  # the load refreshed the dataset file
+        return [dict(c) for c in COMMUNES]
+
+    with patch.multiple(datagouv_service, get_communes_with_data=refreshing_load,
+                        dataset_version=lambda key: version["v"]):
+        zones, _ = await load_catchment_zones(db, [comp.id], 10)
+        assert zones[comp.id].communes_version == "v2"
+        _, stats = await load_catchment_zones(db, [comp.id], 10)
+        assert stats["rebuilt"] == 0
+
+
+@pytest.mark.asyncio
+async def test_zone_created_concurrently_is_updated(db):
+    from database import _add_unique_constraints
+    from services.datagouv import datagouv_service
+    from tests.conftest import TestingSessionLocal
+
+    _add_unique_constraints(db.get_bind())
+    comp = _competitor(db, "Carrefour")
+    _store(db, comp, 48.85, 2.30)
+
+    async def load_while_other_request_commits():
+        other = TestingSessionLocal()
+        other.add(CatchmentZone(competitor_id=comp.id, radius_km=10.0, communes="{}"))
+        other.commit()
+        other.close()
+        return [dict(c) for c in COMMUNES]
+
+    with patch.multiple(datagouv_service, get_communes_with_data=load_while_other_request_commits,
+                        dataset_version=lambda key: "v1"):
+        zones, stats = await load_catchment_zones(db, [comp.id], 10)
+
+    assert stats["rebuilt"] == 1
+    assert json.loads(zones[comp.id].communes) == {"75056": 2000000, "92012": 120000}
+    assert db.query(CatchmentZone).count() == 1
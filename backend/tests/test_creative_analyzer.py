@@ -524,3 +524,79 @@ class TestParseAnalysis:
     def test_invalid_json_returns_none(self):
         analyzer = CreativeAnalyzer()
         assert analyzer._parse_analysis("not json at all") is None
+
+
+# ── TokenBucket / CreativePipeline ──────────────────────────────────
+
+class TestTokenBucket:
+    @pytest.mark.asyncio
+    async def test_paces_beyond_burst(self):
+        import time
+        from services.creative_analyzer import TokenBucket
+
+        bucket = TokenBucket(rate_per_minute=600, burst=2)  # 10/s after a burst of 2
+        t0 = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        elapsed = time.monotonic() - t0
+
+        assert elapsed >= 0.25  # 3 tokens past the burst at 10/s
+        assert bucket.stats()["acquired"] == 5 and bucket.stats()["waits"] == 3
+
+
+class TestCreativePipeline:
+    @staticmethod
+    def _items(n, text_only=False):
+        return [
+            {"key": str(i), "ad_id": f"ad{i}", "creative_url": f"https://x/{i}.jpg",
+             "ad_text": "Promo de la semaine", "platform": "meta", "text_only": text_only}
+            for i in range(n)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_runs_stages_concurrently_and_writes_in_batches(self):
+        import asyncio
+        from services.creative_analyzer import CreativePipeline
+
+        analyzer = CreativeAnalyzer()
+        in_flight = peak = 0
+
+        async def fake_analyze(**kwargs):
+            nonlocal in_flight, peak
+            assert kwargs["image"][0] == FAKE_JPEG  # image comes from the download stage
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if kwargs["ad_id"] == "ad3":
+                raise asyncio.TimeoutError()
+            return {"score": 60}
+
+        batches = []
+        pipeline = CreativePipeline(analyzer, download_workers=3, analyze_workers=4, batch_size=4)
+        with patch.object(analyzer, "_get_image", AsyncMock(return_value=(FAKE_JPEG, "image/jpeg", ""))), \
+             patch.object(analyzer, "analyze_creative", side_effect=fake_analyze):
+            not_started = await pipeline.run(self._items(10), batches.append)
+
+        assert not_started == []
+        assert [len(b) for b in batches] == [4, 4, 2]
+        assert peak > 1
+        errors = [item["key"] for batch in batches for item, _, error in batch if error]
+        assert errors == ["3"]
+        stats = pipeline.stats()
+        assert stats["processed"] == 9 and stats["failed"] == 1
+        assert stats["ads_per_minute"] > 0 and stats["running"] is False
+        assert stats["queue_depth"] == {"download": 0, "analyze": 0, "write": 0}
+
+    @pytest.mark.asyncio
+    async def test_deadline_leaves_items_unstarted(self):
+        import time
+        from services.creative_analyzer import CreativePipeline
+
+        analyzer = CreativeAnalyzer()
+        pipeline = CreativePipeline(analyzer, download_workers=1, analyze_workers=1, batch_size=10)
+        with patch.object(analyzer, "analyze_text_only", AsyncMock(return_value={"score": 50})):
+            not_started = await pipeline.run(self._items(5, text_only=True), lambda b: None,
+                                             deadline=time.monotonic() - 1)
+        assert not_started == ["0", "1", "2", "3", "4"]
+        assert pipeline.processed == 0
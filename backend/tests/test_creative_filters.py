@@ -355,6 +355,17 @@ def test_insights_filter_location(client, db, test_competitor, test_advertiser,
     assert data["total_analyzed"] == 2
 
 
+def test_insights_geo_analysis(client, db, test_competitor, test_advertiser, adv_headers):
+    """Geo analysis counts ads per location from ad_attributes."""
+    _create_test_ads(db, test_competitor, test_advertiser)
+    resp = client.get("/api/creative/insights", headers=adv_headers)
+    geo = {g["location"]: g for g in resp.json()["geo_analysis"]}
+    assert geo["France"]["ad_count"] == 3
+    assert geo["France"]["top_category"] == "Épicerie"
+    assert geo["Île-de-France"]["ad_count"] == 2
+    assert len(geo["Île-de-France"]["competitors"]) == 2
+
+
 def test_insights_combined_filters(client, db, test_competitor, test_advertiser, adv_headers):
     """Insights with combined competitor + category filters."""
     _create_test_ads(db, test_competitor, test_advertiser)
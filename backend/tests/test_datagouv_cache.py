@@ -0,0 +1,146 @@
+"""Tests for the DataGouvService SQLite dataset cache."""
+import io
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from services.datagouv import DataGouvService
+
+
+@pytest.fixture
+def svc(tmp_path):
+    service = DataGouvService()
+    service.cache_dir = tmp_path
+    return service
+
+
+ROWS = [
+    {"code_insee": "75056", "dep_code": "75", "nom_standard": "Paris", "population": "2100000"},
+    {"code_insee": "69123", "dep_code": "69", "nom_standard": "Lyon", "population": "520000"},
+    {"code_insee": "97411", "dep_code": "", "nom_standard": "Saint-Denis", "population": "150000"},
+]
+
+
+def test_write_then_read_roundtrip(svc):
+    svc._write_cache("communes_2025", ROWS)
+    assert svc._cache_row_count("communes_2025") == 3
+    assert svc._read_cache("communes_2025") == ROWS
+
+
+def test_read_projection_and_department_filter(svc):
+    svc._write_cache("communes_2025", ROWS)
+    rows = svc._read_cache("communes_2025", columns=["nom_standard", "missing"], department="69")
+    assert rows == [{"nom_standard": "Lyon"}]
+    # Empty dep_code falls back to the commune code (97x for overseas)
+    assert svc._read_cache("communes_2025", columns=["code_insee"], department="974") == [{"code_insee": "97411"}]
+
+
+def test_read_commune_filter_chunks_params(svc):
+    rows = [{"CODGEO": f"{i:05d}", "P21_POP": str(i)} for i in range(2000)]
+    svc._write_cache("insee_socio_demo", rows)
+    wanted = [f"{i:05d}" for i in range(0, 2000, 2)]
+    result = svc._read_cache("insee_socio_demo", columns=["CODGEO"], communes=wanted)
+    assert sorted(r["CODGEO"] for r in result) == wanted
+    assert svc._read_cache("insee_socio_demo", communes=[]) == []
+
+
+def test_load_csv_stream_latin1(svc):
+    content = "CODGEO;LIBGEO\n01001;L'Abergement-Clémenciat\n01002;L'Abergement-de-Varey\n".encode("latin-1")
+    raw = io.BytesIO(content)
+    count = svc._load_csv_stream("insee_socio_demo", raw, content[:64], ";", "utf-8")
+    assert count == 2
+    rows = svc._read_cache("insee_socio_demo", communes=["01001"])
+    assert rows == [{"CODGEO": "01001", "LIBGEO": "L'Abergement-Clémenciat"}]
+
+
+@pytest.mark.asyncio
+async def test_fetch_dataset_serves_filtered_rows_from_cache(svc):
+    svc._write_cache("communes_2025", ROWS)
+    with patch.object(svc, "_fetch_csv", new_callable=AsyncMock) as fetch:
+        rows = await svc.fetch_dataset("communes_2025", columns=["nom_standard"], department="75")
+    fetch.assert_not_called()
+    assert rows == [{"nom_standard": "Paris"}]
+
+
+@pytest.mark.asyncio
+async def test_fetch_dataset_downloads_and_filters(svc):
+    with patch.object(svc, "_fetch_csv", new_callable=AsyncMock, return_value=ROWS):
+        rows = await svc.fetch_dataset("communes_2025", department="69")
+    assert [r["nom_standard"] for r in rows] == ["Lyon"]
+    assert svc._cache_row_count("communes_2025") == 3
+
+
+@pytest.mark.asyncio
+async def test_fetch_dataset_cache_io_off_the_event_loop(svc):
+    import threading
+
+    threads = []
+    for name in ("_read_cache", "_write_cache"):
+        method = getattr(svc, name)
+
+        def recording(*args, _method=method):
+            threads.append(threading.get_ident())
+            return _method(*args)
+
+        setattr(svc, name, recording)
+
+    with patch.object(svc, "_fetch_csv", new_callable=AsyncMock, return_value=ROWS):
+        await svc.fetch_dataset("communes_2025", department="69")
+    assert await svc.fetch_dataset("communes_2025", columns=["nom_standard"], department="75") == [
+        {"nom_standard": "Paris"}
+    ]
+    assert len(threads) == 3 and threading.get_ident() not in threads
+
+
+@pytest.mark.asyncio
+async def test_get_socio_demo_data_reads_only_requested_communes(svc):
+    svc._write_cache("insee_socio_demo", [
+        {"CODGEO": "75056", "P21_POP": "2100000", "P21_ACT1564": "1000", "P21_CHOM1564": "100", "OTHER": "x"},
+        {"CODGEO": "69123", "P21_POP": "520000"},
+    ])
+    data = await svc.get_socio_demo_data(["75056"])
+    assert list(data) == ["75056"]
+    assert data["75056"]["taux_chomage"] == 10.0
+
+
+@pytest.mark.asyncio
+async def test_download_to_cache_loads_zip_off_the_event_loop(svc):
+    import threading
+    import zipfile
+    from contextlib import asynccontextmanager
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("dossier_complet.csv", "CODGEO;P21_POP\n01001;800\n01002;250\n")
+    payload = buf.getvalue()
+
+    class FakeResponse:
+        def raise_for_status(self):
+            pass
+
+        async def aiter_bytes(self, size):
+            yield payload
+
+    class FakeClient:
+        @asynccontextmanager
+        async def stream(self, method, url):
+            yield FakeResponse()
+
+    @asynccontextmanager
+    async def fake_http_client(**kwargs):
+        yield FakeClient()
+
+    threads = []
+    load = svc._load_csv_stream
+
+    def recording_load(*args):
+        threads.append(threading.get_ident())
+        return load(*args)
+
+    with patch("services.datagouv.http_client", fake_http_client), \
+            patch.object(svc, "_load_csv_stream", recording_load):
+        assert await svc._download_to_cache("insee_socio_demo") is True
+
+    assert threads and threads[0] != threading.get_ident()
+    assert svc._read_cache("insee_socio_demo", communes=["01002"]) == [{"CODGEO": "01002", "P21_POP": "250"}]
+    assert not list(svc.cache_dir.glob("*.download"))
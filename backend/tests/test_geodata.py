@@ -93,7 +93,7 @@ class TestGeoDataService:
         mock_response.content = csv_content
         mock_response.raise_for_status = MagicMock()
 
-        with patch("services.geodata.httpx.AsyncClient") as mock_client_cls:
+        with patch("services.http_client.httpx.AsyncClient") as mock_client_cls:
             mock_client = AsyncMock()
             mock_client.__aenter__ = AsyncMock(return_value=mock_client)
             mock_client.__aexit__ = AsyncMock(return_value=False)
@@ -108,7 +108,7 @@ class TestGeoDataService:
     @pytest.mark.asyncio
     async def test_fetch_csv_error(self):
         svc = GeoDataService()
-        with patch("services.geodata.httpx.AsyncClient") as mock_client_cls:
+        with patch("services.http_client.httpx.AsyncClient") as mock_client_cls:
             mock_client = AsyncMock()
             mock_client.__aenter__ = AsyncMock(return_value=mock_client)
             mock_client.__aexit__ = AsyncMock(return_value=False)
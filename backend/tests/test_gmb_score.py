@@ -134,7 +134,7 @@ class TestSearchAPIExtendedFields:
         mock_client.__aenter__ = AsyncMock(return_value=mock_client)
         mock_client.__aexit__ = AsyncMock(return_value=False)
 
-        with patch("services.gmb_service.httpx.AsyncClient", return_value=mock_client):
+        with patch("services.http_client.httpx.AsyncClient", return_value=mock_client):
             with patch.object(type(self.service), "searchapi_key",
                               new_callable=lambda: property(lambda self: "test_key")):
                 result = await self.service._searchapi_lookup(
@@ -173,7 +173,7 @@ class TestSearchAPIExtendedFields:
         mock_client.__aenter__ = AsyncMock(return_value=mock_client)
         mock_client.__aexit__ = AsyncMock(return_value=False)
 
-        with patch("services.gmb_service.httpx.AsyncClient", return_value=mock_client):
+        with patch("services.http_client.httpx.AsyncClient", return_value=mock_client):
             with patch.object(type(self.service), "searchapi_key",
                               new_callable=lambda: property(lambda self: "test_key")):
                 result = await self.service._searchapi_lookup(
@@ -223,7 +223,7 @@ class TestGooglePlacesExtendedFields:
         mock_client.__aenter__ = AsyncMock(return_value=mock_client)
         mock_client.__aexit__ = AsyncMock(return_value=False)
 
-        with patch("services.gmb_service.httpx.AsyncClient", return_value=mock_client):
+        with patch("services.http_client.httpx.AsyncClient", return_value=mock_client):
             with patch.object(type(self.service), "google_places_key",
                               new_callable=lambda: property(lambda self: "gp_key")):
                 result = await self.service._google_places_lookup(
@@ -264,7 +264,7 @@ class TestGooglePlacesExtendedFields:
         mock_client.__aenter__ = AsyncMock(return_value=mock_client)
         mock_client.__aexit__ = AsyncMock(return_value=False)
 
-        with patch("services.gmb_service.httpx.AsyncClient", return_value=mock_client):
+        with patch("services.http_client.httpx.AsyncClient", return_value=mock_client):
             with patch.object(type(self.service), "google_places_key",
                               new_callable=lambda: property(lambda self: "gp_key")):
                 result = await self.service._google_places_lookup("Test", "Test", "City")
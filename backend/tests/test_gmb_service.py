@@ -90,7 +90,7 @@ class TestGMBService:
         mock_client.__aenter__ = AsyncMock(return_value=mock_client)
         mock_client.__aexit__ = AsyncMock(return_value=False)
 
-        with patch("services.gmb_service.httpx.AsyncClient", return_value=mock_client):
+        with patch("services.http_client.httpx.AsyncClient", return_value=mock_client):
             with patch.object(type(self.service), "searchapi_key", new_callable=lambda: property(lambda self: "test_key")):
                 result = await self.service._searchapi_lookup("Decathlon", "Decathlon", "Paris", 48.85, 2.35)
 
@@ -109,7 +109,7 @@ class TestGMBService:
         mock_client.__aenter__ = AsyncMock(return_value=mock_client)
         mock_client.__aexit__ = AsyncMock(return_value=False)
 
-        with patch("services.gmb_service.httpx.AsyncClient", return_value=mock_client):
+        with patch("services.http_client.httpx.AsyncClient", return_value=mock_client):
             with patch.object(type(self.service), "searchapi_key", new_callable=lambda: property(lambda self: "test_key")):
                 result = await self.service._searchapi_lookup("Unknown Store", "Unknown", "Nowhere")
 
@@ -122,7 +122,7 @@ class TestGMBService:
         mock_client.__aenter__ = AsyncMock(return_value=mock_client)
         mock_client.__aexit__ = AsyncMock(return_value=False)
 
-        with patch("services.gmb_service.httpx.AsyncClient", return_value=mock_client):
+        with patch("services.http_client.httpx.AsyncClient", return_value=mock_client):
             with patch.object(type(self.service), "searchapi_key", new_callable=lambda: property(lambda self: "test_key")):
                 result = await self.service._searchapi_lookup("Store", "Brand", "City")
 
@@ -151,7 +151,7 @@ class TestGMBService:
         mock_client.__aenter__ = AsyncMock(return_value=mock_client)
         mock_client.__aexit__ = AsyncMock(return_value=False)
 
-        with patch("services.gmb_service.httpx.AsyncClient", return_value=mock_client):
+        with patch("services.http_client.httpx.AsyncClient", return_value=mock_client):
             with patch.object(type(self.service), "google_places_key", new_callable=lambda: property(lambda self: "gp_key")):
                 result = await self.service._google_places_lookup("Decathlon", "Decathlon", "Lyon", 45.75, 4.85)
 
@@ -170,7 +170,7 @@ class TestGMBService:
         mock_client.__aenter__ = AsyncMock(return_value=mock_client)
         mock_client.__aexit__ = AsyncMock(return_value=False)
 
-        with patch("services.gmb_service.httpx.AsyncClient", return_value=mock_client):
+        with patch("services.http_client.httpx.AsyncClient", return_value=mock_client):
             with patch.object(type(self.service), "google_places_key", new_callable=lambda: property(lambda self: "gp_key")):
                 result = await self.service._google_places_lookup("Unknown", "Unknown", "Nowhere")
 
@@ -0,0 +1,93 @@
+"""Tests for services/google_ingestion.py — trends upsert, news insert and trends compaction."""
+import os
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import inspect, text
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+os.environ.setdefault("JWT_SECRET", "test-secret-key")
+
+from database import GoogleNewsArticle, GoogleTrendsData, _add_unique_constraints, _compact_google_trends
+from services.google_ingestion import insert_news, news_rows, trends_rows, upsert_trends
+from tests.conftest import TestingSessionLocal
+
+TIMELINE = [
+    {"date": "2026-03-01", "values": {"Carrefour": 40, "Leclerc": 60, "Unknown": 10}},
+    {"date": "2026-03-02", "values": {"Carrefour": 45, "Leclerc": 55}},
+]
+
+
+class TestTrendsUpsert:
+    def test_rows_mapped_to_competitors(self):
+        rows = trends_rows(TIMELINE, {"Carrefour": 1, "Leclerc": 2})
+        assert sorted((r["competitor_id"], r["date"], r["value"]) for r in rows) == [
+            (1, "2026-03-01", 40), (1, "2026-03-02", 45), (2, "2026-03-01", 60), (2, "2026-03-02", 55),
+        ]
+
+    def test_refetch_updates_in_place(self, db):
+        kw_to_comp = {"Carrefour": 1, "Leclerc": 2}
+        assert upsert_trends(db, trends_rows(TIMELINE, kw_to_comp)) == 4
+        # Next day: overlapping timeline, rescaled values and one new point
+        upsert_trends(db, trends_rows([
+            {"date": "2026-03-02", "values": {"Carrefour": 50}},
+            {"date": "2026-03-03", "values": {"Carrefour": 70}},
+        ], kw_to_comp))
+        points = {(r.competitor_id, r.date): r.value for r in db.query(GoogleTrendsData)}
+        assert db.query(GoogleTrendsData).count() == 5
+        assert points[(1, "2026-03-02")] == 50
+        assert points[(1, "2026-03-03")] == 70
+
+    def test_duplicate_keys_in_batch(self, db):
+        rows = trends_rows(TIMELINE[:1], {"Carrefour": 1}) + trends_rows(
+            [{"date": "2026-03-01", "values": {"Carrefour": 42}}], {"Carrefour": 1})
+        assert upsert_trends(db, rows) == 1
+        assert [r.value for r in db.query(GoogleTrendsData)] == [42]
+
+
+class TestNewsInsert:
+    ARTICLES = [
+        {"title": "A", "link": "https://example.com/a"},
+        {"title": "B", "link": "https://example.com/b"},
+        {"title": "No link"},
+        {"title": "A again", "link": "https://example.com/a"},
+    ]
+
+    def test_skips_stored_links(self, db):
+        assert insert_news(db, news_rows(1, self.ARTICLES)) == 2
+        assert insert_news(db, news_rows(2, self.ARTICLES + [{"title": "C", "link": "https://example.com/c"}])) == 1
+        rows = {r.link: r for r in db.query(GoogleNewsArticle)}
+        assert len(rows) == 3
+        assert rows["https://example.com/a"].competitor_id == 1  # first collection kept
+
+
+class TestCompaction:
+    def test_keeps_latest_point_then_adds_unique_index(self, db):
+        engine = db.get_bind()
+        db.execute(text("DROP INDEX uq_google_trends_competitor_keyword_date"))
+        for value in (40, 45, 50):
+            db.add(GoogleTrendsData(competitor_id=1, keyword="Carrefour", date="2026-03-01", value=value))
+        db.add(GoogleTrendsData(competitor_id=1, keyword="Carrefour", date="2026-03-02", value=30))
+        db.commit()
+
+        _compact_google_trends(engine)
+        _add_unique_constraints(engine)
+        assert sorted((r.date, r.value) for r in db.query(GoogleTrendsData)) == [
+            ("2026-03-01", 50), ("2026-03-02", 30),
+        ]
+        indexes = {idx["name"]: idx for idx in inspect(engine).get_indexes("google_trends_data")}
+        assert indexes["uq_google_trends_competitor_keyword_date"]["unique"]
+
+
+@pytest.mark.asyncio
+async def test_daily_job_is_idempotent(db, test_competitor):
+    from services.scheduler import DataCollectionScheduler
+
+    fetch = AsyncMock(return_value={"success": True, "timeline_data": TIMELINE})
+    with patch("services.scheduler.SessionLocal", TestingSessionLocal), \
+            patch("services.searchapi.searchapi.fetch_google_trends", fetch), \
+            patch("asyncio.sleep", AsyncMock()):
+        sched = DataCollectionScheduler()
+        await sched.daily_google_trends()
+        await sched.daily_google_trends()
+    assert db.query(GoogleTrendsData).filter(GoogleTrendsData.competitor_id == test_competitor.id).count() == 2
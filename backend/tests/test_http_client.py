@@ -0,0 +1,82 @@
+"""Tests for services/http_client.py — shared outbound HTTP pool."""
+import asyncio
+
+import httpx
+import pytest
+
+from services import http_client as http_module
+from services.http_client import HttpClientPool, PooledClient
+
+
+@pytest.fixture
+async def pool():
+    calls = []
+
+    async def handler(request: httpx.Request):
+        calls.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"host": request.url.host, "ua": request.headers.get("user-agent")})
+
+    p = HttpClientPool()
+    await p.start()
+    await p._client.aclose()
+    p._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    p.calls = calls
+    yield p
+    await p.close()
+
+
+async def test_shared_client_reused_with_metrics(pool):
+    async with pool.client(timeout=5, headers={"User-Agent": "panorama"}) as client:
+        assert isinstance(client, PooledClient)
+        resp = await client.get("https://api.example.com/a")
+        assert resp.json() == {"host": "api.example.com", "ua": "panorama"}
+    async with pool.client() as client:
+        await client.post("https://api.example.com/b", json={})
+
+    metrics = pool.metrics()
+    host = metrics["hosts"]["api.example.com"]
+    assert metrics["open"] is True
+    assert host["requests"] == 2 and host["errors"] == 0 and host["in_flight"] == 0
+    assert host["avg_latency_ms"] > 0
+    assert metrics["ephemeral_clients"] == 0
+
+
+async def test_per_host_limit_queues_requests(pool, monkeypatch):
+    monkeypatch.setitem(http_module.HOST_LIMITS, "slow.example.com", 2)
+
+    async with pool.client() as client:
+        await asyncio.gather(*(client.get("https://slow.example.com/x") for _ in range(6)))
+
+    host = pool.metrics()["hosts"]["slow.example.com"]
+    assert host["max_in_flight"] == 2
+    assert host["saturated_waits"] >= 1
+    assert host["limit"] == 2
+
+
+async def test_tracked_hosts_bounded(pool, monkeypatch):
+    monkeypatch.setattr(http_module, "MAX_TRACKED_HOSTS", 3)
+    monkeypatch.setitem(http_module.HOST_LIMITS, "api.example.com", 4)
+
+    async with pool.client() as client:
+        await client.get("https://api.example.com/a")
+        for i in range(5):
+            await client.get(f"https://cdn{i}.example.net/img.jpg")
+
+    hosts = pool.metrics()["hosts"]
+    assert set(hosts) == {"api.example.com", "cdn3.example.net", "cdn4.example.net"}
+    assert set(pool._semaphores) == set(hosts)
+
+
+async def test_falls_back_to_ephemeral_client_when_closed():
+    p = HttpClientPool()
+    async with p.client(timeout=3) as client:
+        assert isinstance(client, httpx.AsyncClient)
+    assert client.is_closed
+    assert p.metrics()["open"] is False and p.metrics()["ephemeral_clients"] == 1
+
+
+def test_health_http_endpoint(client):
+    resp = client.get("/api/health/http")
+    assert resp.status_code == 200
+    assert set(resp.json()) >= {"open", "http2", "hosts"}
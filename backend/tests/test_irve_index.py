@@ -0,0 +1,121 @@
+"""Tests for services/irve_index.py — memory-mapped IRVE station index."""
+import asyncio
+import random
+import threading
+
+import pytest
+
+import services.irve_index as irve_index
+from services.datagouv import DataGouvService
+from services.geodata import haversine_distance
+from services.irve_index import IrveIndex, build_index_file, get_irve_index
+
+
+def _rows(n=500, seed=3):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        dep = rng.choice(["75", "69", "13"])
+        rows.append({
+            "id_station_itinerance": f"FR*{i}",
+            "nom_station": f"Station {i}",
+            "consolidated_latitude": str(rng.uniform(43.0, 49.0)).replace(".", ","),
+            "consolidated_longitude": str(rng.uniform(1.0, 6.0)),
+            "consolidated_code_postal": f"{dep}001",
+            "puissance_nominale": "22",
+            "nbre_pdc": str(rng.randint(1, 4)),
+            "nom_operateur": rng.choice(["Ionity", "Tesla", ""]),
+            "gratuit": rng.choice(["true", "false"]),
+        })
+    rows.append({"nom_station": "no coords"})
+    return rows
+
+
+@pytest.fixture(autouse=True)
+def reset_index():
+    irve_index._index = None
+    yield
+    irve_index._index = None
+
+
+def test_build_and_query_radius_matches_brute_force(tmp_path):
+    rows = _rows()
+    path = tmp_path / "irve.idx"
+    assert build_index_file(rows, path, "v1") == 500
+    index = IrveIndex(path)
+
+    lat, lng, radius = 46.0, 3.5, 80
+    got = {index.station(i)["id"] for i, _ in index.query_radius(lat, lng, radius)}
+    expected = {
+        r["id_station_itinerance"] for r in rows[:-1]
+        if haversine_distance(lat, lng, float(r["consolidated_latitude"].replace(",", ".")),
+                              float(r["consolidated_longitude"])) <= radius
+    }
+    assert got == expected
+
+
+def test_department_query_and_station_fields(tmp_path):
+    rows = _rows()
+    path = tmp_path / "irve.idx"
+    build_index_file(rows, path, "v1")
+    index = IrveIndex(path)
+
+    ids = {index.station(i)["id"] for i in index.in_department("69")}
+    assert ids == {r["id_station_itinerance"] for r in rows[:-1] if r["consolidated_code_postal"] == "69001"}
+    assert index.in_department("99") == []
+
+    station = index.station(index.in_department("75")[0])
+    assert station["puissance_max_kw"] == 22.0
+    assert station["code_postal"] == "75001"
+    assert station["distance_km"] is None
+
+
+@pytest.mark.asyncio
+async def test_rebuilds_when_source_version_changes(tmp_path):
+    path = tmp_path / "irve.idx"
+    calls = []
+
+    def load(rows):
+        def _load():
+            calls.append(threading.get_ident())
+            return rows
+        return _load
+
+    first = await get_irve_index(path, "v1", load(_rows(10)))
+    assert first.count == 10
+    assert await get_irve_index(path, "v1", load(_rows(20))) is first
+    second = await get_irve_index(path, "v2", load(_rows(20)))
+    assert second.count == 20
+    assert len(calls) == 2
+    assert threading.get_ident() not in calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_build_once(tmp_path):
+    path = tmp_path / "irve.idx"
+    calls = []
+
+    def load():
+        calls.append(1)
+        return _rows(10)
+
+    indexes = await asyncio.gather(*[get_irve_index(path, "v1", load) for _ in range(3)])
+    assert len(calls) == 1
+    assert all(index is indexes[0] for index in indexes)
+
+
+@pytest.mark.asyncio
+async def test_get_irve_stations_from_cache(tmp_path):
+    svc = DataGouvService()
+    svc.cache_dir = tmp_path
+    svc._write_cache("irve_bornes", _rows())
+
+    stations = await svc.get_irve_stations(lat=46.0, lng=3.5, radius_km=80)
+    assert stations
+    distances = [s["distance_km"] for s in stations]
+    assert distances == sorted(distances)
+    assert all(d <= 80 for d in distances)
+
+    by_dep = await svc.get_irve_stations(department="13")
+    assert by_dep and all(s["code_postal"].startswith("13") for s in by_dep)
+    assert (tmp_path / "irve_bornes.idx").exists()
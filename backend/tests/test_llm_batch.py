@@ -0,0 +1,147 @@
+"""Tests for batched multi-item LLM prompts (services/llm_batch.py and the analyzers' batch modes)."""
+import json
+from unittest.mock import AsyncMock, PropertyMock, patch
+
+import pytest
+
+from database import SocialPost, TaskItem
+from services.creative_analyzer import CreativeAnalyzer, CreativePipeline
+from services.llm_batch import build_batch_prompt, parse_batch
+from services.social_content_analyzer import SocialContentAnalyzer
+from tests.conftest import TestingSessionLocal
+
+
+def _prompt_items(prompt: str) -> list:
+    return json.loads(prompt.split("=== ELEMENTS A ANALYSER ===\n", 1)[1])
+
+
+def fake_model(make_entry, calls):
+    """Model call double: answers a batched prompt through the caller's parser."""
+    async def call(prompt, model=None, max_tokens=None, parser=None):
+        items = _prompt_items(prompt)
+        calls.append(len(items))
+        entries = [e for e in (make_entry(item) for item in items) if e is not None]
+        return parser(json.dumps({"results": entries}))
+    return call
+
+
+class TestParseBatch:
+    def test_maps_by_index_and_strips_fences(self):
+        text = '```json\n{"results": [{"index": 1, "score": 20}, {"index": 0, "score": 10}, "junk"]}\n```'
+        assert parse_batch(text, 2) == {0: {"score": 10}, 1: {"score": 20}}
+
+    def test_truncated_answer_keeps_complete_items(self):
+        text = '{"results": [{"index": 0, "tags": ["a", {"x": 1}]}, {"index": 1, "tags": ["b"]}, {"index": 2, "ta'
+        assert sorted(parse_batch(text, 3)) == [0, 1]
+
+    def test_out_of_range_and_duplicate_indexes_are_ignored(self):
+        text = json.dumps({"results": [{"index": 0, "a": 1}, {"index": 0, "a": 2}, {"index": 7}]})
+        assert parse_batch(text, 2) == {0: {"a": 1}}
+
+    def test_prompt_lists_items_with_indexes(self):
+        prompt = build_batch_prompt("consignes", [{"ad_text": "a"}, {"ad_text": "b"}], "publicités")
+        assert "2 publicités" in prompt
+        assert [i["index"] for i in _prompt_items(prompt)] == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_text_batch_one_prompt_per_group_with_single_fallback(db):
+    analyzer = CreativeAnalyzer()
+    items = [{"ad_text": f"Offre speciale numero {i}", "platform": "google", "ad_id": str(i)} for i in range(12)]
+    items[3]["ad_text"] = "Annonce illisible pour le modele"
+    entry = lambda item: None if "illisible" in item["ad_text"] else {"index": item["index"], "concept": "promo", "score": 60}
+    gemini_calls, mistral_calls = [], []
+    single = AsyncMock(return_value={"concept": "texte", "score": 40})
+
+    with patch.object(analyzer, "_call_gemini_text", side_effect=fake_model(entry, gemini_calls)), \
+         patch.object(analyzer, "_call_mistral", side_effect=fake_model(entry, mistral_calls)), \
+         patch.object(analyzer, "_analyze_text", single):
+        results = await analyzer.analyze_text_batch(items, batch_size=10)
+        again = await analyzer.analyze_text_batch(items[:5], batch_size=10)
+
+    assert gemini_calls == [10, 2] and mistral_calls == [10, 2]
+    assert single.await_count == 1  # only the item missing from both answers
+    assert results[3]["concept"] == "texte"
+    assert all(r["concept"] == "promo" and r["score"] == 60 for i, r in enumerate(results) if i != 3)
+    assert all(r["_cache"] == "exact" for r in again)  # batch results are cached per ad
+
+
+@pytest.mark.asyncio
+async def test_pipeline_groups_text_only_items():
+    analyzer = CreativeAnalyzer()
+    items = [{"key": str(i), "ad_id": str(i), "creative_url": "", "ad_text": f"Texte {i} assez long",
+              "platform": "google", "text_only": True} for i in range(5)]
+    batch = AsyncMock(side_effect=lambda group, batch_size: [{"score": 50}] * len(group))
+    written = []
+    with patch.object(analyzer, "analyze_text_batch", batch):
+        await CreativePipeline(analyzer, analyze_workers=2).run(items, written.extend)
+
+    assert batch.await_count == 1 and len(batch.await_args.args[0]) == 5
+    assert sorted(item["key"] for item, result, _ in written if result) == ["0", "1", "2", "3", "4"]
+
+
+@pytest.mark.asyncio
+async def test_social_batch_falls_back_for_unparsed_posts(db):
+    analyzer = SocialContentAnalyzer()
+    posts = [{"title": f"Post {i}", "description": "bricolage", "platform": "tiktok"} for i in range(3)]
+
+    async def truncated(prompt, model=None, max_tokens=None, parser=None):
+        return parser('{"results": [{"index": 0, "theme": "tuto", "engagement_score": 70}, {"index": 1, "the')
+
+    single = AsyncMock(return_value={"theme": "promo", "engagement_score": 30})
+    with patch.object(type(analyzer), "gemini_key", new_callable=PropertyMock, return_value="k"), \
+         patch.object(type(analyzer), "mistral_key", new_callable=PropertyMock, return_value=""), \
+         patch.object(analyzer, "_call_gemini_text", side_effect=truncated), \
+         patch.object(analyzer, "_analyze", single):
+        results = await analyzer.analyze_content_batch(posts)
+
+    assert results[0]["theme"] == "tuto"
+    assert [r["theme"] for r in results[1:]] == ["promo", "promo"]
+    assert single.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_social_cache_key_includes_engagement_level(db):
+    analyzer = SocialContentAnalyzer()
+    post = {"title": "Recette du jour", "description": "cuisine", "platform": "tiktok"}
+    low = {**post, "views": 1000, "likes": 5}
+    low_next_day = {**post, "views": 1200, "likes": 6}
+    viral = {**post, "views": 2_000_000, "likes": 300_000}
+    calls = []
+    entry = lambda item: {"index": item["index"], "theme": "recette", "engagement_score": len(str(item["views"])) * 10}
+
+    with patch.object(type(analyzer), "gemini_key", new_callable=PropertyMock, return_value="k"), \
+         patch.object(type(analyzer), "mistral_key", new_callable=PropertyMock, return_value=""), \
+         patch.object(analyzer, "_call_gemini_text", side_effect=fake_model(entry, calls)):
+        [first] = await analyzer.analyze_content_batch([low])
+        [same_level, other_level] = await analyzer.analyze_content_batch([low_next_day, viral])
+
+    assert same_level["_cache"] == "exact" and same_level["engagement_score"] == first["engagement_score"]
+    assert other_level["engagement_score"] == 70  # not served from the low-engagement entry
+    assert calls == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_social_drain_batches_posts_without_thumbnail(db, test_competitor):
+    from services import task_queue
+    from services.scheduler import DataCollectionScheduler
+
+    posts = [SocialPost(competitor_id=test_competitor.id, platform="youtube", post_id=f"yt_{i}",
+                        title=f"Video {i}", thumbnail_url="" if i < 3 else "https://img/3.jpg") for i in range(4)]
+    db.add_all(posts)
+    db.commit()
+    task_queue.enqueue_items(db, "social_analysis", [p.id for p in posts])
+
+    batch = AsyncMock(side_effect=lambda items: [{"theme": "tuto", "engagement_score": 55}] * len(items))
+    single = AsyncMock(return_value={"theme": "promo", "engagement_score": 40})
+    with patch("services.social_content_analyzer.social_content_analyzer.analyze_content_batch", batch), \
+         patch("services.social_content_analyzer.social_content_analyzer.analyze_content", single), \
+         patch("services.scheduler.SessionLocal", TestingSessionLocal):
+        result = await DataCollectionScheduler().drain_tasks("social_analysis")
+
+    assert result == {"done": 4, "failed": 0}
+    assert batch.await_count == 1 and len(batch.await_args.args[0]) == 3
+    assert single.await_count == 1  # the post with a thumbnail goes through vision
+    db.expire_all()
+    assert [p.content_theme for p in db.query(SocialPost).order_by(SocialPost.id)] == ["tuto"] * 3 + ["promo"]
+    assert {t.status for t in db.query(TaskItem)} == {"done"}
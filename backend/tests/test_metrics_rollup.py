@@ -0,0 +1,124 @@
+"""Tests for services/metrics_rollup.py — competitor_daily_metrics maintained on ingest."""
+import os
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+os.environ.setdefault("JWT_SECRET", "test-secret-key")
+
+from database import (
+    AppData, CompetitorDailyMetric, InstagramData, SnapchatData, TikTokData,
+    _backfill_competitor_daily_metrics,
+)
+from services.metrics_rollup import load_channel_metrics, rebuild_daily_metrics
+
+
+NOW = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+class TestIngestHook:
+    def test_row_written_on_commit(self, db):
+        db.add(InstagramData(competitor_id=1, followers=1000, engagement_rate=2.5, recorded_at=NOW))
+        db.commit()
+        row = db.query(CompetitorDailyMetric).one()
+        assert row.competitor_id == 1
+        assert row.day == NOW.date()
+        assert row.ig_followers == 1000
+        assert row.ig_engagement_rate == 2.5
+        assert row.tt_followers is None
+
+    def test_same_day_updates_in_place(self, db):
+        db.add(InstagramData(competitor_id=1, followers=1000, recorded_at=NOW - timedelta(hours=2)))
+        db.commit()
+        db.add(InstagramData(competitor_id=1, followers=1100, recorded_at=NOW))
+        db.add(AppData(competitor_id=1, store="playstore", rating=4.1, recorded_at=NOW))
+        db.commit()
+        row = db.query(CompetitorDailyMetric).one()
+        assert row.ig_followers == 1100
+        assert row.ps_rating == 4.1
+        assert row.as_rating is None
+
+    def test_carries_forward_other_channels(self, db):
+        db.add(TikTokData(competitor_id=1, followers=500, recorded_at=NOW - timedelta(days=3)))
+        db.commit()
+        db.add(InstagramData(competitor_id=1, followers=1000, recorded_at=NOW))
+        db.commit()
+        rows = db.query(CompetitorDailyMetric).order_by(CompetitorDailyMetric.day).all()
+        assert [r.day for r in rows] == [(NOW - timedelta(days=3)).date(), NOW.date()]
+        assert rows[0].ig_followers is None
+        assert rows[1].tt_followers == 500
+        assert rows[1].tt_recorded_at == NOW - timedelta(days=3)
+
+    def test_rollback_discards_row(self, db):
+        db.add(InstagramData(competitor_id=1, followers=1000, recorded_at=NOW))
+        db.flush()
+        db.rollback()
+        assert db.query(CompetitorDailyMetric).count() == 0
+
+
+class TestLoadChannelMetrics:
+    def test_latest_and_as_of(self, db):
+        for days_ago, followers in [(10, 900), (7, 950), (1, 1000)]:
+            db.add(InstagramData(competitor_id=1, followers=followers, recorded_at=NOW - timedelta(days=days_ago)))
+        db.add(SnapchatData(competitor_id=2, subscribers=42, recorded_at=NOW))
+        db.commit()
+
+        latest = load_channel_metrics(db, [1, 2, 3])
+        assert latest["instagram"][1].followers == 1000
+        assert latest["snapchat"][2].subscribers == 42
+        assert 2 not in latest["instagram"] and 3 not in latest["instagram"]
+
+        week_ago = load_channel_metrics(db, [1], as_of=NOW - timedelta(days=7))
+        assert week_ago["instagram"][1].followers == 950
+        assert load_channel_metrics(db, [1], as_of=NOW - timedelta(days=30))["instagram"] == {}
+
+    def test_empty_ids(self, db):
+        assert load_channel_metrics(db, [])["instagram"] == {}
+
+
+class TestRebuild:
+    def test_backfill_matches_ingest(self, db):
+        for d in range(5):
+            db.add(InstagramData(competitor_id=1, followers=1000 + d, recorded_at=NOW - timedelta(days=d)))
+            db.add(AppData(competitor_id=1, store="appstore", rating=4.0, recorded_at=NOW - timedelta(days=d, hours=1)))
+        db.commit()
+        expected = [(r.day, r.ig_followers, r.as_rating) for r in
+                    db.query(CompetitorDailyMetric).order_by(CompetitorDailyMetric.day)]
+
+        db.query(CompetitorDailyMetric).delete()
+        db.commit()
+        _backfill_competitor_daily_metrics(db.get_bind())
+        rebuilt = [(r.day, r.ig_followers, r.as_rating) for r in
+                   db.query(CompetitorDailyMetric).order_by(CompetitorDailyMetric.day)]
+        assert rebuilt == expected
+        assert len(rebuilt) == 5
+
+    def test_rebuild_from_day(self, db):
+        db.add(InstagramData(competitor_id=1, followers=1000, recorded_at=NOW - timedelta(days=2)))
+        db.add(InstagramData(competitor_id=1, followers=1200, recorded_at=NOW))
+        db.commit()
+        db.query(InstagramData).filter(InstagramData.followers == 1200).delete()
+        assert rebuild_daily_metrics(db, [1], day_from=NOW.date()) == 0
+        db.commit()
+        assert load_channel_metrics(db, [1])["instagram"][1].followers == 1000
+
+    def test_carry_seeded_from_rollup_not_raw(self, db):
+        db.add(TikTokData(competitor_id=1, followers=500, recorded_at=NOW - timedelta(days=200)))
+        db.commit()
+        # Raw history thinned out (retention): the rollup still holds the carried value
+        db.query(TikTokData).delete()
+        db.commit()
+        db.add(InstagramData(competitor_id=1, followers=1000, recorded_at=NOW))
+        db.commit()
+        today = db.query(CompetitorDailyMetric).filter(CompetitorDailyMetric.day == NOW.date()).one()
+        assert today.tt_followers == 500
+
+    def test_carry_falls_back_to_raw_without_rollup(self, db):
+        db.add(TikTokData(competitor_id=1, followers=500, recorded_at=NOW - timedelta(days=3)))
+        db.commit()
+        db.query(CompetitorDailyMetric).delete()
+        db.commit()
+        assert rebuild_daily_metrics(db, [1], day_from=NOW.date()) == 0
+        db.add(InstagramData(competitor_id=1, followers=1000, recorded_at=NOW))
+        db.commit()
+        today = db.query(CompetitorDailyMetric).filter(CompetitorDailyMetric.day == NOW.date()).one()
+        assert today.tt_followers == 500
@@ -165,7 +165,7 @@ class TestCallGemini:
             }
             mock_response.raise_for_status = MagicMock()
 
-            with patch("services.moby_ai.httpx.AsyncClient") as mock_cls:
+            with patch("services.http_client.httpx.AsyncClient") as mock_cls:
                 mock_client = AsyncMock()
                 mock_client.__aenter__ = AsyncMock(return_value=mock_client)
                 mock_client.__aexit__ = AsyncMock(return_value=False)
@@ -183,7 +183,7 @@ class TestCallGemini:
             mock_response.json.return_value = {"candidates": []}
             mock_response.raise_for_status = MagicMock()
 
-            with patch("services.moby_ai.httpx.AsyncClient") as mock_cls:
+            with patch("services.http_client.httpx.AsyncClient") as mock_cls:
                 mock_client = AsyncMock()
                 mock_client.__aenter__ = AsyncMock(return_value=mock_client)
                 mock_client.__aexit__ = AsyncMock(return_value=False)
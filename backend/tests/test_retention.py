@@ -0,0 +1,116 @@
+"""Tests for services/retention.py — downsampling and text dedupe of the raw history."""
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+os.environ.setdefault("JWT_SECRET", "test-secret-key")
+
+from database import AppData, CompetitorDailyMetric, GoogleTrendsData, InstagramData
+from services.retention import apply_retention, retention_zones
+
+
+NOW = datetime(2026, 6, 17, 12)  # Wednesday
+
+
+def _zones():
+    return {interval: (lo, hi) for interval, lo, hi in retention_zones(NOW, 90, 365)}
+
+
+class TestZones:
+    def test_aligned_bounds(self):
+        zones = _zones()
+        assert zones["day"] == (datetime(2026, 3, 16), datetime(2026, 6, 17))  # Monday, today
+        assert zones["week"] == (datetime(2025, 6, 1), datetime(2026, 3, 16))
+        assert zones["month"] == (None, datetime(2025, 6, 1))
+
+
+class TestDownsampling:
+    def _seed(self, db):
+        for d in range(500):
+            day = datetime(NOW.year, NOW.month, NOW.day) - timedelta(days=d)
+            for hour, followers in ((8, d * 10), (20, d * 10 + 1)):
+                db.add(InstagramData(competitor_id=1, followers=followers, recorded_at=day + timedelta(hours=hour)))
+        db.commit()
+
+    def test_dry_run_reports_without_deleting(self, db):
+        self._seed(db)
+        report = apply_retention(db, dry_run=True, now=NOW)
+        entry = report["tables"]["instagram_data"]
+        assert entry["rows"] > 0 and entry["bytes"] > entry["rows"]
+        assert db.query(InstagramData).count() == 1000
+        assert report["dry_run"] is True
+
+    def test_keeps_last_row_per_bucket(self, db):
+        self._seed(db)
+        rollup_rows = db.query(CompetitorDailyMetric).count()
+        planned = apply_retention(db, dry_run=True, now=NOW)["tables"]["instagram_data"]["rows"]
+        apply_retention(db, dry_run=False, now=NOW)
+        rows = db.query(InstagramData).all()
+        assert len(rows) == 1000 - planned
+
+        zones = _zones()
+        in_zone = lambda name: [r for r in rows if (zones[name][0] is None or r.recorded_at >= zones[name][0])
+                                and r.recorded_at < zones[name][1]]
+        today = [r for r in rows if r.recorded_at >= zones["day"][1]]
+        assert len(today) == 2  # today is left alone
+        daily = in_zone("day")
+        assert all(r.recorded_at.hour == 20 for r in daily)
+        assert max(Counter(r.recorded_at.date() for r in daily).values()) == 1
+        weekly = in_zone("week")
+        assert max(Counter(r.recorded_at.isocalendar()[:2] for r in weekly).values()) == 1
+        monthly = in_zone("month")
+        assert max(Counter((r.recorded_at.year, r.recorded_at.month) for r in monthly).values()) == 1
+        # Rollups are not recomputed from the thinned history
+        assert db.query(CompetitorDailyMetric).count() == rollup_rows
+
+    def test_second_run_is_noop(self, db):
+        self._seed(db)
+        apply_retention(db, dry_run=False, now=NOW)
+        assert apply_retention(db, dry_run=False, now=NOW)["total_rows"] == 0
+
+    def test_trends_string_dates(self, db):
+        for date, value in (("2025-06-02", 40), ("2025-06-04", 55)):  # same week, weekly zone
+            db.add(GoogleTrendsData(competitor_id=1, keyword="k", date=date, value=value))
+        db.commit()
+        apply_retention(db, dry_run=False, now=NOW)
+        assert [r.value for r in db.query(GoogleTrendsData)] == [55]
+
+
+class TestTextDedupe:
+    def test_unchanged_text_nulled_in_final_rows(self, db):
+        old = [(datetime(2025, 1, 31), "A"), (datetime(2025, 2, 28), "A"), (datetime(2025, 3, 31), "B"),
+               (datetime(2025, 4, 30), "B")]
+        for at, text in old:
+            db.add(AppData(competitor_id=1, store="playstore", description=text, changelog="fix", recorded_at=at))
+            db.add(AppData(competitor_id=2, store="playstore", description=text, recorded_at=at))
+        db.add(AppData(competitor_id=1, store="playstore", description="B", changelog="fix", recorded_at=NOW))
+        db.commit()
+
+        report = apply_retention(db, dry_run=False, now=NOW)
+        assert report["tables"]["app_data"]["text_dedupe"]["values"] == 5
+
+        series = db.query(AppData).filter(AppData.competitor_id == 1).order_by(AppData.recorded_at).all()
+        assert [r.description for r in series] == ["A", None, "B", None, "B"]
+        assert [r.changelog for r in series] == ["fix", None, None, None, "fix"]
+        # Series no longer collected are left alone
+        assert [r.description for r in db.query(AppData).filter(AppData.competitor_id == 2)] == ["A", "A", "B", "B"]
+
+
+def test_weekly_job_registered():
+    from services.scheduler import DataCollectionScheduler
+    sched = DataCollectionScheduler()
+    assert sched.scheduler.get_job("weekly_history_retention") is not None
+    assert "weekly_history_retention" in sched.job_functions
+
+
+class TestEndpoints:
+    def test_dry_run_and_report(self, client, auth_headers, test_user, db):
+        user, _ = test_user
+        user.is_admin = True
+        db.commit()
+        resp = client.post("/api/admin/retention/run", headers=auth_headers)
+        assert resp.status_code == 200
+        assert resp.json()["dry_run"] is True
+        report = client.get("/api/admin/retention", headers=auth_headers).json()
+        assert set(report["tables"]) >= {"instagram_data", "app_data", "ad_snapshots", "google_trends_data"}
@@ -0,0 +1,137 @@
+"""Tests for the concurrent daily collection engine."""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from database import Competitor
+from services.collection import ProviderLimiter, CollectionSummary, run_bounded, current_run, timed_source
+from tests.conftest import TestingSessionLocal
+
+
+def _add_competitors(db, n):
+    comps = [Competitor(name=f"Comp {i}", is_active=True) for i in range(n)]
+    db.add_all(comps)
+    db.commit()
+    return comps
+
+
+@pytest.mark.asyncio
+async def test_run_bounded_caps_in_flight():
+    in_flight = 0
+    peak = 0
+
+    async def worker(_):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return True
+
+    results = await run_bounded(range(12), worker, concurrency=3)
+    assert results == [True] * 12
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_run_bounded_returns_exceptions():
+    async def worker(i):
+        if i == 1:
+            raise ValueError("boom")
+        return i
+
+    results = await run_bounded([0, 1, 2], worker, concurrency=2)
+    assert results[0] == 0 and results[2] == 2
+    assert isinstance(results[1], ValueError)
+
+
+@pytest.mark.asyncio
+async def test_provider_limiter_caps_provider():
+    limiter = ProviderLimiter({"scrapecreators": 2})
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.slot("scrapecreators"):
+            peak = max(peak, limiter.stats["scrapecreators"]["in_flight"])
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*[call() for _ in range(6)])
+    assert peak == 2
+    # Uncapped providers never block
+    async with limiter.slot("youtube"):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_timed_source_records_into_active_run():
+    summary = CollectionSummary()
+    token = current_run.set(summary)
+    try:
+        async with timed_source("instagram"):
+            await asyncio.sleep(0)
+        async with timed_source("instagram"):
+            pass
+    finally:
+        current_run.reset(token)
+    summary.finish()
+    data = summary.to_dict()
+    assert data["sources"]["instagram"]["calls"] == 2
+    assert data["wall_clock_seconds"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_daily_collection_runs_competitors_concurrently(db):
+    _add_competitors(db, 6)
+    in_flight = 0
+    peak = 0
+    sessions = []
+
+    async def fake_fetch(worker_db, competitor):
+        nonlocal in_flight, peak
+        sessions.append(worker_db)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    from services.scheduler import DataCollectionScheduler
+    sched = DataCollectionScheduler()
+
+    with patch("services.scheduler.SessionLocal", TestingSessionLocal), \
+         patch("services.scheduler.settings.COLLECTION_CONCURRENCY", 3), \
+         patch.object(sched, "_fetch_competitor_data", side_effect=fake_fetch), \
+         patch.object(sched, "_enrich_payers_searchapi", new_callable=AsyncMock), \
+         patch.object(sched, "_enrich_transparency", new_callable=AsyncMock):
+        await sched.daily_data_collection()
+
+    assert peak == 3
+    assert len({id(s) for s in sessions}) == 6  # one session per worker
+    summary = sched.last_collection_summary
+    assert summary["competitors_total"] == 6
+    assert summary["competitors_done"] == 6
+    assert summary["concurrency"] == 3
+
+
+@pytest.mark.asyncio
+async def test_daily_collection_summary_reports_source_failures(db):
+    _add_competitors(db, 2)
+
+    from services.scheduler import DataCollectionScheduler
+    sched = DataCollectionScheduler()
+
+    async def failing_ads(worker_db, competitor, name):
+        raise RuntimeError("meta down")
+
+    with patch("services.scheduler.SessionLocal", TestingSessionLocal), \
+         patch.object(sched, "_fetch_ads", side_effect=failing_ads), \
+         patch.object(sched, "_enrich_payers_searchapi", new_callable=AsyncMock), \
+         patch.object(sched, "_enrich_transparency", new_callable=AsyncMock):
+        await sched.daily_data_collection()
+
+    summary = sched.last_collection_summary
+    assert summary["failures_count"] == 2
+    assert {f["source"] for f in summary["failures"]} == {"ads"}
+    assert summary["sources"]["ads"]["calls"] == 2
+    assert summary["failures"][0]["error"] == "meta down"
@@ -5,6 +5,8 @@ from unittest.mock import patch, AsyncMock, MagicMock
 
 from database import Ad
 
+FAKE_IMAGE = (b"\xff\xd8" + b"\x00" * 2000, "image/jpeg", "")
+
 
 class NoCloseSession:
     """Wrapper that prevents close() from actually closing the session."""
@@ -41,7 +43,9 @@ async def test_daily_creative_analysis_processes_unanalyzed(db, test_competitor)
     }
 
     with patch("services.creative_analyzer.creative_analyzer.analyze_creative",
-               new_callable=AsyncMock, return_value=mock_result):
+               new_callable=AsyncMock, return_value=mock_result), \
+         patch("services.creative_analyzer.creative_analyzer._get_image",
+               new_callable=AsyncMock, return_value=FAKE_IMAGE):
         from services.scheduler import DataCollectionScheduler
         sched = DataCollectionScheduler()
         with patch("services.scheduler.SessionLocal", return_value=NoCloseSession(db)):
@@ -68,7 +72,9 @@ async def test_daily_creative_analysis_skips_video(db, test_competitor):
     db.commit()
 
     with patch("services.creative_analyzer.creative_analyzer.analyze_creative",
-               new_callable=AsyncMock) as mock_analyze:
+               new_callable=AsyncMock) as mock_analyze, \
+         patch("services.creative_analyzer.creative_analyzer._get_image",
+               new_callable=AsyncMock, return_value=FAKE_IMAGE):
         from services.scheduler import DataCollectionScheduler
         sched = DataCollectionScheduler()
         with patch("services.scheduler.SessionLocal", return_value=NoCloseSession(db)):
@@ -86,7 +92,9 @@ async def test_daily_creative_analysis_skips_google_syndication(db, test_competi
     db.commit()
 
     with patch("services.creative_analyzer.creative_analyzer.analyze_creative",
-               new_callable=AsyncMock) as mock_analyze:
+               new_callable=AsyncMock) as mock_analyze, \
+         patch("services.creative_analyzer.creative_analyzer._get_image",
+               new_callable=AsyncMock, return_value=FAKE_IMAGE):
         from services.scheduler import DataCollectionScheduler
         sched = DataCollectionScheduler()
         with patch("services.scheduler.SessionLocal", return_value=NoCloseSession(db)):
@@ -118,7 +126,9 @@ async def test_daily_creative_analysis_resets_failures(db, test_competitor):
     }
 
     with patch("services.creative_analyzer.creative_analyzer.analyze_creative",
-               new_callable=AsyncMock, return_value=mock_result):
+               new_callable=AsyncMock, return_value=mock_result), \
+         patch("services.creative_analyzer.creative_analyzer._get_image",
+               new_callable=AsyncMock, return_value=FAKE_IMAGE):
         from services.scheduler import DataCollectionScheduler
         sched = DataCollectionScheduler()
         with patch("services.scheduler.SessionLocal", return_value=NoCloseSession(db)):
@@ -133,7 +143,9 @@ async def test_daily_creative_analysis_resets_failures(db, test_competitor):
 async def test_daily_creative_analysis_no_ads(db, test_competitor):
     """No unanalyzed ads → no errors."""
     with patch("services.creative_analyzer.creative_analyzer.analyze_creative",
-               new_callable=AsyncMock) as mock_analyze:
+               new_callable=AsyncMock) as mock_analyze, \
+         patch("services.creative_analyzer.creative_analyzer._get_image",
+               new_callable=AsyncMock, return_value=FAKE_IMAGE):
         from services.scheduler import DataCollectionScheduler
         sched = DataCollectionScheduler()
         with patch("services.scheduler.SessionLocal", return_value=NoCloseSession(db)):
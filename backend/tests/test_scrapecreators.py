@@ -1184,6 +1184,144 @@ class TestCache:
         assert api.cache_stats["misses"] == 2
         assert api.cache_stats["hits"] == 0
 
+    @pytest.mark.asyncio
+    async def test_lru_bound_and_stats(self):
+        """Memory cache is bounded; evictions and bytes are reported."""
+        api = ScrapeCreatorsAPI(api_key="test")
+        api._cache.max_entries = 2
+        mock_response = _make_mock_response({"data": "v"})
+
+        with patch("services.scrapecreators.httpx.AsyncClient") as mock_cls:
+            mock_cls.return_value = _make_mock_client(mock_response)
+            for handle in ("a", "b", "c"):
+                await api._get("/v1/test/profile", {"handle": handle})
+            await api._get("/v1/test/profile", {"handle": "c"})
+
+        stats = api.cache_stats
+        assert stats["size"] == 2
+        assert stats["evictions"] == 1
+        assert stats["bytes"] > 0
+        assert stats["hit_ratio"] == 0.25
+
+    @pytest.mark.asyncio
+    async def test_disk_cache_shared_between_instances(self, tmp_path):
+        """A second client on the same disk cache does not pay for the same call."""
+        from services.response_cache import SQLiteResponseCache
+
+        path = tmp_path / "sc.sqlite"
+        mock_response = _make_mock_response({"data": "persisted"})
+        with patch("services.scrapecreators.httpx.AsyncClient") as mock_cls:
+            mock_client = _make_mock_client(mock_response)
+            mock_cls.return_value = mock_client
+            first = ScrapeCreatorsAPI(api_key="test", disk_cache=SQLiteResponseCache(path))
+            await first._get("/v1/test/profile", {"handle": "foo"})
+
+            second = ScrapeCreatorsAPI(api_key="test", disk_cache=SQLiteResponseCache(path))
+            result = await second._get("/v1/test/profile", {"handle": "foo"})
+
+        assert result["data"] == "persisted"
+        assert mock_client.get.call_count == 1
+        assert second.cache_stats["disk_hits"] == 1
+        assert second.cache_stats["disk"]["size"] == 1
+
+    def test_disk_cache_tracks_bytes_and_evicts(self, tmp_path):
+        """The running byte total follows writes and triggers eviction of least recently read entries."""
+        from services.response_cache import SQLiteResponseCache
+
+        disk = SQLiteResponseCache(tmp_path / "sc.sqlite", max_bytes=100)
+        disk.set("a", {"v": "x" * 30}, 1.0)
+        disk.set("a", {"v": "y" * 30}, 2.0)  # replaced, not counted twice
+        disk.set("b", {"v": "x" * 30}, 3.0)
+        assert disk._bytes == disk.stats()["bytes"] < 100
+        disk.get("a")
+        disk.set("c", {"v": "x" * 30}, 4.0)
+
+        assert disk.get("b") is None and disk.get("a") is not None
+        assert disk.evictions == 1
+        assert disk._bytes == disk.stats()["bytes"]
+        assert SQLiteResponseCache(tmp_path / "sc.sqlite", max_bytes=100)._bytes == disk._bytes
+
+    @pytest.mark.asyncio
+    async def test_disk_cache_io_runs_off_the_event_loop(self, tmp_path):
+        import threading
+        from services.response_cache import SQLiteResponseCache
+
+        disk = SQLiteResponseCache(tmp_path / "sc.sqlite")
+        threads = []
+        for name in ("get", "set"):
+            method = getattr(disk, name)
+
+            def recording(*args, _method=method):
+                threads.append(threading.get_ident())
+                return _method(*args)
+
+            setattr(disk, name, recording)
+
+        api = ScrapeCreatorsAPI(api_key="test", disk_cache=disk)
+        with patch("services.scrapecreators.httpx.AsyncClient") as mock_cls:
+            mock_cls.return_value = _make_mock_client(_make_mock_response({"data": 1}))
+            await api._get("/v1/test/profile", {"handle": "foo"})
+
+        assert len(threads) == 2 and threading.get_ident() not in threads
+
+    def test_unusable_disk_cache_falls_back_to_memory(self, tmp_path):
+        """A path that cannot be created must not break the import-time singleton."""
+        from services.response_cache import open_disk_cache
+
+        blocker = tmp_path / "not-a-dir"
+        blocker.write_text("")
+        assert open_disk_cache(blocker / "sc.sqlite", max_bytes=1024) is None
+        assert open_disk_cache("", max_bytes=1024) is None
+        assert open_disk_cache(tmp_path / "sc.sqlite", max_bytes=1024) is not None
+
+    @pytest.mark.asyncio
+    async def test_stale_while_revalidate(self):
+        """Expired-but-recent entries are served immediately and refreshed in background."""
+        import asyncio
+
+        api = ScrapeCreatorsAPI(api_key="test")
+        with patch("services.scrapecreators.httpx.AsyncClient") as mock_cls:
+            mock_client = AsyncMock()
+            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
+            mock_client.__aexit__ = AsyncMock(return_value=False)
+            mock_client.get = AsyncMock(side_effect=[
+                _make_mock_response({"data": "old"}), _make_mock_response({"data": "new"}),
+            ])
+            mock_cls.return_value = mock_client
+
+            await api._get("/v1/test/profile", {"handle": "foo"})
+            key = next(iter(api._cache))
+            data, ts = api._cache[key]
+            api._cache[key] = (data, ts - 7 * 3600)  # profile TTL is 6h
+
+            stale = await api._get("/v1/test/profile", {"handle": "foo"})
+            assert stale["data"] == "old"
+            await asyncio.gather(*api._refresh_tasks)
+
+        assert api._cache[key][0]["data"] == "new"
+        assert api.cache_stats["stale_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_requests_coalesced(self):
+        """Identical in-flight requests share one upstream call."""
+        import asyncio
+
+        api = ScrapeCreatorsAPI(api_key="test")
+
+        async def slow_get(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return _make_mock_response({"data": "v"})
+
+        with patch("services.scrapecreators.httpx.AsyncClient") as mock_cls:
+            mock_client = _make_mock_client(None)
+            mock_client.get = AsyncMock(side_effect=slow_get)
+            mock_cls.return_value = mock_client
+            results = await asyncio.gather(*(api._get("/v1/x", {"a": "1"}) for _ in range(5)))
+
+        assert all(r["data"] == "v" for r in results)
+        assert mock_client.get.call_count == 1
+        assert api.cache_stats["coalesced"] == 4
+
 
 class TestGetTTL:
     def setup_method(self):
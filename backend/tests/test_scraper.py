@@ -104,7 +104,7 @@ class TestFetchPage:
         mock_response.status_code = 200
         mock_response.text = "<html>OK</html>"
 
-        with patch("services.scraper.httpx.AsyncClient") as mock_cls:
+        with patch("services.http_client.httpx.AsyncClient") as mock_cls:
             mock_client = AsyncMock()
             mock_client.__aenter__ = AsyncMock(return_value=mock_client)
             mock_client.__aexit__ = AsyncMock(return_value=False)
@@ -122,7 +122,7 @@ class TestFetchPage:
         mock_response = MagicMock()
         mock_response.status_code = 404
 
-        with patch("services.scraper.httpx.AsyncClient") as mock_cls:
+        with patch("services.http_client.httpx.AsyncClient") as mock_cls:
             mock_client = AsyncMock()
             mock_client.__aenter__ = AsyncMock(return_value=mock_client)
             mock_client.__aexit__ = AsyncMock(return_value=False)
@@ -137,7 +137,7 @@ class TestFetchPage:
         scraper = Scraper()
         scraper.rate_limiter.last_request = 0
 
-        with patch("services.scraper.httpx.AsyncClient") as mock_cls:
+        with patch("services.http_client.httpx.AsyncClient") as mock_cls:
             mock_client = AsyncMock()
             mock_client.__aenter__ = AsyncMock(return_value=mock_client)
             mock_client.__aexit__ = AsyncMock(return_value=False)
@@ -160,7 +160,7 @@ class TestFetchJson:
         mock_response.status_code = 200
         mock_response.json.return_value = {"key": "value"}
 
-        with patch("services.scraper.httpx.AsyncClient") as mock_cls:
+        with patch("services.http_client.httpx.AsyncClient") as mock_cls:
             mock_client = AsyncMock()
             mock_client.__aenter__ = AsyncMock(return_value=mock_client)
             mock_client.__aexit__ = AsyncMock(return_value=False)
@@ -175,7 +175,7 @@ class TestFetchJson:
         scraper = Scraper()
         scraper.rate_limiter.last_request = 0
 
-        with patch("services.scraper.httpx.AsyncClient") as mock_cls:
+        with patch("services.http_client.httpx.AsyncClient") as mock_cls:
             mock_client = AsyncMock()
             mock_client.__aenter__ = AsyncMock(return_value=mock_client)
             mock_client.__aexit__ = AsyncMock(return_value=False)
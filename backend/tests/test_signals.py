@@ -1,4 +1,5 @@
 """Tests for the signal detection engine (services/signals.py)."""
+import json
 import os
 import pytest
 from datetime import datetime, timedelta
@@ -12,8 +13,7 @@ from services.signals import (
     _pct_change,
     _severity,
     _linear_slope,
-    _get_two_latest,
-    _create_signal,
+    SignalContext,
     _detect_instagram_signals,
     _detect_tiktok_signals,
     _detect_youtube_signals,
@@ -27,6 +27,7 @@ from services.signals import (
     snapshot_active_ads,
     THRESHOLDS,
 )
+from database import Ad, AdDailyStat, AdSnapshot, AppData, Competitor, InstagramData, Signal, SystemSetting
 
 
 # ─── Helper factories ────────────────────────────────────────────
@@ -78,6 +79,14 @@ def _make_app(rating, reviews_count=1000, store="playstore", hours_ago=0, compet
     return r
 
 
+def _ctx(comp_id=1, instagram=(), tiktok=(), youtube=(), apps=()):
+    """In-memory detection context holding the given rows for one competitor."""
+    ctx = SignalContext()
+    for name, rows in (("instagram", instagram), ("tiktok", tiktok), ("youtube", youtube), ("apps", apps)):
+        ctx.series[name] = {comp_id: sorted(rows, key=lambda r: r.recorded_at)}
+    return ctx
+
+
 # ─── Unit: _fmt_pct ──────────────────────────────────────────────
 
 class TestFmtPct:
@@ -155,71 +164,60 @@ class TestLinearSlope:
         assert slope == pytest.approx(-100.0)
 
 
-# ─── Unit: _get_two_latest ───────────────────────────────────────
-
-class TestGetTwoLatest:
-    def test_returns_none_with_one_record(self):
-        """With only 1 record, function returns (None, None) since it needs 2."""
-        from sqlalchemy import create_engine
-        from sqlalchemy.orm import sessionmaker
-        from database import Base, InstagramData
-        engine = create_engine("sqlite:///:memory:")
-        Base.metadata.create_all(bind=engine)
-        db = sessionmaker(bind=engine)()
+# ─── Unit: SignalContext.latest_pair ─────────────────────────────
 
+class TestLatestPair:
+    def test_returns_none_with_one_record(self, db):
+        """With only 1 record, latest_pair returns (None, None) since it needs 2."""
         db.add(InstagramData(competitor_id=1, followers=1000, recorded_at=datetime.utcnow()))
         db.commit()
 
-        latest, prev = _get_two_latest(db, InstagramData, 1)
+        latest, prev = SignalContext.load(db, [1]).latest_pair("instagram", 1)
         assert latest is None
         assert prev is None
-        db.close()
-
-    def test_returns_pair_with_gap(self):
-        from sqlalchemy import create_engine
-        from sqlalchemy.orm import sessionmaker
-        from database import Base, InstagramData
-        engine = create_engine("sqlite:///:memory:")
-        Base.metadata.create_all(bind=engine)
-        db = sessionmaker(bind=engine)()
 
+    def test_returns_pair_with_gap(self, db):
         db.add(InstagramData(competitor_id=1, followers=1000, recorded_at=datetime.utcnow() - timedelta(hours=12)))
         db.add(InstagramData(competitor_id=1, followers=1100, recorded_at=datetime.utcnow()))
         db.commit()
 
-        latest, prev = _get_two_latest(db, InstagramData, 1)
+        latest, prev = SignalContext.load(db, [1]).latest_pair("instagram", 1)
         assert latest.followers == 1100
         assert prev.followers == 1000
-        db.close()
-
-    def test_skips_records_without_enough_gap(self):
-        from sqlalchemy import create_engine
-        from sqlalchemy.orm import sessionmaker
-        from database import Base, InstagramData
-        engine = create_engine("sqlite:///:memory:")
-        Base.metadata.create_all(bind=engine)
-        db = sessionmaker(bind=engine)()
 
+    def test_skips_records_without_enough_gap(self, db):
         now = datetime.utcnow()
         db.add(InstagramData(competitor_id=1, followers=1000, recorded_at=now - timedelta(hours=12)))
         db.add(InstagramData(competitor_id=1, followers=1050, recorded_at=now - timedelta(hours=1)))
         db.add(InstagramData(competitor_id=1, followers=1100, recorded_at=now))
         db.commit()
 
-        latest, prev = _get_two_latest(db, InstagramData, 1, min_gap_hours=6)
+        latest, prev = SignalContext.load(db, [1]).latest_pair("instagram", 1, min_gap_hours=6)
         assert latest.followers == 1100
         assert prev.followers == 1000
-        db.close()
 
+    def test_window_keeps_latest_rows_and_history(self, db):
+        """Old rows beyond the latest ones are not loaded; the 14-day window is complete."""
+        now = datetime.utcnow()
+        for day in range(40):
+            db.add(InstagramData(competitor_id=1, followers=1000 + day, recorded_at=now - timedelta(days=day)))
+        db.add(InstagramData(competitor_id=2, followers=5, recorded_at=now - timedelta(days=30)))
+        db.commit()
+
+        ctx = SignalContext.load(db, [1, 2])
+        assert len(ctx.rows("instagram", 1)) == 14
+        assert len(ctx.window("instagram", 1, days=7)) == 7
+        assert [r.followers for r in ctx.rows("instagram", 2)] == [5]
 
-# ─── Unit: _create_signal ────────────────────────────────────────
 
-class TestCreateSignal:
-    def test_creates_signal(self):
-        db = MagicMock()
+# ─── Unit: SignalContext.emit ────────────────────────────────────
+
+class TestEmit:
+    def test_queues_signal_without_committing(self):
+        ctx = SignalContext()
         comp = _make_comp()
-        result = _create_signal(
-            db, comp,
+        result = ctx.emit(
+            comp,
             signal_type="follower_spike",
             severity="warning",
             platform="instagram",
@@ -228,14 +226,13 @@ class TestCreateSignal:
         assert result["type"] == "follower_spike"
         assert result["severity"] == "warning"
         assert result["competitor"] == "Leclerc"
-        db.add.assert_called_once()
-        db.commit.assert_called_once()
+        assert len(ctx.pending) == 1
+        assert ctx.already_signaled(1, "follower_spike")
 
     def test_brand_signals_downgraded_to_info(self):
-        db = MagicMock()
         comp = _make_comp(is_brand=True)
-        result = _create_signal(
-            db, comp,
+        result = SignalContext().emit(
+            comp,
             signal_type="follower_spike",
             severity="critical",
             platform="instagram",
@@ -248,20 +245,16 @@ class TestCreateSignal:
 
 class TestInstagramSignals:
     def test_no_data_returns_empty(self):
-        db = MagicMock()
-        db.query.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = []
         comp = _make_comp()
-        assert _detect_instagram_signals(db, comp) == []
+        assert _detect_instagram_signals(_ctx(), comp) == []
 
     def test_follower_spike_detected(self):
         now = datetime.utcnow()
         latest = _make_ig(12000, hours_ago=0)
         prev = _make_ig(10000, hours_ago=24)
-        db = MagicMock()
-        db.query.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [latest, prev]
         comp = _make_comp()
 
-        signals = _detect_instagram_signals(db, comp)
+        signals = _detect_instagram_signals(_ctx(instagram=[latest, prev]), comp)
         # 20% increase → critical
         assert len(signals) >= 1
         assert any(s["type"] == "follower_spike" for s in signals)
@@ -269,22 +262,18 @@ class TestInstagramSignals:
     def test_engagement_drop_detected(self):
         latest = _make_ig(10000, engagement_rate=1.0, hours_ago=0)
         prev = _make_ig(10000, engagement_rate=5.0, hours_ago=24)
-        db = MagicMock()
-        db.query.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [latest, prev]
         comp = _make_comp()
 
-        signals = _detect_instagram_signals(db, comp)
+        signals = _detect_instagram_signals(_ctx(instagram=[latest, prev]), comp)
         assert any(s["type"] == "engagement_drop" for s in signals)
 
     def test_small_account_ignored(self):
         """Accounts with < min_followers are ignored."""
         latest = _make_ig(50, hours_ago=0)
         prev = _make_ig(10, hours_ago=24)  # 400% increase but too small
-        db = MagicMock()
-        db.query.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [latest, prev]
         comp = _make_comp()
 
-        signals = _detect_instagram_signals(db, comp)
+        signals = _detect_instagram_signals(_ctx(instagram=[latest, prev]), comp)
         assert not any(s["type"].startswith("follower_") for s in signals)
 
 
@@ -294,11 +283,9 @@ class TestTikTokSignals:
     def test_follower_drop_detected(self):
         latest = _make_tiktok(8000, hours_ago=0)
         prev = _make_tiktok(10000, hours_ago=24)
-        db = MagicMock()
-        db.query.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [latest, prev]
         comp = _make_comp()
 
-        signals = _detect_tiktok_signals(db, comp)
+        signals = _detect_tiktok_signals(_ctx(tiktok=[latest, prev]), comp)
         assert len(signals) >= 1
         assert signals[0]["type"] == "follower_drop"
 
@@ -309,11 +296,9 @@ class TestYouTubeSignals:
     def test_subscriber_spike(self):
         latest = _make_yt(12000, hours_ago=0)
         prev = _make_yt(10000, hours_ago=24)
-        db = MagicMock()
-        db.query.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [latest, prev]
         comp = _make_comp()
 
-        signals = _detect_youtube_signals(db, comp)
+        signals = _detect_youtube_signals(_ctx(youtube=[latest, prev]), comp)
         assert len(signals) >= 1
         assert signals[0]["type"] == "subscriber_spike"
 
@@ -324,22 +309,18 @@ class TestAppSignals:
     def test_rating_drop_detected(self):
         latest = _make_app(3.5, hours_ago=0)
         prev = _make_app(4.2, hours_ago=24)
-        db = MagicMock()
-        db.query.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [latest, prev]
         comp = _make_comp()
 
-        signals = _detect_app_signals(db, comp)
+        signals = _detect_app_signals(_ctx(apps=[latest, prev]), comp)
         assert len(signals) >= 1
         assert signals[0]["type"] == "rating_drop"
 
     def test_rating_up_detected(self):
         latest = _make_app(4.8, hours_ago=0)
         prev = _make_app(4.0, hours_ago=24)
-        db = MagicMock()
-        db.query.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [latest, prev]
         comp = _make_comp()
 
-        signals = _detect_app_signals(db, comp)
+        signals = _detect_app_signals(_ctx(apps=[latest, prev]), comp)
         assert any(s["type"] == "rating_up" for s in signals)
 
 
@@ -347,90 +328,140 @@ class TestAppSignals:
 
 class TestAdSignals:
     def test_ad_surge_detected(self):
-        db = MagicMock()
         comp = _make_comp()
+        ctx = _ctx()
         # current_active = 20, prev_active = 5 → 300% increase
-        db.query.return_value.filter.return_value.scalar.side_effect = [20, 5]
-        # big_ads query = empty
-        db.query.return_value.filter.return_value.all.return_value = []
+        ctx.active_ads, ctx.prev_active_ads = {1: 20}, {1: 5}
 
-        signals = _detect_ad_signals(db, comp)
+        signals = _detect_ad_signals(ctx, comp)
         assert any(s["type"] == "ad_surge" for s in signals)
 
     def test_high_reach_campaign(self):
-        db = MagicMock()
         comp = _make_comp()
-        # ad counts
-        db.query.return_value.filter.return_value.scalar.side_effect = [5, 5]
-        # big ads
+        ctx = _ctx()
+        ctx.active_ads, ctx.prev_active_ads = {1: 5}, {1: 5}
         big_ad = MagicMock()
         big_ad.ad_id = "ad_123"
         big_ad.eu_total_reach = 2_000_000
         big_ad.platform = "meta_ads"
         big_ad.ad_text = "Big sale!"
-        db.query.return_value.filter.return_value.all.return_value = [big_ad]
-        # no existing signal for this ad
-        db.query.return_value.filter.return_value.first.return_value = None
+        ctx.big_ads = {1: [big_ad]}
 
-        signals = _detect_ad_signals(db, comp)
+        signals = _detect_ad_signals(ctx, comp)
         assert any(s["type"] == "high_reach_campaign" for s in signals)
+        # Already signaled for this ad: not repeated
+        assert _detect_ad_signals(ctx, comp) == []
 
 
 # ─── snapshot_active_ads ─────────────────────────────────────────
 
 class TestSnapshotActiveAds:
-    def test_creates_snapshots(self):
-        db = MagicMock()
-        ad1 = MagicMock()
-        ad1.ad_id = "a1"
-        ad1.competitor_id = 1
-        ad1.platform = "meta"
-        ad1.is_active = True
-        ad1.impressions_min = 100
-        ad1.impressions_max = 200
-        ad1.estimated_spend_min = 10
-        ad1.estimated_spend_max = 50
-        ad1.eu_total_reach = 5000
-        db.query.return_value.filter.return_value.all.return_value = [ad1]
+    def _ads(self, db):
+        db.add_all([
+            Ad(ad_id="a1", competitor_id=1, platform="meta", is_active=True,
+               estimated_spend_min=10, estimated_spend_max=50, eu_total_reach=5000),
+            Ad(ad_id="a2", competitor_id=1, platform="meta", is_active=True,
+               estimated_spend_min=5, estimated_spend_max=20, eu_total_reach=1000),
+            Ad(ad_id="a3", competitor_id=2, platform="meta", is_active=True, eu_total_reach=300),
+            Ad(ad_id="old", competitor_id=1, platform="meta", is_active=False, eu_total_reach=9999),
+        ])
+        db.commit()
 
+    def test_creates_snapshots(self, db):
+        self._ads(db)
         count = snapshot_active_ads(db)
-        assert count == 1
-        db.add.assert_called_once()
-        db.commit.assert_called_once()
+        assert count == 3
+        snap = db.query(AdSnapshot).filter(AdSnapshot.ad_id == "a1").one()
+        assert snap.competitor_id == 1
+        assert snap.estimated_spend_max == 50
+        assert snap.eu_total_reach == 5000
+
+    def test_idempotent_per_day(self, db):
+        self._ads(db)
+        snapshot_active_ads(db)
+        db.add(Ad(ad_id="a4", competitor_id=2, platform="meta", is_active=True))
+        db.commit()
+        assert snapshot_active_ads(db) == 1
+        assert db.query(AdSnapshot).count() == 4
+        assert db.query(AdDailyStat).count() == 2
+
+    def test_rolls_up_per_competitor_day(self, db):
+        self._ads(db)
+        snapshot_active_ads(db)
+        row = db.query(AdDailyStat).filter(AdDailyStat.competitor_id == 1).one()
+        assert row.day == datetime.utcnow().date()
+        assert row.active_count == 2
+        assert row.spend_min == 15 and row.spend_max == 70
+        assert row.total_reach == 6000
+
+    def test_rollup_optional(self, db):
+        self._ads(db)
+        snapshot_active_ads(db, rollup=False)
+        assert db.query(AdSnapshot).count() == 3
+        assert db.query(AdDailyStat).count() == 0
+
+    def test_trends_ads_series_reads_rollup(self, db):
+        from routers.trends import _get_ads_series
+        self._ads(db)
+        snapshot_active_ads(db)
+        now = datetime.utcnow()
+        series = _get_ads_series(db, [1], now - timedelta(days=7), now)[1]
+        assert series["active_count"] == [{"date": str(now.date()), "value": 2}]
+        assert series["total_reach"][0]["value"] == 6000
 
 
 # ─── detect_all_signals ──────────────────────────────────────────
 
 class TestDetectAllSignals:
-    def test_runs_all_detectors(self):
-        db = MagicMock()
-        comp = _make_comp()
-        db.query.return_value.filter.return_value.all.return_value = [comp]
-        # Make all sub-detectors return empty
-        db.query.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = []
-        db.query.return_value.filter.return_value.scalar.side_effect = [0, 0]
+    def test_runs_all_detectors_in_one_commit(self, db):
+        now = datetime.utcnow()
+        comps = [Competitor(name=f"Comp {i}", advertiser_id=1, is_active=True) for i in range(3)]
+        db.add_all(comps)
+        db.commit()
+        for comp in comps[:2]:
+            db.add(InstagramData(competitor_id=comp.id, followers=10000, recorded_at=now - timedelta(hours=24)))
+            db.add(InstagramData(competitor_id=comp.id, followers=12000, recorded_at=now))
+        db.add(AppData(competitor_id=comps[2].id, store="playstore", rating=4.2, recorded_at=now - timedelta(hours=24)))
+        db.add(AppData(competitor_id=comps[2].id, store="playstore", rating=3.5, recorded_at=now))
+        db.add(Ad(competitor_id=comps[2].id, ad_id="big", platform="facebook", eu_total_reach=2_000_000))
+        db.commit()
+
+        with patch.object(db, "commit", wraps=db.commit) as commit:
+            signals = detect_all_signals(db)
+        # One commit for the signals, one for the run stats
+        assert commit.call_count == 2
+        assert sorted(s["type"] for s in signals) == ["follower_spike", "follower_spike", "high_reach_campaign", "rating_drop"]
+        assert db.query(Signal).count() == 4
+
+        stats = json.loads(db.query(SystemSetting).filter(SystemSetting.key == "signal_detection_stats").one().value)
+        assert stats["competitors"] == 3 and stats["signals"] == 4
+        assert {"load", "instagram", "ads", "posting_frequency", "insert", "total"} <= set(stats["timings_ms"])
 
-        signals = detect_all_signals(db)
-        assert isinstance(signals, list)
+        # Second run: the campaign is already signaled
+        assert "high_reach_campaign" not in {s["type"] for s in detect_all_signals(db)}
+
+    def test_filters_by_advertiser(self, db):
+        db.add_all([Competitor(name="A", advertiser_id=1, is_active=True),
+                    Competitor(name="B", advertiser_id=2, is_active=True)])
+        db.commit()
+        detect_all_signals(db, advertiser_id=2)
+        stats = json.loads(db.query(SystemSetting).filter(SystemSetting.key == "signal_detection_stats").one().value)
+        assert stats["competitors"] == 1 and stats["advertiser_id"] == 2
 
-    def test_filters_by_advertiser(self):
-        db = MagicMock()
-        detect_all_signals(db, advertiser_id=42)
-        # Should have called filter twice (is_active + advertiser_id)
-        assert db.query.return_value.filter.called
+    def test_detection_stats_endpoint(self, client, auth_headers, db):
+        detect_all_signals(db)
+        resp = client.get("/api/signals/detection-stats", headers=auth_headers)
+        assert resp.status_code == 200
+        assert "timings_ms" in resp.json()
 
 
 # ─── Growth trends ───────────────────────────────────────────────
 
 class TestGrowthTrends:
     def test_no_data_returns_empty(self):
-        db = MagicMock()
-        db.query.return_value.filter.return_value.order_by.return_value.all.return_value = []
-        # _already_signaled
-        db.query.return_value.filter.return_value.first.return_value = None
         comp = _make_comp()
 
-        signals = _detect_growth_trends(db, comp)
+        signals = _detect_growth_trends(_ctx(), comp)
         assert signals == []
 
 
@@ -438,12 +469,9 @@ class TestGrowthTrends:
 
 class TestReviewVelocity:
     def test_no_data_returns_empty(self):
-        db = MagicMock()
-        db.query.return_value.filter.return_value.order_by.return_value.all.return_value = []
-        db.query.return_value.filter.return_value.first.return_value = None
         comp = _make_comp()
 
-        signals = _detect_review_velocity(db, comp)
+        signals = _detect_review_velocity(_ctx(), comp)
         assert signals == []
 
 
@@ -451,11 +479,9 @@ class TestReviewVelocity:
 
 class TestEngagementTrends:
     def test_already_signaled_returns_empty(self):
-        db = MagicMock()
-        db.query.return_value.filter.return_value.first.return_value = MagicMock()  # exists
         comp = _make_comp()
 
-        signals = _detect_engagement_trends(db, comp)
+        signals = _detect_engagement_trends(_ctx(), comp)
         assert signals == []
 
 
@@ -463,10 +489,7 @@ class TestEngagementTrends:
 
 class TestPostingFrequency:
     def test_no_data_returns_empty(self):
-        db = MagicMock()
-        db.query.return_value.filter.return_value.order_by.return_value.all.return_value = []
-        db.query.return_value.filter.return_value.first.return_value = None
         comp = _make_comp()
 
-        signals = _detect_posting_frequency(db, comp)
+        signals = _detect_posting_frequency(_ctx(), comp)
         assert signals == []
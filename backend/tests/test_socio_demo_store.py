@@ -0,0 +1,118 @@
+"""Tests for services/socio_demo_store.py and the socio-demo paths of DataGouvService."""
+from unittest.mock import patch
+
+import pytest
+
+from services.datagouv import DataGouvService
+from services.socio_demo_store import SocioDemoStore
+
+
+def _row(code, pop, hommes, femmes, ages, actifs, chomeurs, menages, prop, csp, revenu="", pauvrete=""):
+    row = {
+        "CODGEO": code, "P21_POP": str(pop), "P21_POPH": str(hommes), "P21_POPF": str(femmes),
+        "P21_ACT1564": str(actifs), "P21_CHOM1564": str(chomeurs),
+        "P21_MEN": str(menages), "P21_RP_PROP": str(prop), "MED21": revenu, "TP60": pauvrete,
+    }
+    for field, value in zip(("POP0014", "POP1529", "POP3044", "POP4559", "POP6074", "POP75P"), ages):
+        row[f"P21_{field}"] = str(value)
+    for cs, value in zip(("CS3", "CS4", "CS5", "CS6", "CS7"), csp):
+        row[f"C21_POP15P_{cs}"] = str(value)
+    return row
+
+
+ROWS = [
+    _row("75056", 1000, 480, 520, (150, 250, 250, 150, 120, 80), 600, 60, 400, 200,
+         (200, 150, 100, 50, 120), revenu="28000", pauvrete="15,5"),
+    _row("69123", 500, 240, 260, (100, 100, 100, 100, 60, 40), 300, 45, 200, 80,
+         (60, 70, 80, 60, 90), revenu="24000"),
+    # Commune sans population INSEE : pondérée par la population de la zone
+    {"CODGEO": "01001", "P21_POP": "", "MED21": "20000", "C21_POP15P_CS3": "5"},
+]
+ROWS[2] = {**{k: "" for k in ROWS[0]}, **ROWS[2]}
+
+
+@pytest.fixture
+def svc(tmp_path):
+    service = DataGouvService()
+    service.cache_dir = tmp_path
+    service._write_cache("insee_socio_demo", ROWS)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_get_socio_demo_data_lookup(svc, tmp_path):
+    data = await svc.get_socio_demo_data(["75056", "01001", "99999"])
+    assert set(data) == {"75056", "01001"}
+
+    paris = data["75056"]
+    assert paris["population"] == 1000
+    assert paris["genre"]["pct_femmes"] == 52.0
+    assert paris["tranches_age"]["15-29"] == 25.0
+    assert paris["taux_chomage"] == 10.0
+    assert paris["pct_proprietaires"] == 50.0
+    assert paris["taux_pauvrete"] == 15.5
+    assert paris["csp"]["retraites"] == 120
+
+    other = data["01001"]
+    assert other["population"] is None and other["revenu_median"] == 20000
+    assert other["csp"]["cadres"] == 5
+    assert (tmp_path / "socio_demo.sqlite").exists()
+
+    assert set(await svc.get_socio_demo_data()) == {"75056", "69123", "01001"}
+
+
+@pytest.mark.asyncio
+async def test_aggregate_socio_demo_weighted(svc):
+    communes = [
+        {"code": "75056", "population": 999},
+        {"code_commune": "69123", "population": 1},
+        {"code": "01001", "population": 100},
+        {"code": "99999", "population": 50},
+    ]
+    agg = await svc._aggregate_socio_demo(communes)
+
+    assert agg["communes_couvertes"] == 3
+    assert agg["genre"] == {"hommes": 720, "femmes": 780, "pct_hommes": 48.0, "pct_femmes": 52.0}
+    # 0-14 : (1000 * 15% + 500 * 20%) / 1600
+    assert agg["tranches_age"]["0-14"] == round(250 / 1600 * 100, 1)
+    assert agg["taux_chomage"] == round((100 + 75) / 1500 * 100, 1)
+    assert agg["pct_proprietaires"] == round((500 + 200) / 1500 * 100, 1)
+    assert agg["revenu_median"] == round((1000 * 28000 + 500 * 24000 + 100 * 20000) / 1600, 0)
+    assert agg["taux_pauvrete"] == 15.5
+    assert agg["csp"]["cadres"] == round(265 / 985 * 100, 1)
+    assert agg["taux_mobinautes"] is not None
+
+    assert await svc._aggregate_socio_demo([{"code": "99999", "population": 10}]) is None
+
+
+@pytest.mark.asyncio
+async def test_store_rebuilt_when_source_changes(svc, tmp_path):
+    store = await svc.get_socio_demo_store()
+    assert store.count == 3
+    assert await svc.get_socio_demo_store() is store
+
+    svc._write_cache("insee_socio_demo", ROWS[:1])
+    svc._cache_path("insee_socio_demo").touch()
+    svc.dataset_version = lambda key: "next"
+    rebuilt = await svc.get_socio_demo_store()
+    assert rebuilt.count == 1 and rebuilt.version == "next"
+    assert SocioDemoStore(tmp_path / "socio_demo.sqlite").version == "next"
+
+
+@pytest.mark.asyncio
+async def test_store_built_once_off_the_event_loop(svc):
+    import asyncio
+    import threading
+
+    threads = []
+    build = SocioDemoStore.build
+
+    def recording_build(*args):
+        threads.append(threading.get_ident())
+        return build(*args)
+
+    with patch.object(SocioDemoStore, "build", side_effect=recording_build):
+        stores = await asyncio.gather(*[svc.get_socio_demo_store() for _ in range(3)])
+
+    assert len(threads) == 1 and threads[0] != threading.get_ident()
+    assert all(store is stores[0] for store in stores)
@@ -0,0 +1,66 @@
+"""Tests for services/spatial_index.py — lat/lon grid index."""
+import random
+
+from services.geodata import haversine_distance, COMMUNES_REFERENCE
+from services.spatial_index import GridIndex, build_commune_index, get_reference_index
+
+
+def _random_communes(n=2000, seed=42):
+    rng = random.Random(seed)
+    return [
+        {"code": str(i), "latitude": rng.uniform(42.0, 51.0), "longitude": rng.uniform(-4.5, 8.0),
+         "population": rng.randint(100, 5000)}
+        for i in range(n)
+    ]
+
+
+def _brute_force(communes, lat, lon, radius_km):
+    return {
+        c["code"] for c in communes
+        if haversine_distance(lat, lon, c["latitude"], c["longitude"]) <= radius_km
+    }
+
+
+class TestGridIndex:
+    def test_query_radius_matches_brute_force(self):
+        communes = _random_communes()
+        index = build_commune_index(communes)
+        assert len(index) == len(communes)
+
+        rng = random.Random(1)
+        for _ in range(50):
+            lat, lon = rng.uniform(42.0, 51.0), rng.uniform(-4.5, 8.0)
+            radius = rng.choice([1, 5, 10, 30, 50])
+            found = {c["code"] for c, _ in index.query_radius(lat, lon, radius)}
+            assert found == _brute_force(communes, lat, lon, radius)
+
+    def test_query_radius_returns_distances(self):
+        index = build_commune_index([{"code": "a", "latitude": 48.86, "longitude": 2.35}])
+        [(commune, dist)] = index.query_radius(48.8566, 2.3522, 5)
+        assert commune["code"] == "a"
+        assert dist == haversine_distance(48.8566, 2.3522, 48.86, 2.35)
+
+    def test_skips_items_without_coords(self):
+        index = build_commune_index([{"code": "a", "population": 10}, {"code": "b", "latitude": 48.0}])
+        assert len(index) == 0
+        assert index.nearest(48.0, 2.0) is None
+
+    def test_nearest_matches_brute_force(self):
+        communes = _random_communes(500)
+        index = build_commune_index(communes)
+        rng = random.Random(7)
+        for _ in range(50):
+            lat, lon = rng.uniform(40.0, 53.0), rng.uniform(-6.0, 10.0)
+            commune, dist = index.nearest(lat, lon)
+            best = min(communes, key=lambda c: haversine_distance(lat, lon, c["latitude"], c["longitude"]))
+            assert commune["code"] == best["code"]
+            assert dist == haversine_distance(lat, lon, best["latitude"], best["longitude"])
+
+    def test_nearest_far_away_point(self):
+        index = GridIndex.build([(43.3, 5.37, "marseille")], lambda p: (p[0], p[1]))
+        payload, dist = index.nearest(50.63, 3.06)
+        assert payload[2] == "marseille"
+        assert dist > 800
+
+    def test_reference_index_covers_reference_communes(self):
+        assert len(get_reference_index()) == len(COMMUNES_REFERENCE)
@@ -0,0 +1,125 @@
+"""Tests for the durable per-item task queue (services/task_queue.py)."""
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from database import Ad, TaskItem
+from services import task_queue
+from tests.conftest import TestingSessionLocal
+
+
+def test_enqueue_is_idempotent_and_rearms_finished_items(db):
+    assert task_queue.enqueue_items(db, "creative_analysis", [1, 2, 2]) == 2
+    assert task_queue.enqueue_items(db, "creative_analysis", [1, 2]) == 0  # still pending
+
+    task = db.query(TaskItem).filter(TaskItem.item_key == "1").first()
+    task_queue.complete(db, task.id)
+    assert task_queue.enqueue_items(db, "creative_analysis", [1, 2], run_id=7) == 1
+    db.refresh(task)
+    assert task.status == "pending" and task.run_id == 7
+    assert db.query(TaskItem).count() == 2
+
+
+def test_lease_is_exclusive_and_expired_leases_are_reclaimed(db):
+    task_queue.enqueue_items(db, "gmb_enrichment", ["10", "11"])
+
+    first = task_queue.lease_batch(db, "gmb_enrichment", "w1", limit=1)
+    assert [t.item_key for t in first] == ["10"]
+    second = task_queue.lease_batch(db, "gmb_enrichment", "w2")
+    assert [t.item_key for t in second] == ["11"]
+    assert task_queue.lease_batch(db, "gmb_enrichment", "w3") == []
+
+    # w1 crashed: its lease expires and another worker takes the item over
+    db.query(TaskItem).filter(TaskItem.item_key == "10").update(
+        {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+    reclaimed = task_queue.lease_batch(db, "gmb_enrichment", "w3")
+    assert [(t.item_key, t.lease_owner) for t in reclaimed] == [("10", "w3")]
+
+
+def test_renew_only_extends_own_leases(db):
+    task_queue.enqueue_items(db, "creative_analysis", ["1", "2", "3"])
+    mine = task_queue.lease_batch(db, "creative_analysis", "w1", limit=2)
+    [theirs] = task_queue.lease_batch(db, "creative_analysis", "w2")
+    task_queue.complete(db, mine[0].id)
+    soon = datetime.utcnow() + timedelta(seconds=1)
+    db.query(TaskItem).filter(TaskItem.status == "leased").update({"lease_expires_at": soon})
+    db.commit()
+
+    ids = [t.id for t in mine] + [theirs.id]
+    assert task_queue.renew_leases(db, "creative_analysis", ids, "w1") == 1
+    db.expire_all()
+    assert db.query(TaskItem).get(mine[1].id).lease_expires_at > soon + timedelta(seconds=60)
+    assert db.query(TaskItem).get(theirs.id).lease_expires_at == soon
+
+
+def test_failures_back_off_then_go_dead(db):
+    task_queue.enqueue_items(db, "social_analysis", ["5"])
+    max_attempts = task_queue.TASK_TYPES["social_analysis"]["max_attempts"]
+
+    for attempt in range(1, max_attempts + 1):
+        task = db.query(TaskItem).first()
+        task.available_at = datetime.utcnow() - timedelta(seconds=1)  # skip the backoff wait
+        db.commit()
+        [leased] = task_queue.lease_batch(db, "social_analysis", "w1")
+        task_queue.fail(db, leased.id, "timeout")
+        db.refresh(task)
+        assert task.attempts == attempt
+        if attempt < max_attempts:
+            assert task.status == "pending"
+            assert task.available_at > datetime.utcnow()
+            assert task_queue.lease_batch(db, "social_analysis", "w1") == []  # still backing off
+
+    assert task.status == "dead" and task.last_error == "timeout"
+    assert task_queue.retry_dead(db, "social_analysis") == 1
+    assert task_queue.retry_delay(1) == timedelta(minutes=1)
+    assert task_queue.retry_delay(3) == timedelta(minutes=4)
+
+
+@pytest.mark.asyncio
+async def test_drain_resumes_and_skips_already_done_items(db, test_competitor):
+    """An interrupted run leaves items queued; the next drain finishes only those."""
+    ads = [Ad(competitor_id=test_competitor.id, ad_id=f"q{i}", platform="facebook",
+              creative_url=f"https://example.com/{i}.jpg") for i in range(3)]
+    db.add_all(ads)
+    db.commit()
+    task_queue.enqueue_items(db, "creative_analysis", [a.id for a in ads])
+
+    # First item already analyzed before the crash (handler must be a no-op for it)
+    ads[0].creative_analyzed_at = datetime.utcnow()
+    ads[0].creative_score = 90
+    db.commit()
+
+    from services.scheduler import DataCollectionScheduler
+    sched = DataCollectionScheduler()
+    analyze = AsyncMock(return_value={"score": 70, "concept": "promo"})
+    with patch("services.creative_analyzer.creative_analyzer.analyze_creative", analyze), \
+         patch("services.creative_analyzer.creative_analyzer._get_image",
+               AsyncMock(return_value=(b"img", "image/jpeg", ""))), \
+         patch("services.scheduler.SessionLocal", TestingSessionLocal):
+        result = await sched.drain_tasks("creative_analysis")
+
+    assert result["done"] == 2 and result["failed"] == 0
+    assert analyze.await_count == 2
+    db.expire_all()
+    assert [a.creative_score for a in db.query(Ad).order_by(Ad.id)] == [90, 70, 70]
+    assert {t.status for t in db.query(TaskItem)} == {"done"}
+
+
+def test_admin_task_queue_reports_backlog_and_throughput(client, auth_headers, test_user, db):
+    user, _ = test_user
+    user.is_admin = True
+    db.commit()
+    task_queue.enqueue_items(db, "gmb_enrichment", ["1", "2", "3"])
+    [leased] = task_queue.lease_batch(db, "gmb_enrichment", "w1", limit=1)
+    task_queue.complete(db, leased.id)
+
+    resp = client.get("/api/admin/task-queue", headers=auth_headers)
+    assert resp.status_code == 200
+    gmb = resp.json()["task_types"]["gmb_enrichment"]
+    assert gmb["backlog"] == 2 and gmb["done"] == 1 and gmb["done_last_hour"] == 1
+    assert gmb["job_id"] == "weekly_gmb_enrichment"
+
+    assert client.post("/api/admin/task-queue/unknown/retry-dead", headers=auth_headers).status_code == 404
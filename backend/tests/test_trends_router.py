@@ -0,0 +1,133 @@
+"""Tests for routers/trends.py — multi-competitor timeseries and summary."""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+os.environ.setdefault("JWT_SECRET", "test-secret-key")
+
+from database import AdvertiserCompetitor, Competitor, InstagramData, AppData, GoogleTrendsData
+
+
+# ─── Helpers ──────────────────────────────────────────────────────
+
+def _add_competitors(db, advertiser, n):
+    comps = [Competitor(name=f"Comp {i}", is_active=True) for i in range(n)]
+    db.add_all(comps)
+    db.commit()
+    for comp in comps:
+        db.add(AdvertiserCompetitor(advertiser_id=advertiser.id, competitor_id=comp.id))
+    db.commit()
+    return comps
+
+
+def _add_instagram(db, comp, days, base=1000):
+    now = datetime(2026, 3, 31, 12)
+    for d in range(days):
+        db.add(InstagramData(
+            competitor_id=comp.id,
+            followers=base + d,
+            engagement_rate=1.0,
+            recorded_at=now - timedelta(days=days - 1 - d),
+        ))
+    db.commit()
+
+
+class _QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+PARAMS = "date_from=2026-03-01&date_to=2026-03-31T23:59:59"
+
+
+# ─── GET /timeseries ──────────────────────────────────────────────
+
+class TestTimeseries:
+    def test_raw_points_per_competitor(self, client, db, test_advertiser, adv_headers):
+        comps = _add_competitors(db, test_advertiser, 2)
+        _add_instagram(db, comps[0], 3)
+        resp = client.get(f"/api/trends/timeseries?{PARAMS}", headers=adv_headers)
+        assert resp.status_code == 200
+        data = resp.json()["competitors"]
+        followers = data[str(comps[0].id)]["instagram"]["followers"]
+        assert [p["value"] for p in followers] == [1000, 1001, 1002]
+        assert followers[-1]["date"].startswith("2026-03-31T12:00")
+        assert data[str(comps[1].id)]["instagram"]["followers"] == []
+
+    def test_weekly_keeps_last_point_per_week(self, client, db, test_advertiser, adv_headers):
+        comps = _add_competitors(db, test_advertiser, 1)
+        _add_instagram(db, comps[0], 14)  # 2026-03-18 (Wed) .. 2026-03-31 (Tue)
+        resp = client.get(f"/api/trends/timeseries?{PARAMS}&interval=week", headers=adv_headers)
+        assert resp.status_code == 200
+        followers = resp.json()["competitors"][str(comps[0].id)]["instagram"]["followers"]
+        assert followers == [
+            {"date": "2026-03-16", "value": 1004},  # Sunday 22nd
+            {"date": "2026-03-23", "value": 1011},  # Sunday 29th
+            {"date": "2026-03-30", "value": 1013},
+        ]
+
+    def test_monthly_buckets_per_store_and_keyword(self, client, db, test_advertiser, adv_headers):
+        comps = _add_competitors(db, test_advertiser, 1)
+        cid = comps[0].id
+        db.add(AppData(competitor_id=cid, store="playstore", rating=4.0, recorded_at=datetime(2026, 3, 2)))
+        db.add(AppData(competitor_id=cid, store="playstore", rating=4.2, recorded_at=datetime(2026, 3, 20)))
+        db.add(AppData(competitor_id=cid, store="appstore", rating=3.0, recorded_at=datetime(2026, 3, 25)))
+        db.add(GoogleTrendsData(competitor_id=cid, keyword="a", date="2026-03-10", value=40))
+        db.add(GoogleTrendsData(competitor_id=cid, keyword="b", date="2026-03-12", value=70))
+        db.commit()
+        resp = client.get(f"/api/trends/timeseries?{PARAMS}&interval=month", headers=adv_headers)
+        data = resp.json()["competitors"][str(cid)]
+        assert data["playstore"]["rating"] == [{"date": "2026-03-01", "value": 4.2}]
+        assert data["appstore"]["rating"] == [{"date": "2026-03-01", "value": 3.0}]
+        assert sorted(p["value"] for p in data["google_trends"]["interest"]) == [40, 70]
+
+    def test_invalid_interval_rejected(self, client, adv_headers):
+        resp = client.get("/api/trends/timeseries?interval=hour", headers=adv_headers)
+        assert resp.status_code == 422
+
+    def test_query_count_independent_of_competitors(self, client, db, test_advertiser, adv_headers):
+        engine = db.get_bind()
+        comps = _add_competitors(db, test_advertiser, 2)
+        for comp in comps:
+            _add_instagram(db, comp, 3)
+        with _QueryCounter(engine) as few:
+            client.get(f"/api/trends/timeseries?{PARAMS}", headers=adv_headers)
+            client.get(f"/api/trends/summary?{PARAMS}", headers=adv_headers)
+
+        for comp in _add_competitors(db, test_advertiser, 10):
+            _add_instagram(db, comp, 3)
+        with _QueryCounter(engine) as many:
+            client.get(f"/api/trends/timeseries?{PARAMS}", headers=adv_headers)
+            client.get(f"/api/trends/summary?{PARAMS}", headers=adv_headers)
+        assert many.count == few.count
+
+
+# ─── GET /summary ─────────────────────────────────────────────────
+
+class TestSummary:
+    def test_deltas_between_start_and_end(self, client, db, test_advertiser, adv_headers):
+        comps = _add_competitors(db, test_advertiser, 2)
+        _add_instagram(db, comps[0], 30)
+        resp = client.get(
+            "/api/trends/summary?date_from=2026-03-24&date_to=2026-03-31T23:59:59", headers=adv_headers,
+        )
+        assert resp.status_code == 200
+        entries = {c["competitor_id"]: c["metrics"] for c in resp.json()["competitors"]}
+        followers = entries[comps[0].id]["ig_followers"]
+        assert followers["value"] == 1029
+        assert followers["previous"] == 1021  # last point on or before 2026-03-24 00:00
+        assert followers["delta"] == 8
+        assert entries[comps[1].id] == {}
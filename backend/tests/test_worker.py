@@ -0,0 +1,162 @@
+"""Tests for the job queue / DB locks (services/jobs.py) and the worker process."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import JobLock, JobRun
+from services import jobs
+from services.scheduler import DataCollectionScheduler
+from services.worker import Worker
+
+
+def test_lock_is_exclusive_until_expiry(db):
+    ttl = timedelta(minutes=5)
+    assert jobs.acquire_lock(db, "daily_collection", "a", ttl) is True
+    assert jobs.acquire_lock(db, "daily_collection", "b", ttl) is False
+    assert jobs.acquire_lock(db, "daily_collection", "a", ttl) is True  # re-entrant renew
+
+    db.query(JobLock).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    assert jobs.acquire_lock(db, "daily_collection", "b", ttl) is True
+
+    jobs.release_lock(db, "daily_collection", "b")
+    assert db.query(JobLock).count() == 0
+
+
+def test_enqueue_dedupes_and_claim_is_atomic(db):
+    first = jobs.enqueue_job(db, "daily_seo_tracking", requested_by="admin@test.com")
+    again = jobs.enqueue_job(db, "daily_seo_tracking", requested_by="other@test.com")
+    assert again.id == first.id
+
+    run = jobs.claim_next_run(db, worker="w1")
+    assert run.id == first.id and run.status == "running" and run.worker == "w1"
+    assert jobs.claim_next_run(db, worker="w2") is None
+
+    jobs.finish_run(db, run.id, error="boom")
+    db.expire_all()
+    assert db.query(JobRun).get(run.id).status == "failed"
+
+
+def test_trigger_endpoint_enqueues_instead_of_running(client, auth_headers, test_user, db):
+    user, _ = test_user
+    user.is_admin = True
+    db.commit()
+
+    resp = client.post("/api/scheduler/run-gmb", headers=auth_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert "GMB" in data["message"] and data["status"] == "queued"
+
+    run = db.query(JobRun).get(data["run_id"])
+    assert run.job_id == "weekly_gmb_enrichment"
+    assert run.requested_by == user.email
+
+    status = client.get("/api/scheduler/status").json()
+    assert status["running"] is False
+    assert status["runs"][0]["id"] == run.id
+    assert all(job["next_run"] for job in status["jobs"])
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_queued_job_under_lock(db):
+    sched = DataCollectionScheduler()
+    calls = []
+
+    async def fake_job():
+        calls.append(db.query(JobLock).filter(JobLock.job_id == "daily_geo_tracking").count())
+
+    sched.job_functions["daily_geo_tracking"] = fake_job
+    run = jobs.enqueue_job(db, "daily_geo_tracking")
+    worker = Worker(sched, poll_seconds=0)
+
+    assert await worker.poll_once() == 1
+    for task in list(worker._running.values()):
+        await task
+
+    assert calls == [1]  # lock held while the job ran
+    db.expire_all()
+    assert db.query(JobRun).get(run.id).status == "done"
+    assert db.query(JobLock).count() == 0
+
+
+@pytest.mark.asyncio
+async def test_worker_requeues_when_job_locked_elsewhere(db):
+    sched = DataCollectionScheduler()
+    ran = []
+
+    async def fake_job():
+        ran.append(True)
+
+    sched.job_functions["daily_aso_analysis"] = fake_job
+    jobs.acquire_lock(db, "daily_aso_analysis", "other-host:1", timedelta(minutes=5))
+    run = jobs.enqueue_job(db, "daily_aso_analysis")
+    worker = Worker(sched, poll_seconds=0)
+
+    await worker.poll_once()
+    for task in list(worker._running.values()):
+        await task
+
+    assert ran == []
+    db.expire_all()
+    assert db.query(JobRun).get(run.id).status == "queued"
+
+
+@pytest.mark.asyncio
+async def test_run_cancelled_when_lock_taken_over(db):
+    import asyncio
+
+    async def stolen_job():
+        async with jobs.job_lock("daily_signals", holder="w1", ttl=timedelta(seconds=0.3)):
+            db.query(JobLock).update({"holder": "w2"})
+            db.commit()
+            await asyncio.sleep(5)
+
+    with pytest.raises(jobs.LockLost):
+        await asyncio.wait_for(stolen_job(), timeout=2)
+    db.expire_all()
+    assert db.query(JobLock).one().holder == "w2"  # the new holder keeps its lease
+
+
+def test_recover_stale_runs(db):
+    old = datetime.utcnow() - timedelta(hours=2)
+    crashed = JobRun(job_id="daily_collection", status="running", worker="gone:1", started_at=old)
+    alive = JobRun(job_id="daily_seo_tracking", status="running", worker="w1", started_at=old)
+    fresh = JobRun(job_id="daily_geo_tracking", status="running", worker="w1", started_at=datetime.utcnow())
+    db.add_all([crashed, alive, fresh])
+    db.commit()
+    jobs.acquire_lock(db, "daily_seo_tracking", "w1", timedelta(minutes=5))
+
+    assert jobs.recover_stale_runs(db, timedelta(minutes=15)) == 1
+    db.expire_all()
+    assert [r.status for r in (crashed, alive, fresh)] == ["failed", "running", "running"]
+
+
+@pytest.mark.asyncio
+async def test_inline_worker_shutdown_waits_for_running_job(db, monkeypatch):
+    import asyncio
+
+    import main
+    from core.config import settings
+
+    monkeypatch.setattr(settings, "SCHEDULER_ENABLED", False)
+    sched = DataCollectionScheduler()
+    started, finished = asyncio.Event(), []
+
+    async def slow_job():
+        started.set()
+        await asyncio.sleep(0.2)
+        finished.append(True)
+
+    sched.job_functions["daily_geo_tracking"] = slow_job
+    run = jobs.enqueue_job(db, "daily_geo_tracking")
+    worker = Worker(sched, poll_seconds=0.05)
+    monkeypatch.setattr(main, "_inline_worker", worker)
+    monkeypatch.setattr(main, "_inline_worker_task", asyncio.create_task(worker.run()))
+
+    await asyncio.wait_for(started.wait(), timeout=5)
+    await main._stop_inline_worker()
+
+    assert finished == [True] and main._inline_worker_task.done()
+    db.expire_all()
+    assert db.query(JobRun).get(run.id).status == "done"
+    assert db.query(JobLock).count() == 0